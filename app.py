@@ -15,6 +15,14 @@ app.register_blueprint(health_bp)
 app.register_blueprint(history_bp)
 app.register_blueprint(chart_bp)
 
+# ADDITIVE: Warm restart - muat snapshot worksheet dari disk, revalidasi berjalan di background
+from services.sheet_cache import load_persistent_snapshots
+load_persistent_snapshots()
+
+# ADDITIVE: Warm-up cache di background (prefetch worksheet whitelist), /health tidak ikut menunggu
+from services.cache_warmup import start_background_warmup
+start_background_warmup()
+
 if __name__ == '__main__':
     # ADDITIVE: Env-based config for production safety (default behavior preserved)
     host = os.getenv('HOST', '127.0.0.1')
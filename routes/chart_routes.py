@@ -7,7 +7,7 @@ import os
 import gspread
 from datetime import datetime
 from services.aggregation import safe_float
-from routes.sheet_routes import get_gsheet, get_worksheet
+from routes.sheet_routes import get_gsheet, get_worksheet, load_worksheet_dataset
 
 chart_bp = Blueprint('chart_bp', __name__)
 
@@ -37,9 +37,9 @@ def generate_chart():
 
     # Ambil data dari Google Sheets (additive, robust)
     try:
-        sh = get_gsheet(sheet_id=sheet)
-        ws = get_worksheet(sh, worksheet) if worksheet else sh.worksheets()[0]
-        data = ws.get_all_records(head=1)
+        # ADDITIVE: Lewat DatasetLoader (cache + single-flight) alih-alih get_all_records() per request
+        dataset, worksheet_title = load_worksheet_dataset(sheet, worksheet or None)
+        data = dataset.records()
         if not data:
             return jsonify({"error": "Data tidak ditemukan di worksheet."}), 404
         df = pd.DataFrame(data)
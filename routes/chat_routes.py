@@ -14,76 +14,59 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 print('DEBUG: Blueprint dan API key selesai, sebelum route')
 DB_PATH = 'chat_history.db'
 VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
-GSHEET_CACHE_TTL_ENV = os.environ.get('GSHEET_CACHE_TTL')
-try:
-    _GSHEET_CACHE_TTL = int(GSHEET_CACHE_TTL_ENV) if GSHEET_CACHE_TTL_ENV else 60 * 60
-except Exception:
-    pass
-
 # CACHE GOOGLE SHEETS (TTL bisa diatur via env GSHEET_CACHE_TTL)
-# ADDITIVE: Max cache size to prepaiaent memory leak (100 worksheets max)
-_GSHEET_CACHE_MAX_SIZE = int(os.environ.get('GSHEET_CACHE_MAX_SIZE', 100))
-_gsheet_cache = {}
-_gsheet_cache_lock = threading.Lock()
-
-def get_cached_sheet_data(sheet_id, worksheet_name):
-    cache_key = f"{sheet_id}:{worksheet_name}"
-    now = time.time()
-    with _gsheet_cache_lock:
-        entry = _gsheet_cache.get(cache_key)
-        if entry:
-            data, ts = entry
-            if now - ts < _GSHEET_CACHE_TTL:
-                if VERBOSE_LOG:
-                    print(f"[CACHE] HIT for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
-                return data
-            else:
-                if VERBOSE_LOG:
-                    print(f"[CACHE] EXPIRED for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
-                del _gsheet_cache[cache_key]
-        if VERBOSE_LOG:
-            print(f"[CACHE] MISS for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
-    return None
+# ADDITIVE: Cache dipindah ke services/sheet_cache.py agar bisa dipakai loader paralel; nama lama tetap bisa di-import dari sini
+from services.sheet_cache import (  # noqa: E402
+    _GSHEET_CACHE_TTL, _GSHEET_CACHE_MAX_SIZE, _gsheet_cache, _gsheet_cache_lock,
+    get_cached_sheet_data, set_cached_sheet_data, clear_gsheet_cache, get_gsheet_cache_status,
+    get_singleflight_stats, get_swr_stats, get_shared_tier_status, get_cache_policy_status
+)
 
-def set_cached_sheet_data(sheet_id, worksheet_name, data):
-    cache_key = f"{sheet_id}:{worksheet_name}"
-    with _gsheet_cache_lock:
-        # ADDITIVE: LRU eviction when cache is full
-        if len(_gsheet_cache) >= _GSHEET_CACHE_MAX_SIZE:
-            # Remove oldest entry (by timestamp)
-            oldest_key = min(_gsheet_cache.keys(), key=lambda k: _gsheet_cache[k][1])
-            del _gsheet_cache[oldest_key]
-            if VERBOSE_LOG:
-                print(f"[CACHE] EVICTED oldest entry: {oldest_key} (cache full: {_GSHEET_CACHE_MAX_SIZE})")
-        
-        _gsheet_cache[cache_key] = (data, time.time())
-        if VERBOSE_LOG:
-            print(f"[CACHE] SET for {cache_key} (rows: {len(data)}) (TTL: {_GSHEET_CACHE_TTL}s) (size: {len(_gsheet_cache)}/{_GSHEET_CACHE_MAX_SIZE})")
-
-def clear_gsheet_cache():
-    with _gsheet_cache_lock:
-        _gsheet_cache.clear()
-        if VERBOSE_LOG:
-            print("[CACHE] CLEARED")
 # Endpoint cache control (additive, setelah chat_bp didefinisikan)
 @chat_bp.route('/cache/status', methods=['GET'])
 def cache_status():
     """Endpoint untuk melihat status cache Google Sheets (additive, tidak mengubah logika lama)."""
-    with _gsheet_cache_lock:
-        status = []
-        now = time.time()
-        for key, (data, ts) in _gsheet_cache.items():
-            sheet_id, worksheet_name = key.split(':', 1)
-            age = now - ts
-            status.append({
-                "sheet_id": sheet_id,
-                "worksheet": worksheet_name,
-                "rows": len(data),
-                "age_seconds": age,
-                "ttl_seconds": _GSHEET_CACHE_TTL,
-                "expired": age > _GSHEET_CACHE_TTL
-            })
-    return jsonify({"success": True, "cache": status, "count": len(status)})
+    status = get_gsheet_cache_status()
+    # ADDITIVE: Info sesi Google Sheets yang di-pool (token expiry, handle spreadsheet)
+    from services.gsheet_client import get_gsheet_client_status
+    from services.snapshot_store import get_snapshot_status
+    from services.sheet_revision import get_revision_stats
+    from services.sheet_incremental import get_incremental_stats
+    from services.sheet_metadata import get_metadata_cache_status
+    from services.worksheet_table import get_table_stats
+    from services.cache_warmup import get_warmup_status
+    from services.dataset_loader import get_dataset_loader_stats
+    from services.column_resolver import get_resolver_stats
+    from services.numeric_parser import get_numeric_stats
+    from services.olap_cube import get_cube_stats
+    from services.calendar_table import get_calendar_stats
+    from services.temporal_index import get_temporal_index_stats
+    from services.dimension_index import get_dimension_index_stats
+    from services.row_selection import get_row_selection_stats
+    return jsonify({
+        "success": True,
+        "cache": status,
+        "count": len(status),
+        "eviction": get_cache_policy_status(),
+        "singleflight": get_singleflight_stats(),
+        "stale_while_revalidate": get_swr_stats(),
+        "shared_cache": get_shared_tier_status(),
+        "snapshots": get_snapshot_status(),
+        "revision_check": get_revision_stats(),
+        "incremental": get_incremental_stats(),
+        "typed_tables": get_table_stats(),
+        "warmup": get_warmup_status(),
+        "datasets": get_dataset_loader_stats(),
+        "column_resolver": get_resolver_stats(),
+        "numeric_parsing": get_numeric_stats(),
+        "olap_cube": get_cube_stats(),
+        "calendar": get_calendar_stats(),
+        "temporal_index": get_temporal_index_stats(),
+        "dimension_index": get_dimension_index_stats(),
+        "row_selection": get_row_selection_stats(),
+        "gsheet_client": get_gsheet_client_status(),
+        "metadata_cache": get_metadata_cache_status()
+    })
 
 @chat_bp.route('/cache/clear', methods=['POST'])
 def cache_clear():
@@ -91,6 +74,28 @@ def cache_clear():
     clear_gsheet_cache()
     return jsonify({"success": True, "message": "Cache Google Sheets cleared."})
 
+@chat_bp.route('/cache/warm', methods=['POST'])
+def cache_warm():
+    """
+    ADDITIVE: Prefetch worksheet ke cache setelah data push (butuh CACHE_WARM_TOKEN).
+    Body JSON opsional: {"sheet_ids": [...], "worksheets": [...], "force": true, "async": false}
+    """
+    from services.cache_warmup import check_warm_token, run_warmup, start_background_warmup, get_warmup_status
+    ok, status_code, message = check_warm_token(request.headers)
+    if not ok:
+        return jsonify({"success": False, "error": message}), status_code
+    body = request.get_json(silent=True) or {}
+    sheet_ids = body.get('sheet_ids') or ([body['sheet_id']] if body.get('sheet_id') else None)
+    worksheets = body.get('worksheets') or ([body['worksheet']] if body.get('worksheet') else None)
+    if (sheet_ids is not None and not isinstance(sheet_ids, list)) or (worksheets is not None and not isinstance(worksheets, list)):
+        return jsonify({"success": False, "error": "sheet_ids dan worksheets harus berupa list"}), 400
+    force = bool(body.get('force', True))
+    if body.get('async'):
+        start_background_warmup(sheet_ids, worksheets=worksheets, force=force, source="manual")
+        return jsonify({"success": True, "message": "Warm-up berjalan di background.", "warmup": get_warmup_status()}), 202
+    result = run_warmup(sheet_ids, worksheets=worksheets, force=force, source="manual")
+    return jsonify({"success": not result["errors"], "result": result})
+
 def get_db():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
@@ -207,6 +212,9 @@ def chat():
 
     # --- SELALU LOAD DATA WORKSHEET/KOLOM SEBELUM INTENT DETECTION ---
     from routes.sheet_routes import get_gsheet_by_id, get_worksheet
+    from services.sheet_loader import get_worksheet_whitelist
+    from services.dataset_loader import get_dataset_loader
+    from services.row_selection import RowSelection
     import os
     sheet_ids = [os.getenv('GOOGLE_SHEET_ID'), os.getenv('GOOGLE_SHEET2_ID')]
     print('DEBUG: sheet_ids loaded:', sheet_ids)
@@ -215,74 +223,22 @@ def chat():
     # Default: only load worksheets containing "age gender" and "region" (case-insensitive)
     # Set WORKSHEET_WHITELIST='*' to load all worksheets (old behavior)
     # UPDATED: Changed default from 'Age & Gender,Region' to 'age gender,region' to match new simplified worksheet names
-    worksheet_whitelist_env = os.getenv('WORKSHEET_WHITELIST', 'age gender,region')
-    if worksheet_whitelist_env.strip() == '*':
-        WORKSHEET_WHITELIST = None  # Load all worksheets (old behavior)
+    # ADDITIVE: Pola whitelist di-resolve sekali per proses oleh services/sheet_loader.py
+    WORKSHEET_WHITELIST = get_worksheet_whitelist()
+    if WORKSHEET_WHITELIST is None:
         print('[DEBUG] WORKSHEET_WHITELIST=* - Loading ALL worksheets (old behavior preserved)')
     else:
-        WORKSHEET_WHITELIST = [pattern.strip().lower() for pattern in worksheet_whitelist_env.split(',')]  # ADDITIVE: Convert to lowercase for case-insensitive matching
         print(f'[DEBUG] WORKSHEET_WHITELIST active (case-insensitive): {WORKSHEET_WHITELIST}')
     
-    all_data = []
-    worksheet_row_meta = []  # metadata jumlah baris per worksheet per file
-    for idx, sheet_id in enumerate(sheet_ids):
-        print(f'\n[DEBUG] ===== Mulai iterasi ke-{idx+1} untuk sheet_id: {sheet_id} =====')
-        if not sheet_id:
-            print(f'[DEBUG] sheet_id kosong pada iterasi ke-{idx+1}, skip')
-            print(f'[DEBUG] ===== Selesai iterasi ke-{idx+1} untuk sheet_id: {sheet_id} (KOSONG) =====\n')
-            continue
-        try:
-            print(f'[DEBUG] Memanggil get_gsheet_by_id untuk sheet_id: {sheet_id}')
-            sh = get_gsheet_by_id(sheet_id)
-            print(f'[DEBUG] Sukses get_gsheet_by_id untuk sheet_id: {sheet_id}')
-            worksheet_objs = sh.worksheets()
-            worksheet_names = [ws.title for ws in worksheet_objs]
-            print(f'[DEBUG] Sheet {sheet_id} worksheets: {worksheet_names}')
-            for ws_name in worksheet_names:
-                # ADDITIVE: Filter worksheet by whitelist pattern (case-insensitive)
-                if WORKSHEET_WHITELIST is not None:
-                    ws_name_lower = ws_name.lower()  # ADDITIVE: Convert worksheet name to lowercase for matching
-                    if not any(pattern in ws_name_lower for pattern in WORKSHEET_WHITELIST):
-                        print(f'[DEBUG] SKIP worksheet "{ws_name}" - not matching whitelist patterns (case-insensitive): {WORKSHEET_WHITELIST}')
-                        continue  # Skip worksheet yang tidak match whitelist
-                data = get_cached_sheet_data(sheet_id, ws_name)
-                if data is None:
-                    ws = None
-                    try:
-                        ws = sh.worksheet(ws_name)
-                    except Exception as e_ws:
-                        print(f'[DEBUG] Worksheet "{ws_name}" not found in sheet "{sheet_id}", fallback ke worksheet pertama. Error: {e_ws}')
-                        worksheets = sh.worksheets()
-                        if worksheets:
-                            ws = worksheets[0]
-                            ws_name = ws.title
-                            print(f'[DEBUG] Fallback: Using first worksheet "{ws_name}" from sheet "{sheet_id}"')
-                    if ws:
-                        data = ws.get_all_records(head=1)
-                        for row in data:
-                            row['worksheet'] = ws_name
-                        set_cached_sheet_data(sheet_id, ws_name, data)
-                        print(f'[DEBUG] Loaded worksheet "{ws_name}" from sheet "{sheet_id}" with {len(data)} rows.')
-                    else:
-                        print(f'[DEBUG] Tidak ada worksheet valid di sheet "{sheet_id}"')
-                        data = []
-                else:
-                    print(f'[DEBUG] Loaded worksheet "{ws_name}" from sheet "{sheet_id}" from cache with {len(data)} rows.')
-                worksheet_row_meta.append({
-                    'sheet_id': sheet_id,
-                    'worksheet': ws_name,
-                    'row_count': len(data)
-                })
-                print(f'[DEBUG] worksheet_row_meta appended: sheet_id={sheet_id}, worksheet={ws_name}, row_count={len(data)}')
-                all_data.extend(data)
-            print(f'[DEBUG] ===== Selesai iterasi ke-{idx+1} untuk sheet_id: {sheet_id} =====\n')
-        except Exception as e:
-            print(f'[ERROR] Exception pada iterasi ke-{idx+1} untuk sheet_id {sheet_id}: {e}')
-            import traceback
-            traceback.print_exc()
-            print(f'[DEBUG] ===== Selesai iterasi ke-{idx+1} untuk sheet_id: {sheet_id} (ERROR) =====\n')
-            continue
-    sheet_data = all_data
+    # ADDITIVE: Semua spreadsheet & worksheet di-load lewat DatasetLoader (services/dataset_loader.py):
+    # cache, paralel (values:batchGet per spreadsheet) dan retry sumber yang gagal ada di satu tempat.
+    # Hasilnya DatasetSnapshot immutable; worksheet_row_meta adalah salinan list-nya.
+    # ADDITIVE: sheet_data = RowSelection (services/row_selection.py), view per partisi tanpa salinan list baris;
+    # filter worksheet/temporal/adset di bawah hanya mempersempit posisi baris
+    dataset = get_dataset_loader().load(sheet_ids, WORKSHEET_WHITELIST)
+    sheet_data = dataset.selection()
+    worksheet_row_meta = dataset.worksheet_row_meta()
+    print(f'[DEBUG] Dataset snapshot v{dataset.version}: {len(dataset.partitions)} worksheet')
     print('[DEBUG] Total sheet_data gabungan:', len(sheet_data))
     print('[DEBUG] Worksheet row meta:', worksheet_row_meta)
     for i, row in enumerate(sheet_data[:3]):
@@ -600,7 +556,7 @@ def chat():
             print(f'[DEBUG] Matched worksheet: {matched_worksheets[0]}')
             
             original_data_count = len(sheet_data)
-            sheet_data = [row for row in sheet_data if row.get('worksheet') == mentioned_worksheet]
+            sheet_data = sheet_data.where_worksheet([mentioned_worksheet])
             filtered_data_count = len(sheet_data)
             print(f'[DEBUG] Data filtered: {original_data_count} rows -> {filtered_data_count} rows')
             
@@ -658,7 +614,7 @@ def chat():
                 
                 # Filter data (PRESERVED logic)
                 original_data_count = len(sheet_data)
-                sheet_data = [row for row in sheet_data if row.get('worksheet') in matched_worksheets]
+                sheet_data = sheet_data.where_worksheet(matched_worksheets)
                 filtered_data_count = len(sheet_data)
                 print(f'[DEBUG] Data filtered: {original_data_count} rows -> {filtered_data_count} rows')
                 
@@ -894,67 +850,11 @@ Pertanyaan user: {question}"""
     # CRITICAL: Cek apakah sheet_data sudah di-load dan di-filter sebelumnya (untuk worksheet-specific analysis)
     # Jika sheet_data sudah ada dan sudah di-filter, JANGAN reload lagi agar filter tetap berlaku
     if 'sheet_data' not in locals() or sheet_data is None or len(sheet_data) == 0:
-        print('[DEBUG] sheet_data not yet loaded or empty, loading from Google Sheets now...')
-        # Multi-sheet support: load data dari dua file sheet (dari .env)
-        from routes.sheet_routes import get_gsheet_by_id, get_worksheet
-        import os
-        sheet_ids = [os.getenv('GOOGLE_SHEET_ID'), os.getenv('GOOGLE_SHEET2_ID')]
-        all_data = []
-        for sheet_id in sheet_ids:
-            if not sheet_id:
-                continue
-            try:
-                sh = get_gsheet_by_id(sheet_id)
-                worksheet_objs = sh.worksheets()
-                worksheet_names = [ws.title for ws in worksheet_objs]
-                print(f'[DEBUG] Sheet {sheet_id} worksheets: {worksheet_names}')
-            except Exception as e:
-                print(f'[DEBUG] Gagal mengambil daftar worksheet dari sheet "{sheet_id}": {e}')
-                continue
-            for ws_name in worksheet_names:
-                    # ADDITIVE: Filter worksheet by whitelist pattern (case-insensitive, same as above)
-                    if WORKSHEET_WHITELIST is not None:
-                        ws_name_lower = ws_name.lower()  # ADDITIVE: Convert to lowercase for case-insensitive matching
-                        if not any(pattern in ws_name_lower for pattern in WORKSHEET_WHITELIST):
-                            print(f'[DEBUG] SKIP worksheet "{ws_name}" - not matching whitelist patterns (case-insensitive): {WORKSHEET_WHITELIST}')
-                            continue  # Skip worksheet yang tidak match whitelist
-                    
-                    data = get_cached_sheet_data(sheet_id, ws_name)
-                    if data is None:
-                        try:
-                            ws = None
-                            try:
-                                ws = sh.worksheet(ws_name)
-                            except Exception as e_ws:
-                                print(f'[DEBUG] Worksheet "{ws_name}" not found in sheet "{sheet_id}", fallback ke worksheet pertama. Error: {e_ws}')
-                                worksheets = sh.worksheets()
-                                if worksheets:
-                                    ws = worksheets[0]
-                                    ws_name = ws.title
-                                    print(f'[DEBUG] Fallback: Using first worksheet "{ws_name}" from sheet "{sheet_id}"')
-                            if ws:
-                                data = ws.get_all_records(head=1)
-                                for row in data:
-                                    row['worksheet'] = ws_name
-                                set_cached_sheet_data(sheet_id, ws_name, data)
-                                print(f'[DEBUG] Loaded worksheet "{ws_name}" from sheet "{sheet_id}" with {len(data)} rows.')
-                            else:
-                                print(f'[DEBUG] Tidak ada worksheet valid di sheet "{sheet_id}"')
-                                data = []
-                        except Exception as e:
-                            print(f'[DEBUG] Worksheet "{ws_name}" not found in sheet "{sheet_id}", skipping. Error: {e}')
-                            data = []
-                    else:
-                        print(f'[DEBUG] Loaded worksheet "{ws_name}" from sheet "{sheet_id}" from cache with {len(data)} rows.')
-                    worksheet_row_meta.append({
-                        'sheet_id': sheet_id,
-                        'worksheet': ws_name,
-                        'row_count': len(data)
-                    })
-                    print(f'[DEBUG] worksheet_row_meta appended: sheet_id={sheet_id}, worksheet={ws_name}, row_count={len(data)}')
-                    all_data.extend(data)
-        sheet_data = all_data
-        print('[DEBUG] Total sheet_data gabungan (fresh load):', len(sheet_data))
+        print('[DEBUG] sheet_data empty (filter worksheet / sumber gagal), memakai dataset snapshot awal...')
+        # ADDITIVE: Dataset sudah di-load (dengan retry) di awal request - tidak perlu load ulang semua worksheet
+        worksheet_row_meta.extend(dataset.worksheet_row_meta())
+        sheet_data = dataset.selection()
+        print(f'[DEBUG] Total sheet_data gabungan (snapshot v{dataset.version}):', len(sheet_data))
     else:
         print(f'[DEBUG] sheet_data ALREADY LOADED and possibly filtered: {len(sheet_data)} rows. Skipping reload to preserve filter.')
         print('[DEBUG] Total sheet_data (using existing filtered data):', len(sheet_data))
@@ -991,12 +891,8 @@ Pertanyaan user: {question}"""
                 sheet_id = meta.get('sheet_id')
                 ws_name = meta.get('worksheet')
                 key = (sheet_id, ws_name)
-                ws_rows = [row for row in sheet_data if row.get('worksheet') == ws_name and row.get('sheet_id', sheet_id) == sheet_id]
-                if ws_rows:
-                    columns = list(ws_rows[0].keys())
-                    worksheet_columns[key] = columns
-                else:
-                    worksheet_columns[key] = []
+                # ADDITIVE: Header partisi worksheet dari RowSelection, tanpa scan semua baris per worksheet
+                worksheet_columns[key] = RowSelection.of(sheet_data).columns(key)
                 print(f'[DEBUG] worksheet_columns[{key}]: {worksheet_columns[key]}')
             print('[DEBUG] worksheet_columns FINAL:', worksheet_columns)
             if worksheet_columns:
@@ -1063,7 +959,17 @@ Pertanyaan user: {question}"""
                 "Kami sedang mengoptimalkan untuk mengatasi masalah ini. Terima kasih atas kesabaran Anda! 🙏"
             )
         else:
-            workflow_result = run_aggregation_workflow(sheet_data, question=user_prompt, chat_history=chat_history_for_workflow)
+            # ADDITIVE: OLAP cube snapshot (dibangun sekali per versi snapshot); jika sheet_data difilter per
+            # worksheet di atas, cube di-slice ke worksheet yang sama; cube hanya dipakai jika mencakup tepat baris sheet_data
+            from services.olap_cube import cell_filter, get_cube
+            cube = get_cube(dataset)
+            if cube is not None and not cube.covers(sheet_data):
+                selected_worksheets = set(RowSelection.of(sheet_data).worksheets())
+                cube = cube.slice(cell_filter(worksheet=lambda name: name in selected_worksheets))
+                if not cube.covers(sheet_data):
+                    print(f'[CUBE] Slice worksheet {sorted(selected_worksheets)} tidak mencakup baris sheet_data, agregasi dari baris')
+                    cube = None
+            workflow_result = run_aggregation_workflow(sheet_data, question=user_prompt, chat_history=chat_history_for_workflow, cube=cube)
             llm_answer = workflow_result.get("llm_answer")
             print(f'[DEBUG] Workflow completed successfully, llm_answer length: {len(llm_answer) if llm_answer else 0}')
             print(f'[DEBUG] llm_answer value check: llm_answer={repr(llm_answer[:100]) if llm_answer else None}...')
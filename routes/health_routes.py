@@ -5,9 +5,12 @@ health_bp = Blueprint('health', __name__)
 
 @health_bp.route('/health', methods=['GET'])
 def health_check():
+    # ADDITIVE: Status warm-up cache (tidak menunggu warm-up selesai)
+    from services.cache_warmup import is_process_warm
     return jsonify({
         "status": "healthy",
-        "message": "Flask Agent is running"
+        "message": "Flask Agent is running",
+        "cache_warm": is_process_warm()
     })
 
 @health_bp.route('/status', methods=['GET'])
@@ -20,6 +23,7 @@ def status():
             "/chat (POST)",
             "/clear_history (POST)",
             "/status (GET)",
-            "/health (GET)"
+            "/health (GET)",
+            "/cache/warm (POST)"
         ]
     })
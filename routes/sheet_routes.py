@@ -8,22 +8,16 @@ def get_gsheet_by_id(sheet_id):
             if not sheet_id:
                 print('[DEBUG] get_gsheet_by_id: sheet_id tidak diberikan')
                 raise Exception("sheet_id tidak diberikan")
-            print('[DEBUG] get_gsheet_by_id: memanggil get_gsheet_creds()')
-            creds = get_gsheet_creds()
-            print('[DEBUG] get_gsheet_by_id: sukses get_gsheet_creds()')
-            print('[DEBUG] get_gsheet_by_id: memanggil gspread.authorize')
-            gc = gspread.authorize(creds)
-            print('[DEBUG] get_gsheet_by_id: sukses gspread.authorize')
-            print(f'[DEBUG] get_gsheet_by_id: memanggil gc.open_by_key({sheet_id})')
-            sh = gc.open_by_key(sheet_id)
-            print('[DEBUG] get_gsheet_by_id: sukses gc.open_by_key')
-            _ = sh.title
+            # ADDITIVE: Pakai client & handle Spreadsheet yang di-pool (tanpa authorize/open_by_key per request)
+            sh = get_spreadsheet(sheet_id)
             print(f"Successfully connected to Google Sheet: {sh.title}")
             return sh
         except Exception as e:
             print(f"[ERROR] get_gsheet_by_id: percobaan ke-{attempt+1} gagal untuk sheet_id={sheet_id}: {e}")
             import traceback
             traceback.print_exc()
+            # Handle bisa saja basi (akses dicabut, sheet dihapus) - buka ulang di percobaan berikutnya
+            invalidate_spreadsheet(sheet_id)
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)
             else:
@@ -31,7 +25,6 @@ def get_gsheet_by_id(sheet_id):
 from flask import Blueprint, request, jsonify
 import os
 import gspread
-from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
@@ -44,35 +37,8 @@ sheet_bp = Blueprint('sheet', __name__)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 
-# Fungsi kredensial dan akses sheet (bisa di-refactor ke services nanti)
-def get_gsheet_creds():
-    try:
-        required_fields = ["GOOGLE_PROJECT_ID", "GOOGLE_PRIVATE_KEY", "GOOGLE_CLIENT_EMAIL"]
-        missing_fields = [field for field in required_fields if not os.getenv(field)]
-        if missing_fields:
-            raise Exception(f"Missing required Google credentials: {', '.join(missing_fields)}")
-        private_key = os.getenv("GOOGLE_PRIVATE_KEY")
-        if private_key:
-            private_key = private_key.replace('\\n', '\n')
-            if not private_key.startswith('-----BEGIN'):
-                raise Exception("Invalid private key format")
-        info = {
-            "type": os.getenv("GOOGLE_TYPE", "service_account"),
-            "project_id": os.getenv("GOOGLE_PROJECT_ID"),
-            "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
-            "private_key": private_key,
-            "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
-            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-            "auth_uri": os.getenv("GOOGLE_AUTH_URI", "https://accounts.google.com/o/oauth2/auth"),
-            "token_uri": os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token"),
-            "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL", "https://www.googleapis.com/oauth2/v1/certs"),
-            "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
-        }
-        info = {k: v for k, v in info.items() if v is not None}
-        return Credentials.from_service_account_info(info, scopes=["https://www.googleapis.com/auth/spreadsheets"])
-    except Exception as e:
-        print(f"Error creating Google credentials: {e}")
-        raise Exception(f"Gagal membuat kredensial Google: {e}")
+# Fungsi kredensial dan akses sheet (di-refactor ke services/gsheet_client.py, tetap di-export dari sini)
+from services.gsheet_client import get_gsheet_creds, get_spreadsheet, invalidate_spreadsheet
 
 def get_gsheet(sheet_id=None):
     import time
@@ -82,14 +48,12 @@ def get_gsheet(sheet_id=None):
         try:
             if not sheet_key:
                 raise Exception("GOOGLE_SHEET_ID tidak ditemukan di environment variables dan tidak diberikan sheet_id parameter")
-            creds = get_gsheet_creds()
-            gc = gspread.authorize(creds)
-            sh = gc.open_by_key(sheet_key)
-            _ = sh.title
+            sh = get_spreadsheet(sheet_key)
             print(f"Successfully connected to Google Sheet: {sh.title}")
             return sh
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {e}")
+            invalidate_spreadsheet(sheet_key)
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)
             else:
@@ -109,14 +73,29 @@ def get_worksheet(sh, sheet_name='work1'):
             print(f"Failed to get any worksheet: {e2}")
         raise Exception(f"Tidak dapat mengakses worksheet '{sheet_name}' atau worksheet lainnya: {e}")
 
+def load_worksheet_dataset(sheet_id=None, worksheet_name='work1'):
+    """
+    ADDITIVE: Baca worksheet lewat DatasetLoader (cache, single-flight, retry) alih-alih
+    get_all_records() per request. Fallback ke worksheet pertama seperti get_worksheet().
+    Returns: (DatasetSnapshot satu worksheet, judul worksheet yang dimuat)
+    """
+    from services.dataset_loader import get_dataset_loader
+    sheet_key = sheet_id or GOOGLE_SHEET_ID
+    if not sheet_key:
+        raise Exception("GOOGLE_SHEET_ID tidak ditemukan di environment variables dan tidak diberikan sheet_id parameter")
+    dataset = get_dataset_loader().load_worksheet(sheet_key, worksheet_name)
+    if not dataset.partitions:
+        raise Exception(f"Tidak dapat mengakses worksheet '{worksheet_name}' atau worksheet lainnya: {dict(dataset.errors)}")
+    (loaded_sheet_id, loaded_name), data = next(iter(dataset.partitions.items()))
+    return dataset, loaded_name
+
 # --- Endpoint Sheet ---
 @sheet_bp.route('/sheet/read', methods=['GET'])
 def sheet_read():
     try:
         sheet_id = request.args.get('sheet_id')
-        sh = get_gsheet(sheet_id=sheet_id)
-        ws = get_worksheet(sh, 'work1')
-        data = ws.get_all_records(head=1)
+        dataset, worksheet_title = load_worksheet_dataset(sheet_id, 'work1')
+        data = dataset.records()
         return jsonify({
             "data": data,
             "total_records": len(data),
@@ -128,17 +107,19 @@ def sheet_read():
 @sheet_bp.route('/sheet/info', methods=['GET'])
 def sheet_info():
     try:
-        sh = get_gsheet()
-        ws = get_worksheet(sh, 'work1')
-        all_data = ws.get_all_records(head=1)
+        from services.sheet_metadata import get_spreadsheet_metadata, get_worksheet_metadata
+        dataset, worksheet_title = load_worksheet_dataset(None, 'work1')
+        all_data = dataset.records()
+        # ADDITIVE: Judul & ukuran grid dari cache metadata (tanpa membuka spreadsheet per request)
+        ws_meta = get_worksheet_metadata(GOOGLE_SHEET_ID, worksheet_title) or {}
         sheet_info = {
-            "sheet_title": sh.title,
-            "worksheet_title": ws.title,
+            "sheet_title": get_spreadsheet_metadata(GOOGLE_SHEET_ID).get('title'),
+            "worksheet_title": worksheet_title,
             "total_rows": len(all_data),
             "total_columns": len(all_data[0].keys()) if all_data else 0,
             "columns": list(all_data[0].keys()) if all_data else [],
-            "row_count": ws.row_count,
-            "col_count": ws.col_count,
+            "row_count": ws_meta.get('row_count'),
+            "col_count": ws_meta.get('col_count'),
             "success": True
         }
         return jsonify(sheet_info)
@@ -155,6 +136,9 @@ def sheet_write():
         if not row:
             return jsonify({"error": "Data 'row' harus diisi."}), 400
         ws.append_row(row)
+        # ADDITIVE: Data worksheet yang di-cache sudah basi setelah ditulis
+        from services.dataset_loader import get_dataset_loader
+        get_dataset_loader().invalidate_worksheet(sh.id, ws.title)
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -222,9 +206,9 @@ def test_data_access():
 @sheet_bp.route('/debug_leads', methods=['GET'])
 def debug_leads():
     try:
-        sh = get_gsheet()
-        ws = get_worksheet(sh, 'work1')
-        all_data = ws.get_all_records()
+        from services.sheet_metadata import get_spreadsheet_metadata
+        dataset, worksheet_title = load_worksheet_dataset(None, 'work1')
+        all_data = dataset.records()
         if not all_data:
             return jsonify({"error": "No data found"})
         available_columns = list(all_data[0].keys())
@@ -268,8 +252,9 @@ def debug_leads():
                 ]
             },
             "debug_info": {
-                "worksheet_title": ws.title,
-                "sheet_title": sh.title
+                "worksheet_title": worksheet_title,
+                "sheet_title": get_spreadsheet_metadata(GOOGLE_SHEET_ID).get('title'),
+                "dataset_version": dataset.version
             }
         })
     except Exception as e:
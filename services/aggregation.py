@@ -4,7 +4,47 @@ Modul untuk fungsi-fungsi agregasi dan summary data campaign.
 """
 from collections import defaultdict
 from datetime import datetime
-import re
+from functools import wraps
+from itertools import chain, repeat
+import os
+import threading
+import time
+
+from services.calendar_table import calendar_day, row_date, row_month
+from services.column_resolver import METRIC_COLUMNS, column_values, resolve_column
+from services.dimension_index import select_rows
+from services.numeric_parser import parse_column, parse_number
+from services.row_selection import RowSelection
+from services.worksheet_table import WorksheetTable, table_of
+
+# ADDITIVE: Backend agregasi default: 'python' (loop per baris) atau 'numpy' (services/aggregation_numpy.py)
+AGGREGATION_BACKEND = os.environ.get('AGGREGATION_BACKEND', 'python').strip().lower()
+
+def _use_numpy(backend):
+    backend = (backend or AGGREGATION_BACKEND).strip().lower()
+    if backend != 'numpy':
+        return False
+    try:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+    except ImportError:
+        print("[AGG] numpy/pandas tidak tersedia, backend numpy dilewati (pakai python)")
+        return False
+    return True
+
+
+def _vectorizable(fn):
+    """
+    ADDITIVE: aggregate_*(..., backend=None). backend 'numpy' (atau AGGREGATION_BACKEND=numpy) memanggil
+    fungsi bernama sama di services/aggregation_numpy.py; output identik dengan backend python.
+    """
+    @wraps(fn)
+    def wrapper(*args, backend=None, **kwargs):
+        if _use_numpy(backend):
+            from services import aggregation_numpy
+            return getattr(aggregation_numpy, fn.__name__)(*args, **kwargs)
+        return fn(*args, **kwargs)
+    return wrapper
 
 # ============================================================================
 # HELPER: Safe column fallback (handles non-string column keys from Sheets)
@@ -14,94 +54,220 @@ def col_fallback(row, names, default=0):
     ADDITIVE: Safe column name fallback dengan str() conversion.
     Google Sheets dapat return column keys sebagai int/float/date, bukan hanya string.
     ALSO handles non-string items in names list (defensive programming).
+    Key yang cocok di-resolve sekali per schema baris (services/column_resolver.py).
     """
     for n in names:
-        for k in row.keys():
-            # DEFENSIVE: Both k and n must be safely converted to string
-            k_str = str(k).strip().lower() if k is not None else ""
-            n_str = str(n).strip().lower() if n is not None else ""
-            if k_str == n_str:
-                # ADDITIVE DEBUG: Log when WhatsApp column is found
-                if 'whatsapp' in n_str and row[k] != 0:
-                    print(f"[DEBUG col_fallback] Found {k}={row[k]} (matched with '{n}')")
-                return row[k]
+        k = resolve_column(tuple(row.keys()), (n,))
+        if k is not None:
+            # ADDITIVE DEBUG: Log when WhatsApp column is found
+            if 'whatsapp' in (str(n).strip().lower() if n is not None else "") and row[k] != 0:
+                print(f"[DEBUG col_fallback] Found {k}={row[k]} (matched with '{n}')")
+            return row[k]
     return default
 
-# Mapping nama bulan Indonesia & Inggris ke angka bulan
-MONTH_NAME_MAP = {
-    'january': 1, 'jan': 1, 'januari': 1,
-    'february': 2, 'feb': 2, 'februari': 2,
-    'march': 3, 'mar': 3, 'maret': 3,
-    'april': 4, 'apr': 4,
-    'may': 5, 'mei': 5,
-    'june': 6, 'jun': 6, 'juni': 6,
-    'july': 7, 'jul': 7, 'juli': 7,
-    'august': 8, 'aug': 8, 'agustus': 8,
-    'september': 9, 'sep': 9,
-    'october': 10, 'oct': 10, 'oktober': 10, 'okt': 10,
-    'november': 11, 'nov': 11,
-    'december': 12, 'dec': 12, 'desember': 12, 'des': 12
-}
-
 def safe_float(val):
-    try:
-        s = str(val)
-        # Ambil semua digit, titik, koma setelah prefix non-angka
-        m = re.search(r"[-+]?\d[\d.,]*", s)
-        if not m:
-            # Fallback: jika ada angka dengan separator ribuan saja (misal 1.000.000)
-            # Tangkap pola ribuan baik dengan titik maupun koma (misal 1.000.000 atau 1,000,000)
-            m2 = re.search(r"(\d{1,3}(?:[.,]\d{3})+)", s)
-            if m2:
-                num = m2.group(1)
-                # Jika hanya ada titik dan tidak ada koma, atau hanya koma dan tidak ada titik, treat as ribuan
-                if ('.' in num and ',' not in num) or (',' in num and '.' not in num):
-                    num = num.replace('.', '').replace(',', '')
-                    return float(num)
-            return 0.0
-            return 0.0
-        num = m.group(0)
-        # Case 1: Both ',' and '.' present
-        if ',' in num and '.' in num:
-            if num.rfind(',') > num.rfind('.'):
-                # Eropa: 1.234,56 -> 1234.56
-                num = num.replace('.', '').replace(',', '.')
-            else:
-                # US: 1,234.56 -> 1234.56
-                num = num.replace(',', '')
-        # Case 2: Only ',' present
-        elif ',' in num:
-            if num.count(',') > 1:
-                # 1,234,567 -> 1234567
-                num = num.replace(',', '')
-            else:
-                # Satu koma, cek apakah di 3 digit terakhir (desimal) atau ribuan
-                parts = num.split(',')
-                if len(parts[-1]) == 3 and len(parts) > 1:
-                    # 1,234 -> 1234 (ribuan)
-                    num = num.replace(',', '')
-                else:
-                    # 4,56 -> 4.56 (desimal)
-                    num = num.replace(',', '.')
-        # Case 3: Only '.' present (asumsi ribuan jika semua segmen 3 digit, atau desimal jika tidak)
-        elif '.' in num:
-            parts = num.split('.')
-            if all(len(p) == 3 for p in parts[1:]) and len(parts[0]) <= 3:
-                # 1.000.000 -> 1000000 (semua segmen 3 digit, ribuan)
-                num = num.replace('.', '')
-        return float(num)
-    except:
-        return 0.0
+    """
+    Angka dari cell Sheets ("Rp 1.234.567", "1,234.56", "4,56", int/float); 0.0 jika tidak ada angka.
+    ADDITIVE: Parsing lewat services/numeric_parser.py (memo per string, hasil sama dengan regex lama).
+    """
+    return parse_number(val)
 
 # ============================================================================
-# ADDITIVE: Restore aggregate_metrics_by_worksheet (was accidentally removed)
+# ADDITIVE: Akses kolumnar ke snapshot bertipe (services/worksheet_table.py)
+# Baris dari WorksheetTable dibaca lewat kolom yang sudah di-parse saat ingest;
+# dict biasa tetap lewat col_fallback + safe_float. Penjumlahan tetap baris demi
+# baris dengan urutan yang sama, jadi hasil agregasi identik dengan loop lama.
 # ============================================================================
-def aggregate_metrics_by_worksheet(sheet_data):
+_MISSING = object()
+
+
+def _first_present(*values):
+    """Semantik r.get(a, r.get(b, default)): nilai pertama yang bukan _MISSING."""
+    for value in values:
+        if value is not _MISSING:
+            return value
+    return values[-1]
+
+
+# ADDITIVE: Tanggal kanonik per baris (services/calendar_table.py), sama untuk semua aggregator
+_DATE_PARSERS = {
+    'day': row_date,
+    'month': row_month,
+}
+
+
+class _Segment:
     """
-    Mengembalikan dict: {(sheet_id, worksheet): {total_cost, total_impressions, ...}}
-    ADDITIVE: Function ini digunakan di chat_routes.py line 990, tidak boleh dihapus!
+    Potongan berurutan sheet_data: baris dari satu WorksheetTable (table + positions) atau dict biasa.
+    Kolom metrik, tanggal dan key grup di-memo per segmen, sehingga aggregator yang berbagi segmen
+    (aggregate_workflow) membaca setiap kolom sekali.
     """
-    stats = defaultdict(lambda: {
+    __slots__ = ('table', 'positions', 'rows', 'memo')
+
+    def __init__(self, table):
+        self.table = table
+        self.positions = [] if table is not None else None
+        self.rows = [] if table is None else None
+        self.memo = {}
+
+    def _finish(self):
+        # Seluruh tabel berurutan (kasus umum tanpa filter): baca kolom langsung tanpa indexing
+        if self.table is not None and len(self.positions) == len(self.table) \
+                and self.positions == list(range(len(self.table))):
+            self.positions = None
+
+    def __len__(self):
+        if self.table is None:
+            return len(self.rows)
+        return len(self.table) if self.positions is None else len(self.positions)
+
+    def _take(self, column):
+        if self.positions is None:
+            return column
+        return [column[i] for i in self.positions]
+
+    def row_list(self):
+        if self.table is None:
+            return self.rows
+        return self._take(self.table)
+
+    def floats(self, names):
+        """safe_float(col_fallback(r, names)) untuk setiap baris segmen."""
+        memo_key = ('floats', tuple(names))
+        values = self.memo.get(memo_key)
+        if values is None:
+            if self.table is None:
+                values = parse_column(column_values(self.rows, names))[0]
+            else:
+                values = self._take(self.table.floats(names))
+            self.memo[memo_key] = values
+        return values
+
+    def dates(self, mode):
+        """Tanggal per baris (lihat _DATE_PARSERS) dari kolom ter-parse, atau dihitung per baris."""
+        memo_key = ('dates', mode)
+        values = self.memo.get(memo_key)
+        if values is None:
+            if self.table is not None and self.table.dates.get(mode) is not None:
+                values = self._take(self.table.dates[mode])
+            else:
+                values = [_DATE_PARSERS[mode](r) for r in self.row_list()]
+            self.memo[memo_key] = values
+        return values
+
+    def group_keys(self, fn, *specs):
+        """
+        Key grup per baris = fn(r.get(k1, d1), r.get(k2, d2), ...). Untuk WorksheetTable fn cukup
+        dihitung sekali per kombinasi kode dictionary, bukan per baris. Memo per (fn, specs): pakai
+        fungsi level modul (bukan lambda per panggilan) agar key bisa dipakai ulang antar aggregator.
+        """
+        memo_key = ('keys', fn, specs)
+        keys = self.memo.get(memo_key)
+        if keys is None:
+            keys = self._group_keys(fn, specs)
+            self.memo[memo_key] = keys
+        return keys
+
+    def _group_keys(self, fn, specs):
+        if self.table is None:
+            return [fn(*[r.get(k, d) for k, d in specs]) for r in self.rows]
+        size = len(self)
+        dictionaries = []
+        code_columns = []
+        for k, d in specs:
+            encoded = self.table.dimension(k)
+            if encoded is None:
+                dictionaries.append([d])
+                code_columns.append(repeat(0, size))
+            else:
+                codes, dictionary = encoded
+                dictionaries.append(dictionary)
+                code_columns.append(self._take(codes))
+        memo = {}
+        keys = []
+        for combo in zip(*code_columns):
+            key = memo.get(combo, _MISSING)
+            if key is _MISSING:
+                key = fn(*[dictionary[code] for dictionary, code in zip(dictionaries, combo)])
+                memo[combo] = key
+            keys.append(key)
+        return keys
+
+
+# Segmen sheet_data yang sedang dipakai bersama oleh aggregate_workflow (per thread request)
+_shared = threading.local()
+
+
+def _segments(sheet_data):
+    """Pecah sheet_data menjadi _Segment berurutan (urutan baris tetap)."""
+    shared = getattr(_shared, 'segments', None)
+    if shared is not None and shared[0] is sheet_data:
+        return shared[1]
+    if isinstance(sheet_data, WorksheetTable):
+        segment = _Segment(sheet_data)
+        segment.positions = None
+        return [segment]
+    if isinstance(sheet_data, RowSelection):
+        # View zero-copy (services/row_selection.py): satu segmen per part, posisi dipakai apa adanya
+        segments = []
+        for part in sheet_data.parts:
+            table = part.data if isinstance(part.data, WorksheetTable) else None
+            segment = _Segment(table)
+            if table is not None:
+                segment.positions = part.positions
+            elif part.positions is None:
+                segment.rows = part.data
+            else:
+                segment.rows = [part.data[i] for i in part.positions]
+            segments.append(segment)
+        return segments
+    segments = []
+    current = None
+    for r in sheet_data:
+        table = table_of(r)
+        if current is None or current.table is not table:
+            current = _Segment(table)
+            segments.append(current)
+        if table is None:
+            current.rows.append(r)
+        else:
+            current.positions.append(r._idx)
+    for segment in segments:
+        segment._finish()
+    return segments
+
+
+def _accumulate(targets, field, values):
+    """targets[i][field] += values[i] baris demi baris."""
+    for d, v in zip(targets, values):
+        d[field] += v
+
+
+def _age_gender_key(age, gender):
+    return f"{age}|{gender}"
+
+
+def _region_key(region, region_alt):
+    region = _first_present(region, region_alt)
+    if not region or str(region).strip() == '':
+        region = 'Unknown'
+    return region
+
+
+def _variant_key(*values):
+    # Try all variants: nilai truthy pertama, selain itu 'Unknown'
+    for key in values:
+        if key:
+            return key
+    return 'Unknown'
+
+
+def _worksheet_key(sheet_id, sheet_id_alt, worksheet, worksheet_alt):
+    return (_first_present(sheet_id, sheet_id_alt), _first_present(worksheet, worksheet_alt))
+
+
+def _worksheet_entry():
+    return {
         'total_cost': 0,
         'total_impressions': 0,
         'total_clicks': 0,
@@ -110,34 +276,52 @@ def aggregate_metrics_by_worksheet(sheet_data):
         'total_leads_fb': 0,
         'total_lead_form': 0,
         'total_msg_conv': 0
-    })
+    }
 
-    for r in sheet_data:
-        sheet_id = r.get('sheet_id', r.get('Sheet ID', 'Unknown'))
-        worksheet = r.get('worksheet', r.get('Worksheet', 'Unknown'))
-        key = (sheet_id, worksheet)
-        stats[key]['total_cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[key]['total_impressions'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['total_clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['total_link_clicks'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
-        stats[key]['total_leads_wa'] += safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads']))
-        stats[key]['total_leads_fb'] += safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads']))
-        stats[key]['total_lead_form'] += safe_float(col_fallback(r, ['lead form', 'Lead Form']))
-        stats[key]['total_msg_conv'] += safe_float(col_fallback(r, ['messaging conversations started', 'Messaging Conversations Started']))
+# ============================================================================
+# ADDITIVE: Restore aggregate_metrics_by_worksheet (was accidentally removed)
+# ============================================================================
+@_vectorizable
+def aggregate_metrics_by_worksheet(sheet_data):
+    """
+    Mengembalikan dict: {(sheet_id, worksheet): {total_cost, total_impressions, ...}}
+    ADDITIVE: Function ini digunakan di chat_routes.py line 990, tidak boleh dihapus!
+    """
+    stats = defaultdict(_worksheet_entry)
+
+    for seg in _segments(sheet_data):
+        keys = seg.group_keys(
+            _worksheet_key, ('sheet_id', _MISSING), ('Sheet ID', 'Unknown'), ('worksheet', _MISSING), ('Worksheet', 'Unknown')
+        )
+        targets = [stats[key] for key in keys]
+        _accumulate(targets, 'total_cost', seg.floats(METRIC_COLUMNS['cost']))
+        _accumulate(targets, 'total_impressions', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'total_clicks', seg.floats(METRIC_COLUMNS['clicks']))
+        _accumulate(targets, 'total_link_clicks', seg.floats(METRIC_COLUMNS['link_clicks']))
+        _accumulate(targets, 'total_leads_wa', seg.floats(METRIC_COLUMNS['whatsapp']))
+        _accumulate(targets, 'total_leads_fb', seg.floats(METRIC_COLUMNS['fb_leads_basic']))
+        _accumulate(targets, 'total_lead_form', seg.floats(METRIC_COLUMNS['lead_form_basic']))
+        _accumulate(targets, 'total_msg_conv', seg.floats(METRIC_COLUMNS['msg_conv']))
     return stats
 
+@_vectorizable
 def aggregate_main_metrics(sheet_data):
     """Hitung total cost, impressions, clicks, link clicks, leads, dsb."""
     # Uses global col_fallback helper
+    segments = _segments(sheet_data)
 
-    total_cost = sum(safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya'])) for r in sheet_data)
-    total_impressions = sum(safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp'])) for r in sheet_data)
-    total_clicks = sum(safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks'])) for r in sheet_data)
-    total_link_clicks = sum(safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link'])) for r in sheet_data)
-    total_leads_wa = sum(safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads'])) for r in sheet_data)
-    total_leads_fb = sum(safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads'])) for r in sheet_data)
-    total_lead_form = sum(safe_float(col_fallback(r, ['lead form', 'Lead Form'])) for r in sheet_data)
-    total_msg_conv = sum(safe_float(col_fallback(r, ['messaging conversations started', 'Messaging Conversations Started'])) for r in sheet_data)
+    def column_sum(names):
+        # sum() atas urutan nilai yang sama dengan generator lama -> hasil identik
+        return sum(chain.from_iterable(seg.floats(names) for seg in segments))
+
+    total_cost = column_sum(METRIC_COLUMNS['cost'])
+    total_impressions = column_sum(METRIC_COLUMNS['impressions'])
+    total_clicks = column_sum(METRIC_COLUMNS['clicks'])
+    total_link_clicks = column_sum(METRIC_COLUMNS['link_clicks'])
+    total_leads_wa = column_sum(METRIC_COLUMNS['whatsapp'])
+    total_leads_fb = column_sum(METRIC_COLUMNS['fb_leads_basic'])
+    total_lead_form = column_sum(METRIC_COLUMNS['lead_form_basic'])
+    total_msg_conv = column_sum(METRIC_COLUMNS['msg_conv'])
     return {
         'total_cost': total_cost,
         'total_impressions': total_impressions,
@@ -149,44 +333,27 @@ def aggregate_main_metrics(sheet_data):
         'total_msg_conv': total_msg_conv
     }
 
+@_vectorizable
 def aggregate_daily_weekly_cost(sheet_data):
     daily_cost = {}
     weekly_cost = {}
     rows_by_date = defaultdict(list)
-    for r in sheet_data:
-        tgl = None
-        for k in r:
-            if k.lower() in ["tanggal", "date", "tgl"] and r[k]:
-                vstr = str(r[k])
-                try:
-                    if re.match(r"\d{4}-\d{2}-\d{2}", vstr):
-                        tgl = datetime.strptime(vstr, "%Y-%m-%d")
-                    elif re.match(r"\d{2}/\d{2}/\d{4}", vstr):
-                        tgl = datetime.strptime(vstr, "%d/%m/%Y")
-                except:
-                    continue
-        if tgl:
-            # Uses global col_fallback helper
-            c = safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-            daily_cost.setdefault(tgl.date(), 0)
-            daily_cost[tgl.date()] += c
-            week = tgl.isocalendar()[1]
-            weekly_cost.setdefault(week, 0)
-            weekly_cost[week] += c
-            rows_by_date[tgl.date()].append(r)
+    for seg in _segments(sheet_data):
+        # ADDITIVE: tanggal kanonik & cost dibaca dari snapshot bertipe jika ada, minggu dari tabel kalender
+        costs = seg.floats(METRIC_COLUMNS['cost'])
+        for tgl, c, r in zip(seg.dates('day'), costs, seg.row_list()):
+            if not tgl:
+                continue
+            day = calendar_day(tgl)
+            daily_cost.setdefault(day.date, 0)
+            daily_cost[day.date] += c
+            weekly_cost.setdefault(day.iso_week, 0)
+            weekly_cost[day.iso_week] += c
+            rows_by_date[day.date].append(r)
     return daily_cost, weekly_cost, rows_by_date
 
-# ADDITIVE: Enhanced daily/weekly/monthly aggregation dengan metrik lengkap
-def aggregate_by_period_enhanced(sheet_data, period='daily'):
-    """
-    Enhanced period agregasi dengan metrik lengkap.
-    period: 'daily', 'weekly', 'monthly'
-    
-    Returns: dict dengan key=(date/week/month), value=dict metrik lengkap
-    
-    ADDITIVE: Tidak menghapus aggregate_daily_weekly_cost lama
-    """
-    stats = defaultdict(lambda: {
+def _period_entry():
+    return {
         'cost': 0,
         'wa': 0,
         'fb_leads': 0,
@@ -202,65 +369,91 @@ def aggregate_by_period_enhanced(sheet_data, period='daily'):
         'ctr': 0,
         'lctr': 0,
         'conversion_rate': 0
-    })
+    }
+
+def _enhanced_derived(d, frequency=False):
+    """Metrik turunan versi enhanced (period, age/gender, breakdown); frequency=True juga rata-rata frequency."""
+    # Cost metrics
+    d['cpwa'] = (d['cost'] / d['wa']) if d['wa'] > 0 else 0
+    d['cpm'] = (d['cost'] / d['impr'] * 1000) if d['impr'] > 0 else 0
+    d['cpc'] = (d['cost'] / d['clicks']) if d['clicks'] > 0 else 0
+    d['cplc'] = (d['cost'] / d['link']) if d['link'] > 0 else 0
+    
+    # Rate metrics
+    d['ctr'] = (d['clicks'] / d['impr'] * 100) if d['impr'] > 0 else 0
+    d['lctr'] = (d['link'] / d['impr'] * 100) if d['impr'] > 0 else 0  # Website CTR
+    
+    # Frequency average
+    if frequency:
+        d['frequency'] = (d['freq_sum'] / d['freq_count']) if d['freq_count'] > 0 else 0
+    
+    # Conversion rate (total leads / clicks)
+    total_leads = d['wa'] + d['fb_leads'] + d['lead_form']
+    d['conversion_rate'] = (total_leads / d['clicks'] * 100) if d['clicks'] > 0 else 0
+
+# ADDITIVE: Enhanced daily/weekly/monthly aggregation dengan metrik lengkap
+@_vectorizable
+def aggregate_by_period_enhanced(sheet_data, period='daily'):
+    """
+    Enhanced period agregasi dengan metrik lengkap.
+    period: 'daily', 'weekly', 'monthly'
+    
+    Returns: dict dengan key=(date/week/month), value=dict metrik lengkap
+    
+    ADDITIVE: Tidak menghapus aggregate_daily_weekly_cost lama
+    """
+    stats = defaultdict(_period_entry)
     
     # Uses global col_fallback helper
     
     print(f"[DEBUG] aggregate_by_period_enhanced: processing {len(sheet_data)} rows, period='{period}'")
     
-    for r in sheet_data:
-        tgl = None
-        for k in r:
-            if k.lower() in ["tanggal", "date", "tgl"] and r[k]:
-                vstr = str(r[k])
-                try:
-                    if re.match(r"\d{4}-\d{2}-\d{2}", vstr):
-                        tgl = datetime.strptime(vstr, "%Y-%m-%d")
-                    elif re.match(r"\d{2}/\d{2}/\d{4}", vstr):
-                        tgl = datetime.strptime(vstr, "%d/%m/%Y")
-                except:
-                    continue
-                break
-        
-        if not tgl:
+    period_keys = {}
+    for seg in _segments(sheet_data):
+        dates = seg.dates('day')
+        picked = [i for i, tgl in enumerate(dates) if tgl]
+        if not picked:
             continue
-        
-        # Determine period key
-        if period == 'daily':
-            key = tgl.date()
-        elif period == 'weekly':
-            key = f"{tgl.year}-W{tgl.isocalendar()[1]:02d}"
-        elif period == 'monthly':
-            key = f"{tgl.year}-{tgl.month:02d}"
-        else:
-            key = tgl.date()  # Default to daily
-        
-        # Aggregate metrics
-        stats[key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['reach'] += safe_float(col_fallback(r, ['reach', 'Reach']))
-        stats[key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
-        stats[key]['wa'] += safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads']))
-        stats[key]['fb_leads'] += safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads', 'Facebook Leads']))
-        stats[key]['lead_form'] += safe_float(col_fallback(r, ['lead form', 'Lead Form', 'LeadForm']))
-    
+
+        # Determine period key (sekali per tanggal unik)
+        targets = []
+        for i in picked:
+            tgl = dates[i]
+            key = period_keys.get(tgl)
+            if key is None:
+                day = calendar_day(tgl)
+                if period == 'weekly':
+                    key = day.week_key
+                elif period == 'monthly':
+                    key = day.month_key
+                else:
+                    key = day.date  # daily & default
+                period_keys[tgl] = key
+            targets.append(stats[key])
+
+        # Aggregate metrics (hanya baris bertanggal)
+        for field, names in (
+            ('cost', METRIC_COLUMNS['cost']),
+            ('impr', METRIC_COLUMNS['impressions']),
+            ('reach', METRIC_COLUMNS['reach']),
+            ('clicks', METRIC_COLUMNS['clicks']),
+            ('link', METRIC_COLUMNS['link_clicks']),
+            ('wa', METRIC_COLUMNS['whatsapp']),
+            ('fb_leads', METRIC_COLUMNS['fb_leads']),
+            ('lead_form', METRIC_COLUMNS['lead_form']),
+        ):
+            values = seg.floats(names)
+            _accumulate(targets, field, [values[i] for i in picked])
+
     # Calculate derived metrics
     for key, d in stats.items():
-        d['cpwa'] = (d['cost'] / d['wa']) if d['wa'] > 0 else 0
-        d['cpm'] = (d['cost'] / d['impr'] * 1000) if d['impr'] > 0 else 0
-        d['cpc'] = (d['cost'] / d['clicks']) if d['clicks'] > 0 else 0
-        d['cplc'] = (d['cost'] / d['link']) if d['link'] > 0 else 0
-        d['ctr'] = (d['clicks'] / d['impr'] * 100) if d['impr'] > 0 else 0
-        d['lctr'] = (d['link'] / d['impr'] * 100) if d['impr'] > 0 else 0
-        
-        total_leads = d['wa'] + d['fb_leads'] + d['lead_form']
-        d['conversion_rate'] = (total_leads / d['clicks'] * 100) if d['clicks'] > 0 else 0
+        _enhanced_derived(d)
     
     print(f"[DEBUG] aggregate_by_period_enhanced: found {len(stats)} unique periods")
     return stats
 
 # ADDITIVE: Outbound clicks breakdown dan proportion analysis
+@_vectorizable
 def aggregate_outbound_clicks(sheet_data):
     """
     Agregasi outbound clicks per channel (WhatsApp, Website, Messaging/Form)
@@ -282,34 +475,22 @@ def aggregate_outbound_clicks(sheet_data):
     
     print(f"[DEBUG] aggregate_outbound_clicks: processing {len(sheet_data)} rows")
     
-    for r in sheet_data:
+    for seg in _segments(sheet_data):
         # WhatsApp outbound clicks - Support both "WhatsApp Leads" (age/gender) and actual "WhatsApp" columns
-        stats['whatsapp'] += safe_float(col_fallback(r, [
-            'outbound clicks - whatsapp', 'Outbound Clicks - WhatsApp',
-            'whatsapp', 'WhatsApp', 'whatsapp leads', 'WhatsApp Leads',
-            'whatsapp clicks', 'WhatsApp Clicks'
-        ]))
+        for v in seg.floats(METRIC_COLUMNS['outbound_whatsapp_any']):
+            stats['whatsapp'] += v
         
         # Website outbound clicks - Support "Link Clicks" (from both worksheets)
-        stats['website'] += safe_float(col_fallback(r, [
-            'outbound clicks - website', 'Outbound Clicks - Website',
-            'link clicks', 'Link Clicks',
-            'website clicks', 'Website Clicks'
-        ]))
+        for v in seg.floats(METRIC_COLUMNS['outbound_website_any']):
+            stats['website'] += v
         
         # Messaging outbound clicks - Support "Messaging Conversations Started" (from age/gender)
-        stats['messaging'] += safe_float(col_fallback(r, [
-            'outbound clicks - messaging', 'Outbound Clicks - Messaging',
-            'messaging conversations started', 'Messaging Conversations Started',
-            'messaging clicks', 'Messaging Clicks'
-        ]))
+        for v in seg.floats(METRIC_COLUMNS['outbound_messaging_any']):
+            stats['messaging'] += v
         
         # Form clicks (if exists) - Support "Lead Form (On-Facebook)"
-        stats['form'] += safe_float(col_fallback(r, [
-            'outbound clicks - form', 'Outbound Clicks - Form',
-            'lead form (on-facebook)', 'Lead Form (On-Facebook)',
-            'form clicks', 'Form Clicks'
-        ]))
+        for v in seg.floats(METRIC_COLUMNS['outbound_form_any']):
+            stats['form'] += v
     
     # Calculate total and proportions
     stats['total'] = stats['whatsapp'] + stats['website'] + stats['messaging'] + stats['form']
@@ -325,65 +506,61 @@ def aggregate_outbound_clicks(sheet_data):
     print(f"[DEBUG] aggregate_outbound_clicks: total={stats['total']}, WhatsApp={stats['whatsapp']}, Website={stats['website']}, Messaging={stats['messaging']}, Form={stats['form']}")
     return stats
 
+def _breakdown_entry():
+    return {'cost':0,'wa':0,'cpwa':0,'impr':0,'clicks':0,'link':0,'ctr':0,'lctr':0}
+
+@_vectorizable
 def aggregate_breakdown(sheet_data, by="Ad set"):
-    stats = defaultdict(lambda: {'cost':0,'wa':0,'cpwa':0,'impr':0,'clicks':0,'link':0,'ctr':0,'lctr':0})
+    stats = defaultdict(_breakdown_entry)
     # Uses global col_fallback helper
 
-    for r in sheet_data:
-        key = r.get(by, r.get(by.title(), 'Unknown'))
-        stats[key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[key]['wa'] += safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads']))
-        stats[key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
+    for seg in _segments(sheet_data):
+        # key = r.get(by, r.get(by.title(), 'Unknown'))
+        targets = [stats[key] for key in seg.group_keys(_first_present, (by, _MISSING), (by.title(), 'Unknown'))]
+        _accumulate(targets, 'cost', seg.floats(METRIC_COLUMNS['cost']))
+        _accumulate(targets, 'wa', seg.floats(METRIC_COLUMNS['whatsapp']))
+        _accumulate(targets, 'impr', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'clicks', seg.floats(METRIC_COLUMNS['clicks']))
+        _accumulate(targets, 'link', seg.floats(METRIC_COLUMNS['link_clicks']))
     for key, d in stats.items():
-        d['cpwa'] = (d['cost']/d['wa']) if d['wa'] else 0
-        d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
-        d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
+        _breakdown_derived(d)
     return stats
 
+def _breakdown_derived(d):
+    d['cpwa'] = (d['cost']/d['wa']) if d['wa'] else 0
+    d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
+    d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
+
+def _age_gender_entry():
+    return {'cost':0,'wa':0,'cpwa':0,'impr':0,'clicks':0,'link':0,'ctr':0,'lctr':0,'fb':0,'lead_form':0,'frequency':0,'reach':0,'cpm':0,'cpc':0,'cplc':0}
+
+@_vectorizable
 def aggregate_age_gender(sheet_data):
-    stats = defaultdict(lambda: {'cost':0,'wa':0,'cpwa':0,'impr':0,'clicks':0,'link':0,'ctr':0,'lctr':0,'fb':0,'lead_form':0,'frequency':0,'reach':0,'cpm':0,'cpc':0,'cplc':0})
+    stats = defaultdict(_age_gender_entry)
     # Uses global col_fallback helper
     
     # ADDITIVE DEBUG: Print first row keys to check column names
     if sheet_data and len(sheet_data) > 0:
         print(f"[DEBUG aggregate_age_gender] First row keys: {list(sheet_data[0].keys())}")
 
-    for r in sheet_data:
-        age = r.get('Age', 'Unknown')
-        gender = r.get('Gender', 'Unknown')
-        key = f"{age}|{gender}"
-        stats[key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
+    for seg in _segments(sheet_data):
+        keys = seg.group_keys(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+        targets = [stats[key] for key in keys]
+        _accumulate(targets, 'cost', seg.floats(METRIC_COLUMNS['cost']))
         # ADDITIVE: Extended WhatsApp column fallback - include Messaging Conversations and Offsite Leads
-        wa_value = safe_float(col_fallback(r, [
-            'whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads',
-            'messaging conversations started', 'Messaging Conversations Started',
-            'messaging conversations', 'Messaging Conversations',  # ADDITIVE: Shorter variant
-            'leads (offsite/pixels)', 'Leads (Offsite/Pixels)',
-            'offsite leads', 'Offsite Leads',
-            'on-facebook leads', 'On-Facebook Leads'  # ADDITIVE: Facebook leads juga dihitung sebagai WA leads alternative
-        ]))
-        stats[key]['wa'] += wa_value
+        _accumulate(targets, 'wa', seg.floats(METRIC_COLUMNS['wa_leads_any']))
         # ADDITIVE: Facebook leads (On-Facebook Leads)
-        fb_value = safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads', 'facebook leads', 'Facebook Leads']))
-        stats[key]['fb'] += fb_value
+        _accumulate(targets, 'fb', seg.floats(METRIC_COLUMNS['fb_leads_any']))
         # ADDITIVE: Lead Form
-        lead_form_value = safe_float(col_fallback(r, ['lead form', 'Lead Form', 'LeadForm']))
-        stats[key]['lead_form'] += lead_form_value
-        stats[key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
-        stats[key]['frequency'] += safe_float(col_fallback(r, ['frequency', 'Frequency']))
-        stats[key]['reach'] += safe_float(col_fallback(r, ['reach', 'Reach']))
+        _accumulate(targets, 'lead_form', seg.floats(METRIC_COLUMNS['lead_form']))
+        _accumulate(targets, 'impr', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'clicks', seg.floats(METRIC_COLUMNS['clicks']))
+        _accumulate(targets, 'link', seg.floats(METRIC_COLUMNS['link_clicks']))
+        _accumulate(targets, 'frequency', seg.floats(METRIC_COLUMNS['frequency']))
+        _accumulate(targets, 'reach', seg.floats(METRIC_COLUMNS['reach']))
     
     for key, d in stats.items():
-        d['cpwa'] = (d['cost']/d['wa']) if d['wa'] else 0
-        d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
-        d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
-        d['cpm'] = (d['cost']/d['impr']*1000) if d['impr'] else 0
-        d['cpc'] = (d['cost']/d['clicks']) if d['clicks'] else 0
-        d['cplc'] = (d['cost']/d['link']) if d['link'] else 0
+        _age_gender_derived(d)
     
     # ADDITIVE DEBUG: Print aggregated results to check WA leads
     print(f"[DEBUG aggregate_age_gender] Aggregated {len(stats)} segments")
@@ -392,7 +569,37 @@ def aggregate_age_gender(sheet_data):
     
     return stats
 
+def _age_gender_derived(d):
+    _breakdown_derived(d)
+    d['cpm'] = (d['cost']/d['impr']*1000) if d['impr'] else 0
+    d['cpc'] = (d['cost']/d['clicks']) if d['clicks'] else 0
+    d['cplc'] = (d['cost']/d['link']) if d['link'] else 0
+
+def _age_gender_enhanced_entry():
+    return {
+        'cost': 0,
+        'wa': 0,           # WhatsApp leads
+        'fb_leads': 0,     # Facebook leads
+        'lead_form': 0,    # Lead Form
+        'impr': 0,         # Impressions
+        'reach': 0,        # Reach
+        'freq_sum': 0,     # Frequency sum
+        'freq_count': 0,   # Frequency count
+        'clicks': 0,       # All clicks
+        'link': 0,         # Link clicks
+        # Derived metrics
+        'cpwa': 0,
+        'cpm': 0,
+        'cpc': 0,
+        'cplc': 0,
+        'ctr': 0,
+        'lctr': 0,         # Website CTR
+        'frequency': 0,
+        'conversion_rate': 0
+    }
+
 # ADDITIVE: Enhanced age & gender aggregation dengan metrik lengkap
+@_vectorizable
 def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
     """
     Enhanced age & gender agregasi dengan metrik tambahan:
@@ -412,27 +619,7 @@ def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
     Returns:
         Dict dengan key=age|gender, value=dict metrik
     """
-    stats = defaultdict(lambda: {
-        'cost': 0,
-        'wa': 0,           # WhatsApp leads
-        'fb_leads': 0,     # Facebook leads
-        'lead_form': 0,    # Lead Form
-        'impr': 0,         # Impressions
-        'reach': 0,        # Reach
-        'freq_sum': 0,     # Frequency sum
-        'freq_count': 0,   # Frequency count
-        'clicks': 0,       # All clicks
-        'link': 0,         # Link clicks
-        # Derived metrics
-        'cpwa': 0,
-        'cpm': 0,
-        'cpc': 0,
-        'cplc': 0,
-        'ctr': 0,
-        'lctr': 0,         # Website CTR
-        'frequency': 0,
-        'conversion_rate': 0
-    })
+    stats = defaultdict(_age_gender_enhanced_entry)
     
     # Uses global col_fallback helper
     
@@ -440,7 +627,8 @@ def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
     if adset_name:
         print(f"[DEBUG] aggregate_age_gender_enhanced: filtering by adset_name='{adset_name}'")
         original_count = len(sheet_data)
-        sheet_data = [r for r in sheet_data if str(r.get('Ad set', r.get('Ad Set', r.get('Adset', '')))).lower() == adset_name.lower()]
+        # ADDITIVE: Bitmap per nilai adset (services/dimension_index.py), tanpa scan per baris
+        sheet_data = select_rows(sheet_data, adset=adset_name)
         print(f"[DEBUG] aggregate_age_gender_enhanced: filtered {original_count} rows -> {len(sheet_data)} rows matching adset")
         if len(sheet_data) == 0:
             print(f"[WARN] aggregate_age_gender_enhanced: No data found for adset '{adset_name}'")
@@ -452,58 +640,34 @@ def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
     if sheet_data and len(sheet_data) > 0:
         print(f"[DEBUG aggregate_age_gender_enhanced] First row keys: {list(sheet_data[0].keys())}")
     
-    for r in sheet_data:
-        age = r.get('Age', 'Unknown')
-        gender = r.get('Gender', 'Unknown')
-        key = f"{age}|{gender}"
+    for seg in _segments(sheet_data):
+        keys = seg.group_keys(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+        targets = [stats[key] for key in keys]
         
         # Core metrics
-        stats[key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['reach'] += safe_float(col_fallback(r, ['reach', 'Reach']))
+        _accumulate(targets, 'cost', seg.floats(METRIC_COLUMNS['cost']))
+        _accumulate(targets, 'impr', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'reach', seg.floats(METRIC_COLUMNS['reach']))
         
         # Frequency
-        freq_val = safe_float(col_fallback(r, ['frequency', 'Frequency']))
-        if freq_val > 0:
-            stats[key]['freq_sum'] += freq_val
-            stats[key]['freq_count'] += 1
+        for d, freq_val in zip(targets, seg.floats(METRIC_COLUMNS['frequency'])):
+            if freq_val > 0:
+                d['freq_sum'] += freq_val
+                d['freq_count'] += 1
         
         # Clicks
-        stats[key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
+        _accumulate(targets, 'clicks', seg.floats(METRIC_COLUMNS['clicks']))
+        _accumulate(targets, 'link', seg.floats(METRIC_COLUMNS['link_clicks']))
         
         # Leads
         # ADDITIVE: Extended WhatsApp column fallback - include Messaging Conversations and Offsite Leads  
-        wa_value = safe_float(col_fallback(r, [
-            'whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads',
-            'messaging conversations started', 'Messaging Conversations Started',
-            'messaging conversations', 'Messaging Conversations',  # ADDITIVE: Shorter variant
-            'leads (offsite/pixels)', 'Leads (Offsite/Pixels)',
-            'offsite leads', 'Offsite Leads',
-            'on-facebook leads', 'On-Facebook Leads'  # ADDITIVE: Facebook leads juga dihitung sebagai WA leads alternative
-        ]))
-        stats[key]['wa'] += wa_value
-        stats[key]['fb_leads'] += safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads', 'Facebook Leads']))
-        stats[key]['lead_form'] += safe_float(col_fallback(r, ['lead form', 'Lead Form', 'LeadForm']))
+        _accumulate(targets, 'wa', seg.floats(METRIC_COLUMNS['wa_leads_any']))
+        _accumulate(targets, 'fb_leads', seg.floats(METRIC_COLUMNS['fb_leads']))
+        _accumulate(targets, 'lead_form', seg.floats(METRIC_COLUMNS['lead_form']))
     
     # Calculate derived metrics
     for key, d in stats.items():
-        # Cost metrics
-        d['cpwa'] = (d['cost'] / d['wa']) if d['wa'] > 0 else 0
-        d['cpm'] = (d['cost'] / d['impr'] * 1000) if d['impr'] > 0 else 0
-        d['cpc'] = (d['cost'] / d['clicks']) if d['clicks'] > 0 else 0
-        d['cplc'] = (d['cost'] / d['link']) if d['link'] > 0 else 0
-        
-        # Rate metrics
-        d['ctr'] = (d['clicks'] / d['impr'] * 100) if d['impr'] > 0 else 0
-        d['lctr'] = (d['link'] / d['impr'] * 100) if d['impr'] > 0 else 0  # Website CTR
-        
-        # Frequency average
-        d['frequency'] = (d['freq_sum'] / d['freq_count']) if d['freq_count'] > 0 else 0
-        
-        # Conversion rate
-        total_leads = d['wa'] + d['fb_leads'] + d['lead_form']
-        d['conversion_rate'] = (total_leads / d['clicks'] * 100) if d['clicks'] > 0 else 0
+        _enhanced_derived(d, frequency=True)
     
     print(f"[DEBUG] aggregate_age_gender_enhanced: found {len(stats)} unique age|gender segments")
     
@@ -513,105 +677,92 @@ def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
     
     return stats
 
+def _age_gender_monthly_entry():
+    return {'cost':0,'wa':0,'impr':0,'clicks':0,'link':0}
+
 # Additive: agregasi tren CTR per bulan untuk setiap kombinasi age|gender
+@_vectorizable
 def aggregate_age_gender_monthly(sheet_data):
     """
     Mengembalikan dict: {(age|gender, yyyy-mm): {cost, impr, clicks, ctr, ...}}
     """
-    stats = defaultdict(lambda: {'cost':0,'wa':0,'impr':0,'clicks':0,'link':0})
+    stats = defaultdict(_age_gender_monthly_entry)
     # Uses global col_fallback helper
 
-    for r in sheet_data:
-        age = r.get('Age', 'Unknown')
-        gender = r.get('Gender', 'Unknown')
-        key = f"{age}|{gender}"
-        # Ambil bulan dari kolom tanggal (robust: support nama bulan Indonesia/Inggris)
-        tgl = None
-        for k in r:
-            if k.lower() in ["tanggal", "date", "tgl"] and r[k]:
-                vstr = str(r[k]).strip()
-                try:
-                    if re.match(r"\d{4}-\d{2}-\d{2}", vstr):
-                        tgl = datetime.strptime(vstr, "%Y-%m-%d")
-                    elif re.match(r"\d{2}/\d{2}/\d{4}", vstr):
-                        tgl = datetime.strptime(vstr, "%d/%m/%Y")
-                    else:
-                        # Cek jika hanya nama bulan (Indonesia/Inggris) atau "Mei 2025", "May 2025", dst
-                        parts = vstr.lower().replace('.', '').split()
-                        if len(parts) == 2 and parts[0] in MONTH_NAME_MAP and parts[1].isdigit():
-                            tgl = datetime(int(parts[1]), MONTH_NAME_MAP[parts[0]], 1)
-                        elif vstr.lower() in MONTH_NAME_MAP:
-                            tgl = datetime(datetime.now().year, MONTH_NAME_MAP[vstr.lower()], 1)
-                except Exception:
-                    continue
-        if tgl:
-            month_key = f"{tgl.year}-{tgl.month:02d}"
-            stat_key = (key, month_key)
-            stats[stat_key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-            stats[stat_key]['wa'] += safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads']))
-            stats[stat_key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-            stats[stat_key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-            stats[stat_key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
+    current_year = datetime.now().year
+    for seg in _segments(sheet_data):
+        keys = seg.group_keys(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+        # Bulan kanonik (tanggal, atau nama bulan Indonesia/Inggris; lihat services/calendar_table.row_month)
+        months = seg.dates('month')
+        picked = [i for i, tgl in enumerate(months) if tgl]
+        if not picked:
+            continue
+        targets = []
+        for i in picked:
+            year, month = months[i]
+            month_key = f"{year if year is not None else current_year}-{month:02d}"
+            targets.append(stats[(keys[i], month_key)])
+        for field, names in (
+            ('cost', METRIC_COLUMNS['cost']),
+            ('wa', METRIC_COLUMNS['whatsapp']),
+            ('impr', METRIC_COLUMNS['impressions']),
+            ('clicks', METRIC_COLUMNS['clicks']),
+            ('link', METRIC_COLUMNS['link_clicks']),
+        ):
+            values = seg.floats(names)
+            _accumulate(targets, field, [values[i] for i in picked])
     # Hitung metrik turunan
     for stat_key, d in stats.items():
-        d['cpwa'] = (d['cost']/d['wa']) if d['wa'] else 0
-        d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
-        d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
+        _breakdown_derived(d)
     return stats
 
+def _region_entry():
+    return {'cost':0,'impr':0,'clicks':0,'link':0,'reach':0,'freq':0,'cpm':0,'cpc':0,'ctr':0,'lctr':0}
+
+def _region_derived(d):
+    d['cpm'] = (d['cost']/d['impr']*1000) if d['impr'] else 0
+    d['cpc'] = (d['cost']/d['clicks']) if d['clicks'] else 0
+    d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
+    d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
+    # Frequency adalah rata-rata (simplified: total freq / jumlah rows untuk region tersebut)
+    # Untuk simplicity, kita pakai total frequency yang sudah di-sum (bisa di-improve later)
+
 # ADDITIVE: Agregasi breakdown per region (wilayah geografis)
+@_vectorizable
 def aggregate_region(sheet_data):
     """
     Agregasi metrik per region untuk analisis performa geografis.
     Returns: dict dengan key=region, value=dict metrik (cost, impressions, clicks, link_clicks, reach, frequency, cpm, cpc, ctr, lctr)
     """
-    stats = defaultdict(lambda: {'cost':0,'impr':0,'clicks':0,'link':0,'reach':0,'freq':0,'cpm':0,'cpc':0,'ctr':0,'lctr':0})
+    stats = defaultdict(_region_entry)
     
     # Uses global col_fallback helper
     
     print(f"[DEBUG] aggregate_region: processing {len(sheet_data)} rows")
     
-    for r in sheet_data:
-        region = r.get('Region', r.get('region', 'Unknown'))
-        if not region or str(region).strip() == '':
-            region = 'Unknown'
+    for seg in _segments(sheet_data):
+        # region = r.get('Region', r.get('region', 'Unknown'))
+        targets = [stats[region] for region in seg.group_keys(_region_key, ('Region', _MISSING), ('region', 'Unknown'))]
         
-        stats[region]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[region]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[region]['clicks'] += safe_float(col_fallback(r, ['clicks all', 'all clicks', 'Clicks all', 'All Clicks', 'clicks', 'Clicks']))
-        stats[region]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
-        stats[region]['reach'] += safe_float(col_fallback(r, ['reach', 'Reach']))
+        _accumulate(targets, 'cost', seg.floats(METRIC_COLUMNS['cost']))
+        _accumulate(targets, 'impr', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'clicks', seg.floats(METRIC_COLUMNS['clicks_region']))
+        _accumulate(targets, 'link', seg.floats(METRIC_COLUMNS['link_clicks']))
+        _accumulate(targets, 'reach', seg.floats(METRIC_COLUMNS['reach']))
         # Frequency adalah average, jadi kita sum dulu nanti average di akhir
-        freq_val = safe_float(col_fallback(r, ['frequency', 'Frequency']))
-        if freq_val > 0:
-            stats[region]['freq'] += freq_val
+        for d, freq_val in zip(targets, seg.floats(METRIC_COLUMNS['frequency'])):
+            if freq_val > 0:
+                d['freq'] += freq_val
     
     # Hitung metrik turunan
     for region, d in stats.items():
-        d['cpm'] = (d['cost']/d['impr']*1000) if d['impr'] else 0
-        d['cpc'] = (d['cost']/d['clicks']) if d['clicks'] else 0
-        d['ctr'] = (d['clicks']/d['impr']*100) if d['impr'] else 0
-        d['lctr'] = (d['link']/d['impr']*100) if d['impr'] else 0
-        # Frequency adalah rata-rata (simplified: total freq / jumlah rows untuk region tersebut)
-        # Untuk simplicity, kita pakai total frequency yang sudah di-sum (bisa di-improve later)
+        _region_derived(d)
     
     print(f"[DEBUG] aggregate_region: found {len(stats)} unique regions")
     return stats
 
-# ADDITIVE: Enhanced aggregate_breakdown untuk support reach, frequency, CPM, CPC, CPLC, website CTR
-def aggregate_breakdown_enhanced(sheet_data, by="Ad set"):
-    """
-    Enhanced breakdown agregasi dengan metrik tambahan:
-    - Reach, Frequency
-    - CPM (Cost Per Mille), CPC (Cost Per Click), CPLC (Cost Per Link Click)
-    - Website CTR (Link CTR)
-    - Lead Form counts
-    - Facebook Leads counts
-    - Outbound clicks breakdown
-    
-    ADDITIVE: Tidak menghapus aggregate_breakdown lama, ini versi enhanced
-    """
-    stats = defaultdict(lambda: {
+def _breakdown_enhanced_entry():
+    return {
         'cost': 0,
         'wa': 0,           # WhatsApp leads
         'fb_leads': 0,     # Facebook leads
@@ -634,7 +785,34 @@ def aggregate_breakdown_enhanced(sheet_data, by="Ad set"):
         'lctr': 0,         # Link Click Through Rate (Website CTR)
         'frequency': 0,    # Average frequency
         'conversion_rate': 0  # Leads / Clicks ratio
-    })
+    }
+
+def _column_variants(by):
+    # Build list of column name variants to try (ADDITIVE: more variants for robustness)
+    column_variants = [by, by.title(), by.lower()]
+    if ' ' in by:
+        underscore_variant = by.replace(' ', '_')
+        column_variants.extend([underscore_variant, underscore_variant.title(), underscore_variant.lower()])
+    if ' ' in by:
+        no_space_variant = by.replace(' ', '')
+        column_variants.extend([no_space_variant, no_space_variant.title(), no_space_variant.lower()])
+    return list(dict.fromkeys(column_variants))
+
+# ADDITIVE: Enhanced aggregate_breakdown untuk support reach, frequency, CPM, CPC, CPLC, website CTR
+@_vectorizable
+def aggregate_breakdown_enhanced(sheet_data, by="Ad set"):
+    """
+    Enhanced breakdown agregasi dengan metrik tambahan:
+    - Reach, Frequency
+    - CPM (Cost Per Mille), CPC (Cost Per Click), CPLC (Cost Per Link Click)
+    - Website CTR (Link CTR)
+    - Lead Form counts
+    - Facebook Leads counts
+    - Outbound clicks breakdown
+    
+    ADDITIVE: Tidak menghapus aggregate_breakdown lama, ini versi enhanced
+    """
+    stats = defaultdict(_breakdown_enhanced_entry)
     
     # Uses global col_fallback helper (THIS IS THE ONE THAT WAS CRASHING AT LINE 599)
     
@@ -647,77 +825,57 @@ def aggregate_breakdown_enhanced(sheet_data, by="Ad set"):
         if by and "set" in by.lower():
             print(f"[DEBUG] aggregate_breakdown_enhanced: Columns include: {first_keys[:10]}...")  # First 10 only
     
-    # Build list of column name variants to try (ADDITIVE: more variants for robustness)
-    column_variants = [by, by.title(), by.lower()]
-    if ' ' in by:
-        underscore_variant = by.replace(' ', '_')
-        column_variants.extend([underscore_variant, underscore_variant.title(), underscore_variant.lower()])
-    if ' ' in by:
-        no_space_variant = by.replace(' ', '')
-        column_variants.extend([no_space_variant, no_space_variant.title(), no_space_variant.lower()])
-    column_variants = list(dict.fromkeys(column_variants))
+    column_variants = _column_variants(by)
     if by and "set" in by.lower():
         print(f"[DEBUG] aggregate_breakdown_enhanced: Trying column variants: {column_variants}")
     
-    for r in sheet_data:
-        # Try all variants
-        key = None
-        for col_var in column_variants:
-            key = r.get(col_var)
-            if key:
-                break
-        if not key:
-            key = 'Unknown'
+    for seg in _segments(sheet_data):
+        keys = seg.group_keys(_variant_key, *[(col_var, None) for col_var in column_variants])
+        targets = [stats[key] for key in keys]
         
         # Core metrics
-        stats[key]['cost'] += safe_float(col_fallback(r, ['cost', 'biaya', 'Cost', 'COST', 'Biaya']))
-        stats[key]['impr'] += safe_float(col_fallback(r, ['impressions', 'Impressions', 'IMP', 'imp']))
-        stats[key]['reach'] += safe_float(col_fallback(r, ['reach', 'Reach']))
+        _accumulate(targets, 'cost', seg.floats(METRIC_COLUMNS['cost']))
+        _accumulate(targets, 'impr', seg.floats(METRIC_COLUMNS['impressions']))
+        _accumulate(targets, 'reach', seg.floats(METRIC_COLUMNS['reach']))
         
         # Frequency (untuk averaging)
-        freq_val = safe_float(col_fallback(r, ['frequency', 'Frequency']))
-        if freq_val > 0:
-            stats[key]['freq_sum'] += freq_val
-            stats[key]['freq_count'] += 1
+        for d, freq_val in zip(targets, seg.floats(METRIC_COLUMNS['frequency'])):
+            if freq_val > 0:
+                d['freq_sum'] += freq_val
+                d['freq_count'] += 1
         
         # Clicks
-        stats[key]['clicks'] += safe_float(col_fallback(r, ['all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks']))
-        stats[key]['link'] += safe_float(col_fallback(r, ['link clicks', 'Link Clicks', 'link', 'Link']))
+        _accumulate(targets, 'clicks', seg.floats(METRIC_COLUMNS['clicks']))
+        _accumulate(targets, 'link', seg.floats(METRIC_COLUMNS['link_clicks']))
         
         # Leads
-        stats[key]['wa'] += safe_float(col_fallback(r, ['whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads']))
-        stats[key]['fb_leads'] += safe_float(col_fallback(r, ['on-facebook leads', 'On-Facebook Leads', 'Facebook Leads']))
-        stats[key]['lead_form'] += safe_float(col_fallback(r, ['lead form', 'Lead Form', 'LeadForm']))
+        _accumulate(targets, 'wa', seg.floats(METRIC_COLUMNS['whatsapp']))
+        _accumulate(targets, 'fb_leads', seg.floats(METRIC_COLUMNS['fb_leads']))
+        _accumulate(targets, 'lead_form', seg.floats(METRIC_COLUMNS['lead_form']))
         
         # Outbound clicks breakdown
-        stats[key]['outbound_wa'] += safe_float(col_fallback(r, ['outbound clicks - whatsapp', 'Outbound Clicks - WhatsApp', 'whatsapp clicks']))
-        stats[key]['outbound_web'] += safe_float(col_fallback(r, ['outbound clicks - website', 'Outbound Clicks - Website', 'website clicks']))
-        stats[key]['outbound_msg'] += safe_float(col_fallback(r, ['outbound clicks - messaging', 'Outbound Clicks - Messaging']))
+        _accumulate(targets, 'outbound_wa', seg.floats(METRIC_COLUMNS['outbound_wa']))
+        _accumulate(targets, 'outbound_web', seg.floats(METRIC_COLUMNS['outbound_web']))
+        _accumulate(targets, 'outbound_msg', seg.floats(METRIC_COLUMNS['outbound_msg']))
     
     # Calculate derived metrics
     for key, d in stats.items():
-        # Cost metrics
-        d['cpwa'] = (d['cost'] / d['wa']) if d['wa'] > 0 else 0
-        d['cpm'] = (d['cost'] / d['impr'] * 1000) if d['impr'] > 0 else 0
-        d['cpc'] = (d['cost'] / d['clicks']) if d['clicks'] > 0 else 0
-        d['cplc'] = (d['cost'] / d['link']) if d['link'] > 0 else 0
-        
-        # Rate metrics
-        d['ctr'] = (d['clicks'] / d['impr'] * 100) if d['impr'] > 0 else 0
-        d['lctr'] = (d['link'] / d['impr'] * 100) if d['impr'] > 0 else 0  # Website CTR
-        
-        # Frequency average
-        d['frequency'] = (d['freq_sum'] / d['freq_count']) if d['freq_count'] > 0 else 0
-        
-        # Conversion rate (total leads / clicks)
-        total_leads = d['wa'] + d['fb_leads'] + d['lead_form']
-        d['conversion_rate'] = (total_leads / d['clicks'] * 100) if d['clicks'] > 0 else 0
+        _enhanced_derived(d, frequency=True)
     
     print(f"[DEBUG] aggregate_breakdown_enhanced: found {len(stats)} unique values for '{by}'")
     return stats
 
 
-def aggregate_adset_by_age_gender(sheet_data, age_range=None, gender=None):
+def _normalize_gender(gender):
+    """'male' / 'female' untuk variasi penulisan gender (lowercase), selain itu nilai apa adanya (unknown, dst)."""
+    if gender in ['male', 'laki-laki', 'pria', 'm', 'l']:
+        return 'male'
+    if gender in ['female', 'wanita', 'perempuan', 'f', 'p']:
+        return 'female'
+    return gender
+
+
+def aggregate_adset_by_age_gender(sheet_data, age_range=None, gender=None, backend=None):
     """
     ADDITIVE: Aggregate by adset, filtered by specific age/gender segment.
     
@@ -728,6 +886,7 @@ def aggregate_adset_by_age_gender(sheet_data, age_range=None, gender=None):
         sheet_data: List of row dicts from Google Sheets
         age_range: String like "45-54", "35-44", etc. (optional)
         gender: String like "male", "female", "laki-laki", "wanita", etc. (optional)
+        backend: 'python' / 'numpy' untuk agregasi per adset (default AGGREGATION_BACKEND)
     
     Returns:
         dict: {adset_name: {metrics...}}
@@ -736,40 +895,8 @@ def aggregate_adset_by_age_gender(sheet_data, age_range=None, gender=None):
     print(f"[DEBUG] aggregate_adset_by_age_gender: processing {len(sheet_data)} rows")
     
     # Filter data by age/gender first
-    filtered_data = []
-    
-    for row in sheet_data:
-        # Get age and gender from row
-        row_age = str(col_fallback(row, ['age', 'Age', 'AGE', 'usia', 'Usia'], '')).strip()
-        row_gender = str(col_fallback(row, ['gender', 'Gender', 'GENDER', 'jenis kelamin', 'Jenis Kelamin'], '')).strip().lower()
-        
-        # Normalize gender
-        gender_normalized = None
-        if row_gender:
-            if row_gender in ['male', 'laki-laki', 'pria', 'm', 'l']:
-                gender_normalized = 'male'
-            elif row_gender in ['female', 'wanita', 'perempuan', 'f', 'p']:
-                gender_normalized = 'female'
-            else:
-                gender_normalized = row_gender  # unknown, etc.
-        
-        # Check filters
-        age_match = True
-        gender_match = True
-        
-        if age_range:
-            age_match = row_age == age_range
-        
-        if gender:
-            gender_input_normalized = gender.lower()
-            if gender_input_normalized in ['male', 'laki-laki', 'pria', 'm', 'l']:
-                gender_input_normalized = 'male'
-            elif gender_input_normalized in ['female', 'wanita', 'perempuan', 'f', 'p']:
-                gender_input_normalized = 'female'
-            gender_match = gender_normalized == gender_input_normalized
-        
-        if age_match and gender_match:
-            filtered_data.append(row)
+    # ADDITIVE: AND bitmap age & gender (gender dinormalisasi saat indeks dibangun, services/dimension_index.py)
+    filtered_data = select_rows(sheet_data, age=age_range, gender=gender)
     
     print(f"[DEBUG] aggregate_adset_by_age_gender: filtered to {len(filtered_data)} rows (age={age_range}, gender={gender})")
     
@@ -778,7 +905,246 @@ def aggregate_adset_by_age_gender(sheet_data, age_range=None, gender=None):
         return {}
     
     # Now aggregate filtered data by adset using existing function
-    result = aggregate_breakdown_enhanced(filtered_data, by="Ad set")
+    result = aggregate_breakdown_enhanced(filtered_data, by="Ad set", backend=backend)
     
     print(f"[DEBUG] aggregate_adset_by_age_gender: found {len(result)} adsets for age={age_range}, gender={gender}")
     return result
+
+
+# ============================================================================
+# ADDITIVE: Kernel gabungan untuk semua agregat workflow (satu segmentasi, satu pass baris)
+# ============================================================================
+WORKFLOW_AGGREGATES = {
+    'main_metrics': lambda data, backend: aggregate_main_metrics(data, backend=backend),
+    'daily_weekly': lambda data, backend: aggregate_daily_weekly_cost(data, backend=backend),
+    'breakdown_adset': lambda data, backend: aggregate_breakdown(data, by="Ad set", backend=backend),
+    'breakdown_ad': lambda data, backend: aggregate_breakdown(data, by="Ad", backend=backend),
+    'age_gender': lambda data, backend: aggregate_age_gender(data, backend=backend),
+    'region_breakdown': lambda data, backend: aggregate_region(data, backend=backend),
+    'breakdown_adset_enhanced': lambda data, backend: aggregate_breakdown_enhanced(data, by="Ad set", backend=backend),
+    'breakdown_ad_enhanced': lambda data, backend: aggregate_breakdown_enhanced(data, by="Ad", backend=backend),
+    'age_gender_enhanced': lambda data, backend: aggregate_age_gender_enhanced(data, backend=backend),
+    'period_stats_daily': lambda data, backend: aggregate_by_period_enhanced(data, period='daily', backend=backend),
+    'period_stats_weekly': lambda data, backend: aggregate_by_period_enhanced(data, period='weekly', backend=backend),
+    'period_stats_monthly': lambda data, backend: aggregate_by_period_enhanced(data, period='monthly', backend=backend),
+    'outbound_clicks': lambda data, backend: aggregate_outbound_clicks(data, backend=backend),
+    'age_gender_monthly': lambda data, backend: aggregate_age_gender_monthly(data, backend=backend),
+}
+
+# Baris yang tidak masuk accumulator (mis. tanpa tanggal untuk agregat per periode)
+_SKIP = object()
+
+
+def _breakdown_keys(by):
+    return lambda seg: seg.group_keys(_first_present, (by, _MISSING), (by.title(), 'Unknown'))
+
+
+def _breakdown_enhanced_keys(by):
+    specs = tuple((col_var, None) for col_var in _column_variants(by))
+    return lambda seg: seg.group_keys(_variant_key, *specs)
+
+
+def _age_gender_keys(seg):
+    return seg.group_keys(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+
+
+def _region_keys(seg):
+    return seg.group_keys(_region_key, ('Region', _MISSING), ('region', 'Unknown'))
+
+
+def _period_keys(period):
+    def keys(seg):
+        period_keys = {}
+        result = []
+        for tgl in seg.dates('day'):
+            if not tgl:
+                result.append(_SKIP)
+                continue
+            key = period_keys.get(tgl)
+            if key is None:
+                day = calendar_day(tgl)
+                key = period_keys[tgl] = day.week_key if period == 'weekly' else day.month_key if period == 'monthly' else day.date
+            result.append(key)
+        return result
+    return keys
+
+
+def _age_gender_monthly_keys(seg):
+    current_year = datetime.now().year
+    result = []
+    for key, month in zip(_age_gender_keys(seg), seg.dates('month')):
+        if not month:
+            result.append(_SKIP)
+        else:
+            year, month = month
+            result.append((key, f"{year if year is not None else current_year}-{month:02d}"))
+    return result
+
+
+def _enhanced_frequency_derived(d):
+    _enhanced_derived(d, frequency=True)
+
+
+_BREAKDOWN_COLUMNS = (('cost', 'cost'), ('wa', 'whatsapp'), ('impr', 'impressions'), ('clicks', 'clicks'), ('link', 'link_clicks'))
+_BREAKDOWN_ENHANCED_COLUMNS = (
+    ('cost', 'cost'), ('impr', 'impressions'), ('reach', 'reach'), ('clicks', 'clicks'), ('link', 'link_clicks'),
+    ('wa', 'whatsapp'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form'),
+    ('outbound_wa', 'outbound_wa'), ('outbound_web', 'outbound_web'), ('outbound_msg', 'outbound_msg')
+)
+_PERIOD_COLUMNS = (
+    ('cost', 'cost'), ('impr', 'impressions'), ('reach', 'reach'), ('clicks', 'clicks'), ('link', 'link_clicks'),
+    ('wa', 'whatsapp'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form')
+)
+
+# Agregat berkelompok untuk kernel gabungan (backend python):
+# nama -> (entry, key per baris (_SKIP = dilewati), (field, METRIC_COLUMNS), mode frequency, derive).
+# Mode frequency untuk nilai > 0: 'count' = freq_sum & freq_count, 'sum' = freq. Field & kolom sama dengan aggregate_* asalnya.
+_GROUPED_AGGREGATES = {
+    'breakdown_adset': (_breakdown_entry, _breakdown_keys("Ad set"), _BREAKDOWN_COLUMNS, None, _breakdown_derived),
+    'breakdown_ad': (_breakdown_entry, _breakdown_keys("Ad"), _BREAKDOWN_COLUMNS, None, _breakdown_derived),
+    'age_gender': (_age_gender_entry, _age_gender_keys, (
+        ('cost', 'cost'), ('wa', 'wa_leads_any'), ('fb', 'fb_leads_any'), ('lead_form', 'lead_form'), ('impr', 'impressions'),
+        ('clicks', 'clicks'), ('link', 'link_clicks'), ('frequency', 'frequency'), ('reach', 'reach')
+    ), None, _age_gender_derived),
+    'region_breakdown': (_region_entry, _region_keys, (
+        ('cost', 'cost'), ('impr', 'impressions'), ('clicks', 'clicks_region'), ('link', 'link_clicks'), ('reach', 'reach')
+    ), 'sum', _region_derived),
+    'breakdown_adset_enhanced': (_breakdown_enhanced_entry, _breakdown_enhanced_keys("Ad set"), _BREAKDOWN_ENHANCED_COLUMNS,
+                                 'count', _enhanced_frequency_derived),
+    'breakdown_ad_enhanced': (_breakdown_enhanced_entry, _breakdown_enhanced_keys("Ad"), _BREAKDOWN_ENHANCED_COLUMNS,
+                              'count', _enhanced_frequency_derived),
+    'age_gender_enhanced': (_age_gender_enhanced_entry, _age_gender_keys, (
+        ('cost', 'cost'), ('impr', 'impressions'), ('reach', 'reach'), ('clicks', 'clicks'), ('link', 'link_clicks'),
+        ('wa', 'wa_leads_any'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form')
+    ), 'count', _enhanced_frequency_derived),
+    'period_stats_daily': (_period_entry, _period_keys('daily'), _PERIOD_COLUMNS, None, _enhanced_derived),
+    'period_stats_weekly': (_period_entry, _period_keys('weekly'), _PERIOD_COLUMNS, None, _enhanced_derived),
+    'period_stats_monthly': (_period_entry, _period_keys('monthly'), _PERIOD_COLUMNS, None, _enhanced_derived),
+    'age_gender_monthly': (_age_gender_monthly_entry, _age_gender_monthly_keys, (
+        ('cost', 'cost'), ('wa', 'whatsapp'), ('impr', 'impressions'), ('clicks', 'clicks'), ('link', 'link_clicks')
+    ), None, _breakdown_derived),
+}
+_OUTBOUND_COLUMNS = (
+    ('whatsapp', 'outbound_whatsapp_any'), ('website', 'outbound_website_any'),
+    ('messaging', 'outbound_messaging_any'), ('form', 'outbound_form_any')
+)
+_MAIN_METRICS_COLUMNS = (
+    ('total_cost', 'cost'), ('total_impressions', 'impressions'), ('total_clicks', 'clicks'),
+    ('total_link_clicks', 'link_clicks'), ('total_leads_wa', 'whatsapp'), ('total_leads_fb', 'fb_leads_basic'),
+    ('total_lead_form', 'lead_form_basic'), ('total_msg_conv', 'msg_conv')
+)
+
+
+def _fused_python(segments, names):
+    """
+    Kernel gabungan backend python: SATU loop per baris yang mengisi semua accumulator yang diminta
+    (grup adset/ad/age|gender/region/periode, outbound clicks, daily/weekly cost). Setiap field tetap
+    dijumlah berurutan baris dan grup dibuat sesuai urutan kemunculan, jadi hasil identik dengan
+    fungsi aggregate_* masing-masing. main_metrics = sum() kolom bersama (sama dengan aggregate_main_metrics).
+    """
+    grouped = [(name, defaultdict(_GROUPED_AGGREGATES[name][0])) for name in names if name in _GROUPED_AGGREGATES]
+    outbound = {'whatsapp': 0, 'website': 0, 'messaging': 0, 'form': 0} if 'outbound_clicks' in names else None
+    daily_weekly = ({}, {}, defaultdict(list)) if 'daily_weekly' in names else None
+
+    for seg in segments:
+        # Kolom & key dibaca sekali per segmen (memo _Segment), lalu satu pass baris untuk semua accumulator
+        plans = []
+        for name, stats in grouped:
+            _, key_fn, columns, frequency, _ = _GROUPED_AGGREGATES[name]
+            plans.append((
+                stats, key_fn(seg), [(field, seg.floats(METRIC_COLUMNS[column])) for field, column in columns],
+                seg.floats(METRIC_COLUMNS['frequency']) if frequency else None, frequency
+            ))
+        outbound_columns = [(field, seg.floats(METRIC_COLUMNS[column])) for field, column in _OUTBOUND_COLUMNS] \
+            if outbound is not None else ()
+        if daily_weekly is not None:
+            daily_cost, weekly_cost, rows_by_date = daily_weekly
+            days = seg.dates('day')
+            costs = seg.floats(METRIC_COLUMNS['cost'])
+            rows = seg.row_list()
+
+        for i in range(len(seg)):
+            for stats, keys, columns, freq, mode in plans:
+                key = keys[i]
+                if key is _SKIP:
+                    continue
+                d = stats[key]
+                for field, values in columns:
+                    d[field] += values[i]
+                if freq is not None:
+                    freq_val = freq[i]
+                    if freq_val > 0:
+                        if mode == 'count':
+                            d['freq_sum'] += freq_val
+                            d['freq_count'] += 1
+                        else:
+                            d['freq'] += freq_val
+            for field, values in outbound_columns:
+                outbound[field] += values[i]
+            if daily_weekly is not None:
+                tgl = days[i]
+                if tgl:
+                    day = calendar_day(tgl)
+                    daily_cost.setdefault(day.date, 0)
+                    daily_cost[day.date] += costs[i]
+                    weekly_cost.setdefault(day.iso_week, 0)
+                    weekly_cost[day.iso_week] += costs[i]
+                    rows_by_date[day.date].append(rows[i])
+
+    results = {}
+    for name, stats in grouped:
+        derive = _GROUPED_AGGREGATES[name][4]
+        for d in stats.values():
+            derive(d)
+        results[name] = stats
+    if 'main_metrics' in names:
+        results['main_metrics'] = {
+            field: sum(chain.from_iterable(seg.floats(METRIC_COLUMNS[column]) for seg in segments))
+            for field, column in _MAIN_METRICS_COLUMNS
+        }
+    if daily_weekly is not None:
+        results['daily_weekly'] = daily_weekly
+    if outbound is not None:
+        outbound['total'] = outbound['whatsapp'] + outbound['website'] + outbound['messaging'] + outbound['form']
+        if outbound['total'] > 0:
+            outbound['proportion'] = {field: outbound[field] / outbound['total'] * 100 for field, _ in _OUTBOUND_COLUMNS}
+        else:
+            outbound['proportion'] = {'whatsapp': 0, 'website': 0, 'messaging': 0, 'form': 0}
+        results['outbound_clicks'] = outbound
+    return {name: results[name] for name in names}
+
+
+def aggregate_workflow(sheet_data, requested=None, backend=None):
+    """
+    Hitung beberapa agregat workflow sekaligus.
+
+    Backend python: sheet_data dipecah menjadi segmen sekali, setiap kolom metrik (parse angka), kolom
+    tanggal dan key grup dibaca sekali per segmen, lalu _fused_python mengisi SEMUA accumulator yang
+    diminta (total, per adset/ad, per age|gender, per region, per hari/minggu/bulan, outbound) dalam
+    satu pass baris. Penjumlahan tiap accumulator tetap berurutan baris, jadi hasil identik dengan
+    memanggil fungsi aggregate_* satu per satu.
+    Backend numpy: segmen dipakai bersama oleh fungsi aggregate_* versi numpy (masing-masing vektorisasi kolom).
+
+    Args:
+        sheet_data: List of row dicts (atau WorksheetTable / RowSelection)
+        requested: nama agregat (key WORKFLOW_AGGREGATES) yang dihitung; None = semua
+        backend: 'python' / 'numpy' (default AGGREGATION_BACKEND)
+
+    Returns:
+        dict {nama agregat: hasil fungsi aggregate_* yang bersangkutan}
+    """
+    names = [name for name in WORKFLOW_AGGREGATES if requested is None or name in requested]
+    started = time.time()
+    segments = _segments(sheet_data)
+    if not _use_numpy(backend):
+        results = _fused_python(segments, names)
+        print(f"[DEBUG] aggregate_workflow: {len(names)} agregat dari {len(sheet_data)} rows (satu pass) dalam {time.time() - started:.3f}s")
+        return results
+    previous = getattr(_shared, 'segments', None)
+    _shared.segments = (sheet_data, segments)
+    try:
+        results = {name: WORKFLOW_AGGREGATES[name](sheet_data, backend) for name in names}
+    finally:
+        _shared.segments = previous
+    print(f"[DEBUG] aggregate_workflow: {len(names)} agregat dari {len(sheet_data)} rows dalam {time.time() - started:.3f}s")
+    return results
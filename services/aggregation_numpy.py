@@ -0,0 +1,465 @@
+"""
+services/aggregation_numpy.py
+Backend vektor (NumPy/pandas) untuk fungsi aggregate_* di services/aggregation.py.
+
+Dipilih per panggilan (aggregate_*(..., backend='numpy')) atau global lewat AGGREGATION_BACKEND=numpy.
+sheet_data dibaca sebagai frame kolumnar (_Frame): kolom metrik float64 (zero-copy dari WorksheetTable),
+kode grup hasil factorize kode dictionary per worksheet, lalu:
+- jumlah per grup = np.bincount(codes, weights): penjumlahan berurutan baris per grup, sama persis
+  dengan loop d[field] += v (groupby().sum() pandas memakai penjumlahan terkompensasi sehingga bit
+  terakhir bisa berbeda, karena itu tidak dipakai),
+- metrik turunan (CPWA, CPM, CPC, CPLC, CTR, LCTR, conversion rate) dihitung vektor per grup.
+
+Output (tipe dict/defaultdict, urutan key, int 0 vs float) identik dengan backend Python.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from services.aggregation import (
+    METRIC_COLUMNS, _MISSING, _age_gender_key, _age_gender_enhanced_entry, _age_gender_entry,
+    _age_gender_monthly_entry, _breakdown_enhanced_entry, _breakdown_entry, _first_present,
+    _period_entry, _region_entry, _region_key, _segments, _variant_key, _worksheet_entry, _worksheet_key
+)
+from services.calendar_table import calendar_day
+from services.dimension_index import select_rows
+
+# Batas hasil kali ukuran dictionary untuk menggabungkan kode beberapa kolom dimensi ke satu int64
+_MAX_RADIX = 1 << 62
+
+
+def _segment_size(seg):
+    if seg.table is None:
+        return len(seg.rows)
+    return len(seg.table) if seg.positions is None else len(seg.positions)
+
+
+class _Frame:
+    """sheet_data sebagai kolom NumPy lintas segmen (urutan baris sama dengan sheet_data)."""
+
+    def __init__(self, sheet_data):
+        self.segments = _segments(sheet_data)
+        self.size = sum(_segment_size(seg) for seg in self.segments)
+        self._floats = {}
+
+    def floats(self, names):
+        """float64 array = safe_float(col_fallback(r, names)) per baris."""
+        names = tuple(names)
+        values = self._floats.get(names)
+        if values is None:
+            parts = []
+            for seg in self.segments:
+                if seg.table is not None and _segment_size(seg):
+                    column = np.frombuffer(seg.table.floats(names), dtype=np.float64)
+                    parts.append(column if seg.positions is None else column[np.asarray(seg.positions, dtype=np.intp)])
+                else:
+                    parts.append(np.asarray(seg.floats(names), dtype=np.float64))
+            values = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float64)
+            self._floats[names] = values
+        return values
+
+    def dates(self, mode):
+        """Tanggal per baris (lihat services/aggregation._DATE_PARSERS), list Python."""
+        values = []
+        for seg in self.segments:
+            values.extend(seg.dates(mode))
+        return values
+
+    def group(self, fn, *specs):
+        """
+        Kode grup per baris untuk key fn(r.get(k1, d1), ...) (semantik _Segment.group_keys).
+        Returns: (codes intp array, keys) dengan keys berurutan kemunculan pertama, seperti defaultdict.
+        """
+        index = {}
+        parts = []
+        for seg in self.segments:
+            if seg.table is None:
+                keys = seg.group_keys(fn, *specs)
+                parts.append(np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys)))
+            else:
+                parts.append(self._table_codes(seg, fn, specs, index))
+        codes = np.concatenate(parts) if parts else np.zeros(0, dtype=np.intp)
+        return codes, list(index)
+
+    def _table_codes(self, seg, fn, specs, index):
+        size = _segment_size(seg)
+        combined = np.zeros(size, dtype=np.int64)
+        radix = 1
+        dimensions = []
+        for k, d in specs:
+            encoded = seg.table.dimension(k)
+            if encoded is None:
+                dimensions.append((None, d))
+                continue
+            codes, dictionary = encoded
+            if radix * len(dictionary) >= _MAX_RADIX:
+                # Terlalu banyak kombinasi untuk satu int64: key dihitung per baris
+                keys = seg.group_keys(fn, *specs)
+                return np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys))
+            column = np.frombuffer(codes, dtype=codes.typecode).astype(np.int64)
+            if seg.positions is not None:
+                column = column[np.asarray(seg.positions, dtype=np.intp)]
+            combined += column * radix
+            dimensions.append((dictionary, radix))
+            radix *= len(dictionary)
+        # factorize: kombinasi unik berurutan kemunculan pertama
+        inverse, combos = pd.factorize(combined)
+        group_of_combo = np.empty(len(combos), dtype=np.intp)
+        for position, combo in enumerate(combos.tolist()):
+            values = []
+            for dictionary, value in dimensions:
+                if dictionary is None:
+                    values.append(value)
+                else:
+                    values.append(dictionary[(combo // value) % len(dictionary)])
+            group_of_combo[position] = index.setdefault(fn(*values), len(index))
+        return group_of_combo[inverse]
+
+
+def _sums(codes, count, frame, fields, mask=None):
+    """{field: float64 array jumlah per grup} dari np.bincount (urutan penjumlahan = urutan baris)."""
+    if mask is not None:
+        codes = codes[mask]
+    sums = {}
+    for field, names in fields:
+        values = frame.floats(names)
+        if mask is not None:
+            values = values[mask]
+        sums[field] = np.bincount(codes, weights=values, minlength=count)
+    return sums
+
+
+def _positive_sums(codes, count, values):
+    """(jumlah nilai > 0, jumlah baris nilai > 0) per grup, untuk frequency."""
+    positive = values > 0
+    total = np.bincount(codes[positive], weights=values[positive], minlength=count)
+    counted = np.bincount(codes[positive], minlength=count)
+    return total, counted
+
+
+def _ratio(numerator, denominator, condition, scale=None):
+    """numerator / denominator (* scale) per grup, int 0 jika condition False (sama dengan `if ... else 0`)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = numerator / denominator
+        if scale is not None:
+            value = value * scale
+    return [v if c else 0 for v, c in zip(value.tolist(), condition.tolist())]
+
+
+def _fill(stats, keys, columns):
+    """stats[key][field] = columns[field][i]; urutan field baru mengikuti urutan columns."""
+    columns = [(field, values.tolist() if isinstance(values, np.ndarray) else values) for field, values in columns.items()]
+    for i, key in enumerate(keys):
+        d = stats[key]
+        for field, values in columns:
+            d[field] = values[i]
+    return stats
+
+
+def _nonzero_or_int(sums, counted):
+    """Nilai float per grup, int 0 untuk grup tanpa nilai yang dijumlahkan (akumulator tetap int 0)."""
+    return [v if c else 0 for v, c in zip(sums.tolist(), counted.tolist())]
+
+
+def _sequential_sum(values):
+    """Jumlah berurutan (0 + v1 + v2 ...), sama dengan loop total += v."""
+    if not len(values):
+        return 0
+    return np.bincount(np.zeros(len(values), dtype=np.intp), weights=values, minlength=1).tolist()[0]
+
+
+# ============================================================================
+# Versi vektor fungsi aggregate_* (signature & output sama dengan services/aggregation.py)
+# ============================================================================
+def aggregate_metrics_by_worksheet(sheet_data):
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(
+        _worksheet_key, ('sheet_id', _MISSING), ('Sheet ID', 'Unknown'), ('worksheet', _MISSING), ('Worksheet', 'Unknown')
+    )
+    sums = _sums(codes, len(keys), frame, [
+        ('total_cost', METRIC_COLUMNS['cost']),
+        ('total_impressions', METRIC_COLUMNS['impressions']),
+        ('total_clicks', METRIC_COLUMNS['clicks']),
+        ('total_link_clicks', METRIC_COLUMNS['link_clicks']),
+        ('total_leads_wa', METRIC_COLUMNS['whatsapp']),
+        ('total_leads_fb', METRIC_COLUMNS['fb_leads_basic']),
+        ('total_lead_form', METRIC_COLUMNS['lead_form_basic']),
+        ('total_msg_conv', METRIC_COLUMNS['msg_conv']),
+    ])
+    return _fill(defaultdict(_worksheet_entry), keys, sums)
+
+
+def aggregate_main_metrics(sheet_data):
+    frame = _Frame(sheet_data)
+
+    def column_sum(names):
+        # sum() Python atas nilai yang sama -> hasil identik dengan backend Python di semua versi Python
+        return sum(frame.floats(names).tolist())
+
+    return {
+        'total_cost': column_sum(METRIC_COLUMNS['cost']),
+        'total_impressions': column_sum(METRIC_COLUMNS['impressions']),
+        'total_clicks': column_sum(METRIC_COLUMNS['clicks']),
+        'total_link_clicks': column_sum(METRIC_COLUMNS['link_clicks']),
+        'total_leads_wa': column_sum(METRIC_COLUMNS['whatsapp']),
+        'total_leads_fb': column_sum(METRIC_COLUMNS['fb_leads_basic']),
+        'total_lead_form': column_sum(METRIC_COLUMNS['lead_form_basic']),
+        'total_msg_conv': column_sum(METRIC_COLUMNS['msg_conv'])
+    }
+
+
+def _date_groups(dates, key_of):
+    """(codes, mask baris bertanggal, keys) untuk key_of(tgl); key dihitung sekali per tanggal unik."""
+    index = {}
+    period_keys = {}
+    codes = np.full(len(dates), -1, dtype=np.intp)
+    for i, tgl in enumerate(dates):
+        if not tgl:
+            continue
+        key = period_keys.get(tgl)
+        if key is None:
+            key = key_of(tgl)
+            period_keys[tgl] = key
+        codes[i] = index.setdefault(key, len(index))
+    return codes, codes >= 0, list(index)
+
+
+def aggregate_daily_weekly_cost(sheet_data):
+    frame = _Frame(sheet_data)
+    dates = frame.dates('day')
+    costs = frame.floats(METRIC_COLUMNS['cost'])
+    day_codes, dated, days = _date_groups(dates, lambda tgl: calendar_day(tgl).date)
+    week_codes, _, weeks = _date_groups(dates, lambda tgl: calendar_day(tgl).iso_week)
+    daily = np.bincount(day_codes[dated], weights=costs[dated], minlength=len(days)).tolist()
+    weekly = np.bincount(week_codes[dated], weights=costs[dated], minlength=len(weeks)).tolist()
+    rows_by_date = defaultdict(list)
+    rows = [r for seg in frame.segments for r in seg.row_list()]
+    for i in np.flatnonzero(dated).tolist():
+        rows_by_date[days[day_codes[i]]].append(rows[i])
+    return dict(zip(days, daily)), dict(zip(weeks, weekly)), rows_by_date
+
+
+def _period_key(period):
+    if period == 'weekly':
+        return lambda tgl: calendar_day(tgl).week_key
+    if period == 'monthly':
+        return lambda tgl: calendar_day(tgl).month_key
+    return lambda tgl: calendar_day(tgl).date  # daily & default
+
+
+def _enhanced_derived(sums, extra=None):
+    """Metrik turunan versi enhanced (kondisi > 0), urutan field sama dengan backend Python."""
+    cost, wa, impr, clicks, link = sums['cost'], sums['wa'], sums['impr'], sums['clicks'], sums['link']
+    derived = {
+        'cpwa': _ratio(cost, wa, wa > 0),
+        'cpm': _ratio(cost, impr, impr > 0, 1000),
+        'cpc': _ratio(cost, clicks, clicks > 0),
+        'cplc': _ratio(cost, link, link > 0),
+        'ctr': _ratio(clicks, impr, impr > 0, 100),
+        'lctr': _ratio(link, impr, impr > 0, 100),
+    }
+    if extra:
+        derived.update(extra)
+    total_leads = wa + sums['fb_leads'] + sums['lead_form']
+    derived['conversion_rate'] = _ratio(total_leads, clicks, clicks > 0, 100)
+    return derived
+
+
+def aggregate_by_period_enhanced(sheet_data, period='daily'):
+    print(f"[DEBUG] aggregate_by_period_enhanced[numpy]: processing {len(sheet_data)} rows, period='{period}'")
+    frame = _Frame(sheet_data)
+    codes, dated, keys = _date_groups(frame.dates('day'), _period_key(period))
+    sums = _sums(codes, len(keys), frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('reach', METRIC_COLUMNS['reach']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+        ('wa', METRIC_COLUMNS['whatsapp']),
+        ('fb_leads', METRIC_COLUMNS['fb_leads']),
+        ('lead_form', METRIC_COLUMNS['lead_form']),
+    ], mask=dated)
+    stats = _fill(defaultdict(_period_entry), keys, sums)
+    return _fill(stats, keys, _enhanced_derived(sums))
+
+
+def aggregate_outbound_clicks(sheet_data):
+    frame = _Frame(sheet_data)
+    stats = {
+        'whatsapp': _sequential_sum(frame.floats(METRIC_COLUMNS['outbound_whatsapp_any'])),
+        'website': _sequential_sum(frame.floats(METRIC_COLUMNS['outbound_website_any'])),
+        'messaging': _sequential_sum(frame.floats(METRIC_COLUMNS['outbound_messaging_any'])),
+        'form': _sequential_sum(frame.floats(METRIC_COLUMNS['outbound_form_any'])),
+        'total': 0,
+        'proportion': {}
+    }
+    stats['total'] = stats['whatsapp'] + stats['website'] + stats['messaging'] + stats['form']
+    if stats['total'] > 0:
+        for channel in ('whatsapp', 'website', 'messaging', 'form'):
+            stats['proportion'][channel] = (stats[channel] / stats['total'] * 100)
+    else:
+        stats['proportion'] = {'whatsapp': 0, 'website': 0, 'messaging': 0, 'form': 0}
+    return stats
+
+
+def aggregate_breakdown(sheet_data, by="Ad set"):
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(_first_present, (by, _MISSING), (by.title(), 'Unknown'))
+    sums = _sums(codes, len(keys), frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('wa', METRIC_COLUMNS['whatsapp']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+    ])
+    cost, wa, impr, clicks, link = sums['cost'], sums['wa'], sums['impr'], sums['clicks'], sums['link']
+    sums.update({
+        'cpwa': _ratio(cost, wa, wa != 0),
+        'ctr': _ratio(clicks, impr, impr != 0, 100),
+        'lctr': _ratio(link, impr, impr != 0, 100),
+    })
+    return _fill(defaultdict(_breakdown_entry), keys, sums)
+
+
+def aggregate_age_gender(sheet_data):
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+    sums = _sums(codes, len(keys), frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('wa', METRIC_COLUMNS['wa_leads_any']),
+        ('fb', METRIC_COLUMNS['fb_leads_any']),
+        ('lead_form', METRIC_COLUMNS['lead_form']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+        ('frequency', METRIC_COLUMNS['frequency']),
+        ('reach', METRIC_COLUMNS['reach']),
+    ])
+    cost, wa, impr, clicks, link = sums['cost'], sums['wa'], sums['impr'], sums['clicks'], sums['link']
+    sums.update({
+        'cpwa': _ratio(cost, wa, wa != 0),
+        'ctr': _ratio(clicks, impr, impr != 0, 100),
+        'lctr': _ratio(link, impr, impr != 0, 100),
+        'cpm': _ratio(cost, impr, impr != 0, 1000),
+        'cpc': _ratio(cost, clicks, clicks != 0),
+        'cplc': _ratio(cost, link, link != 0),
+    })
+    return _fill(defaultdict(_age_gender_entry), keys, sums)
+
+
+def aggregate_age_gender_enhanced(sheet_data, adset_name=None):
+    if adset_name:
+        sheet_data = select_rows(sheet_data, adset=adset_name)
+        if len(sheet_data) == 0:
+            print(f"[WARN] aggregate_age_gender_enhanced[numpy]: No data found for adset '{adset_name}'")
+            return {}
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+    count = len(keys)
+    sums = _sums(codes, count, frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('reach', METRIC_COLUMNS['reach']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+        ('wa', METRIC_COLUMNS['wa_leads_any']),
+        ('fb_leads', METRIC_COLUMNS['fb_leads']),
+        ('lead_form', METRIC_COLUMNS['lead_form']),
+    ])
+    freq_sum, freq_count = _positive_sums(codes, count, frame.floats(METRIC_COLUMNS['frequency']))
+    sums['freq_sum'] = _nonzero_or_int(freq_sum, freq_count)
+    sums['freq_count'] = freq_count
+    sums.update(_enhanced_derived(sums, {'frequency': _ratio(freq_sum, freq_count, freq_count > 0)}))
+    return _fill(defaultdict(_age_gender_enhanced_entry), keys, sums)
+
+
+def aggregate_age_gender_monthly(sheet_data):
+    frame = _Frame(sheet_data)
+    segment_codes, segments = frame.group(_age_gender_key, ('Age', 'Unknown'), ('Gender', 'Unknown'))
+    current_year = datetime.now().year
+    index = {}
+    month_keys = {}
+    months = frame.dates('month')
+    codes = np.full(len(months), -1, dtype=np.intp)
+    for i, (tgl, segment) in enumerate(zip(months, segment_codes.tolist())):
+        if not tgl:
+            continue
+        month_key = month_keys.get(tgl)
+        if month_key is None:
+            year, month = tgl
+            month_key = f"{year if year is not None else current_year}-{month:02d}"
+            month_keys[tgl] = month_key
+        codes[i] = index.setdefault((segments[segment], month_key), len(index))
+    keys = list(index)
+    sums = _sums(codes, len(keys), frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('wa', METRIC_COLUMNS['whatsapp']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+    ], mask=codes >= 0)
+    cost, wa, impr, clicks, link = sums['cost'], sums['wa'], sums['impr'], sums['clicks'], sums['link']
+    sums.update({
+        'cpwa': _ratio(cost, wa, wa != 0),
+        'ctr': _ratio(clicks, impr, impr != 0, 100),
+        'lctr': _ratio(link, impr, impr != 0, 100),
+    })
+    return _fill(defaultdict(_age_gender_monthly_entry), keys, sums)
+
+
+def aggregate_region(sheet_data):
+    print(f"[DEBUG] aggregate_region[numpy]: processing {len(sheet_data)} rows")
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(_region_key, ('Region', _MISSING), ('region', 'Unknown'))
+    count = len(keys)
+    sums = _sums(codes, count, frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('clicks', METRIC_COLUMNS['clicks_region']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+        ('reach', METRIC_COLUMNS['reach']),
+    ])
+    freq_sum, freq_count = _positive_sums(codes, count, frame.floats(METRIC_COLUMNS['frequency']))
+    sums['freq'] = _nonzero_or_int(freq_sum, freq_count)
+    cost, impr, clicks, link = sums['cost'], sums['impr'], sums['clicks'], sums['link']
+    sums.update({
+        'cpm': _ratio(cost, impr, impr != 0, 1000),
+        'cpc': _ratio(cost, clicks, clicks != 0),
+        'ctr': _ratio(clicks, impr, impr != 0, 100),
+        'lctr': _ratio(link, impr, impr != 0, 100),
+    })
+    return _fill(defaultdict(_region_entry), keys, sums)
+
+
+def aggregate_breakdown_enhanced(sheet_data, by="Ad set"):
+    print(f"[DEBUG] aggregate_breakdown_enhanced[numpy]: processing {len(sheet_data)} rows, grouping by '{by}'")
+    column_variants = [by, by.title(), by.lower()]
+    if ' ' in by:
+        underscore_variant = by.replace(' ', '_')
+        column_variants.extend([underscore_variant, underscore_variant.title(), underscore_variant.lower()])
+        no_space_variant = by.replace(' ', '')
+        column_variants.extend([no_space_variant, no_space_variant.title(), no_space_variant.lower()])
+    column_variants = list(dict.fromkeys(column_variants))
+    frame = _Frame(sheet_data)
+    codes, keys = frame.group(_variant_key, *[(col_var, None) for col_var in column_variants])
+    count = len(keys)
+    sums = _sums(codes, count, frame, [
+        ('cost', METRIC_COLUMNS['cost']),
+        ('impr', METRIC_COLUMNS['impressions']),
+        ('reach', METRIC_COLUMNS['reach']),
+        ('clicks', METRIC_COLUMNS['clicks']),
+        ('link', METRIC_COLUMNS['link_clicks']),
+        ('wa', METRIC_COLUMNS['whatsapp']),
+        ('fb_leads', METRIC_COLUMNS['fb_leads']),
+        ('lead_form', METRIC_COLUMNS['lead_form']),
+        ('outbound_wa', METRIC_COLUMNS['outbound_wa']),
+        ('outbound_web', METRIC_COLUMNS['outbound_web']),
+        ('outbound_msg', METRIC_COLUMNS['outbound_msg']),
+    ])
+    freq_sum, freq_count = _positive_sums(codes, count, frame.floats(METRIC_COLUMNS['frequency']))
+    sums['freq_sum'] = _nonzero_or_int(freq_sum, freq_count)
+    sums['freq_count'] = freq_count
+    sums.update(_enhanced_derived(sums, {'frequency': _ratio(freq_sum, freq_count, freq_count > 0)}))
+    return _fill(defaultdict(_breakdown_enhanced_entry), keys, sums)
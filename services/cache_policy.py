@@ -0,0 +1,174 @@
+"""
+services/cache_policy.py
+Kebijakan eviction L1 cache worksheet (services/sheet_cache.py).
+
+- Budget memori dalam byte (GSHEET_CACHE_MAX_BYTES) selain batas jumlah entry (GSHEET_CACHE_MAX_SIZE);
+  ukuran entry diperkirakan sekali saat SET (services/worksheet_table.estimate_bytes).
+- GSHEET_CACHE_POLICY=lru (default) atau lfu. Recency dan frekuensi dilacak O(1) per akses:
+  LRU lewat OrderedDict (key diakses pindah ke belakang), LFU lewat bucket frekuensi -> OrderedDict (tie-break LRU).
+- Pinning: entry yang di-pin (GSHEET_CACHE_PINNED atau sheet_cache.pin_cache_entry) tidak pernah di-evict karena
+  budget; tetap bisa expired/dibuang oleh /cache/clear seperti biasa.
+- Alasan setiap eviction dicatat (max_entries, max_bytes, expired, invalidated, generation, cleared).
+
+Semua method dipanggil dengan _gsheet_cache_lock milik sheet_cache dipegang (tidak ada lock sendiri).
+"""
+import os
+import time
+from collections import OrderedDict, deque
+
+CACHE_POLICY = os.environ.get('GSHEET_CACHE_POLICY', 'lru').strip().lower()
+if CACHE_POLICY not in ('lru', 'lfu'):
+    print(f"[CACHE] GSHEET_CACHE_POLICY '{CACHE_POLICY}' tidak dikenal, pakai 'lru'")
+    CACHE_POLICY = 'lru'
+# Default 512 MB; 0 = tanpa budget byte (hanya batas jumlah entry)
+CACHE_MAX_BYTES = int(os.environ.get('GSHEET_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# "sheet_id:worksheet" atau nama worksheet saja, dipisah koma
+CACHE_PINNED = [item.strip() for item in os.environ.get('GSHEET_CACHE_PINNED', '').split(',') if item.strip()]
+_RECENT_EVICTIONS = 50
+
+
+class CachePolicy:
+    """Pelacak ukuran, hit, recency/frekuensi dan eviction untuk key L1 cache."""
+
+    def __init__(self, max_entries, max_bytes=CACHE_MAX_BYTES, policy=CACHE_POLICY, pinned=CACHE_PINNED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.pinned_patterns = set(pinned)
+        self.entries = {}           # key -> {"bytes", "hits", "freq", "pinned", "admitted_at", "last_access"}
+        self.total_bytes = 0
+        self._lru = OrderedDict()   # key tidak di-pin, paling lama tidak diakses di depan
+        self._buckets = {}          # freq -> OrderedDict key (LFU)
+        self._min_freq = 0
+        self.evictions = {}         # alasan -> jumlah
+        self.recent = deque(maxlen=_RECENT_EVICTIONS)
+
+    # -- pinning ------------------------------------------------------------
+    def is_pinned(self, key):
+        return key in self.pinned_patterns or key.split(':', 1)[-1] in self.pinned_patterns
+
+    def set_pinned(self, key, pinned):
+        if pinned:
+            self.pinned_patterns.add(key)
+        else:
+            self.pinned_patterns.discard(key)
+        entry = self.entries.get(key)
+        if entry is not None and entry["pinned"] != self.is_pinned(key):
+            self._untrack(key, entry)
+            entry["pinned"] = self.is_pinned(key)
+            self._track(key, entry)
+
+    # -- struktur O(1) ------------------------------------------------------
+    def _track(self, key, entry):
+        if entry["pinned"]:
+            return
+        self._lru[key] = None
+        bucket = self._buckets.get(entry["freq"])
+        if bucket is None:
+            bucket = self._buckets[entry["freq"]] = OrderedDict()
+        bucket[key] = None
+        if entry["freq"] < self._min_freq or len(self._lru) == 1:
+            self._min_freq = entry["freq"]
+
+    def _untrack(self, key, entry):
+        if entry["pinned"]:
+            return
+        self._lru.pop(key, None)
+        bucket = self._buckets.get(entry["freq"])
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                # _min_freq bisa jadi basi di sini; diperbaiki di touch() atau saat victim() dipanggil
+                del self._buckets[entry["freq"]]
+
+    # -- event cache --------------------------------------------------------
+    def admit(self, key, nbytes):
+        """Entry baru / di-replace. Hit & frekuensi entry yang di-replace dipertahankan."""
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {"bytes": 0, "hits": 0, "freq": 1, "pinned": self.is_pinned(key), "admitted_at": now, "last_access": now}
+            self.entries[key] = entry
+        else:
+            self._untrack(key, entry)
+            entry["admitted_at"] = now
+        self.total_bytes += nbytes - entry["bytes"]
+        entry["bytes"] = nbytes
+        self._track(key, entry)
+
+    def touch(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry["hits"] += 1
+        entry["last_access"] = time.time()
+        if entry["pinned"]:
+            return
+        freq = entry["freq"]
+        self._untrack(key, entry)
+        entry["freq"] = freq + 1
+        self._track(key, entry)
+        if self._min_freq == freq and freq not in self._buckets:
+            self._min_freq = freq + 1
+
+    def remove(self, key, reason):
+        """Lupakan key dan catat alasannya. Returns: entry yang dibuang atau None."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self._untrack(key, entry)
+        self.total_bytes -= entry["bytes"]
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+        self.recent.append({"key": key, "reason": reason, "bytes": entry["bytes"], "hits": entry["hits"], "at": time.time()})
+        return entry
+
+    def remove_all(self, reason):
+        """Semua entry dibuang sekaligus (clear/generation): hanya jumlahnya yang dicatat."""
+        if self.entries:
+            self.evictions[reason] = self.evictions.get(reason, 0) + len(self.entries)
+        self.entries.clear()
+        self._lru.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+        self.total_bytes = 0
+
+    def over_budget(self):
+        """Alasan eviction jika melebihi batas ('max_entries' / 'max_bytes'), atau None."""
+        if len(self.entries) > self.max_entries:
+            return 'max_entries'
+        if self.max_bytes and self.total_bytes > self.max_bytes:
+            return 'max_bytes'
+        return None
+
+    def victim(self, exclude=None):
+        """Key korban berikutnya sesuai policy (bukan pinned, bukan exclude), atau None."""
+        if self.policy == 'lfu':
+            if self._buckets and self._min_freq not in self._buckets:
+                # Entry di bucket minimum dibuang di luar eviction (expired dll.)
+                self._min_freq = min(self._buckets)
+            candidates = self._buckets.get(self._min_freq, ())
+            for key in candidates:
+                if key != exclude:
+                    return key
+            # Hanya exclude yang ada di bucket minimum: cari di bucket berikutnya
+            for freq in sorted(self._buckets):
+                for key in self._buckets[freq]:
+                    if key != exclude:
+                        return key
+            return None
+        for key in self._lru:
+            if key != exclude:
+                return key
+        return None
+
+    def status(self):
+        return {
+            "policy": self.policy,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "used_bytes": self.total_bytes,
+            "entries": len(self.entries),
+            "pinned": sorted(self.pinned_patterns),
+            "evictions": dict(self.evictions),
+            "recent_evictions": list(self.recent)
+        }
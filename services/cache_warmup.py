@@ -0,0 +1,123 @@
+"""
+services/cache_warmup.py
+Warm-up cache worksheet saat startup + endpoint POST /cache/warm.
+
+Saat app start, thread background "gsheet-cache-warmup" mem-prefetch semua worksheet yang lolos
+WORKSHEET_WHITELIST dari GOOGLE_SHEET_ID & GOOGLE_SHEET2_ID (metadata, download, WorksheetTable),
+sehingga /chat pertama setelah deploy tidak menanggung download. /health tidak menunggu warm-up;
+statusnya terlihat di field "cache_warm".
+
+POST /cache/warm (butuh CACHE_WARM_TOKEN, header "Authorization: Bearer <token>" atau
+"X-Cache-Token") bisa menarget spreadsheet/worksheet tertentu setelah data push.
+"""
+import hmac
+import os
+import threading
+import time
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+WARMUP_ENABLED = os.environ.get('GSHEET_WARMUP', '1') in ['1', 'true', 'True']
+# Jeda sebelum warm-up startup dimulai (beri waktu server menerima request /health dulu)
+_WARMUP_DELAY = float(os.environ.get('GSHEET_WARMUP_DELAY', 0))
+
+_warm_lock = threading.Lock()
+_warm_state = {
+    "warm": False,          # True setelah warm-up (startup atau manual) selesai tanpa error
+    "running": 0,
+    "startup": None,        # ringkasan warm-up startup
+    "last_run": None,       # ringkasan warm-up terakhir (startup atau manual)
+    "runs": 0
+}
+_warmup_thread = None
+
+
+def default_sheet_ids():
+    return [sheet_id for sheet_id in [os.getenv('GOOGLE_SHEET_ID'), os.getenv('GOOGLE_SHEET2_ID')] if sheet_id]
+
+
+def run_warmup(sheet_ids=None, worksheets=None, force=False, source="manual"):
+    """Jalankan warm-up secara sinkron. Returns: ringkasan (per sheet, jumlah worksheet & baris, durasi)."""
+    from services.sheet_loader import get_worksheet_whitelist, warm_worksheets
+
+    sheet_ids = sheet_ids or default_sheet_ids()
+    with _warm_lock:
+        _warm_state["running"] += 1
+    started = time.time()
+    summary = {"source": source, "sheet_ids": sheet_ids, "worksheets_requested": worksheets, "force": force,
+               "started_at": started}
+    try:
+        results = warm_worksheets(sheet_ids, worksheets=worksheets, force=force, whitelist=get_worksheet_whitelist())
+        errors = {sheet_id: result["error"] for sheet_id, result in results.items() if "error" in result}
+        summary.update({
+            "sheets": results,
+            "worksheets": sum(len(result.get("worksheets", [])) for result in results.values()),
+            "rows": sum(result.get("rows", 0) for result in results.values()),
+            "errors": errors
+        })
+    except Exception as e:
+        summary.update({"sheets": {}, "worksheets": 0, "rows": 0, "errors": {"*": str(e)}})
+    summary["duration_seconds"] = time.time() - started
+    with _warm_lock:
+        _warm_state["running"] -= 1
+        _warm_state["runs"] += 1
+        _warm_state["last_run"] = summary
+        if source == "startup":
+            _warm_state["startup"] = summary
+        if not summary["errors"] and sheet_ids:
+            _warm_state["warm"] = True
+    print(f"[WARMUP] {source}: {summary['worksheets']} worksheet, {summary['rows']} rows dari {len(sheet_ids)} spreadsheet "
+          f"dalam {summary['duration_seconds']:.2f}s" + (f" (error: {summary['errors']})" if summary['errors'] else ""))
+    return summary
+
+
+def start_background_warmup(sheet_ids=None, worksheets=None, force=False, source="startup"):
+    """Jalankan warm-up di thread daemon (tidak memblokir startup maupun request). Returns: Thread atau None."""
+    global _warmup_thread
+    if source == "startup":
+        if not WARMUP_ENABLED:
+            print("[WARMUP] Warm-up startup dimatikan (GSHEET_WARMUP=0)")
+            return None
+        if not (sheet_ids or default_sheet_ids()):
+            print("[WARMUP] GOOGLE_SHEET_ID belum di-set, warm-up startup dilewati")
+            return None
+
+    def target():
+        if source == "startup" and _WARMUP_DELAY > 0:
+            time.sleep(_WARMUP_DELAY)
+        run_warmup(sheet_ids, worksheets=worksheets, force=force, source=source)
+
+    thread = threading.Thread(target=target, name="gsheet-cache-warmup", daemon=True)
+    thread.start()
+    if source == "startup":
+        _warmup_thread = thread
+    return thread
+
+
+def is_process_warm():
+    with _warm_lock:
+        return _warm_state["warm"]
+
+
+def get_warmup_status():
+    with _warm_lock:
+        status = dict(_warm_state)
+    status["enabled"] = WARMUP_ENABLED
+    status["startup_thread_alive"] = _warmup_thread is not None and _warmup_thread.is_alive()
+    return status
+
+
+def check_warm_token(headers):
+    """
+    Validasi token untuk POST /cache/warm. Returns: (ok, http_status, pesan).
+    Endpoint nonaktif (403) selama CACHE_WARM_TOKEN belum di-set.
+    """
+    expected = os.getenv('CACHE_WARM_TOKEN')
+    if not expected:
+        return False, 403, "CACHE_WARM_TOKEN belum di-set, endpoint /cache/warm nonaktif"
+    token = headers.get('X-Cache-Token', '')
+    auth = headers.get('Authorization', '')
+    if auth.lower().startswith('bearer '):
+        token = auth[7:].strip()
+    if not token or not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+        return False, 401, "Token tidak valid"
+    return True, 200, None
@@ -0,0 +1,269 @@
+"""
+services/calendar_table.py
+Kolom tanggal kanonik + tabel kalender (date dimension) yang dipakai semua kode temporal.
+
+Sebelumnya tanggal di-parse ulang (regex + strptime) di aggregator, filter temporal llm_summary,
+node_aggregate_monthly dan extract_month/week_from_date workflow, masing-masing dengan format yang
+sedikit berbeda. Sekarang satu aturan:
+- Kolom tanggal: nama persis tanggal/date/tgl dulu, lalu nama yang mengandung date/tanggal/tgl/day/dt
+  (mis. "Day", "Date Start"), keduanya sesuai urutan header. Jika header tidak ada yang cocok, kolom
+  yang isinya mirip tanggal (YYYY-MM-DD atau DD/MM/YYYY) dipakai. Ini gabungan aturan lama terluas
+  (filter temporal llm_summary + node_aggregate_monthly).
+- row_date(row): tanggal (datetime tengah malam) dari kolom tanggal pertama yang terisi dan bisa
+  di-parse. Format: YYYY-MM-DD, YYYY/MM/DD, DD/MM/YYYY, DD-MM-YYYY (hari/bulan boleh 1 digit, boleh
+  diikuti jam), atau objek date/datetime.
+- row_month(row): (tahun, bulan) dari row_date; jika tidak ada, dari cell bulan saja di kolom tanggal
+  atau kolom yang namanya mengandung bulan/month ("2025-05", "Mei 2025", "May"; tahun None jika hanya
+  nama bulan).
+- calendar_day(tgl): baris tabel kalender (tahun, bulan, minggu ISO, minggu ke-N dalam bulan, key
+  YYYY-MM / YYYY-Www), dihitung sekali per tanggal unik.
+
+WorksheetTable menyimpan hasil row_date/row_month per baris saat ingest (table.dates['day'/'month'],
+di-parse sekali per nilai unik), jadi row_date untuk TableRow hanya membaca kolom tersebut.
+"""
+import re
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+
+DATE_COLUMNS = ("tanggal", "date", "tgl")
+MONTH_COLUMNS = ("bulan", "month")
+# Potongan nama kolom (substring, case-insensitive) setelah nama persis di atas
+DATE_COLUMN_HINTS = ("date", "tanggal", "tgl", "day", "dt")
+MONTH_COLUMN_HINTS = MONTH_COLUMNS
+
+# Mapping nama bulan Indonesia & Inggris ke angka bulan
+MONTH_NAME_MAP = {
+    'january': 1, 'jan': 1, 'januari': 1,
+    'february': 2, 'feb': 2, 'februari': 2,
+    'march': 3, 'mar': 3, 'maret': 3,
+    'april': 4, 'apr': 4,
+    'may': 5, 'mei': 5,
+    'june': 6, 'jun': 6, 'juni': 6,
+    'july': 7, 'jul': 7, 'juli': 7,
+    'august': 8, 'aug': 8, 'agustus': 8,
+    'september': 9, 'sep': 9,
+    'october': 10, 'oct': 10, 'oktober': 10, 'okt': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12, 'desember': 12, 'des': 12
+}
+
+# week_key = key periode 'weekly' (tahun kalender + minggu ISO, format lama aggregate_by_period_enhanced)
+CalendarDay = namedtuple('CalendarDay', [
+    'date', 'year', 'month', 'day', 'iso_year', 'iso_week', 'weekday', 'week_of_month', 'month_key', 'week_key'
+])
+
+_YMD = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T].*)?$')
+_DMY = re.compile(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})(?:[ T].*)?$')
+_YM = re.compile(r'^(\d{4})[-/](\d{1,2})$')
+# Fallback isi kolom jika tidak ada header tanggal (sama dengan sniff lama node_aggregate_monthly)
+_LOOKS_LIKE_DATE = re.compile(r'\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}')
+
+# Batas entry memo; nilai tanggal unik per dataset kecil, batas ini hanya pengaman data liar
+_MAX_ENTRIES = 65536
+_lock = threading.Lock()
+_parsed = {}    # str cell -> datetime atau None
+_calendar = {}  # date -> CalendarDay
+_header_columns = {}  # tuple header -> (kolom tanggal, kolom tanggal + bulan)
+_calendar_stats = {"parsed": 0, "days": 0}
+
+
+def _to_datetime(year, month, day):
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """Tanggal (datetime tengah malam) dari satu cell, atau None jika bukan tanggal lengkap."""
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if value is None or value == '':
+        return None
+    text = str(value).strip()
+    found = _parsed.get(text, _parsed)
+    if found is not _parsed:
+        return found
+    m = _YMD.match(text)
+    if m:
+        found = _to_datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    else:
+        m = _DMY.match(text)
+        found = _to_datetime(int(m.group(3)), int(m.group(2)), int(m.group(1))) if m else None
+    with _lock:
+        if len(_parsed) >= _MAX_ENTRIES:
+            _parsed.clear()
+        _parsed[text] = found
+        _calendar_stats["parsed"] += 1
+    return found
+
+
+def parse_month(value):
+    """(tahun, bulan) dari cell tanggal/bulan; tahun None = hanya nama bulan. None jika tidak dikenali."""
+    tgl = parse_date(value)
+    if tgl is not None:
+        return (tgl.year, tgl.month)
+    if value is None or isinstance(value, (date, datetime)):
+        return None
+    text = str(value).strip().lower().replace('.', '')
+    m = _YM.match(text)
+    if m:
+        month = int(m.group(2))
+        return (int(m.group(1)), month) if 1 <= month <= 12 else None
+    parts = text.split()
+    if len(parts) == 2:
+        if parts[0] in MONTH_NAME_MAP and parts[1].isdigit():
+            return (int(parts[1]), MONTH_NAME_MAP[parts[0]])
+        if parts[1] in MONTH_NAME_MAP and parts[0].isdigit():
+            return (int(parts[0]), MONTH_NAME_MAP[parts[1]])
+    if text in MONTH_NAME_MAP:
+        return (None, MONTH_NAME_MAP[text])
+    return None
+
+
+def calendar_day(tgl):
+    """Baris tabel kalender untuk date/datetime (None -> None)."""
+    if not tgl:
+        return None
+    day = tgl.date() if isinstance(tgl, datetime) else tgl
+    entry = _calendar.get(day)
+    if entry is None:
+        iso_year, iso_week, weekday = day.isocalendar()
+        entry = CalendarDay(
+            date=day, year=day.year, month=day.month, day=day.day,
+            iso_year=iso_year, iso_week=iso_week, weekday=weekday,
+            week_of_month=(day.day - 1) // 7 + 1,
+            month_key=f"{day.year}-{day.month:02d}",
+            week_key=f"{day.year}-W{iso_week:02d}"
+        )
+        with _lock:
+            if len(_calendar) >= _MAX_ENTRIES:
+                _calendar.clear()
+            _calendar[day] = entry
+            _calendar_stats["days"] = len(_calendar)
+    return entry
+
+
+def matches(entry, year=None, month=None, week=None):
+    """Filter temporal (week = minggu ke-N dalam bulan, hari 1-7 = minggu 1); tanpa tanggal tidak lolos."""
+    if entry is None:
+        return False
+    if year and entry.year != year:
+        return False
+    if month and entry.month != month:
+        return False
+    if week and entry.week_of_month != week:
+        return False
+    return True
+
+
+def _columns_for_header(keys):
+    header = tuple(keys)
+    found = _header_columns.get(header)
+    if found is None:
+        names = [str(k).strip().lower() for k in header]
+        exact = [k for k, name in zip(header, names) if name in DATE_COLUMNS]
+        hinted = [k for k, name in zip(header, names)
+                  if name not in DATE_COLUMNS and any(hint in name for hint in DATE_COLUMN_HINTS)]
+        dates = exact + hinted
+        months = dates + [k for k, name in zip(header, names)
+                          if k not in dates and any(hint in name for hint in MONTH_COLUMN_HINTS)]
+        found = (dates, months)
+        with _lock:
+            if len(_header_columns) >= _MAX_ENTRIES:
+                _header_columns.clear()
+            _header_columns[header] = found
+    return found
+
+
+def looks_like_date(value):
+    """True jika cell berupa date/datetime atau teks berawalan YYYY-MM-DD / DD/MM/YYYY."""
+    if isinstance(value, (date, datetime)):
+        return True
+    return isinstance(value, str) and _LOOKS_LIKE_DATE.match(value.strip()) is not None
+
+
+def date_columns(keys, sample=None):
+    """
+    Key kolom tanggal sesuai aturan modul (nama persis, lalu substring). Jika tidak ada dan sample
+    (satu baris) diberikan, kolom yang isinya mirip tanggal di baris tersebut.
+    """
+    dates = list(_columns_for_header(keys)[0])
+    if not dates and sample is not None:
+        dates = [k for k in keys if looks_like_date(sample.get(k))]
+    return dates
+
+
+def month_columns(keys):
+    """Key kolom tanggal + kolom yang namanya mengandung bulan/month, sesuai urutan prioritas."""
+    return list(_columns_for_header(keys)[1])
+
+
+def _first_date(row, keys):
+    for k in keys:
+        value = row[k]
+        if value:
+            tgl = parse_date(value)
+            if tgl is not None:
+                return tgl
+    return None
+
+
+def parse_row_date(row):
+    """row_date dihitung dari cell (dipakai saat ingest WorksheetTable dan untuk dict biasa)."""
+    dates = _columns_for_header(row.keys())[0]
+    if dates:
+        return _first_date(row, dates)
+    return _first_date(row, [k for k in row.keys() if looks_like_date(row[k])])
+
+
+def parse_row_month(row, tgl=None):
+    """row_month dihitung dari cell; tgl = hasil parse_row_date jika sudah ada."""
+    if tgl is None:
+        tgl = parse_row_date(row)
+    if tgl is not None:
+        return (tgl.year, tgl.month)
+    for k in _columns_for_header(row.keys())[1]:
+        if row[k]:
+            month = parse_month(row[k])
+            if month is not None:
+                return month
+    return None
+
+
+def _table_dates(row, mode):
+    table = getattr(row, '_table', None)
+    if table is None:
+        return None
+    return table.dates.get(mode)
+
+
+def row_date(row):
+    """Tanggal kanonik baris (lihat docstring modul), dari kolom ter-parse WorksheetTable jika ada."""
+    dates = _table_dates(row, 'day')
+    if dates is not None:
+        return dates[row._idx]
+    return parse_row_date(row)
+
+
+def row_month(row):
+    """(tahun, bulan) kanonik baris (lihat docstring modul)."""
+    months = _table_dates(row, 'month')
+    if months is not None:
+        return months[row._idx]
+    return parse_row_month(row)
+
+
+def row_calendar(row):
+    """Baris tabel kalender untuk tanggal kanonik row, atau None."""
+    return calendar_day(row_date(row))
+
+
+def get_calendar_stats():
+    with _lock:
+        stats = dict(_calendar_stats)
+        stats["memo_entries"] = len(_parsed)
+    return stats
@@ -0,0 +1,141 @@
+"""
+services/column_resolver.py
+Resolusi nama kolom metrik sekali per schema worksheet (pengganti scan col_fallback per baris).
+
+col_fallback(row, names) mencari key pertama yang cocok untuk setiap baris: untuk setiap nama kandidat
+semua key di-str().strip().lower(). Padahal semua baris satu worksheet punya header yang sama, jadi
+hasilnya cukup dihitung sekali per (schema, names):
+- resolve_column(schema, names): key fisik (atau None), urutan & normalisasi sama persis dengan col_fallback.
+- column_values(rows, names, default): nilai per baris lewat key yang sudah di-resolve; baris dengan
+  schema berbeda (urutan key berbeda) di-resolve sendiri-sendiri.
+- METRIC_COLUMNS: nama logis metrik -> daftar kandidat kolom yang dipakai aggregator.
+
+Cache dipakai bersama oleh WorksheetTable (services/worksheet_table.py) dan list of dict biasa.
+"""
+import threading
+
+# ADDITIVE: Nama logis -> kandidat kolom (urutan = prioritas fallback). Beberapa aggregator memakai
+# varian daftar sendiri (suffix _basic/_any/_region); urutannya sengaja dipertahankan apa adanya.
+METRIC_COLUMNS = {
+    'cost': ('cost', 'biaya', 'Cost', 'COST', 'Biaya'),
+    'impressions': ('impressions', 'Impressions', 'IMP', 'imp'),
+    'reach': ('reach', 'Reach'),
+    'frequency': ('frequency', 'Frequency'),
+    'clicks': ('all clicks', 'clicks all', 'All Clicks', 'Clicks all', 'clicks', 'Clicks'),
+    'link_clicks': ('link clicks', 'Link Clicks', 'link', 'Link'),
+    'whatsapp': ('whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads'),
+    'fb_leads': ('on-facebook leads', 'On-Facebook Leads', 'Facebook Leads'),
+    'lead_form': ('lead form', 'Lead Form', 'LeadForm'),
+    'fb_leads_basic': ('on-facebook leads', 'On-Facebook Leads'),
+    'fb_leads_any': ('on-facebook leads', 'On-Facebook Leads', 'facebook leads', 'Facebook Leads'),
+    'lead_form_basic': ('lead form', 'Lead Form'),
+    'msg_conv': ('messaging conversations started', 'Messaging Conversations Started'),
+    # Extended WhatsApp fallback (age/gender): Messaging Conversations, Offsite Leads, On-Facebook Leads
+    'wa_leads_any': (
+        'whatsapp', 'whatsapp leads', 'WhatsApp', 'WhatsApp Leads',
+        'messaging conversations started', 'Messaging Conversations Started',
+        'messaging conversations', 'Messaging Conversations',
+        'leads (offsite/pixels)', 'Leads (Offsite/Pixels)',
+        'offsite leads', 'Offsite Leads',
+        'on-facebook leads', 'On-Facebook Leads'
+    ),
+    'clicks_region': ('clicks all', 'all clicks', 'Clicks all', 'All Clicks', 'clicks', 'Clicks'),
+    # Outbound clicks per channel (aggregate_breakdown_enhanced)
+    'outbound_wa': ('outbound clicks - whatsapp', 'Outbound Clicks - WhatsApp', 'whatsapp clicks'),
+    'outbound_web': ('outbound clicks - website', 'Outbound Clicks - Website', 'website clicks'),
+    'outbound_msg': ('outbound clicks - messaging', 'Outbound Clicks - Messaging'),
+    # Outbound clicks per channel (aggregate_outbound_clicks), termasuk kolom worksheet age/gender & region
+    'outbound_whatsapp_any': (
+        'outbound clicks - whatsapp', 'Outbound Clicks - WhatsApp',
+        'whatsapp', 'WhatsApp', 'whatsapp leads', 'WhatsApp Leads',
+        'whatsapp clicks', 'WhatsApp Clicks'
+    ),
+    'outbound_website_any': (
+        'outbound clicks - website', 'Outbound Clicks - Website',
+        'link clicks', 'Link Clicks',
+        'website clicks', 'Website Clicks'
+    ),
+    'outbound_messaging_any': (
+        'outbound clicks - messaging', 'Outbound Clicks - Messaging',
+        'messaging conversations started', 'Messaging Conversations Started',
+        'messaging clicks', 'Messaging Clicks'
+    ),
+    'outbound_form_any': (
+        'outbound clicks - form', 'Outbound Clicks - Form',
+        'lead form (on-facebook)', 'Lead Form (On-Facebook)',
+        'form clicks', 'Form Clicks'
+    ),
+    'age': ('age', 'Age', 'AGE', 'usia', 'Usia'),
+    'gender': ('gender', 'Gender', 'GENDER', 'jenis kelamin', 'Jenis Kelamin'),
+}
+
+# Batas entry cache; schema worksheet jumlahnya kecil, batas ini hanya pengaman header liar
+_MAX_RESOLVED = 4096
+_resolved_lock = threading.Lock()
+_resolved = {}  # (schema tuple, names tuple) -> key atau None
+_resolver_stats = {"hits": 0, "misses": 0, "schemas": 0}
+_schemas = set()
+
+
+def _normalize(name):
+    # DEFENSIVE: key dari Sheets bisa int/float/date, sama dengan col_fallback
+    return str(name).strip().lower() if name is not None else ""
+
+
+def resolve_column(schema, names):
+    """Key pertama di schema yang cocok dengan names (lihat col_fallback), atau None."""
+    names = tuple(names)
+    cache_key = (schema, names)
+    found = _resolved.get(cache_key, _resolved)
+    if found is not _resolved:
+        with _resolved_lock:
+            _resolver_stats["hits"] += 1
+        return found
+    found = None
+    normalized = [_normalize(k) for k in schema]
+    for n in names:
+        n_str = _normalize(n)
+        for k, k_str in zip(schema, normalized):
+            if k_str == n_str:
+                found = k
+                break
+        if found is not None:
+            break
+    with _resolved_lock:
+        if len(_resolved) >= _MAX_RESOLVED:
+            _resolved.clear()
+            _schemas.clear()
+        _resolved[cache_key] = found
+        _schemas.add(schema)
+        _resolver_stats["misses"] += 1
+        _resolver_stats["schemas"] = len(_schemas)
+    return found
+
+
+def column_values(rows, names, default=0):
+    """[col_fallback(r, names, default) for r in rows] dengan resolve sekali per schema."""
+    names = tuple(names)
+    values = []
+    append = values.append
+    last_schema = None
+    key = None
+    for r in rows:
+        schema = tuple(r)
+        if schema != last_schema:
+            last_schema = schema
+            key = resolve_column(schema, names)
+        append(default if key is None else r[key])
+    return values
+
+
+def column_value(row, names, default=0):
+    """col_fallback untuk satu baris lewat cache resolusi."""
+    key = resolve_column(tuple(row), names)
+    return default if key is None else row[key]
+
+
+def get_resolver_stats():
+    with _resolved_lock:
+        stats = dict(_resolver_stats)
+        stats["entries"] = len(_resolved)
+    return stats
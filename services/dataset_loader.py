@@ -0,0 +1,200 @@
+"""
+services/dataset_loader.py
+Satu pintu untuk memuat dataset worksheet yang dipakai route chat, sheet dan chart.
+
+DatasetLoader.load() memuat semua worksheet yang lolos WORKSHEET_WHITELIST dari beberapa
+spreadsheet (cache L1/L2/snapshot, paralel, single-flight lewat services/sheet_loader.py),
+mengulang sumber yang gagal (GSHEET_DATASET_RETRIES, backoff eksponensial), lalu mengembalikan
+DatasetSnapshot yang immutable dan ber-versi:
+- rows: view read-only semua baris (urutan spreadsheet lalu urutan tab, sama dengan loop lama),
+  dibangun dari partitions saat diakses (= selection()), tanpa tuple salinan per versi,
+- partitions: {(sheet_id, worksheet): data worksheet (WorksheetTable/list, read-only)},
+- row_meta: worksheet_row_meta per worksheet (sheet_id, worksheet, row_count),
+- schema: {(sheet_id, worksheet): tuple header}.
+selection() memberi view RowSelection atas partitions (tanpa salinan list baris) untuk filter per request.
+
+Selama objek data setiap worksheet di cache tidak berganti, load() mengembalikan snapshot yang
+SAMA (versi sama, tanpa membangun ulang metadata); versi naik setiap kali ada worksheet yang
+di-reload. Versi bisa dipakai sebagai key cache turunan (agregat, cube, index).
+"""
+import itertools
+import os
+import threading
+import time
+from types import MappingProxyType
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+_DATASET_RETRIES = int(os.environ.get('GSHEET_DATASET_RETRIES', 1))
+_DATASET_RETRY_BACKOFF = float(os.environ.get('GSHEET_DATASET_RETRY_BACKOFF', 0.5))
+
+_versions = itertools.count(1)
+
+
+def _schema_of(data):
+    header = getattr(data, 'header', None)
+    if header is not None:
+        return tuple(header)
+    return tuple(data[0].keys()) if data else ()
+
+
+class DatasetSnapshot:
+    """Hasil DatasetLoader yang immutable (lihat docstring modul)."""
+    __slots__ = ('version', 'key', 'row_count', 'partitions', 'row_meta', 'schema', 'errors', 'created_at')
+
+    def __init__(self, key, partitions, errors=None):
+        values = {
+            'version': next(_versions),
+            'key': key,
+            'row_count': sum(len(data) for sheet_id, loaded_name, data in partitions),
+            'partitions': MappingProxyType({(sheet_id, loaded_name): data for sheet_id, loaded_name, data in partitions}),
+            'row_meta': tuple(MappingProxyType({'sheet_id': sheet_id, 'worksheet': loaded_name, 'row_count': len(data)})
+                              for sheet_id, loaded_name, data in partitions),
+            'schema': MappingProxyType({(sheet_id, loaded_name): _schema_of(data) for sheet_id, loaded_name, data in partitions}),
+            'errors': MappingProxyType(dict(errors or {})),
+            'created_at': time.time()
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DatasetSnapshot immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("DatasetSnapshot immutable")
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def rows(self):
+        """Semua baris sebagai Sequence read-only (view atas partitions, tidak menyalin baris)."""
+        return self.selection()
+
+    def same_sources(self, partitions):
+        """True jika partitions (hasil loader) menunjuk objek data yang sama dengan snapshot ini."""
+        if len(partitions) != len(self.partitions):
+            return False
+        for (sheet_id, loaded_name, data), key in zip(partitions, self.partitions):
+            if key != (sheet_id, loaded_name) or self.partitions[key] is not data:
+                return False
+        return True
+
+    def worksheet_row_meta(self):
+        """worksheet_row_meta dalam bentuk list of dict baru (boleh dimodifikasi/di-jsonify caller)."""
+        return [dict(meta) for meta in self.row_meta]
+
+    def partition(self, sheet_id, worksheet_name):
+        return self.partitions.get((sheet_id, worksheet_name))
+
+    def selection(self):
+        """Semua baris sebagai RowSelection (view per partisi, services/row_selection.py) untuk difilter per request."""
+        from services.row_selection import RowSelection
+        return RowSelection.from_partitions(self.partitions)
+
+    def records(self):
+        """Baris sebagai list of dict biasa tanpa kolom 'worksheet' yang ditambahkan loader (respons JSON, DataFrame)."""
+        return [{k: v for k, v in row.items() if k != 'worksheet'} for data in self.partitions.values() for row in data]
+
+
+class DatasetLoader:
+    """Memuat DatasetSnapshot; snapshot terakhir per key disimpan untuk dipakai ulang (lihat docstring modul)."""
+
+    def __init__(self, retries=_DATASET_RETRIES, backoff=_DATASET_RETRY_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._stats = {"loads": 0, "reused": 0, "built": 0, "retries": 0, "failed_sources": 0}
+
+    def _load_with_retry(self, load):
+        partitions, errors = load()
+        attempt = 0
+        while errors and attempt < self.retries:
+            with self._lock:
+                self._stats["retries"] += 1
+            delay = self.backoff * (2 ** attempt)
+            print(f"[DATASET] {len(errors)} sumber gagal ({list(errors)}), retry ke-{attempt + 1} dalam {delay:.1f}s")
+            time.sleep(delay)
+            partitions, errors = load()
+            attempt += 1
+        return partitions, errors
+
+    def _snapshot(self, key, partitions, errors):
+        with self._lock:
+            self._stats["loads"] += 1
+            self._stats["failed_sources"] += len(errors)
+            previous = self._snapshots.get(key)
+            if previous is not None and not errors and not previous.errors and previous.same_sources(partitions):
+                self._stats["reused"] += 1
+                return previous
+        snapshot = DatasetSnapshot(key, partitions, errors)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._stats["built"] += 1
+        if VERBOSE_LOG:
+            print(f"[DATASET] Snapshot v{snapshot.version} untuk {key}: {len(snapshot.partitions)} worksheet, {len(snapshot)} rows")
+        return snapshot
+
+    def load(self, sheet_ids, whitelist=None):
+        """Semua worksheet lolos whitelist dari sheet_ids. Returns: DatasetSnapshot."""
+        from services.sheet_loader import load_sheet_partitions
+        sheet_ids = [sheet_id for sheet_id in sheet_ids if sheet_id]
+        key = ('sources', tuple(sheet_ids), tuple(whitelist) if whitelist is not None else None)
+        partitions, errors = self._load_with_retry(lambda: load_sheet_partitions(sheet_ids, whitelist))
+        return self._snapshot(key, partitions, errors)
+
+    def load_worksheet(self, sheet_id, worksheet_name=None):
+        """
+        Satu worksheet tanpa filter whitelist (route sheet/chart). worksheet_name None = worksheet
+        pertama. Returns: DatasetSnapshot dengan satu partition (worksheet hasil fallback jika
+        nama tidak ditemukan).
+        """
+        from services.sheet_loader import load_worksheet
+        from services.sheet_metadata import get_worksheet_titles
+
+        def load():
+            name = worksheet_name
+            try:
+                if not name:
+                    titles = get_worksheet_titles(sheet_id)
+                    if not titles:
+                        return [], {sheet_id: "Spreadsheet tidak punya worksheet"}
+                    name = titles[0]
+                loaded_name, data = load_worksheet(sheet_id, name)
+            except Exception as e:
+                return [], {f"{sheet_id}:{name}" if name else sheet_id: str(e)}
+            return [(sheet_id, loaded_name, data)], {}
+
+        key = ('worksheet', sheet_id, worksheet_name)
+        partitions, errors = self._load_with_retry(load)
+        return self._snapshot(key, partitions, errors)
+
+    def invalidate_worksheet(self, sheet_id, worksheet_name):
+        """Paksa reload worksheet berikutnya (setelah aplikasi menulis ke worksheet tersebut)."""
+        from services.sheet_cache import invalidate_cached_sheet_data
+        invalidate_cached_sheet_data(sheet_id, worksheet_name)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["snapshots"] = [{
+                "key": list(key),
+                "version": snapshot.version,
+                "worksheets": len(snapshot.partitions),
+                "rows": len(snapshot),
+                "errors": dict(snapshot.errors),
+                "age_seconds": time.time() - snapshot.created_at
+            } for key, snapshot in self._snapshots.items()]
+        stats["retries_configured"] = self.retries
+        return stats
+
+
+_default_loader = DatasetLoader()
+
+
+def get_dataset_loader():
+    return _default_loader
+
+
+def get_dataset_loader_stats():
+    return _default_loader.get_stats()
@@ -0,0 +1,195 @@
+"""
+services/dimension_index.py
+Inverted index (bitmap baris) per nilai dimensi untuk filter adset/ad/age/gender/region.
+
+aggregate_age_gender_enhanced(adset_name=...) dan aggregate_adset_by_age_gender(age_range, gender)
+dulu men-scan semua baris: lookup r.get('Ad set', r.get('Ad Set', ...)), normalisasi gender dan
+perbandingan string per baris per pertanyaan. Untuk WorksheetTable (read-only, satu per partisi
+snapshot) indeks dibangun sekali per dimensi saat filter pertama:
+- nilai cell dinormalisasi sekali per nilai unik dictionary kolom (gender -> male/female, age di-strip,
+  adset/ad/region lowercase), lalu
+- setiap nilai ter-normalisasi -> bitmap baris (int Python, bit i = baris i).
+Filter gabungan ("female 45-54 di adset X bulan September") = AND bitmap per dimensi, ditambah
+bitmap seleksi indeks temporal (services/temporal_index.py) untuk tahun/bulan/minggu.
+
+select_rows(sheet_data, year, month, week, **dims) menerima RowSelection / WorksheetTable / list TableRow /
+list of dict biasa (dict dicek per baris dengan normalisasi yang sama) dan mengembalikan RowSelection;
+filter berantai hanya mempersempit posisi, urutan baris tetap.
+DIMENSION_INDEX=0 mematikan indeks (cek per baris).
+"""
+import os
+import threading
+
+from services.calendar_table import matches, row_calendar
+from services.column_resolver import METRIC_COLUMNS, column_value, resolve_column
+from services.row_selection import RowSelection
+from services.temporal_index import INDEX_ENABLED as TEMPORAL_INDEX_ENABLED, temporal_index
+from services.worksheet_table import WorksheetTable
+
+INDEX_ENABLED = os.environ.get('DIMENSION_INDEX', '1') in ['1', 'true', 'True']
+
+# Posisi bit yang menyala untuk setiap nilai byte (ekstraksi posisi dari bitmap)
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+_index_lock = threading.Lock()
+_index_stats = {"built": 0, "bitmaps": 0, "selections": 0, "rows_selected": 0, "row_checks": 0}
+
+
+def _lower(value):
+    return str(value).lower()
+
+
+def _strip_lower(value):
+    return str(value).strip().lower()
+
+
+def _age(value):
+    return str(value).strip()
+
+
+def _gender(value):
+    from services.aggregation import _normalize_gender
+    gender = str(value).strip().lower()
+    return _normalize_gender(gender) if gender else None
+
+
+def _gender_query(gender):
+    from services.aggregation import _normalize_gender
+    return _normalize_gender(gender.lower())
+
+
+# Nama dimensi -> (kolom, resolve case-insensitive?, normalisasi nilai cell, normalisasi nilai filter).
+# Kolom exact = semantik r.get(a, r.get(b, '')), resolve = column_value(row, names, '') (services/column_resolver.py)
+DIMENSIONS = {
+    'adset': (('Ad set', 'Ad Set', 'Adset'), False, _lower, _lower),
+    'ad': (('Ad', 'ad', 'AD'), False, _lower, _lower),
+    'age': (METRIC_COLUMNS['age'], True, _age, lambda age: age),
+    'gender': (METRIC_COLUMNS['gender'], True, _gender, _gender_query),
+    'region': (('Region', 'region'), False, _strip_lower, _strip_lower),
+}
+
+
+def _cell(row, name):
+    """Nilai cell dimensi name untuk satu baris (dict / TableRow), semantik sama dengan filter lama."""
+    columns, resolve, _, _ = DIMENSIONS[name]
+    if resolve:
+        return column_value(row, columns, '')
+    for key in columns:
+        if key in row:
+            return row[key]
+    return ''
+
+
+def bitmap_from_positions(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for i in positions:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def positions_from_bitmap(bitmap):
+    """Posisi bit yang menyala, urut naik."""
+    positions = []
+    extend = positions.extend
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, value in enumerate(data):
+        if value:
+            base = byte_index << 3
+            extend([base + bit for bit in _BYTE_BITS[value]])
+    return positions
+
+
+def _build_dimension(table, name):
+    """{nilai ter-normalisasi: bitmap baris} untuk satu dimensi WorksheetTable."""
+    columns, resolve, normalize, _ = DIMENSIONS[name]
+    if resolve:
+        key = resolve_column(table.header, columns)
+    else:
+        key = next((k for k in columns if k in table.header_set), None)
+    if key is None:
+        return {normalize(''): (1 << len(table)) - 1} if len(table) else {}
+    codes, dictionary = table.dimension(key)
+    # Normalisasi sekali per nilai unik, lalu kode -> posisi baris per nilai ter-normalisasi
+    normalized = [normalize(value) for value in dictionary]
+    buckets = {}
+    for i, code in enumerate(codes):
+        value = normalized[code]
+        bucket = buckets.get(value)
+        if bucket is None:
+            bucket = buckets[value] = []
+        bucket.append(i)
+    return {value: bitmap_from_positions(positions, len(table)) for value, positions in buckets.items()}
+
+
+def dimension_bitmaps(table, name):
+    """Bitmap per nilai dimensi name untuk WorksheetTable (dibangun sekali per tabel & dimensi)."""
+    bitmaps = table.bitmaps.get(name)
+    if bitmaps is not None:
+        return bitmaps
+    with _index_lock:
+        bitmaps = table.bitmaps.get(name)
+        if bitmaps is None:
+            bitmaps = table.bitmaps[name] = _build_dimension(table, name)
+            _index_stats["built"] += 1
+            _index_stats["bitmaps"] += len(bitmaps)
+    return bitmaps
+
+
+def _row_matches(row, wanted, temporal):
+    for name, value in wanted:
+        if DIMENSIONS[name][2](_cell(row, name)) != value:
+            return False
+    return not temporal or matches(row_calendar(row), *temporal)
+
+
+def select_rows(sheet_data, year=None, month=None, week=None, **dims):
+    """
+    Baris sheet_data yang lolos semua filter (urutan tetap) sebagai RowSelection (services/row_selection.py).
+    dims: adset, ad, age, gender, region (nilai None/kosong = tanpa filter); year/month/week = filter
+    temporal tanggal kanonik.
+    """
+    unknown = set(dims) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Dimensi tidak dikenal: {sorted(unknown)}")
+    wanted = [(name, DIMENSIONS[name][3](value)) for name, value in dims.items() if value]
+    temporal = (year, month, week) if any([year, month, week]) else None
+    if not wanted and not temporal:
+        return sheet_data
+    source = RowSelection.of(sheet_data)
+    selections = []
+    row_checks = 0
+    for part in source.parts:
+        table = part.data if isinstance(part.data, WorksheetTable) else None
+        if not INDEX_ENABLED or table is None or (temporal and (not TEMPORAL_INDEX_ENABLED or temporal_index(table) is None)):
+            data = part.data
+            indices = range(len(data)) if part.positions is None else part.positions
+            row_checks += len(indices)
+            selections.append([i for i in indices if _row_matches(data[i], wanted, temporal)])
+            continue
+        size = len(table)
+        bitmap = (1 << size) - 1
+        for name, value in wanted:
+            bitmap &= dimension_bitmaps(table, name).get(value, 0)
+            if not bitmap:
+                break
+        if bitmap and temporal:
+            bitmap &= bitmap_from_positions(temporal_index(table).select(*temporal), size)
+        if bitmap and part.positions is not None:
+            # Sebagian tabel (mis. hasil filter lain): irisan dengan posisi part, urutan part tetap
+            wanted_rows = set(positions_from_bitmap(bitmap))
+            selections.append([i for i in part.positions if i in wanted_rows])
+            continue
+        selections.append(positions_from_bitmap(bitmap))
+    selected = source.narrow(selections)
+    with _index_lock:
+        _index_stats["selections"] += 1
+        _index_stats["rows_selected"] += len(selected)
+        _index_stats["row_checks"] += row_checks
+    return selected
+
+
+def get_dimension_index_stats():
+    with _index_lock:
+        stats = dict(_index_stats)
+    stats["enabled"] = INDEX_ENABLED
+    return stats
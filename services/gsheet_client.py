@@ -0,0 +1,206 @@
+"""
+services/gsheet_client.py
+Manager client Google Sheets yang hidup selama proses berjalan.
+
+Satu sesi gspread terotorisasi disimpan per kredensial (service account), koneksi HTTP
+di-pool agar keep-alive, token OAuth di-refresh di background sebelum expired, dan handle
+Spreadsheet hasil open_by_key di-cache per sheet_id. Request yang cache-hit tidak perlu
+lagi membayar token exchange maupun TLS handshake.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import gspread
+import requests
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+GSHEET_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+# ADDITIVE: Drive metadata (read-only) untuk cek modifiedTime spreadsheet sebelum download ulang
+if os.environ.get('GSHEET_REVISION_DRIVE', '1') in ['1', 'true', 'True']:
+    GSHEET_SCOPES.append("https://www.googleapis.com/auth/drive.metadata.readonly")
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+# Refresh token jika sisa umur token kurang dari margin ini (detik)
+_TOKEN_REFRESH_MARGIN = int(os.environ.get('GSHEET_TOKEN_REFRESH_MARGIN', 5 * 60))
+# Interval pengecekan token oleh background thread (detik)
+_TOKEN_CHECK_INTERVAL = int(os.environ.get('GSHEET_TOKEN_CHECK_INTERVAL', 60))
+# Ukuran pool koneksi HTTP per sesi (gunicorn --threads 4 + loader paralel)
+_HTTP_POOL_SIZE = int(os.environ.get('GSHEET_HTTP_POOL_SIZE', 16))
+# Umur maksimum handle Spreadsheet sebelum dibuka ulang (detik)
+_HANDLE_TTL = int(os.environ.get('GSHEET_HANDLE_TTL', 6 * 60 * 60))
+
+_clients = {}          # credential_key -> {"client", "creds", "lock", "created_at"}
+_handles = {}          # (credential_key, sheet_id) -> (Spreadsheet, opened_at)
+_manager_lock = threading.Lock()
+_refresher_thread = None
+_stats = {"authorize": 0, "token_refresh": 0, "open_by_key": 0, "handle_hits": 0}
+# ADDITIVE: Session HTTP biasa (bukan AuthorizedSession client) untuk token exchange, di-pool agar keep-alive
+_token_session = requests.Session()
+_token_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=_HTTP_POOL_SIZE))
+
+
+def get_gsheet_creds():
+    """Bangun Credentials service account dari environment variables."""
+    try:
+        required_fields = ["GOOGLE_PROJECT_ID", "GOOGLE_PRIVATE_KEY", "GOOGLE_CLIENT_EMAIL"]
+        missing_fields = [field for field in required_fields if not os.getenv(field)]
+        if missing_fields:
+            raise Exception(f"Missing required Google credentials: {', '.join(missing_fields)}")
+        private_key = os.getenv("GOOGLE_PRIVATE_KEY")
+        if private_key:
+            private_key = private_key.replace('\\n', '\n')
+            if not private_key.startswith('-----BEGIN'):
+                raise Exception("Invalid private key format")
+        info = {
+            "type": os.getenv("GOOGLE_TYPE", "service_account"),
+            "project_id": os.getenv("GOOGLE_PROJECT_ID"),
+            "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
+            "private_key": private_key,
+            "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
+            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+            "auth_uri": os.getenv("GOOGLE_AUTH_URI", "https://accounts.google.com/o/oauth2/auth"),
+            "token_uri": os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token"),
+            "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL", "https://www.googleapis.com/oauth2/v1/certs"),
+            "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
+        }
+        info = {k: v for k, v in info.items() if v is not None}
+        return Credentials.from_service_account_info(info, scopes=GSHEET_SCOPES)
+    except Exception as e:
+        print(f"Error creating Google credentials: {e}")
+        raise Exception(f"Gagal membuat kredensial Google: {e}")
+
+
+def _credential_key():
+    # Identitas kredensial cukup dari env (tanpa membangun ulang Credentials tiap request)
+    return (os.getenv("GOOGLE_CLIENT_EMAIL") or "", os.getenv("GOOGLE_PRIVATE_KEY_ID") or "")
+
+
+def _token_needs_refresh(creds):
+    if not creds.token or creds.expiry is None:
+        return True
+    # google-auth menyimpan expiry sebagai naive UTC datetime
+    remaining = (creds.expiry - datetime.utcnow()).total_seconds()
+    return remaining < _TOKEN_REFRESH_MARGIN
+
+
+def _refresh_entry(entry):
+    """Refresh token satu sesi (dipakai saat authorize dan oleh background thread)."""
+    with entry["lock"]:
+        creds = entry["creds"]
+        if not _token_needs_refresh(creds):
+            return False
+        # Token endpoint lewat session tanpa auth: AuthorizedSession client akan menempelkan token lama
+        creds.refresh(Request(_token_session))
+        with _manager_lock:
+            _stats["token_refresh"] += 1
+        if VERBOSE_LOG:
+            print(f"[GSHEET] Token refreshed, expiry={creds.expiry}")
+        return True
+
+
+def _token_refresher_loop():
+    while True:
+        time.sleep(_TOKEN_CHECK_INTERVAL)
+        with _manager_lock:
+            entries = list(_clients.values())
+        for entry in entries:
+            try:
+                _refresh_entry(entry)
+            except Exception as e:
+                # Jangan matikan thread; request berikutnya tetap bisa refresh on-demand
+                print(f"[GSHEET] Background token refresh gagal: {e}")
+
+
+def _ensure_refresher_started():
+    global _refresher_thread
+    if _refresher_thread is None or not _refresher_thread.is_alive():
+        _refresher_thread = threading.Thread(target=_token_refresher_loop, name="gsheet-token-refresher", daemon=True)
+        _refresher_thread.start()
+
+
+def get_gsheet_client():
+    """Ambil client gspread yang sudah terotorisasi untuk kredensial aktif (dibuat sekali per proses)."""
+    key = _credential_key()
+    with _manager_lock:
+        entry = _clients.get(key)
+    if entry is not None:
+        return entry["client"]
+
+    creds = get_gsheet_creds()
+    client = gspread.authorize(creds)
+    # Pool koneksi lebih besar agar thread paralel tidak saling menunggu socket
+    adapter = HTTPAdapter(pool_connections=_HTTP_POOL_SIZE, pool_maxsize=_HTTP_POOL_SIZE)
+    client.http_client.session.mount("https://", adapter)
+    entry = {"client": client, "creds": creds, "lock": threading.Lock(), "created_at": time.time()}
+    _refresh_entry(entry)
+
+    with _manager_lock:
+        # Thread lain mungkin sudah lebih dulu membuat client untuk kredensial yang sama
+        existing = _clients.get(key)
+        if existing is not None:
+            return existing["client"]
+        _clients[key] = entry
+        _stats["authorize"] += 1
+        _ensure_refresher_started()
+    print(f"[GSHEET] Authorized new Google Sheets session for {key[0] or 'unknown'}")
+    return client
+
+
+def get_spreadsheet(sheet_id):
+    """Ambil handle Spreadsheet dari cache, atau open_by_key sekali lalu simpan."""
+    if not sheet_id:
+        raise Exception("sheet_id tidak diberikan")
+    handle_key = (_credential_key(), sheet_id)
+    now = time.time()
+    with _manager_lock:
+        cached = _handles.get(handle_key)
+        if cached is not None and now - cached[1] < _HANDLE_TTL:
+            _stats["handle_hits"] += 1
+            return cached[0]
+
+    client = get_gsheet_client()
+    sh = client.open_by_key(sheet_id)
+    with _manager_lock:
+        _handles[handle_key] = (sh, time.time())
+        _stats["open_by_key"] += 1
+    return sh
+
+
+def invalidate_spreadsheet(sheet_id=None):
+    """Buang handle Spreadsheet (semua jika sheet_id None), misal setelah error akses."""
+    with _manager_lock:
+        if sheet_id is None:
+            _handles.clear()
+        else:
+            for handle_key in [k for k in _handles if k[1] == sheet_id]:
+                del _handles[handle_key]
+
+
+def reset_gsheet_clients():
+    """Buang semua sesi & handle (misal setelah rotasi kredensial)."""
+    with _manager_lock:
+        _clients.clear()
+        _handles.clear()
+
+
+def get_gsheet_client_status():
+    """Ringkasan state manager untuk endpoint monitoring."""
+    with _manager_lock:
+        sessions = []
+        for (email, key_id), entry in _clients.items():
+            creds = entry["creds"]
+            sessions.append({
+                "client_email": email,
+                "private_key_id": key_id[:8] if key_id else None,
+                "token_expiry": creds.expiry.isoformat() if creds.expiry else None,
+                "age_seconds": time.time() - entry["created_at"]
+            })
+        return {
+            "sessions": sessions,
+            "spreadsheet_handles": [k[1] for k in _handles],
+            "stats": dict(_stats)
+        }
@@ -2,9 +2,11 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import re
-from datetime import datetime
 from collections import defaultdict
 
+from services.calendar_table import date_columns
+from services.temporal_index import select_temporal
+
 # Inisialisasi LLM Google Gemini (atau ganti dengan model lain jika perlu)
 # Pastikan environment variable GOOGLE_API_KEY sudah di-set
 llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.2)
@@ -99,90 +101,19 @@ def filter_sheet_data_by_temporal(sheet_data: list, temporal_filter: dict) -> li
         print("[DEBUG] No temporal filter detected, returning all data")
         return sheet_data
     
-    filtered_data = []
     total_rows = len(sheet_data)
     
-    # ENHANCED: First pass to detect date column name
-    date_column_name = None
-    if sheet_data and len(sheet_data) > 0:
-        for key in sheet_data[0].keys():
-            key_lower = str(key).lower().strip()
-            # More flexible matching for date columns
-            if any(date_word in key_lower for date_word in ['date', 'tanggal', 'tgl', 'day', 'dt']):
-                date_column_name = key
-                print(f"[DEBUG] Detected date column: '{date_column_name}'")
-                break
-    
-    if not date_column_name:
+    # ADDITIVE: Kolom & format tanggal kanonik (services/calendar_table.py), sama dengan aggregator;
+    # tanggal baris WorksheetTable sudah di-parse saat ingest
+    date_keys = date_columns(sheet_data[0].keys(), sheet_data[0]) if sheet_data else []
+    if not date_keys:
         print(f"[WARN] No date column found in sheet_data. Available columns: {list(sheet_data[0].keys()) if sheet_data else 'none'}")
         return sheet_data  # Return all data if no date column found
+    print(f"[DEBUG] Detected date column(s): {date_keys}")
     
-    parse_failed_count = 0
-    
-    for row in sheet_data:
-        date_val = row.get(date_column_name)
-        
-        if not date_val:
-            continue
-        
-        # Parse tanggal
-        try:
-            date_str = str(date_val).strip()
-            parsed_date = None
-            
-            # Format YYYY-MM-DD
-            if re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-                parsed_date = datetime.strptime(date_str, '%Y-%m-%d')
-            # Format DD/MM/YYYY
-            elif re.match(r'^\d{2}/\d{2}/\d{4}$', date_str):
-                parsed_date = datetime.strptime(date_str, '%d/%m/%Y')
-            # Format MM/DD/YYYY (US format)
-            elif re.match(r'^\d{2}/\d{2}/\d{4}$', date_str):
-                try:
-                    parsed_date = datetime.strptime(date_str, '%m/%d/%Y')
-                except:
-                    pass
-            # Format YYYY/MM/DD
-            elif re.match(r'^\d{4}/\d{2}/\d{2}$', date_str):
-                parsed_date = datetime.strptime(date_str, '%Y/%m/%d')
-            # Format DD-MM-YYYY
-            elif re.match(r'^\d{2}-\d{2}-\d{4}$', date_str):
-                parsed_date = datetime.strptime(date_str, '%d-%m-%Y')
-            
-            if not parsed_date:
-                parse_failed_count += 1
-                if parse_failed_count <= 3:  # Only log first 3 failures
-                    print(f"[DEBUG] Unable to parse date format: '{date_str}'")
-                continue
-            
-            # Apply filters
-            match = True
-            
-            if year and parsed_date.year != year:
-                match = False
-            
-            if month_num and parsed_date.month != month_num:
-                match = False
-            
-            if week_num:
-                # FIXED: Calculate week-of-month (1-5), not ISO week
-                # Week 1 = day 1-7, Week 2 = day 8-14, Week 3 = day 15-21, etc.
-                week_of_month = ((parsed_date.day - 1) // 7) + 1
-                if week_of_month != week_num:
-                    match = False
-                    print(f"[DEBUG] Week filter mismatch: date {parsed_date.date()} is week-{week_of_month} of month, need week-{week_num}")
-            
-            if match:
-                filtered_data.append(row)
-        
-        except Exception as e:
-            parse_failed_count += 1
-            if parse_failed_count <= 3:  # Only log first 3 failures
-                print(f"[DEBUG] Failed to parse date: {date_val}, error: {e}")
-            continue
-    
-    if parse_failed_count > 3:
-        print(f"[DEBUG] Total {parse_failed_count} rows failed date parsing (only first 3 logged)")
+    # ADDITIVE: Range baris dari indeks temporal per WorksheetTable (services/temporal_index.py),
+    # tanpa scan/parse per baris dan tanpa log per baris yang tidak cocok
+    filtered_data = select_temporal(sheet_data, year=year, month=month_num, week=week_num)
     
     print(f"[DEBUG] Temporal filter result: {len(filtered_data)}/{total_rows} rows match (week={week_num}, month={month_num}, year={year})")
     return filtered_data
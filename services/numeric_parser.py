@@ -0,0 +1,219 @@
+"""
+services/numeric_parser.py
+Parser angka untuk cell Google Sheets (pengganti regex safe_float per cell).
+
+- parse_number(val): hasil sama persis dengan safe_float lama (services/aggregation.py), tapi string
+  yang sama di-parse sekali (memo LRU) dan int langsung dikonversi tanpa regex.
+- sniff_column(values): profil format satu kolom, dihitung sekali: locale ('id' = 1.234,56,
+  'us' = 1,234.56, 'plain', 'ambiguous', 'mixed'), prefix mata uang (Rp, IDR, $, ...) dan jumlah
+  cell kosong/gagal di-parse.
+- parse_column(values): seluruh kolom sekaligus; setiap nilai unik di-parse sekali. Cell gagal
+  (tidak ada angka / format rusak) menjadi 0.0 seperti safe_float dan dihitung di statistik.
+
+Cell ambigu ("1,234" atau "1.500") tetap dibaca dengan aturan safe_float (koma = ribuan, titik =
+ribuan) supaya angka laporan tidak berubah. GSHEET_NUMERIC_LOCALE=auto memakai locale hasil sniff
+kolom untuk cell ambigu tersebut (mis. "1,500" di kolom berformat Indonesia -> 1.5).
+"""
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+NUMERIC_LOCALE_MODE = os.environ.get('GSHEET_NUMERIC_LOCALE', 'compat').strip().lower()
+if NUMERIC_LOCALE_MODE not in ('compat', 'auto'):
+    print(f"[NUMERIC] GSHEET_NUMERIC_LOCALE '{NUMERIC_LOCALE_MODE}' tidak dikenal, pakai 'compat'")
+    NUMERIC_LOCALE_MODE = 'compat'
+
+_NUMBER_RE = re.compile(r"[-+]?\d[\d.,]*")
+_MEMO_SIZE = 65536
+
+_stats_lock = threading.Lock()
+_numeric_stats = {"columns": 0, "cells": 0, "distinct": 0, "empty": 0, "failed": 0, "locales": {}}
+
+
+def _token_kind(num):
+    """
+    Jenis token angka menurut aturan safe_float: 'id' (koma desimal / titik ribuan), 'us' (titik desimal /
+    koma ribuan), 'plain' (tanpa separator), atau ambigu: 'comma3' ("1,234") dan 'dot3' ("1.500").
+    """
+    has_comma = ',' in num
+    has_dot = '.' in num
+    if has_comma and has_dot:
+        return 'id' if num.rfind(',') > num.rfind('.') else 'us'
+    if has_comma:
+        if num.count(',') > 1:
+            return 'us'
+        return 'comma3' if len(num.split(',')[-1]) == 3 else 'id'
+    if has_dot:
+        parts = num.split('.')
+        if all(len(p) == 3 for p in parts[1:]) and len(parts[0]) <= 3:
+            return 'dot3' if len(parts) == 2 else 'id'
+        return 'us'
+    return 'plain'
+
+
+def _token_value(num, kind, locale=None):
+    # safe_float: koma tunggal 3 digit = ribuan (cara baca US), titik tunggal 3 digit = ribuan (cara baca ID)
+    if kind == 'comma3':
+        kind = 'id' if locale == 'id' else 'us'
+    elif kind == 'dot3':
+        kind = 'us' if locale == 'us' else 'id'
+    if kind == 'id':
+        num = num.replace('.', '').replace(',', '.')
+    else:
+        num = num.replace(',', '')
+    try:
+        return float(num)
+    except ValueError:
+        # Format rusak, mis. "1.2.3"
+        return None
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _scan_text(s):
+    """(token, kind, prefix) untuk string cell, atau None jika tidak ada angka."""
+    m = _NUMBER_RE.search(s)
+    if not m:
+        return None
+    num = m.group(0)
+    return num, _token_kind(num), s[:m.start()].strip()
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _parse_text(s, locale=None):
+    """Nilai float cell string, atau None jika gagal (safe_float -> 0.0)."""
+    scanned = _scan_text(s)
+    if scanned is None:
+        return None
+    num, kind, _ = scanned
+    return _token_value(num, kind, locale)
+
+
+def parse_number(val):
+    """Sama dengan safe_float(val): float hasil parse, 0.0 jika gagal."""
+    if val.__class__ is int:
+        try:
+            return float(val)
+        except OverflowError:
+            pass
+    try:
+        value = _parse_text(str(val))
+    except Exception:
+        return 0.0
+    return 0.0 if value is None else value
+
+
+def _parse_value(val, locale=None):
+    try:
+        return _parse_text(str(val), locale)
+    except Exception:
+        return None
+
+
+def _is_empty(val):
+    return val is None or (val.__class__ is str and not val.strip())
+
+
+def sniff_column(values):
+    """Profil format kolom dari nilai-nilainya (lihat docstring modul)."""
+    kinds = Counter()
+    prefixes = Counter()
+    empty = 0
+    failed = 0
+    for val in values:
+        if _is_empty(val):
+            empty += 1
+            continue
+        if val.__class__ is int:
+            kinds['plain'] += 1
+            continue
+        try:
+            scanned = _scan_text(str(val))
+        except Exception:
+            scanned = None
+        if scanned is None:
+            failed += 1
+            continue
+        num, kind, prefix = scanned
+        kinds[kind] += 1
+        if prefix:
+            prefixes[prefix] += 1
+    has_id = kinds['id'] > 0
+    has_us = kinds['us'] > 0
+    if has_id and has_us:
+        locale = 'mixed'
+    elif has_id:
+        locale = 'id'
+    elif has_us:
+        locale = 'us'
+    elif kinds['comma3'] or kinds['dot3']:
+        locale = 'ambiguous'
+    else:
+        locale = 'plain'
+    return {
+        "locale": locale,
+        "prefix": prefixes.most_common(1)[0][0] if prefixes else None,
+        "kinds": dict(kinds),
+        "empty": empty,
+        "unparsed": failed
+    }
+
+
+def parse_column(values, profile=None, mode=None, counts=None):
+    """
+    [parse_number(v) for v in values] dengan parse sekali per nilai unik.
+    mode None = GSHEET_NUMERIC_LOCALE; 'auto' memakai locale profile (sniff_column) untuk cell ambigu.
+    counts: jumlah cell per nilai jika values adalah dictionary kolom (WorksheetTable), untuk statistik.
+    Returns: (list float, info {"cells", "distinct", "empty", "failed", "locale"}).
+    """
+    mode = mode or NUMERIC_LOCALE_MODE
+    if mode == 'auto' and profile is None:
+        profile = sniff_column(values)
+    locale = profile["locale"] if mode == 'auto' and profile else None
+    memo = {}
+    parsed = []
+    append = parsed.append
+    empty = 0
+    failed = 0
+    for i, val in enumerate(values):
+        if val.__class__ is str:
+            # Memo hanya untuk str: 1 == 1.0 == True sebagai key dict, padahal safe_float(True) = 0.0
+            value = memo.get(val, memo)
+            if value is memo:
+                value = _parse_text(val, locale)
+                memo[val] = value
+        elif val is None:
+            value = None
+        else:
+            value = parse_number(val) if val.__class__ is int else _parse_value(val, locale)
+        if value is None:
+            weight = 1 if counts is None else counts[i]
+            if _is_empty(val):
+                empty += weight
+            else:
+                failed += weight
+            value = 0.0
+        append(value)
+    cells = len(parsed) if counts is None else sum(counts)
+    info = {"cells": cells, "distinct": len(memo), "empty": empty, "failed": failed,
+            "locale": profile["locale"] if profile else None}
+    with _stats_lock:
+        _numeric_stats["columns"] += 1
+        _numeric_stats["cells"] += cells
+        _numeric_stats["distinct"] += len(memo)
+        _numeric_stats["empty"] += empty
+        _numeric_stats["failed"] += failed
+        if info["locale"]:
+            _numeric_stats["locales"][info["locale"]] = _numeric_stats["locales"].get(info["locale"], 0) + 1
+    return parsed, info
+
+
+def get_numeric_stats():
+    with _stats_lock:
+        stats = dict(_numeric_stats)
+        stats["locales"] = dict(_numeric_stats["locales"])
+    memo = _parse_text.cache_info()
+    stats.update({"mode": NUMERIC_LOCALE_MODE, "memo_hits": memo.hits, "memo_misses": memo.misses,
+                  "memo_size": memo.currsize})
+    return stats
@@ -0,0 +1,629 @@
+"""
+services/olap_cube.py
+OLAP cube (materialized) untuk DatasetSnapshot: agregat siap pakai tanpa scan baris per pertanyaan.
+
+- Grain terkecil: (date, worksheet, adset, ad, age, gender, region, adset_breakdown, ad_breakdown, age_filter,
+  gender_filter). Setiap sel menyimpan measure
+  aditif (jumlah): cost, impressions, reach, clicks, link clicks, WA, FB leads, lead form, messaging,
+  outbound clicks, frequency (total, jumlah positif & banyaknya) dan jumlah baris. Varian kolom per
+  measure sama dengan aggregator (METRIC_COLUMNS), key dimensi sama dengan aggregate_*.
+- get_cube(snapshot): cube dibangun sekali per versi snapshot (DatasetLoader), lalu dipakai ulang.
+  Versi baru yang hanya menambah baris di akhir worksheet (ingestion incremental, export harian)
+  tidak membangun ulang: cube lama di-copy lalu hanya baris baru yang di-fold, termasuk ke rollup
+  yang sudah di-memo (biaya sebanding delta). Jika baris lama berubah/hilang, cube dibangun ulang.
+- rollup(by, measures, where): jumlah measure per kombinasi dimensi; rollup tanpa filter di-memo
+  (rollup untuk semua CUBE_VIEWS dibangun saat build). slice(where) = cube baru berisi sel yang lolos filter (cell_filter: tahun,
+  bulan, minggu ke-N dalam bulan, nilai dimensi).
+- CUBE_VIEWS / cube_aggregates(): hasil berbentuk sama dengan aggregate_* (key, field, tipe).
+  Rasio (CPWA, CPM, CPC, CTR, ...) dihitung dari measure yang sudah dijumlah, dengan rumus yang sama.
+
+Karena penjumlahan dilakukan per sel lalu per rollup, angka pecahan bisa berbeda di digit terakhir
+(ulp) dibanding loop per baris; nilai bulat (impressions, clicks, cost rupiah) identik.
+Grup baru dari baris delta ditambahkan di akhir rollup, jadi urutan key bisa berbeda dari build penuh.
+OLAP_CUBE=0 mematikan cube (semua agregat dihitung dari baris seperti sebelumnya),
+OLAP_CUBE_INCREMENTAL=0 selalu membangun ulang cube untuk setiap versi snapshot.
+"""
+import os
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+
+from services.aggregation import (
+    METRIC_COLUMNS, _MISSING, _age_gender_derived, _age_gender_enhanced_entry, _age_gender_entry,
+    _age_gender_key, _breakdown_derived, _breakdown_enhanced_entry, _breakdown_entry, _column_variants,
+    _enhanced_derived, _first_present, _period_entry, _region_derived, _region_entry, _region_key,
+    _segments, _variant_key
+)
+from services.calendar_table import calendar_day, matches
+from services.column_resolver import column_value, resolve_column
+from services.dimension_index import DIMENSIONS as FILTER_DIMENSIONS
+from services.row_selection import Part, RowSelection
+from services.temporal_index import select_temporal
+from services.worksheet_table import WorksheetTable
+
+CUBE_ENABLED = os.environ.get('OLAP_CUBE', '1') in ['1', 'true', 'True']
+INCREMENTAL_ENABLED = os.environ.get('OLAP_CUBE_INCREMENTAL', '1') in ['1', 'true', 'True']
+
+CUBE_DIMENSIONS = ('date', 'worksheet', 'adset', 'ad', 'age', 'gender', 'region', 'adset_breakdown', 'ad_breakdown',
+                   'age_filter', 'gender_filter')
+
+# Nama measure -> key METRIC_COLUMNS (urutan = urutan kolom di sel)
+CUBE_MEASURES = (
+    ('cost', 'cost'),
+    ('impr', 'impressions'),
+    ('reach', 'reach'),
+    ('clicks', 'clicks'),
+    ('clicks_region', 'clicks_region'),
+    ('link', 'link_clicks'),
+    ('wa', 'whatsapp'),
+    ('wa_any', 'wa_leads_any'),
+    ('fb_leads', 'fb_leads'),
+    ('fb_basic', 'fb_leads_basic'),
+    ('fb_any', 'fb_leads_any'),
+    ('lead_form', 'lead_form'),
+    ('lead_form_basic', 'lead_form_basic'),
+    ('msg_conv', 'msg_conv'),
+    ('outbound_wa', 'outbound_wa'),
+    ('outbound_web', 'outbound_web'),
+    ('outbound_msg', 'outbound_msg'),
+)
+# Measure turunan kolom frequency dan jumlah baris
+MEASURES = tuple(name for name, _ in CUBE_MEASURES) + ('freq_total', 'freq_sum', 'freq_count', 'rows')
+
+# Key dimensi sama dengan aggregator: adset/ad = _variant_key (aggregate_breakdown_enhanced), age/gender = r.get(...),
+# region = _region_key, adset_breakdown/ad_breakdown = r.get(by, r.get(by.title(), 'Unknown')) (aggregate_breakdown)
+_DIM_KEYS = (
+    ('worksheet', _first_present, (('worksheet', 'Unknown'),)),
+    ('adset', _variant_key, tuple((col_var, None) for col_var in _column_variants("Ad set"))),
+    ('ad', _variant_key, tuple((col_var, None) for col_var in _column_variants("Ad"))),
+    ('age', _first_present, (('Age', 'Unknown'),)),
+    ('gender', _first_present, (('Gender', 'Unknown'),)),
+    ('region', _region_key, (('Region', _MISSING), ('region', 'Unknown'))),
+    ('adset_breakdown', _first_present, (('Ad set', _MISSING), ('Ad set'.title(), 'Unknown'))),
+    ('ad_breakdown', _first_present, (('Ad', _MISSING), ('Ad'.title(), 'Unknown'))),
+)
+# Dimensi filter age/gender = semantik filter baris (select_rows / aggregate_adset_by_age_gender): varian
+# METRIC_COLUMNS di-resolve case-insensitive (age/AGE/usia, gender/jenis kelamin), nilai dinormalisasi
+# (age di-strip, gender -> male/female). Dimensi 'age'/'gender' di atas tetap r.get('Age') untuk view age_gender*.
+_FILTER_DIM_KEYS = (('age_filter', 'age'), ('gender_filter', 'gender'))
+
+
+def _filter_dim_keys(seg, name):
+    """Nilai ter-normalisasi dimensi filter name (services/dimension_index.py DIMENSIONS) per baris segmen."""
+    columns, _, normalize, _ = FILTER_DIMENSIONS[name]
+    if seg.table is None:
+        return [normalize(column_value(r, columns, '')) for r in seg.rows]
+    key = resolve_column(tuple(seg.table.header), columns)
+    if key is None:
+        return [normalize('')] * len(seg)
+    return seg.group_keys(normalize, (key, ''))
+
+
+def _key_getter(index):
+    """Fungsi key sel -> tuple nilai dimensi di posisi index."""
+    if not index:
+        return lambda cell_key: ()
+    if len(index) == 1:
+        i = index[0]
+        return lambda cell_key: (cell_key[i],)
+    return itemgetter(*index)
+
+
+class OlapCube:
+    """
+    Sel cube kolumnar: keys[i] = (date, worksheet, adset, ad, age, gender, region, adset_breakdown, ad_breakdown), columns[measure][i]
+    = jumlah measure sel i (lihat docstring modul).
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.keys = []
+        self.index = {}  # key sel -> posisi
+        self.columns = {measure: [] for measure in MEASURES}
+        self.row_count = 0
+        self.built_at = time.time()
+        self._groupings = {}  # by -> (groups, group_ids) tanpa filter
+        self._sums = {}       # (by, measure) -> jumlah per grup tanpa filter
+        self._lock = threading.Lock()
+        # key partisi snapshot -> tanda partisi yang sudah di-fold (lihat _partition_mark)
+        self.sources = {}
+        # Filter slice yang menghasilkan cube ini (lihat covers): filter worksheet & (tahun, bulan, minggu);
+        # None = slice dengan filter lain (baris asal tidak bisa dicocokkan)
+        self.scope = {"worksheets": (), "temporal": ()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _positions(self, cell_keys):
+        """Posisi sel untuk setiap key (sel baru ditambahkan dengan measure 0)."""
+        index = self.index
+        positions = []
+        append = positions.append
+        for cell_key in cell_keys:
+            pos = index.get(cell_key)
+            if pos is None:
+                pos = index[cell_key] = len(self.keys)
+                self.keys.append(cell_key)
+                for column in self.columns.values():
+                    column.append(0)
+            append(pos)
+        return positions
+
+    def fold(self, data):
+        """Tambahkan baris data (list of dict / WorksheetTable) ke sel cube dan ke rollup yang sudah di-memo."""
+        columns = self.columns
+        for seg in _segments(data):
+            days = {}
+            day_keys = []
+            for tgl in seg.dates('day'):
+                day = days.get(tgl, _MISSING)
+                if day is _MISSING:
+                    day = days[tgl] = tgl.date() if tgl else None
+                day_keys.append(day)
+            dim_keys = [seg.group_keys(fn, *specs) for _, fn, specs in _DIM_KEYS]
+            dim_keys += [_filter_dim_keys(seg, name) for _, name in _FILTER_DIM_KEYS]
+            positions = self._positions(zip(day_keys, *dim_keys))
+            memo = self._extend_groupings()
+            freq = seg.floats(METRIC_COLUMNS['frequency'])
+            values = [(measure, seg.floats(METRIC_COLUMNS[column])) for measure, column in CUBE_MEASURES]
+            values += [
+                ('freq_total', freq),
+                ('freq_sum', [v if v > 0 else 0 for v in freq]),
+                ('freq_count', [1 if v > 0 else 0 for v in freq]),
+                ('rows', [1] * len(positions)),
+            ]
+            for measure, measure_values in values:
+                target = columns[measure]
+                for pos, v in zip(positions, measure_values):
+                    target[pos] += v
+                # ADDITIVE: Rollup yang sudah di-memo ikut ditambah (delta), tidak dihitung ulang dari semua sel
+                for acc, group_ids in memo.get(measure, ()):
+                    for pos, v in zip(positions, measure_values):
+                        acc[group_ids[pos]] += v
+            self.row_count += len(positions)
+
+    def _extend_groupings(self):
+        """Grup untuk sel baru di setiap rollup yang di-memo. Returns: {measure: [(jumlah per grup, group_ids)]}."""
+        memo = defaultdict(list)
+        with self._lock:
+            sums_by = defaultdict(list)
+            for (by, measure), acc in self._sums.items():
+                sums_by[by].append(acc)
+                memo[measure].append((acc, self._groupings[by][1]))
+            for by, (groups, group_ids) in self._groupings.items():
+                if len(group_ids) == len(self.keys):
+                    continue
+                key_of = _key_getter([CUBE_DIMENSIONS.index(name) for name in by])
+                for cell_key in self.keys[len(group_ids):]:
+                    key = key_of(cell_key)
+                    group = groups.get(key)
+                    if group is None:
+                        group = groups[key] = len(groups)
+                        for acc in sums_by[by]:
+                            acc.append(0)
+                    group_ids.append(group)
+        return memo
+
+    def extended(self, tails, version=None):
+        """
+        Cube baru = cube ini + baris tails (iterable data baru); cube ini tidak berubah (copy-on-write,
+        request lain mungkin sedang membacanya). Rollup yang sudah di-memo disalin lalu diperbarui dengan delta.
+        """
+        cube = OlapCube(version)
+        cube.keys = list(self.keys)
+        cube.index = dict(self.index)
+        cube.columns = {measure: list(column) for measure, column in self.columns.items()}
+        cube.row_count = self.row_count
+        with self._lock:
+            cube._groupings = {by: (dict(groups), list(group_ids)) for by, (groups, group_ids) in self._groupings.items()}
+            cube._sums = {key: list(acc) for key, acc in self._sums.items()}
+        cube.sources = dict(self.sources)
+        for data in tails:
+            cube.fold(data)
+        return cube
+
+    def _grouping(self, by, where=None):
+        """(groups {key: id}, group id per sel; None = sel tidak lolos where). Tanpa where di-memo per by."""
+        if where is None:
+            with self._lock:
+                cached = self._groupings.get(by)
+            if cached is not None:
+                return cached
+        key_of = _key_getter([CUBE_DIMENSIONS.index(name) for name in by])
+        groups = {}
+        group_ids = []
+        append = group_ids.append
+        for cell_key in self.keys:
+            if where is not None and not where(cell_key):
+                append(None)
+                continue
+            key = key_of(cell_key)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = len(groups)
+            append(group)
+        if where is None:
+            with self._lock:
+                self._groupings[by] = (groups, group_ids)
+        return groups, group_ids
+
+    def _measure_sums(self, by, measure, groups, group_ids, where=None):
+        if where is None:
+            with self._lock:
+                cached = self._sums.get((by, measure))
+            if cached is not None:
+                return cached
+        acc = [0] * len(groups)
+        if where is None:
+            for group, v in zip(group_ids, self.columns[measure]):
+                acc[group] += v
+            with self._lock:
+                self._sums[(by, measure)] = acc
+        else:
+            for group, v in zip(group_ids, self.columns[measure]):
+                if group is not None:
+                    acc[group] += v
+        return acc
+
+    def rollup(self, by=(), measures=MEASURES, where=None):
+        """
+        Jumlah measures per kombinasi dimensi by (tuple nama di CUBE_DIMENSIONS).
+        Returns: {tuple nilai dimensi: {measure: jumlah}}, urutan key = urutan kemunculan baris.
+        Tanpa where, grup dan jumlah per (by, measure) di-memo: jangan modifikasi hasilnya.
+        """
+        by = tuple(by)
+        measures = tuple(measures)
+        groups, group_ids = self._grouping(by, where)
+        sums = [self._measure_sums(by, measure, groups, group_ids, where) for measure in measures]
+        return {key: {measure: acc[group] for measure, acc in zip(measures, sums)} for key, group in groups.items()}
+
+    def slice(self, where):
+        """Cube baru berisi sel yang lolos where (lihat cell_filter); cube ini tidak berubah."""
+        sliced = OlapCube(self.version)
+        picked = [i for i, cell_key in enumerate(self.keys) if where(cell_key)]
+        sliced.keys = [self.keys[i] for i in picked]
+        sliced.index = {cell_key: pos for pos, cell_key in enumerate(sliced.keys)}
+        sliced.columns = {measure: [column[i] for i in picked] for measure, column in self.columns.items()}
+        sliced.row_count = sum(sliced.columns['rows'])
+        # Partisi asal tetap sama (hanya dibaca oleh covers); scope = filter cube ini + filter slice
+        sliced.sources = self.sources
+        where_scope = getattr(where, 'scope', None)
+        if self.scope is not None and where_scope is not None:
+            sliced.scope = {name: self.scope[name] + where_scope[name] for name in self.scope}
+        else:
+            sliced.scope = None
+        return sliced
+
+    def covers(self, sheet_data):
+        """
+        True jika sel cube ini dijumlah dari tepat baris sheet_data (RowSelection), bukan sekadar jumlah baris
+        sama: setiap part harus partisi cube yang lolos filter worksheet slice dengan posisi baris sama persis
+        dengan filter temporal slice (select_temporal, tanggal kanonik yang sama dengan sel), dan total baris sama.
+        """
+        scope = self.scope
+        if scope is None or not isinstance(sheet_data, RowSelection):
+            return False
+        total = 0
+        for part in sheet_data.parts:
+            if part.key not in self.sources or not all(_value_matches(part.key[1], expected) for expected in scope["worksheets"]):
+                return False
+            expected = RowSelection([Part(part.key, part.data, None)])
+            for temporal in scope["temporal"]:
+                expected = select_temporal(expected, *temporal)
+            if not expected.parts or not _same_positions(part, expected.parts[0]):
+                return False
+            total += len(expected)
+        return total == self.row_count
+
+    def view(self, name):
+        """Agregat name (key CUBE_VIEWS) berbentuk sama dengan fungsi aggregate_* bersangkutan."""
+        return CUBE_VIEWS[name](self)
+
+    def info(self):
+        with self._lock:
+            rollups = list(self._groupings)
+        return {
+            "version": self.version,
+            "rows": self.row_count,
+            "cells": len(self.keys),
+            "rollups": [list(by) for by in rollups],
+            "age_seconds": time.time() - self.built_at
+        }
+
+
+def _value_matches(value, expected):
+    return expected(value) if callable(expected) else value == expected
+
+
+def _same_positions(part, other):
+    """True jika dua part (partisi sama) memilih baris yang sama."""
+    if part.positions is None or other.positions is None:
+        size = len(part.data)
+        return (len(part.positions) if part.positions is not None else size) == \
+            (len(other.positions) if other.positions is not None else size)
+    return part.positions == other.positions
+
+
+def cell_filter(year=None, month=None, week=None, **dims):
+    """
+    Predicate sel cube untuk rollup/slice. year/month/week: tanggal sel (week = minggu ke-N dalam
+    bulan, hari 1-7 = minggu 1, sama dengan filter temporal workflow); sel tanpa tanggal tidak lolos.
+    dims: nama dimensi -> nilai yang harus sama, atau callable(nilai) -> bool; None = tanpa filter.
+    """
+    checks = [(CUBE_DIMENSIONS.index(name), expected) for name, expected in dims.items() if expected is not None]
+    temporal = bool(year or month or week)
+
+    def where(cell_key):
+        if temporal and not matches(calendar_day(cell_key[0]), year, month, week):
+            return False
+        for i, expected in checks:
+            if not _value_matches(cell_key[i], expected):
+                return False
+        return True
+
+    # Scope untuk OlapCube.covers: hanya filter worksheet & temporal yang punya padanan filter baris
+    if all(name == 'worksheet' for name, expected in dims.items() if expected is not None):
+        where.scope = {
+            "worksheets": (dims['worksheet'],) if dims.get('worksheet') is not None else (),
+            "temporal": ((year, month, week),) if temporal else (),
+        }
+    else:
+        where.scope = None
+    return where
+
+
+# ============================================================================
+# View berbentuk aggregate_* (field entry -> measure cube)
+# ============================================================================
+_BREAKDOWN_FIELDS = (('cost', 'cost'), ('wa', 'wa'), ('impr', 'impr'), ('clicks', 'clicks'), ('link', 'link'))
+_AGE_GENDER_FIELDS = (
+    ('cost', 'cost'), ('wa', 'wa_any'), ('fb', 'fb_any'), ('lead_form', 'lead_form'), ('impr', 'impr'),
+    ('clicks', 'clicks'), ('link', 'link'), ('frequency', 'freq_total'), ('reach', 'reach')
+)
+_AGE_GENDER_ENHANCED_FIELDS = (
+    ('cost', 'cost'), ('impr', 'impr'), ('reach', 'reach'), ('freq_sum', 'freq_sum'), ('freq_count', 'freq_count'),
+    ('clicks', 'clicks'), ('link', 'link'), ('wa', 'wa_any'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form')
+)
+_REGION_FIELDS = (
+    ('cost', 'cost'), ('impr', 'impr'), ('clicks', 'clicks_region'), ('link', 'link'), ('reach', 'reach'), ('freq', 'freq_sum')
+)
+_BREAKDOWN_ENHANCED_FIELDS = (
+    ('cost', 'cost'), ('impr', 'impr'), ('reach', 'reach'), ('freq_sum', 'freq_sum'), ('freq_count', 'freq_count'),
+    ('clicks', 'clicks'), ('link', 'link'), ('wa', 'wa'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form'),
+    ('outbound_wa', 'outbound_wa'), ('outbound_web', 'outbound_web'), ('outbound_msg', 'outbound_msg')
+)
+_PERIOD_FIELDS = (
+    ('cost', 'cost'), ('impr', 'impr'), ('reach', 'reach'), ('clicks', 'clicks'), ('link', 'link'),
+    ('wa', 'wa'), ('fb_leads', 'fb_leads'), ('lead_form', 'lead_form')
+)
+_MAIN_METRICS_FIELDS = (
+    ('total_cost', 'cost'), ('total_impressions', 'impr'), ('total_clicks', 'clicks'), ('total_link_clicks', 'link'),
+    ('total_leads_wa', 'wa'), ('total_leads_fb', 'fb_basic'), ('total_lead_form', 'lead_form_basic'),
+    ('total_msg_conv', 'msg_conv')
+)
+
+_PERIOD_KEYS = {
+    'daily': lambda day: day,
+    'weekly': lambda day: calendar_day(day).week_key,
+    'monthly': lambda day: calendar_day(day).month_key,
+}
+
+
+def _view(cube, by, entry, fields, derive, key_of=None):
+    stats = defaultdict(entry)
+    for key, measures in cube.rollup(by, [measure for _, measure in fields]).items():
+        if key_of is not None:
+            key = key_of(*key)
+            if key is None:
+                continue
+        else:
+            key = key[0]
+        d = stats[key]
+        for field, measure in fields:
+            d[field] += measures[measure]
+    for d in stats.values():
+        derive(d)
+    return stats
+
+
+def _main_metrics_view(cube):
+    totals = cube.rollup((), [measure for _, measure in _MAIN_METRICS_FIELDS]).get(())
+    return {field: totals[measure] if totals else 0 for field, measure in _MAIN_METRICS_FIELDS}
+
+
+def _period_view(period):
+    period_key = _PERIOD_KEYS[period]
+    return lambda cube: _view(cube, ('date',), _period_entry, _PERIOD_FIELDS, _enhanced_derived,
+                              key_of=lambda day: period_key(day) if day else None)
+
+
+def _enhanced_frequency_derived(d):
+    _enhanced_derived(d, frequency=True)
+
+
+CUBE_VIEWS = {
+    'main_metrics': _main_metrics_view,
+    'breakdown_adset': lambda cube: _view(cube, ('adset_breakdown',), _breakdown_entry, _BREAKDOWN_FIELDS, _breakdown_derived),
+    'breakdown_ad': lambda cube: _view(cube, ('ad_breakdown',), _breakdown_entry, _BREAKDOWN_FIELDS, _breakdown_derived),
+    'age_gender': lambda cube: _view(cube, ('age', 'gender'), _age_gender_entry, _AGE_GENDER_FIELDS,
+                                     _age_gender_derived, key_of=_age_gender_key),
+    'region_breakdown': lambda cube: _view(cube, ('region',), _region_entry, _REGION_FIELDS, _region_derived),
+    'breakdown_adset_enhanced': lambda cube: _view(cube, ('adset',), _breakdown_enhanced_entry,
+                                                   _BREAKDOWN_ENHANCED_FIELDS, _enhanced_frequency_derived),
+    'breakdown_ad_enhanced': lambda cube: _view(cube, ('ad',), _breakdown_enhanced_entry,
+                                                _BREAKDOWN_ENHANCED_FIELDS, _enhanced_frequency_derived),
+    'age_gender_enhanced': lambda cube: _view(cube, ('age', 'gender'), _age_gender_enhanced_entry,
+                                              _AGE_GENDER_ENHANCED_FIELDS, _enhanced_frequency_derived,
+                                              key_of=_age_gender_key),
+    'period_stats_daily': _period_view('daily'),
+    'period_stats_weekly': _period_view('weekly'),
+    'period_stats_monthly': _period_view('monthly'),
+}
+
+
+def cube_aggregates(cube, requested=None):
+    """{nama agregat: hasil} untuk nama di CUBE_VIEWS (requested None = semua), dari rollup cube."""
+    started = time.time()
+    names = [name for name in CUBE_VIEWS if requested is None or name in requested]
+    results = {name: CUBE_VIEWS[name](cube) for name in names}
+    print(f"[CUBE] {len(names)} agregat dari {len(cube)} sel ({cube.row_count} rows) dalam {time.time() - started:.3f}s")
+    return results
+
+
+def adset_by_age_gender(cube, age_range=None, gender=None):
+    """aggregate_adset_by_age_gender dari cube: breakdown adset enhanced untuk sel age/gender yang cocok."""
+    # Nilai dimensi filter sudah dinormalisasi saat fold (lihat _filter_dim_keys)
+    sliced = cube.slice(cell_filter(
+        age_filter=FILTER_DIMENSIONS['age'][3](age_range) if age_range else None,
+        gender_filter=FILTER_DIMENSIONS['gender'][3](gender) if gender else None
+    ))
+    print(f"[CUBE] adset_by_age_gender: {sliced.row_count} rows (age={age_range}, gender={gender})")
+    if sliced.row_count == 0:
+        return {}
+    return sliced.view('breakdown_adset_enhanced')
+
+
+def _partition_mark(data):
+    """
+    Tanda partisi yang di-fold: jumlah baris + sidik kolom WorksheetTable (crc kode & dictionary per kolom)
+    untuk mengenali versi berikutnya yang hanya menambah baris. list of dict biasa hanya dikenali jika objeknya sama.
+    """
+    if not isinstance(data, WorksheetTable):
+        return {"rows": len(data), "data": data}
+    columns = {}
+    for key in data.header:
+        codes, dictionary = data.dimension(key)
+        columns[key] = (codes.typecode, zlib.crc32(codes), dictionary)
+    return {"rows": len(data), "header": data.header, "columns": columns}
+
+
+def _appended_from(mark, data):
+    """Posisi baris pertama yang belum di-fold jika data = baris lama (tidak berubah) + baris baru, selain itu None."""
+    rows = mark["rows"]
+    if "data" in mark:
+        return rows if mark["data"] is data and len(data) == rows else None
+    if not isinstance(data, WorksheetTable) or len(data) < rows or data.header != mark["header"]:
+        return None
+    for key, (typecode, crc, dictionary) in mark["columns"].items():
+        # Dictionary ter-encode urut kemunculan: prefix baris sama <=> prefix kode & dictionary sama
+        codes, values = data.dimension(key)
+        if values[:len(dictionary)] != dictionary:
+            return None
+        # Typecode bisa melebar ('B' -> 'H') saat baris baru menambah nilai unik; kode prefix tetap muat di typecode lama
+        prefix = memoryview(codes)[:rows] if codes.typecode == typecode else array(typecode, codes[:rows])
+        if zlib.crc32(prefix) != crc:
+            return None
+    return rows
+
+
+def build_cube(partitions, version=None):
+    """
+    OlapCube dari data worksheet (mapping key partisi -> data seperti DatasetSnapshot.partitions, atau iterable
+    WorksheetTable/list of dict); rollup CUBE_VIEWS ikut dibangun.
+    """
+    cube = OlapCube(version)
+    items = partitions.items() if hasattr(partitions, 'items') else enumerate(partitions)
+    for key, data in items:
+        cube.fold(data)
+        cube.sources[key] = _partition_mark(data)
+    for view in CUBE_VIEWS.values():
+        view(cube)
+    cube.built_at = time.time()
+    return cube
+
+
+def _delta_cube(cube, snapshot):
+    """
+    Cube versi snapshot dari cube versi sebelumnya jika semua partisi lama hanya bertambah baris di akhir
+    (partisi baru di-fold utuh). Returns: (cube baru, jumlah baris delta), atau None jika ada baris lama berubah/hilang.
+    """
+    if set(cube.sources) - set(snapshot.partitions):
+        return None
+    tails = []
+    marks = {}
+    for key, data in snapshot.partitions.items():
+        mark = cube.sources.get(key)
+        start = 0 if mark is None else _appended_from(mark, data)
+        if start is None:
+            return None
+        if start < len(data):
+            tails.append(data[start:] if start else data)
+            marks[key] = _partition_mark(data)
+    delta = cube.extended(tails, version=snapshot.version)
+    delta.sources.update(marks)
+    return delta, sum(len(tail) for tail in tails)
+
+
+# ============================================================================
+# Cube per snapshot (satu cube terakhir per key DatasetLoader)
+# ============================================================================
+_cube_lock = threading.Lock()
+_cubes = {}  # snapshot.key -> OlapCube versi terakhir
+_cube_stats = {
+    "builds": 0, "hits": 0, "failed": 0, "last_build_seconds": 0.0,
+    "delta_updates": 0, "delta_rows": 0, "last_delta_seconds": 0.0, "invalidated": 0
+}
+
+
+def get_cube(snapshot):
+    """
+    OlapCube untuk DatasetSnapshot (dibangun sekali per versi; versi append-only diturunkan dari cube
+    versi sebelumnya), atau None jika nonaktif/gagal.
+    """
+    if not CUBE_ENABLED or snapshot is None:
+        return None
+    with _cube_lock:
+        cube = _cubes.get(snapshot.key)
+        if cube is not None and cube.version == snapshot.version:
+            _cube_stats["hits"] += 1
+            return cube
+    # ADDITIVE: Delta update - hanya baris baru yang di-fold jika baris lama tidak berubah
+    if cube is not None and INCREMENTAL_ENABLED:
+        started = time.time()
+        try:
+            result = _delta_cube(cube, snapshot)
+        except Exception as e:
+            result = None
+            print(f"[CUBE] Delta update snapshot v{cube.version} -> v{snapshot.version} gagal, build ulang: {e}")
+        if result is not None:
+            delta, rows = result
+            elapsed = time.time() - started
+            with _cube_lock:
+                _cubes[snapshot.key] = delta
+                _cube_stats["delta_updates"] += 1
+                _cube_stats["delta_rows"] += rows
+                _cube_stats["last_delta_seconds"] = elapsed
+            print(f"[CUBE] DELTA snapshot v{cube.version} -> v{snapshot.version}: +{rows} rows "
+                  f"({delta.row_count} rows, {len(delta)} sel) dalam {elapsed:.3f}s")
+            return delta
+        with _cube_lock:
+            _cube_stats["invalidated"] += 1
+        print(f"[CUBE] Baris lama berubah di snapshot v{snapshot.version}, cube dibangun ulang")
+    started = time.time()
+    try:
+        cube = build_cube(snapshot.partitions, version=snapshot.version)
+    except Exception as e:
+        print(f"[CUBE] Gagal membangun cube snapshot v{snapshot.version}: {e}")
+        with _cube_lock:
+            _cube_stats["failed"] += 1
+        return None
+    elapsed = time.time() - started
+    with _cube_lock:
+        _cubes[snapshot.key] = cube
+        _cube_stats["builds"] += 1
+        _cube_stats["last_build_seconds"] = elapsed
+    print(f"[CUBE] BUILT snapshot v{snapshot.version}: {cube.row_count} rows -> {len(cube)} sel dalam {elapsed:.3f}s")
+    return cube
+
+
+def get_cube_stats():
+    with _cube_lock:
+        stats = dict(_cube_stats)
+        cubes = list(_cubes.items())
+    stats["enabled"] = CUBE_ENABLED
+    stats["incremental"] = INCREMENTAL_ENABLED
+    stats["cubes"] = [dict(cube.info(), key=list(key)) for key, cube in cubes]
+    return stats
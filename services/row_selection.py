@@ -0,0 +1,198 @@
+"""
+services/row_selection.py
+View baris zero-copy (RowSelection) di atas partisi dataset, untuk filter yang bisa dikomposisi.
+
+Dulu setiap langkah di chat() membuat list baru berisi referensi baris: list(dataset.rows) untuk
+semua baris gabungan, filter worksheet [row for row in sheet_data if row.get('worksheet') == ...],
+filter temporal dan filter adset/age/gender, masing-masing per request. RowSelection hanya
+menyimpan bagian (Part) per partisi: (key, data, positions) dengan
+- key: (sheet_id, worksheet) partisi snapshot (None jika tidak diketahui),
+- data: WorksheetTable / list baris asli partisi (tidak disalin),
+- positions: array('I') posisi baris terpilih di data, urut naik (None = seluruh data).
+Filter mengembalikan RowSelection baru dengan positions yang lebih kecil; baris tidak pernah disalin:
+- where_worksheet(names): pilih partisi per nama worksheet (tanpa scan baris),
+- select_temporal (services/temporal_index.py) dan select_rows (services/dimension_index.py)
+  menerima dan mengembalikan RowSelection,
+- _segments (services/aggregation.py) membaca parts langsung, jadi agregator tidak butuh list perantara.
+
+RowSelection adalah Sequence read-only (len, iterasi, index, bool) sehingga kode lama yang
+memperlakukan sheet_data sebagai list tetap jalan; slice (sheet_data[:3]) mengembalikan list baris.
+"""
+import threading
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from collections.abc import Sequence
+from itertools import chain, islice
+
+from services.worksheet_table import WorksheetTable, table_of
+
+Part = namedtuple('Part', ['key', 'data', 'positions'])
+
+_stats_lock = threading.Lock()
+_selection_stats = {"views": 0, "narrowed": 0, "rows_selected": 0}
+
+
+def _part_len(part):
+    return len(part.data) if part.positions is None else len(part.positions)
+
+
+def _positions(positions):
+    # Seleksi indeks (memo temporal_index) sudah array('I') read-only: dipakai tanpa salin
+    if isinstance(positions, array) and positions.typecode == 'I':
+        return positions
+    return array('I', positions)
+
+
+def _parts_of(rows, key=None):
+    """Part untuk list baris: run TableRow per WorksheetTable asalnya, run dict biasa terhadap rows sendiri."""
+    if isinstance(rows, WorksheetTable):
+        return [Part(key or (rows.sheet_id, rows.worksheet), rows, None)]
+    parts = []
+    table = current = None
+    for i, row in enumerate(rows):
+        row_table = table_of(row)
+        if current is None or row_table is not table:
+            table = row_table
+            current = []
+            parts.append((table, current))
+        current.append(i if table is None else row._idx)
+    result = []
+    for table, positions in parts:
+        if table is None:
+            data = rows
+        else:
+            data = table
+            if len(positions) == len(table) and positions[0] == 0 and positions[-1] == len(table) - 1 \
+                    and positions == list(range(len(table))):
+                positions = None
+        part_key = key or ((table.sheet_id, table.worksheet) if table is not None else None)
+        result.append(Part(part_key, data, None if positions is None else array('I', positions)))
+    if len(result) == 1 and result[0].data is rows and len(result[0].positions) == len(rows):
+        # Satu partisi dict biasa utuh: tidak perlu array posisi
+        result[0] = Part(key, rows, None)
+    return result
+
+
+class RowSelection(Sequence):
+    """Baris terpilih per partisi (lihat docstring modul). Immutable: filter membuat RowSelection baru."""
+    __slots__ = ('parts', '_offsets')
+
+    def __init__(self, parts):
+        self.parts = tuple(parts)
+        offsets = []
+        total = 0
+        for part in self.parts:
+            total += _part_len(part)
+            offsets.append(total)
+        self._offsets = offsets
+        with _stats_lock:
+            _selection_stats["views"] += 1
+
+    @classmethod
+    def of(cls, rows):
+        """RowSelection untuk sheet_data apa pun (RowSelection dikembalikan apa adanya)."""
+        if isinstance(rows, RowSelection):
+            return rows
+        return cls(_parts_of(rows))
+
+    @classmethod
+    def from_partitions(cls, partitions):
+        """RowSelection untuk {(sheet_id, worksheet): data} (DatasetSnapshot.partitions), urutan partisi tetap."""
+        parts = []
+        for key, data in partitions.items():
+            parts.extend(_parts_of(data, key))
+        return cls(parts)
+
+    # -- Sequence ------------------------------------------------------------
+    def __len__(self):
+        return self._offsets[-1] if self._offsets else 0
+
+    def __iter__(self):
+        return chain.from_iterable(
+            part.data if part.positions is None else map(part.data.__getitem__, part.positions)
+            for part in self.parts
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return list(islice(self, start, max(start, stop)))
+            return [self[i] for i in range(start, stop, step)]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("RowSelection index out of range")
+        p = bisect_right(self._offsets, index)
+        part = self.parts[p]
+        local = index - (self._offsets[p - 1] if p else 0)
+        return part.data[local if part.positions is None else part.positions[local]]
+
+    def __repr__(self):
+        return f"RowSelection({len(self)} rows, {len(self.parts)} parts)"
+
+    # -- komposisi filter ----------------------------------------------------
+    def narrow(self, selections):
+        """
+        RowSelection baru dari posisi terpilih per part (sejajar dengan self.parts; None = part utuh).
+        Posisi harus subset urut naik dari posisi part; part kosong dibuang.
+        """
+        parts = []
+        selected = 0
+        for part, positions in zip(self.parts, selections):
+            if positions is None:
+                parts.append(part)
+            elif len(positions):
+                parts.append(Part(part.key, part.data, _positions(positions)))
+            else:
+                continue
+            selected += _part_len(parts[-1])
+        with _stats_lock:
+            _selection_stats["narrowed"] += 1
+            _selection_stats["rows_selected"] += selected
+        return RowSelection(parts)
+
+    def where_worksheet(self, names):
+        """Baris dari worksheet bernama names (semantik row.get('worksheet') in names)."""
+        names = set(names)
+        selections = []
+        for part in self.parts:
+            if part.key is not None:
+                selections.append(None if part.key[1] in names else ())
+            else:
+                data = part.data
+                indices = range(len(data)) if part.positions is None else part.positions
+                selections.append([i for i in indices if data[i].get('worksheet') in names])
+        return self.narrow(selections)
+
+    # -- info partisi --------------------------------------------------------
+    def worksheets(self):
+        """Nama worksheet yang punya baris terpilih, urutan kemunculan."""
+        names = {}
+        for part in self.parts:
+            if part.key is not None:
+                names[part.key[1]] = None
+            else:
+                data = part.data
+                indices = range(len(data)) if part.positions is None else part.positions
+                names.update((data[i].get('worksheet'), None) for i in indices)
+        return list(names)
+
+    def columns(self, key):
+        """Kolom worksheet key=(sheet_id, worksheet) dari header tabel / baris pertama ([] jika tidak ada baris)."""
+        for part in self.parts:
+            if part.key != key or not _part_len(part):
+                continue
+            header = getattr(part.data, 'header', None)
+            if header is not None:
+                return list(header)
+            first = part.data[0 if part.positions is None else part.positions[0]]
+            return list(first.keys())
+        return []
+
+
+def get_row_selection_stats():
+    with _stats_lock:
+        return dict(_selection_stats)
@@ -0,0 +1,296 @@
+"""
+services/shared_cache.py
+Tier cache bersama untuk semua worker gunicorn di satu host (SQLite lokal).
+
+- worksheet_cache: snapshot data worksheet (pickle + zlib) beserta waktu fetch dan revision sumber.
+- cache_meta.generation: dinaikkan setiap /cache/clear; worker yang melihat generation
+  berubah membuang cache in-memory miliknya (invalidasi terkoordinasi).
+- fetch_lease: lease per worksheet agar satu worksheet hanya di-download oleh satu worker;
+  worker lain menunggu hasilnya muncul di tabel worksheet_cache.
+
+Aktif jika GSHEET_SHARED_CACHE=1 (default). Path file via GSHEET_SHARED_CACHE_PATH; default di direktori
+cache user (<XDG_CACHE_HOME atau ~/.cache>/gsheet-cache, mode 0700), bukan working directory aplikasi.
+PENTING: data dibaca dengan pickle.loads, jadi file ini (dan direktorinya) tidak boleh bisa ditulis oleh
+pihak yang tidak dipercaya — siapa pun yang bisa menulisnya bisa menjalankan kode di proses worker.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+SHARED_CACHE_ENABLED = os.environ.get('GSHEET_SHARED_CACHE', '1') in ['1', 'true', 'True']
+CACHE_HOME = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'gsheet-cache')
+SHARED_CACHE_PATH = os.environ.get('GSHEET_SHARED_CACHE_PATH', os.path.join(CACHE_HOME, 'gsheet_cache.db'))
+# Lama lease fetch sebelum dianggap mati (worker crash di tengah download)
+_LEASE_TTL = int(os.environ.get('GSHEET_SHARED_LEASE_TTL', 60))
+_POLL_INTERVAL = 0.2
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def make_private_dir(path):
+    """Buat direktori (dan parent yang belum ada) dengan mode 0700: isi cache di-unpickle, hanya user proses yang boleh menulis."""
+    if not path or os.path.isdir(path):
+        return
+    make_private_dir(os.path.dirname(os.path.abspath(path)))
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+
+def _connect():
+    make_private_dir(os.path.dirname(SHARED_CACHE_PATH))
+    conn = sqlite3.connect(SHARED_CACHE_PATH, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _ensure_schema():
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        conn = _connect()
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS worksheet_cache (
+                cache_key TEXT PRIMARY KEY,
+                sheet_id TEXT,
+                worksheet TEXT,
+                data BLOB,
+                rows INTEGER,
+                fetched_at REAL
+            )''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS cache_meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER
+            )''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS fetch_lease (
+                cache_key TEXT PRIMARY KEY,
+                owner TEXT,
+                expires_at REAL
+            )''')
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0)")
+            # ADDITIVE: kolom revision (JSON) untuk conditional refresh; file lama di-migrasi di sini
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(worksheet_cache)').fetchall()]
+            if 'revision' not in columns:
+                conn.execute('ALTER TABLE worksheet_cache ADD COLUMN revision TEXT')
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def lease_owner():
+    return f"{os.getpid()}:{threading.get_ident()}"
+
+
+def encode_rows(data):
+    return zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def decode_rows(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+
+def shared_get(sheet_id, worksheet_name):
+    """Returns: (data, fetched_at, revision) dari tier bersama, atau None."""
+    if not SHARED_CACHE_ENABLED:
+        return None
+    _ensure_schema()
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT data, fetched_at, revision FROM worksheet_cache WHERE cache_key = ?',
+                           (f"{sheet_id}:{worksheet_name}",)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    return decode_rows(row[0]), row[1], json.loads(row[2]) if row[2] else None
+
+
+def shared_get_fetched_at(sheet_id, worksheet_name):
+    """Waktu fetch entry di tier bersama tanpa decode data (None jika tidak ada)."""
+    if not SHARED_CACHE_ENABLED:
+        return None
+    _ensure_schema()
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT fetched_at FROM worksheet_cache WHERE cache_key = ?',
+                           (f"{sheet_id}:{worksheet_name}",)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def shared_set(sheet_id, worksheet_name, data, fetched_at, revision=None):
+    if not SHARED_CACHE_ENABLED:
+        return
+    _ensure_schema()
+    blob = encode_rows(data)
+    conn = _connect()
+    try:
+        conn.execute('''INSERT OR REPLACE INTO worksheet_cache (cache_key, sheet_id, worksheet, data, rows, fetched_at, revision)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                     (f"{sheet_id}:{worksheet_name}", sheet_id, worksheet_name, blob, len(data), fetched_at,
+                      json.dumps(revision) if revision else None))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def shared_renew(sheet_id, worksheet_name, fetched_at, revision=None):
+    """Perpanjang umur entry tanpa menulis ulang data (sumber tidak berubah)."""
+    if not SHARED_CACHE_ENABLED:
+        return
+    _ensure_schema()
+    conn = _connect()
+    try:
+        conn.execute('UPDATE worksheet_cache SET fetched_at = ?, revision = ? WHERE cache_key = ?',
+                     (fetched_at, json.dumps(revision) if revision else None, f"{sheet_id}:{worksheet_name}"))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def shared_delete(sheet_id, worksheet_name):
+    if not SHARED_CACHE_ENABLED:
+        return
+    _ensure_schema()
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM worksheet_cache WHERE cache_key = ?', (f"{sheet_id}:{worksheet_name}",))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def shared_clear():
+    """Hapus semua entry bersama dan naikkan generation (semua worker ikut membuang cache lokal)."""
+    if not SHARED_CACHE_ENABLED:
+        return None
+    _ensure_schema()
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM worksheet_cache')
+        conn.execute('DELETE FROM fetch_lease')
+        conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+        conn.commit()
+        generation = conn.execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()[0]
+    finally:
+        conn.close()
+    if VERBOSE_LOG:
+        print(f"[SHARED] CLEARED (generation={generation})")
+    return generation
+
+
+def current_generation():
+    if not SHARED_CACHE_ENABLED:
+        return None
+    _ensure_schema()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def try_acquire_lease(sheet_id, worksheet_name):
+    """True jika worker ini berhak men-download worksheet (lease kosong/expired/milik sendiri)."""
+    if not SHARED_CACHE_ENABLED:
+        return True
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    now = time.time()
+    try:
+        _ensure_schema()
+        conn = _connect()
+    except sqlite3.Error as e:
+        # Tier bersama bermasalah: jangan blokir download
+        print(f"[SHARED] Gagal membuka {SHARED_CACHE_PATH}: {e}")
+        return True
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT owner, expires_at FROM fetch_lease WHERE cache_key = ?', (cache_key,)).fetchone()
+        if row and row[1] > now and row[0] != lease_owner():
+            conn.rollback()
+            return False
+        conn.execute('INSERT OR REPLACE INTO fetch_lease (cache_key, owner, expires_at) VALUES (?, ?, ?)',
+                     (cache_key, lease_owner(), now + _LEASE_TTL))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"[SHARED] Gagal mengambil lease {cache_key}: {e}")
+        return True
+    finally:
+        conn.close()
+
+
+def release_lease(sheet_id, worksheet_name, owner=None):
+    """Lepas lease milik owner (default: thread ini; writer background mengirim owner thread yang mengambil lease)."""
+    if not SHARED_CACHE_ENABLED:
+        return
+    try:
+        conn = _connect()
+        try:
+            conn.execute('DELETE FROM fetch_lease WHERE cache_key = ? AND owner = ?',
+                         (f"{sheet_id}:{worksheet_name}", owner or lease_owner()))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        # Lease akan expired sendiri setelah GSHEET_SHARED_LEASE_TTL
+        print(f"[SHARED] Gagal melepas lease {sheet_id}:{worksheet_name}: {e}")
+
+
+def wait_for_shared_entry(sheet_id, worksheet_name, newer_than=None, timeout=None):
+    """
+    Tunggu worker lain selesai men-download worksheet (lease dipegang worker lain).
+    Returns: (data, fetched_at, revision) jika entry (lebih baru dari newer_than) muncul, atau None jika timeout.
+    """
+    deadline = time.time() + (timeout if timeout is not None else _LEASE_TTL)
+    while time.time() < deadline:
+        try:
+            fetched_at = shared_get_fetched_at(sheet_id, worksheet_name)
+            if fetched_at is not None and (newer_than is None or fetched_at > newer_than):
+                return shared_get(sheet_id, worksheet_name)
+        except sqlite3.Error as e:
+            print(f"[SHARED] Gagal membaca {sheet_id}:{worksheet_name} saat menunggu: {e}")
+            return None
+        time.sleep(_POLL_INTERVAL)
+    return None
+
+
+def get_shared_cache_status():
+    if not SHARED_CACHE_ENABLED:
+        return {"enabled": False}
+    _ensure_schema()
+    now = time.time()
+    conn = _connect()
+    try:
+        entries = conn.execute('SELECT sheet_id, worksheet, rows, fetched_at, length(data) FROM worksheet_cache').fetchall()
+        leases = conn.execute('SELECT cache_key, owner, expires_at FROM fetch_lease WHERE expires_at > ?', (now,)).fetchall()
+        generation = conn.execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "enabled": True,
+        "path": SHARED_CACHE_PATH,
+        "generation": generation,
+        "entries": [{
+            "sheet_id": sheet_id,
+            "worksheet": worksheet,
+            "rows": rows,
+            "bytes": size,
+            "age_seconds": now - fetched_at
+        } for sheet_id, worksheet, rows, fetched_at, size in entries],
+        "active_leases": [{"key": key, "owner": owner, "expires_in": expires_at - now} for key, owner, expires_at in leases]
+    }
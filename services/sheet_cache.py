@@ -0,0 +1,709 @@
+"""
+services/sheet_cache.py
+Cache in-memory data worksheet Google Sheets (dipindah dari routes/chat_routes.py).
+
+Key cache: "<sheet_id>:<worksheet>", value: (rows, timestamp).
+TTL diatur via env GSHEET_CACHE_TTL, jumlah entry maksimum via GSHEET_CACHE_MAX_SIZE.
+
+Eviction (services/cache_policy.py): budget byte GSHEET_CACHE_MAX_BYTES, policy LRU/LFU O(1)
+(GSHEET_CACHE_POLICY), worksheet yang di-pin tidak pernah di-evict karena budget.
+
+Single-flight: cache MISS yang bersamaan untuk key yang sama hanya memicu satu download;
+thread lain menunggu Future milik fetch yang sedang berjalan (claim_sheet_fetch/complete_sheet_fetch).
+
+Stale-while-revalidate: entry yang lewat TTL tetap dilayani sampai GSHEET_CACHE_MAX_STALENESS detik
+sambil di-reload oleh background thread; worksheet yang sering diakses (hot) di-refresh lebih awal
+GSHEET_CACHE_REFRESH_AHEAD detik sebelum expired.
+
+Tier bersama (services/shared_cache.py): cache in-memory adalah L1 per worker, SQLite lokal adalah
+L2 untuk semua worker gunicorn di host yang sama. /cache/clear menaikkan generation sehingga
+semua worker membuang L1 miliknya.
+
+Snapshot disk (services/snapshot_store.py): setiap hasil download juga ditulis ke disk, lalu
+dimuat kembali saat startup (load_persistent_snapshots) agar restart tidak mulai dari cache kosong.
+
+Penulisan tier bersama & snapshot (pickle + zlib + SQLite/disk) dijalankan thread background
+gsheet-cache-writer, bukan di thread request: set_cached_sheet_data hanya mengisi L1 lalu mengantri
+job per key (job yang belum ditulis digabung, versi terakhir menang). Lease download dilepas lewat
+antrian yang sama (release_lease_after_persist) sehingga worker lain baru boleh download ulang setelah
+hasilnya ada di tier bersama. GSHEET_CACHE_ASYNC_PERSIST=0 untuk kembali menulis sinkron.
+
+Tabel bertipe (services/worksheet_table.py): setiap data yang masuk L1 (download, tier bersama,
+snapshot) dikonversi sekali menjadi WorksheetTable; yang di-cache & dikembalikan adalah tabel itu.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from services import shared_cache, snapshot_store
+from services.cache_policy import CachePolicy
+from services.worksheet_table import WorksheetTable, build_worksheet_table, estimate_bytes
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+GSHEET_CACHE_TTL_ENV = os.environ.get('GSHEET_CACHE_TTL')
+try:
+    _GSHEET_CACHE_TTL = int(GSHEET_CACHE_TTL_ENV) if GSHEET_CACHE_TTL_ENV else 60 * 60
+except Exception:
+    _GSHEET_CACHE_TTL = 60 * 60
+
+# ADDITIVE: Max cache size to prevent memory leak (100 worksheets max)
+_GSHEET_CACHE_MAX_SIZE = int(os.environ.get('GSHEET_CACHE_MAX_SIZE', 100))
+_gsheet_cache = {}
+_gsheet_cache_lock = threading.Lock()
+# ADDITIVE: Ukuran, hit, recency/frekuensi & alasan eviction per entry (dijaga _gsheet_cache_lock)
+_policy = CachePolicy(_GSHEET_CACHE_MAX_SIZE)
+
+# ADDITIVE: Single-flight - key "sheet_id:worksheet" -> Future berisi (loaded_name, data)
+_GSHEET_SINGLEFLIGHT_TIMEOUT = int(os.environ.get('GSHEET_SINGLEFLIGHT_TIMEOUT', 120))
+_inflight = {}
+_singleflight_stats = {"fetches": 0, "coalesced": 0, "failed": 0, "timeouts": 0}
+
+# ADDITIVE: Stale-while-revalidate (GSHEET_CACHE_SWR=0 untuk kembali ke behavior lama: expired = dihapus)
+_GSHEET_CACHE_SWR = os.environ.get('GSHEET_CACHE_SWR', '1') in ['1', 'true', 'True']
+_GSHEET_CACHE_MAX_STALENESS = int(os.environ.get('GSHEET_CACHE_MAX_STALENESS', 30 * 60))
+_GSHEET_CACHE_REFRESH_AHEAD = int(os.environ.get('GSHEET_CACHE_REFRESH_AHEAD', 5 * 60))
+_GSHEET_CACHE_HOT_HITS = int(os.environ.get('GSHEET_CACHE_HOT_HITS', 3))
+_GSHEET_CACHE_REFRESH_INTERVAL = int(os.environ.get('GSHEET_CACHE_REFRESH_INTERVAL', 30))
+_access_stats = {}  # cache_key -> [hits sejak SET terakhir, last_access]
+_refresh_queue = queue.Queue()
+_refresh_pending = set()
+_refresher_thread = None
+_swr_stats = {"stale_served": 0, "refresh_scheduled": 0, "refreshed": 0, "refresh_failed": 0}
+
+# ADDITIVE: Generation tier bersama yang terakhir dilihat worker ini
+_GSHEET_SHARED_GEN_CHECK_INTERVAL = float(os.environ.get('GSHEET_SHARED_GEN_CHECK_INTERVAL', 2))
+_local_generation = None
+_last_generation_check = 0.0
+_shared_stats = {"shared_hits": 0, "shared_errors": 0}
+
+# ADDITIVE: Revision sumber per entry L1 (lihat services/sheet_revision.py)
+_revisions = {}
+
+# ADDITIVE: Writer background untuk tier bersama & snapshot (lihat docstring modul)
+_GSHEET_CACHE_ASYNC_PERSIST = os.environ.get('GSHEET_CACHE_ASYNC_PERSIST', '1') in ['1', 'true', 'True']
+_persist_queue = queue.Queue()
+_persist_pending = {}  # cache_key -> job terakhir yang belum ditulis
+_persist_lock = threading.Lock()  # menjaga _persist_pending & _persist_stats
+_persist_io_lock = threading.Lock()  # urutan tulis vs invalidate/clear (job lama tidak menimpa hasil clear)
+_persist_thread = None
+_persist_stats = {"queued": 0, "coalesced": 0, "written": 0, "failed": 0}
+
+
+def _drop_entry_locked(cache_key, reason):
+    """Buang satu entry L1 beserta metadata-nya (dipanggil dengan _gsheet_cache_lock dipegang)."""
+    _gsheet_cache.pop(cache_key, None)
+    _access_stats.pop(cache_key, None)
+    _revisions.pop(cache_key, None)
+    return _policy.remove(cache_key, reason)
+
+
+def _drop_all_locked(reason):
+    _gsheet_cache.clear()
+    _access_stats.clear()
+    _revisions.clear()
+    _policy.remove_all(reason)
+
+
+def _evict_locked(keep_key):
+    """Evict entry sesuai policy sampai jumlah entry & byte kembali dalam budget (keep_key tidak disentuh)."""
+    while True:
+        reason = _policy.over_budget()
+        if reason is None:
+            return
+        victim = _policy.victim(exclude=keep_key)
+        if victim is None:
+            # Sisa entry di-pin (atau hanya entry baru): biarkan melebihi budget daripada membuang data yang dibutuhkan
+            print(f"[CACHE] Budget terlampaui ({reason}) tapi tidak ada entry yang bisa di-evict "
+                  f"(used: {_policy.total_bytes} bytes, entries: {len(_gsheet_cache)})")
+            return
+        entry = _drop_entry_locked(victim, reason)
+        if VERBOSE_LOG:
+            print(f"[CACHE] EVICTED {victim} ({_policy.policy}, reason: {reason}, "
+                  f"bytes: {entry['bytes'] if entry else 0}, hits: {entry['hits'] if entry else 0})")
+
+
+def _is_hot(cache_key, now):
+    stats = _access_stats.get(cache_key)
+    return bool(stats) and stats[0] >= _GSHEET_CACHE_HOT_HITS and now - stats[1] < _GSHEET_CACHE_TTL
+
+
+def _schedule_refresh_locked(cache_key):
+    """Masukkan key ke antrian refresh (dipanggil dengan _gsheet_cache_lock dipegang)."""
+    if cache_key in _refresh_pending or cache_key in _inflight:
+        return
+    _refresh_pending.add(cache_key)
+    _swr_stats["refresh_scheduled"] += 1
+    _refresh_queue.put(cache_key)
+    _ensure_refresher_started()
+
+
+def _refresh_keys(cache_keys):
+    """Reload worksheet per spreadsheet (satu batchGet per sheet) lewat loader."""
+    from services.sheet_loader import refresh_worksheets
+    by_sheet = {}
+    for cache_key in cache_keys:
+        sheet_id, worksheet_name = cache_key.split(':', 1)
+        by_sheet.setdefault(sheet_id, []).append(worksheet_name)
+    for sheet_id, names in by_sheet.items():
+        try:
+            refreshed = refresh_worksheets(sheet_id, names)
+            with _gsheet_cache_lock:
+                _swr_stats["refreshed"] += refreshed
+                _swr_stats["refresh_failed"] += len(names) - refreshed
+        except Exception as e:
+            # Entry lama tetap dilayani sampai batas staleness; refresh dicoba lagi di akses berikutnya
+            with _gsheet_cache_lock:
+                _swr_stats["refresh_failed"] += len(names)
+            print(f"[CACHE] Background refresh gagal untuk sheet {sheet_id}: {e}")
+        finally:
+            with _gsheet_cache_lock:
+                for worksheet_name in names:
+                    _refresh_pending.discard(f"{sheet_id}:{worksheet_name}")
+
+
+def _scan_refresh_ahead():
+    """Jadwalkan refresh untuk entry hot yang akan expired dalam GSHEET_CACHE_REFRESH_AHEAD detik."""
+    now = time.time()
+    with _gsheet_cache_lock:
+        for cache_key, (data, ts) in _gsheet_cache.items():
+            if now - ts >= _GSHEET_CACHE_TTL - _GSHEET_CACHE_REFRESH_AHEAD and _is_hot(cache_key, now):
+                _schedule_refresh_locked(cache_key)
+
+
+def _refresher_loop():
+    while True:
+        try:
+            first = _refresh_queue.get(timeout=_GSHEET_CACHE_REFRESH_INTERVAL)
+        except queue.Empty:
+            try:
+                _scan_refresh_ahead()
+            except Exception as e:
+                print(f"[CACHE] Scan refresh-ahead gagal: {e}")
+            continue
+        # Kumpulkan key lain yang sudah antri agar satu spreadsheet cukup satu batchGet
+        keys = [first]
+        while True:
+            try:
+                keys.append(_refresh_queue.get_nowait())
+            except queue.Empty:
+                break
+        if VERBOSE_LOG:
+            print(f"[CACHE] Background refresh {len(keys)} worksheet: {keys}")
+        _refresh_keys(keys)
+
+
+def _ensure_refresher_started():
+    global _refresher_thread
+    if _refresher_thread is None or not _refresher_thread.is_alive():
+        _refresher_thread = threading.Thread(target=_refresher_loop, name="gsheet-cache-refresher", daemon=True)
+        _refresher_thread.start()
+
+
+def _sync_shared_generation():
+    """Buang L1 jika worker lain sudah menjalankan /cache/clear (generation berubah)."""
+    global _local_generation, _last_generation_check
+    if not shared_cache.SHARED_CACHE_ENABLED:
+        return
+    now = time.time()
+    if now - _last_generation_check < _GSHEET_SHARED_GEN_CHECK_INTERVAL:
+        return
+    _last_generation_check = now
+    try:
+        generation = shared_cache.current_generation()
+    except Exception as e:
+        _shared_stats["shared_errors"] += 1
+        print(f"[SHARED] Gagal membaca generation: {e}")
+        return
+    with _gsheet_cache_lock:
+        if _local_generation is not None and generation != _local_generation:
+            _drop_all_locked("generation")
+            print(f"[CACHE] Generation berubah {_local_generation} -> {generation}, cache lokal dibuang")
+        _local_generation = generation
+
+
+def _get_local_sheet_data(cache_key):
+    now = time.time()
+    with _gsheet_cache_lock:
+        entry = _gsheet_cache.get(cache_key)
+        if entry:
+            data, ts = entry
+            age = now - ts
+            if age < _GSHEET_CACHE_TTL or (_GSHEET_CACHE_SWR and age < _GSHEET_CACHE_TTL + _GSHEET_CACHE_MAX_STALENESS):
+                _policy.touch(cache_key)
+            if _GSHEET_CACHE_SWR:
+                stats = _access_stats.setdefault(cache_key, [0, now])
+                stats[0] += 1
+                stats[1] = now
+            if age < _GSHEET_CACHE_TTL:
+                if VERBOSE_LOG:
+                    print(f"[CACHE] HIT for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
+                # ADDITIVE: Refresh-ahead untuk worksheet hot yang hampir expired
+                if _GSHEET_CACHE_SWR and age >= _GSHEET_CACHE_TTL - _GSHEET_CACHE_REFRESH_AHEAD and _is_hot(cache_key, now):
+                    _schedule_refresh_locked(cache_key)
+                return data
+            elif _GSHEET_CACHE_SWR and age < _GSHEET_CACHE_TTL + _GSHEET_CACHE_MAX_STALENESS:
+                # ADDITIVE: Stale-while-revalidate - layani data lama, reload di background
+                _swr_stats["stale_served"] += 1
+                if VERBOSE_LOG:
+                    print(f"[CACHE] STALE for {cache_key} (age: {age:.0f}s, max staleness: {_GSHEET_CACHE_MAX_STALENESS}s)")
+                _schedule_refresh_locked(cache_key)
+                return data
+            else:
+                if VERBOSE_LOG:
+                    print(f"[CACHE] EXPIRED for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
+                _drop_entry_locked(cache_key, "expired")
+    return None
+
+
+def _set_local_sheet_data(cache_key, data, fetched_at, revision=None):
+    """Simpan ke L1. Returns: data yang disimpan (WorksheetTable bertipe, lihat services/worksheet_table.py)."""
+    # ADDITIVE: Konversi sekali saat ingest ke snapshot kolumnar bertipe (di luar lock)
+    sheet_id, worksheet_name = cache_key.split(':', 1)
+    try:
+        data = build_worksheet_table(sheet_id, worksheet_name, data)
+    except Exception as e:
+        print(f"[TABLE] Gagal membangun tabel bertipe untuk {cache_key}, pakai list of dict biasa: {e}")
+    try:
+        nbytes = estimate_bytes(data)
+    except Exception as e:
+        nbytes = 0
+        print(f"[CACHE] Gagal memperkirakan ukuran {cache_key}: {e}")
+    with _gsheet_cache_lock:
+        _gsheet_cache[cache_key] = (data, fetched_at)
+        # ADDITIVE: Eviction berbasis budget byte + jumlah entry (LRU/LFU O(1), pinned dilewati)
+        _policy.admit(cache_key, nbytes)
+        _evict_locked(cache_key)
+        if revision:
+            _revisions[cache_key] = revision
+        else:
+            _revisions.pop(cache_key, None)
+        # Hit counter diturunkan setengah tiap reload: worksheet tetap hot hanya jika terus diakses
+        if cache_key in _access_stats:
+            _access_stats[cache_key][0] //= 2
+        if VERBOSE_LOG:
+            print(f"[CACHE] SET for {cache_key} (rows: {len(data)}, bytes: {nbytes}) (TTL: {_GSHEET_CACHE_TTL}s) "
+                  f"(size: {len(_gsheet_cache)}/{_GSHEET_CACHE_MAX_SIZE}, {_policy.total_bytes}/{_policy.max_bytes or '-'} bytes)")
+    return data
+
+
+def _persist(job):
+    """Tulis satu job ke tier bersama (set penuh / renew timestamp) + snapshot disk."""
+    sheet_id, worksheet_name = job['sheet_id'], job['worksheet']
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    ok = True
+    try:
+        if job['renew']:
+            shared_cache.shared_renew(sheet_id, worksheet_name, job['fetched_at'], job['revision'])
+        else:
+            # ADDITIVE: Tulis juga ke tier bersama agar worker lain tidak perlu download ulang
+            shared_cache.shared_set(sheet_id, worksheet_name, job['data'], job['fetched_at'], job['revision'])
+    except Exception as e:
+        ok = False
+        _shared_stats["shared_errors"] += 1
+        print(f"[SHARED] Gagal menulis {cache_key}: {e}")
+    # ADDITIVE: Snapshot disk untuk warm restart
+    try:
+        snapshot_store.save_snapshot(sheet_id, worksheet_name, job['data'], job['fetched_at'], job['revision'])
+    except Exception as e:
+        ok = False
+        print(f"[SNAPSHOT] Gagal menulis {cache_key}: {e}")
+    with _persist_lock:
+        _persist_stats["written" if ok else "failed"] += 1
+
+
+def _queue_persist(sheet_id, worksheet_name, data, fetched_at, revision, renew=False):
+    job = {'sheet_id': sheet_id, 'worksheet': worksheet_name, 'data': data,
+           'fetched_at': fetched_at, 'revision': revision, 'renew': renew}
+    if not _GSHEET_CACHE_ASYNC_PERSIST:
+        with _persist_io_lock:
+            _persist(job)
+        return
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _persist_lock:
+        previous = _persist_pending.get(cache_key)
+        # Renew di atas set yang belum ditulis tetap harus menulis data penuh
+        job['renew'] = renew and (previous is None or previous['renew'])
+        _persist_pending[cache_key] = job
+        if previous is not None:
+            _persist_stats["coalesced"] += 1
+            return
+        _persist_stats["queued"] += 1
+    _persist_queue.put(('persist', cache_key))
+    _ensure_writer_started()
+
+
+def _writer_loop():
+    while True:
+        kind, payload = _persist_queue.get()
+        try:
+            if kind == 'persist':
+                with _persist_io_lock:
+                    with _persist_lock:
+                        job = _persist_pending.pop(payload, None)
+                    if job is not None:
+                        _persist(job)
+            elif kind == 'release':
+                shared_cache.release_lease(*payload)
+            elif kind == 'flush':
+                payload.set()
+        except Exception as e:
+            print(f"[CACHE] Writer background gagal ({kind}): {e}")
+
+
+def _ensure_writer_started():
+    global _persist_thread
+    with _persist_lock:
+        if _persist_thread is None or not _persist_thread.is_alive():
+            _persist_thread = threading.Thread(target=_writer_loop, name="gsheet-cache-writer", daemon=True)
+            _persist_thread.start()
+
+
+def release_lease_after_persist(sheet_id, worksheet_name):
+    """Lepas lease download setelah job tulis yang sudah diantri untuk worksheet ini selesai."""
+    if not _GSHEET_CACHE_ASYNC_PERSIST:
+        shared_cache.release_lease(sheet_id, worksheet_name)
+        return
+    _persist_queue.put(('release', (sheet_id, worksheet_name, shared_cache.lease_owner())))
+    _ensure_writer_started()
+
+
+def flush_persistence(timeout=None):
+    """Tunggu semua job tulis yang sudah diantri selesai. Returns: True jika selesai sebelum timeout."""
+    if not _GSHEET_CACHE_ASYNC_PERSIST or _persist_thread is None:
+        return True
+    done = threading.Event()
+    _persist_queue.put(('flush', done))
+    _ensure_writer_started()
+    return done.wait(timeout)
+
+
+def get_persist_stats():
+    with _persist_lock:
+        stats = dict(_persist_stats)
+        stats["async"] = _GSHEET_CACHE_ASYNC_PERSIST
+        stats["pending"] = len(_persist_pending)
+    return stats
+
+
+# Job yang masih antri ikut ditulis saat proses berhenti normal (maksimal 10 detik)
+atexit.register(flush_persistence, 10)
+
+
+def adopt_shared_entry(sheet_id, worksheet_name, newer_than=None):
+    """
+    Ambil entry dari tier bersama ke L1 jika masih bisa dilayani (fresh, atau stale dalam batas
+    SWR) dan lebih baru dari newer_than. Returns: data atau None.
+    """
+    try:
+        fetched_at = shared_cache.shared_get_fetched_at(sheet_id, worksheet_name)
+        if fetched_at is None or (newer_than is not None and fetched_at <= newer_than):
+            return None
+        max_age = _GSHEET_CACHE_TTL + (_GSHEET_CACHE_MAX_STALENESS if _GSHEET_CACHE_SWR else 0)
+        if time.time() - fetched_at >= max_age:
+            return None
+        shared = shared_cache.shared_get(sheet_id, worksheet_name)
+    except Exception as e:
+        _shared_stats["shared_errors"] += 1
+        print(f"[SHARED] Gagal membaca {sheet_id}:{worksheet_name}: {e}")
+        return None
+    if shared is None:
+        return None
+    data, fetched_at, revision = shared
+    data = _set_local_sheet_data(f"{sheet_id}:{worksheet_name}", data, fetched_at, revision)
+    _shared_stats["shared_hits"] += 1
+    if VERBOSE_LOG:
+        print(f"[CACHE] SHARED HIT for {sheet_id}:{worksheet_name} (age: {time.time() - fetched_at:.0f}s)")
+    return data
+
+
+def get_cached_sheet_data(sheet_id, worksheet_name):
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    _sync_shared_generation()
+    data = _get_local_sheet_data(cache_key)
+    if data is not None:
+        return data
+    # ADDITIVE: L2 - worker lain di host yang sama mungkin sudah men-download worksheet ini
+    if adopt_shared_entry(sheet_id, worksheet_name) is not None:
+        data = _get_local_sheet_data(cache_key)
+        if data is not None:
+            return data
+    if VERBOSE_LOG:
+        print(f"[CACHE] MISS for {cache_key} (TTL: {_GSHEET_CACHE_TTL}s)")
+    return None
+
+
+def get_local_fetched_at(sheet_id, worksheet_name):
+    """Waktu fetch entry L1 (None jika tidak ada); dipakai refresh untuk mengenali data yang lebih baru."""
+    with _gsheet_cache_lock:
+        entry = _gsheet_cache.get(f"{sheet_id}:{worksheet_name}")
+    return entry[1] if entry else None
+
+
+def set_cached_sheet_data(sheet_id, worksheet_name, data, revision=None):
+    """
+    Simpan hasil download ke L1; tier bersama + snapshot ditulis writer background.
+    Returns: data versi cache (tabel bertipe).
+    """
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    fetched_at = time.time()
+    data = _set_local_sheet_data(cache_key, data, fetched_at, revision)
+    _queue_persist(sheet_id, worksheet_name, data, fetched_at, revision)
+    return data
+
+
+def get_revalidation_source(sheet_id, worksheet_name):
+    """
+    Data + revision terakhir yang diketahui (berapapun umurnya) untuk conditional refresh:
+    L1, lalu tier bersama, lalu snapshot disk. Returns: (data, revision) atau None.
+    """
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _gsheet_cache_lock:
+        entry = _gsheet_cache.get(cache_key)
+        if entry is not None and _revisions.get(cache_key):
+            return entry[0], _revisions[cache_key]
+    try:
+        shared = shared_cache.shared_get(sheet_id, worksheet_name)
+        if shared is not None and shared[2]:
+            return shared[0], shared[2]
+    except Exception as e:
+        _shared_stats["shared_errors"] += 1
+        print(f"[SHARED] Gagal membaca {cache_key}: {e}")
+    try:
+        snap = snapshot_store.load_snapshot(sheet_id, worksheet_name)
+        if snap is not None and snap.get('revision'):
+            return snap['data'], snap['revision']
+    except Exception as e:
+        print(f"[SNAPSHOT] Gagal membaca {cache_key}: {e}")
+    return None
+
+
+def renew_cached_sheet_data(sheet_id, worksheet_name, data, revision):
+    """
+    Sumber tidak berubah: perpanjang TTL tanpa mengganti objek data (agregat turunan yang
+    di-cache per objek data tetap valid). Tier bersama & snapshot ikut diperbarui timestamp-nya
+    (writer background). Returns: data versi cache.
+    """
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    fetched_at = time.time()
+    data = _set_local_sheet_data(cache_key, data, fetched_at, revision)
+    _queue_persist(sheet_id, worksheet_name, data, fetched_at, revision, renew=True)
+    if VERBOSE_LOG:
+        print(f"[CACHE] RENEWED {cache_key} (sumber tidak berubah)")
+    return data
+
+
+def load_persistent_snapshots():
+    """
+    Muat snapshot disk ke L1 saat startup. Snapshot yang masih dalam TTL dipakai apa adanya;
+    yang sudah lewat TTL dilayani sebagai stale (jika SWR aktif) dan langsung dijadwalkan
+    revalidasi di background. Returns: jumlah worksheet yang dimuat.
+    """
+    try:
+        snapshots = snapshot_store.load_all_snapshots()
+    except Exception as e:
+        print(f"[SNAPSHOT] Gagal memuat snapshot: {e}")
+        return 0
+    now = time.time()
+    loaded = 0
+    for snap in snapshots:
+        sheet_id, worksheet_name = snap['sheet_id'], snap['worksheet']
+        cache_key = f"{sheet_id}:{worksheet_name}"
+        age = now - snap['fetched_at']
+        if age >= _GSHEET_CACHE_TTL and not _GSHEET_CACHE_SWR:
+            continue
+        try:
+            # Worker lain mungkin sudah punya versi lebih baru di tier bersama
+            shared_ts = shared_cache.shared_get_fetched_at(sheet_id, worksheet_name)
+        except Exception:
+            shared_ts = None
+        if shared_ts is not None and shared_ts >= snap['fetched_at']:
+            continue
+        # Snapshot lama di-clamp menjadi "baru saja expired" agar tetap dilayani selama revalidasi
+        served_ts = snap['fetched_at'] if age < _GSHEET_CACHE_TTL else now - _GSHEET_CACHE_TTL
+        _set_local_sheet_data(cache_key, snap['data'], served_ts, snap.get('revision'))
+        if age >= _GSHEET_CACHE_TTL:
+            with _gsheet_cache_lock:
+                _schedule_refresh_locked(cache_key)
+        loaded += 1
+    if snapshots:
+        print(f"[SNAPSHOT] Loaded {loaded}/{len(snapshots)} worksheet snapshot dari disk")
+    return loaded
+
+
+def claim_sheet_fetch(sheet_id, worksheet_name, force=False):
+    """
+    Daftarkan niat fetch worksheet yang cache MISS.
+
+    Returns: (future, is_leader). Jika is_leader True, caller WAJIB memanggil complete_sheet_fetch()
+    untuk key ini. Jika False, tunggu future.result() (fetch sedang berjalan di thread lain, atau
+    data sudah masuk cache sejak MISS pertama dicek). force=True dipakai background refresh
+    (entry masih fresh tapi tetap harus di-reload).
+    """
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _gsheet_cache_lock:
+        future = _inflight.get(cache_key)
+        if future is not None:
+            _singleflight_stats["coalesced"] += 1
+            if VERBOSE_LOG:
+                print(f"[CACHE] COALESCED {cache_key} (menunggu fetch yang sedang berjalan)")
+            return future, False
+        # Cek ulang: leader sebelumnya mungkin baru selesai setelah caller mengalami MISS
+        entry = _gsheet_cache.get(cache_key)
+        if not force and entry and time.time() - entry[1] < _GSHEET_CACHE_TTL:
+            future = Future()
+            future.set_result((worksheet_name, entry[0]))
+            return future, False
+        future = Future()
+        _inflight[cache_key] = future
+        _singleflight_stats["fetches"] += 1
+    return future, True
+
+
+def complete_sheet_fetch(sheet_id, worksheet_name, result=None, error=None):
+    """Selesaikan fetch milik leader: bangunkan semua waiter dengan result (loaded_name, data) atau error."""
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _gsheet_cache_lock:
+        future = _inflight.pop(cache_key, None)
+        if error is not None:
+            _singleflight_stats["failed"] += 1
+    if future is None or future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def wait_sheet_fetch(sheet_id, worksheet_name, future):
+    """Tunggu hasil fetch (leader maupun coalesced) dengan batas GSHEET_SINGLEFLIGHT_TIMEOUT."""
+    try:
+        return future.result(timeout=_GSHEET_SINGLEFLIGHT_TIMEOUT)
+    except FutureTimeoutError:
+        with _gsheet_cache_lock:
+            _singleflight_stats["timeouts"] += 1
+        raise Exception(f"Timeout {_GSHEET_SINGLEFLIGHT_TIMEOUT}s menunggu fetch {sheet_id}:{worksheet_name}")
+
+
+def get_singleflight_stats():
+    with _gsheet_cache_lock:
+        stats = dict(_singleflight_stats)
+        stats["inflight"] = list(_inflight.keys())
+    return stats
+
+
+def get_shared_tier_status():
+    """Status tier bersama (global untuk semua worker) + statistik worker yang menjawab."""
+    try:
+        status = shared_cache.get_shared_cache_status()
+    except Exception as e:
+        status = {"enabled": shared_cache.SHARED_CACHE_ENABLED, "error": str(e)}
+    status["worker_pid"] = os.getpid()
+    status["worker_generation"] = _local_generation
+    status["worker_stats"] = dict(_shared_stats)
+    status["worker_persist"] = get_persist_stats()
+    return status
+
+
+def get_swr_stats():
+    with _gsheet_cache_lock:
+        stats = dict(_swr_stats)
+        stats["enabled"] = _GSHEET_CACHE_SWR
+        stats["max_staleness_seconds"] = _GSHEET_CACHE_MAX_STALENESS
+        stats["refresh_ahead_seconds"] = _GSHEET_CACHE_REFRESH_AHEAD
+        stats["pending"] = sorted(_refresh_pending)
+    return stats
+
+
+def invalidate_cached_sheet_data(sheet_id, worksheet_name):
+    """Buang satu worksheet dari L1, tier bersama & snapshot (mis. setelah aplikasi menulis ke worksheet itu)."""
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _gsheet_cache_lock:
+        _drop_entry_locked(cache_key, "invalidated")
+    with _persist_io_lock:
+        # Job tulis yang belum jalan dibuang agar tidak menghidupkan lagi data yang di-invalidate
+        with _persist_lock:
+            _persist_pending.pop(cache_key, None)
+        try:
+            shared_cache.shared_delete(sheet_id, worksheet_name)
+        except Exception as e:
+            _shared_stats["shared_errors"] += 1
+            print(f"[SHARED] Gagal menghapus {cache_key}: {e}")
+        try:
+            snapshot_store.delete_snapshot(sheet_id, worksheet_name)
+        except Exception as e:
+            print(f"[SNAPSHOT] Gagal menghapus {cache_key}: {e}")
+    if VERBOSE_LOG:
+        print(f"[CACHE] INVALIDATED {cache_key}")
+
+
+def clear_gsheet_cache():
+    global _local_generation
+    with _gsheet_cache_lock:
+        _drop_all_locked("cleared")
+        if VERBOSE_LOG:
+            print("[CACHE] CLEARED")
+    with _persist_io_lock:
+        with _persist_lock:
+            _persist_pending.clear()
+        # ADDITIVE: Clear tier bersama + naikkan generation agar worker lain ikut membuang L1
+        try:
+            generation = shared_cache.shared_clear()
+            if generation is not None:
+                with _gsheet_cache_lock:
+                    _local_generation = generation
+        except Exception as e:
+            _shared_stats["shared_errors"] += 1
+            print(f"[SHARED] Gagal clear tier bersama: {e}")
+        try:
+            snapshot_store.clear_snapshots()
+        except Exception as e:
+            print(f"[SNAPSHOT] Gagal menghapus snapshot: {e}")
+    # ADDITIVE: Metadata worksheet ikut di-invalidate agar tab baru/rename langsung terlihat
+    from services.sheet_metadata import invalidate_spreadsheet_metadata
+    invalidate_spreadsheet_metadata()
+
+
+def get_gsheet_cache_status():
+    """List status per entry cache untuk endpoint /cache/status."""
+    with _gsheet_cache_lock:
+        status = []
+        now = time.time()
+        for key, (data, ts) in _gsheet_cache.items():
+            sheet_id, worksheet_name = key.split(':', 1)
+            age = now - ts
+            policy_entry = _policy.entries.get(key, {})
+            status.append({
+                "sheet_id": sheet_id,
+                "worksheet": worksheet_name,
+                "rows": len(data),
+                "age_seconds": age,
+                "ttl_seconds": _GSHEET_CACHE_TTL,
+                "expired": age > _GSHEET_CACHE_TTL,
+                "stale_servable": _GSHEET_CACHE_SWR and _GSHEET_CACHE_TTL < age < _GSHEET_CACHE_TTL + _GSHEET_CACHE_MAX_STALENESS,
+                "hits": _access_stats.get(key, [0, None])[0],
+                "total_hits": policy_entry.get("hits", 0),
+                "bytes": policy_entry.get("bytes", 0),
+                "pinned": policy_entry.get("pinned", False),
+                "last_access_seconds_ago": now - policy_entry["last_access"] if policy_entry else None,
+                "typed": data.memory_info() if isinstance(data, WorksheetTable) else None
+            })
+    return status
+
+
+def get_cache_policy_status():
+    """Budget, policy & riwayat eviction L1 untuk endpoint /cache/status."""
+    with _gsheet_cache_lock:
+        return _policy.status()
+
+
+def pin_cache_entry(sheet_id, worksheet_name, pinned=True):
+    """Pin (atau unpin) worksheet agar tidak di-evict karena budget; berlaku juga untuk entry yang belum di-cache."""
+    cache_key = f"{sheet_id}:{worksheet_name}"
+    with _gsheet_cache_lock:
+        _policy.set_pinned(cache_key, pinned)
+        if not pinned:
+            _evict_locked(None)
+    print(f"[CACHE] {'PINNED' if pinned else 'UNPINNED'} {cache_key}")
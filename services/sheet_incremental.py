@@ -0,0 +1,111 @@
+"""
+services/sheet_incremental.py
+Ingestion incremental untuk worksheet append-only (export harian Facebook Ads).
+
+Setiap download penuh menyimpan watermark (jumlah baris mentah yang sudah di-ingest + header)
+di revision worksheet. Saat worksheet berubah, sebelum download penuh dicek:
+- kolom A sampai watermark masih sama (crc) dan bertambah panjang,
+- header dan baris di posisi watermark tidak berubah.
+Jika lolos, hanya range baris baru (watermark+1 .. baris terakhir) yang diambil lalu di-append
+ke data yang sudah ada. Jika tidak (ada edit/hapus di atas watermark), caller melakukan download
+penuh seperti biasa. Edit di luar kolom A di tengah sheet tetap tertangkap oleh download penuh
+berkala (GSHEET_REVISION_MAX_SKIP).
+"""
+import os
+
+from gspread.utils import absolute_range_name, numericise_all
+
+from services.sheet_revision import crc_values, fetch_columns, fingerprint_from_parts
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+INCREMENTAL_ENABLED = os.environ.get('GSHEET_INCREMENTAL', '1') in ['1', 'true', 'True']
+
+_incremental_stats = {"appends": 0, "rows_appended": 0, "fallback_full_reload": 0}
+
+
+def records_from_tail(header, rows):
+    """Baris baru -> records dengan semantik get_all_records(head=1). None jika baris lebih lebar dari header."""
+    width = len(header)
+    records = []
+    for row in rows:
+        if len(row) > width:
+            return None
+        padded = list(row) + [""] * (width - len(row))
+        records.append(dict(zip(header, numericise_all(padded, False, "", False, []))))
+    return records
+
+
+def try_incremental_append(sh, sources, columns=None):
+    """
+    Coba append baris baru untuk worksheet yang berubah.
+
+    sources: {ws_name: (data lama, revision lama)}
+    columns: {ws_name: kolom A terkini} hasil cek fingerprint (yang belum ada diambil di sini).
+    Returns: {ws_name: (data baru, fingerprint baru, watermark baru)} hanya untuk worksheet yang
+    berhasil di-append; sisanya harus di-download penuh oleh caller.
+    """
+    if not INCREMENTAL_ENABLED:
+        return {}
+    eligible = {
+        ws_name: (data, rev) for ws_name, (data, rev) in sources.items()
+        if rev and rev.get('watermark') and rev.get('fingerprint')
+    }
+    if not eligible:
+        return {}
+    columns = dict(columns or {})
+    missing = [ws_name for ws_name in eligible if ws_name not in columns]
+    if missing:
+        columns.update(fetch_columns(sh, missing))
+
+    plans = {}
+    for ws_name, (data, rev) in eligible.items():
+        watermark_rows = rev['watermark']['rows']
+        column = columns.get(ws_name, [])
+        crc_column = rev['fingerprint'].split(':')[1]
+        if len(column) <= watermark_rows or str(crc_values(column[:watermark_rows])) != crc_column:
+            # Tidak ada baris baru, atau kolom A di atas watermark berubah (edit/hapus/sisip)
+            continue
+        plans[ws_name] = (watermark_rows, len(column))
+    _incremental_stats["fallback_full_reload"] += len(eligible) - len(plans)
+    if not plans:
+        return {}
+
+    ranges = []
+    for ws_name, (watermark_rows, last_row) in plans.items():
+        ranges.append(absolute_range_name(ws_name, '1:1'))
+        ranges.append(absolute_range_name(ws_name, f"{watermark_rows}:{watermark_rows}"))
+        ranges.append(absolute_range_name(ws_name, f"{watermark_rows + 1}:{last_row}"))
+    value_ranges = sh.values_batch_get(ranges).get('valueRanges', [])
+
+    results = {}
+    for idx, (ws_name, (watermark_rows, last_row)) in enumerate(plans.items()):
+        data, rev = eligible[ws_name]
+        header_values, watermark_values, tail = [
+            value_range.get('values', []) for value_range in value_ranges[idx * 3:idx * 3 + 3]
+        ]
+        header = list(header_values[0]) if header_values else []
+        watermark_row = list(watermark_values[0]) if watermark_values else []
+        crc_last = rev['fingerprint'].split(':')[2]
+        if header != rev['watermark']['header'] or str(crc_values(watermark_row)) != crc_last \
+                or len(tail) != last_row - watermark_rows:
+            _incremental_stats["fallback_full_reload"] += 1
+            continue
+        new_records = records_from_tail(header, tail)
+        if new_records is None:
+            _incremental_stats["fallback_full_reload"] += 1
+            continue
+        for row in new_records:
+            row['worksheet'] = ws_name
+        fingerprint = fingerprint_from_parts(columns[ws_name], tail[-1])
+        # List baru (bukan extend in-place): request lain mungkin sedang membaca list lama
+        results[ws_name] = (data + new_records, fingerprint, {"rows": last_row, "header": header})
+        _incremental_stats["appends"] += 1
+        _incremental_stats["rows_appended"] += len(new_records)
+        print(f"[INCREMENTAL] '{ws_name}' di '{sh.title}': +{len(new_records)} baris baru (watermark {watermark_rows} -> {last_row})")
+    return results
+
+
+def get_incremental_stats():
+    stats = dict(_incremental_stats)
+    stats["enabled"] = INCREMENTAL_ENABLED
+    return stats
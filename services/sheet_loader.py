@@ -0,0 +1,465 @@
+"""
+services/sheet_loader.py
+Bulk loader worksheet Google Sheets.
+
+Semua worksheet yang lolos WORKSHEET_WHITELIST dalam satu spreadsheet diambil sekaligus lewat
+satu request values:batchGet, lalu dipecah menjadi record per worksheet dengan semantik yang
+sama seperti ws.get_all_records(head=1). Beberapa spreadsheet di-load paralel lewat
+load_sheet_sources() di thread pool terbatas (GSHEET_LOADER_WORKERS).
+"""
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from gspread.exceptions import GSpreadException
+from gspread.utils import absolute_range_name, fill_gaps, numericise_all, to_records
+
+from services.sheet_incremental import try_incremental_append
+from services.sheet_revision import build_revision, describe_values, find_unchanged_worksheets
+
+_worksheet_whitelist = None
+_worksheet_whitelist_resolved = False
+
+
+def get_worksheet_whitelist():
+    """
+    Resolve pola WORKSHEET_WHITELIST sekali per proses (lowercase, case-insensitive).
+    Return None jika WORKSHEET_WHITELIST='*' (load semua worksheet, behavior lama).
+    """
+    global _worksheet_whitelist, _worksheet_whitelist_resolved
+    if not _worksheet_whitelist_resolved:
+        worksheet_whitelist_env = os.getenv('WORKSHEET_WHITELIST', 'age gender,region')
+        if worksheet_whitelist_env.strip() == '*':
+            _worksheet_whitelist = None
+        else:
+            _worksheet_whitelist = [pattern.strip().lower() for pattern in worksheet_whitelist_env.split(',')]
+        _worksheet_whitelist_resolved = True
+    return _worksheet_whitelist
+
+
+def is_worksheet_whitelisted(ws_name, whitelist=None):
+    if whitelist is None:
+        return True
+    ws_name_lower = ws_name.lower()
+    return any(pattern in ws_name_lower for pattern in whitelist)
+
+
+def filter_whitelisted_worksheets(worksheet_names, whitelist=None):
+    """Filter daftar judul worksheet dengan pola whitelist (urutan dipertahankan)."""
+    return [ws_name for ws_name in worksheet_names if is_worksheet_whitelisted(ws_name, whitelist)]
+
+
+def records_from_values(values):
+    """Konversi value range mentah (baris pertama = header) menjadi list of dict ala get_all_records(head=1)."""
+    if not values:
+        return []
+    try:
+        values = fill_gaps(values)
+    except KeyError:
+        return []
+    if values == [[]]:
+        return []
+    keys = values[0]
+    counts = Counter(keys)
+    duplicates = [item for item in counts if counts[item] > 1]
+    if duplicates:
+        raise GSpreadException(f"the header row in the worksheet contains duplicates: {duplicates}")
+    rows = [numericise_all(row, False, "", False, []) for row in values[1:]]
+    return to_records(keys, rows)
+
+
+def batch_get_worksheet_records(sh, worksheet_names, revision_info=None):
+    """
+    Ambil beberapa worksheet dalam SATU call values:batchGet.
+
+    Returns: dict {ws_name: records} atau {ws_name: Exception} jika parsing satu worksheet gagal
+    (worksheet lain tetap terisi). Exception dari API (misal range tidak valid) di-raise ke caller.
+    Jika revision_info (dict) diberikan, diisi fingerprint + watermark per worksheet dari nilai mentah.
+    """
+    if not worksheet_names:
+        return {}
+    ranges = [absolute_range_name(ws_name) for ws_name in worksheet_names]
+    response = sh.values_batch_get(ranges)
+    value_ranges = response.get('valueRanges', [])
+    results = {}
+    for ws_name, value_range in zip(worksheet_names, value_ranges):
+        if revision_info is not None:
+            revision_info[ws_name] = describe_values(value_range.get('values', []))
+        try:
+            results[ws_name] = records_from_values(value_range.get('values', []))
+        except Exception as e:
+            results[ws_name] = e
+    print(f"[LOADER] batchGet {len(worksheet_names)} worksheet dari '{sh.title}' dalam 1 request")
+    return results
+
+
+# ADDITIVE: Loader paralel lintas spreadsheet & worksheet (bounded thread pool)
+_LOADER_WORKERS = int(os.environ.get('GSHEET_LOADER_WORKERS', 8))
+# Jumlah worksheet per request batchGet (0 = semua worksheet MISS dalam satu batch per spreadsheet)
+_BATCH_CHUNK_SIZE = int(os.environ.get('GSHEET_BATCH_CHUNK_SIZE', 0))
+
+_loader_pool = None
+_loader_pool_lock = threading.Lock()
+
+
+def _get_loader_pool():
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is None:
+            _loader_pool = ThreadPoolExecutor(max_workers=max(1, _LOADER_WORKERS), thread_name_prefix="gsheet-loader")
+        return _loader_pool
+
+
+def fetch_worksheet_single(sh, sheet_id, ws_name):
+    """Jalur lama per-worksheet (dipakai jika batchGet gagal): fallback ke worksheet pertama jika tidak ditemukan."""
+    from services.sheet_metadata import invalidate_spreadsheet_metadata
+    ws = None
+    try:
+        ws = sh.worksheet(ws_name)
+    except Exception as e_ws:
+        print(f'[DEBUG] Worksheet "{ws_name}" not found in sheet "{sheet_id}", fallback ke worksheet pertama. Error: {e_ws}')
+        invalidate_spreadsheet_metadata(sheet_id)  # Metadata basi (tab di-rename/dihapus)
+        worksheets = sh.worksheets()
+        if worksheets:
+            ws = worksheets[0]
+            ws_name = ws.title
+            print(f'[DEBUG] Fallback: Using first worksheet "{ws_name}" from sheet "{sheet_id}"')
+    if not ws:
+        print(f'[DEBUG] Tidak ada worksheet valid di sheet "{sheet_id}"')
+        return ws_name, None
+    return ws_name, ws.get_all_records(head=1)
+
+
+def _download_worksheets(sheet_id, worksheet_names, results):
+    """
+    Download worksheet dari Google Sheets (satu batchGet), simpan ke cache, isi results & selesaikan Future.
+
+    ADDITIVE: Worksheet yang sudah punya data + revision dicek dulu (Drive modifiedTime / fingerprint);
+    jika tidak berubah, TTL cukup diperpanjang tanpa download ulang.
+    """
+    from routes.sheet_routes import get_gsheet_by_id
+    from services.sheet_cache import (
+        set_cached_sheet_data, complete_sheet_fetch, get_revalidation_source, renew_cached_sheet_data
+    )
+    from services.sheet_metadata import invalidate_spreadsheet_metadata
+
+    sh = get_gsheet_by_id(sheet_id)
+
+    previous = {}
+    for ws_name in worksheet_names:
+        source = get_revalidation_source(sheet_id, ws_name)
+        if source is not None and source[1]:
+            previous[ws_name] = source
+    unchanged, drive_time, columns = find_unchanged_worksheets(sh, {ws_name: rev for ws_name, (data, rev) in previous.items()})
+    for ws_name, revision in unchanged.items():
+        data = renew_cached_sheet_data(sheet_id, ws_name, previous[ws_name][0], revision)
+        results[ws_name] = (ws_name, data)
+        complete_sheet_fetch(sheet_id, ws_name, result=results[ws_name])
+    worksheet_names = [ws_name for ws_name in worksheet_names if ws_name not in unchanged]
+
+    # ADDITIVE: Worksheet append-only - ambil hanya baris baru setelah watermark
+    changed_sources = {ws_name: previous[ws_name] for ws_name in worksheet_names if ws_name in previous}
+    try:
+        appended = try_incremental_append(sh, changed_sources, columns) if changed_sources else {}
+    except Exception as e:
+        print(f'[INCREMENTAL] Gagal append incremental untuk sheet "{sheet_id}", fallback download penuh. Error: {e}')
+        appended = {}
+    for ws_name, (data, fingerprint, watermark) in appended.items():
+        # downloaded_at tidak diperbarui: download penuh tetap dipaksa tiap GSHEET_REVISION_MAX_SKIP
+        revision = build_revision(drive_time, fingerprint, previous[ws_name][1].get('downloaded_at'), watermark)
+        data = set_cached_sheet_data(sheet_id, ws_name, data, revision=revision)
+        results[ws_name] = (ws_name, data)
+        complete_sheet_fetch(sheet_id, ws_name, result=results[ws_name])
+    worksheet_names = [ws_name for ws_name in worksheet_names if ws_name not in appended]
+    if not worksheet_names:
+        return
+
+    revision_info = {}
+    try:
+        fetched = batch_get_worksheet_records(sh, worksheet_names, revision_info=revision_info)
+        fetched = {ws_name: (ws_name, data) for ws_name, data in fetched.items()}
+    except Exception as e:
+        # Range tidak valid (tab di-rename/dihapus) membuat seluruh batch gagal - pakai jalur lama per worksheet
+        print(f'[DEBUG] batchGet gagal untuk sheet "{sheet_id}", fallback per worksheet. Error: {e}')
+        invalidate_spreadsheet_metadata(sheet_id)
+        fetched = {}
+        for ws_name in worksheet_names:
+            try:
+                fetched[ws_name] = fetch_worksheet_single(sh, sheet_id, ws_name)
+            except Exception as e_single:
+                fetched[ws_name] = (ws_name, e_single)
+
+    for ws_name in worksheet_names:
+        loaded_name, data = fetched.get(ws_name, (ws_name, None))
+        if isinstance(data, Exception):
+            print(f'[DEBUG] Worksheet "{ws_name}" gagal di-load dari sheet "{sheet_id}", skipping. Error: {data}')
+            data = None
+        if data is None:
+            results[ws_name] = (loaded_name, [])
+        else:
+            for row in data:
+                row['worksheet'] = loaded_name
+            info = revision_info.get(loaded_name) if loaded_name == ws_name else None
+            revision = build_revision(drive_time, info['fingerprint'], watermark=info['watermark']) if info else None
+            data = set_cached_sheet_data(sheet_id, loaded_name, data, revision=revision)
+            print(f'[DEBUG] Loaded worksheet "{loaded_name}" from sheet "{sheet_id}" with {len(data)} rows.')
+            results[ws_name] = (loaded_name, data)
+        complete_sheet_fetch(sheet_id, ws_name, result=results[ws_name])
+
+
+def _fetch_worksheet_chunk(sheet_id, worksheet_names):
+    """
+    Ambil sekelompok worksheet yang cache MISS (satu values:batchGet), tag kolom 'worksheet',
+    lalu simpan ke cache. Caller adalah leader single-flight untuk semua worksheet_names:
+    setiap key SELALU diselesaikan (complete_sheet_fetch) agar waiter tidak menggantung.
+
+    ADDITIVE: Sebelum download, cek tier bersama (worker lain di host yang sama). Worksheet yang
+    lease-nya dipegang worker lain ditunggu hasilnya, bukan di-download ulang.
+    Returns: dict {ws_name: (loaded_name, data)}; data = [] jika gagal.
+    """
+    from services import shared_cache
+    from services.sheet_cache import complete_sheet_fetch, adopt_shared_entry, get_local_fetched_at, release_lease_after_persist
+
+    results = {}
+    leased = []
+    try:
+        waiting = []
+        for ws_name in worksheet_names:
+            local_ts = get_local_fetched_at(sheet_id, ws_name)
+            data = adopt_shared_entry(sheet_id, ws_name, newer_than=local_ts)
+            if data is not None:
+                results[ws_name] = (ws_name, data)
+                complete_sheet_fetch(sheet_id, ws_name, result=results[ws_name])
+            elif shared_cache.try_acquire_lease(sheet_id, ws_name):
+                leased.append(ws_name)
+            else:
+                waiting.append((ws_name, local_ts))
+
+        if leased:
+            _download_worksheets(sheet_id, leased, results)
+
+        timed_out = []
+        for ws_name, local_ts in waiting:
+            print(f'[SHARED] Worksheet "{ws_name}" sedang di-download worker lain, menunggu hasilnya')
+            data = None
+            if shared_cache.wait_for_shared_entry(sheet_id, ws_name, newer_than=local_ts) is not None:
+                data = adopt_shared_entry(sheet_id, ws_name, newer_than=local_ts)
+            if data is None:
+                timed_out.append(ws_name)
+                continue
+            results[ws_name] = (ws_name, data)
+            complete_sheet_fetch(sheet_id, ws_name, result=results[ws_name])
+        if timed_out:
+            _download_worksheets(sheet_id, timed_out, results)
+    except Exception as e:
+        for ws_name in worksheet_names:
+            if ws_name not in results:
+                complete_sheet_fetch(sheet_id, ws_name, error=e)
+        raise
+    finally:
+        for ws_name in leased:
+            # Lease dilepas setelah writer background menulis hasilnya ke tier bersama
+            release_lease_after_persist(sheet_id, ws_name)
+    return results
+
+
+def refresh_worksheets(sheet_id, worksheet_names):
+    """
+    Reload worksheet untuk background refresh (stale-while-revalidate). Worksheet yang sudah
+    di-fetch thread lain dilewati. Returns: jumlah worksheet yang berhasil di-reload.
+    """
+    from services.sheet_cache import claim_sheet_fetch
+    owned = []
+    for ws_name in worksheet_names:
+        future, is_leader = claim_sheet_fetch(sheet_id, ws_name, force=True)
+        if is_leader:
+            owned.append(ws_name)
+    if not owned:
+        return 0
+    results = _fetch_worksheet_chunk(sheet_id, owned)
+    # Worksheet gagal (data kosong) tidak ditulis ke cache, entry lama tetap dilayani
+    return sum(1 for loaded_name, data in results.values() if data)
+
+
+def warm_worksheets(sheet_ids, worksheets=None, force=False, whitelist=None):
+    """
+    Prefetch worksheet (lolos whitelist) ke cache untuk warm-up (services/cache_warmup.py).
+
+    worksheets: judul worksheet yang ditarget (case-insensitive, exact); None = semua yang lolos whitelist.
+    force=True: reload walau entry masih fresh (setelah data push) - worksheet yang tidak berubah
+    tetap hanya diperpanjang lewat cek revision. Spreadsheet di-warm paralel di pool loader.
+    Returns: {sheet_id: {"worksheets", "fetched", "cached", "rows"} atau {"error"}}
+    """
+    from services.sheet_cache import get_cached_sheet_data
+    from services.sheet_metadata import get_worksheet_titles, invalidate_spreadsheet_metadata
+
+    targets = {name.strip().lower() for name in worksheets} if worksheets else None
+
+    def warm_sheet(sheet_id):
+        if force:
+            invalidate_spreadsheet_metadata(sheet_id)  # Tab baru dari data push ikut terlihat
+        names = filter_whitelisted_worksheets(get_worksheet_titles(sheet_id), whitelist)
+        if targets is not None:
+            names = [ws_name for ws_name in names if ws_name.lower() in targets]
+        missing = names if force else [ws_name for ws_name in names if get_cached_sheet_data(sheet_id, ws_name) is None]
+        fetched = refresh_worksheets(sheet_id, missing) if missing else 0
+        rows = 0
+        for ws_name in names:
+            data = get_cached_sheet_data(sheet_id, ws_name)
+            rows += len(data) if data is not None else 0
+        return {"worksheets": names, "fetched": fetched, "cached": len(names) - len(missing), "rows": rows}
+
+    pool = _get_loader_pool()
+    futures = {sheet_id: pool.submit(warm_sheet, sheet_id) for sheet_id in dict.fromkeys(sheet_ids) if sheet_id}
+    results = {}
+    for sheet_id, future in futures.items():
+        try:
+            results[sheet_id] = future.result()
+        except Exception as e:
+            print(f'[WARMUP] Gagal warm-up sheet "{sheet_id}": {e}')
+            results[sheet_id] = {"error": str(e)}
+    return results
+
+
+def load_worksheet(sheet_id, ws_name):
+    """
+    Satu worksheet (tanpa filter whitelist) lewat cache + single-flight, untuk route sheet/chart.
+    Worksheet yang tidak ditemukan jatuh ke worksheet pertama (fetch_worksheet_single).
+    Returns: (loaded_name, data)
+    """
+    from services.sheet_cache import get_cached_sheet_data, claim_sheet_fetch, wait_sheet_fetch
+    data = get_cached_sheet_data(sheet_id, ws_name)
+    if data is not None:
+        return ws_name, data
+    future, is_leader = claim_sheet_fetch(sheet_id, ws_name)
+    if is_leader:
+        try:
+            _fetch_worksheet_chunk(sheet_id, [ws_name])
+        except Exception as e:
+            # Future sudah diselesaikan dengan error oleh _fetch_worksheet_chunk; wait di bawah me-raise-nya
+            print(f'[ERROR] Gagal load worksheet "{ws_name}" dari sheet "{sheet_id}": {e}')
+    return wait_sheet_fetch(sheet_id, ws_name, future)
+
+
+def _chunk_names(worksheet_names):
+    if _BATCH_CHUNK_SIZE <= 0:
+        return [worksheet_names] if worksheet_names else []
+    return [worksheet_names[i:i + _BATCH_CHUNK_SIZE] for i in range(0, len(worksheet_names), _BATCH_CHUNK_SIZE)]
+
+
+def load_sheet_sources(sheet_ids, whitelist=None):
+    """
+    Load semua worksheet (lolos whitelist) dari beberapa spreadsheet secara paralel.
+    Returns: (all_data, worksheet_row_meta) - all_data berupa RowSelection (services/row_selection.py)
+    atas partisi load_sheet_partitions() berurutan, tanpa menyalin baris ke list gabungan.
+    """
+    from services.row_selection import RowSelection
+    partitions, errors = load_sheet_partitions(sheet_ids, whitelist)
+    worksheet_row_meta = []
+    for sheet_id, loaded_name, data in partitions:
+        worksheet_row_meta.append({
+            'sheet_id': sheet_id,
+            'worksheet': loaded_name,
+            'row_count': len(data)
+        })
+        print(f'[DEBUG] worksheet_row_meta appended: sheet_id={sheet_id}, worksheet={loaded_name}, row_count={len(data)}')
+    all_data = RowSelection.from_partitions({(sheet_id, loaded_name): data for sheet_id, loaded_name, data in partitions})
+    return all_data, worksheet_row_meta
+
+
+def load_sheet_partitions(sheet_ids, whitelist=None):
+    """
+    Load semua worksheet (lolos whitelist) dari beberapa spreadsheet secara paralel, per worksheet.
+
+    Tahap 1: daftar worksheet tiap spreadsheet di-resolve bersamaan (metadata cache).
+    Tahap 2: worksheet cache MISS di-fetch per chunk batchGet di thread pool yang sama.
+    Task di pool tidak pernah menunggu task lain, jadi pool terbatas aman dari deadlock.
+    Hasil berurutan (urutan sheet_ids lalu urutan tab) sehingga sama persis dengan loop
+    sekuensial lama; error satu sumber hanya men-skip sumber itu.
+
+    Returns: (partitions, errors) dengan partitions = [(sheet_id, loaded_name, data), ...] dan
+    errors = {sheet_id atau "sheet_id:worksheet": pesan error}
+    """
+    from services.sheet_cache import get_cached_sheet_data, claim_sheet_fetch, complete_sheet_fetch, wait_sheet_fetch
+    from services.sheet_metadata import get_worksheet_titles
+
+    started = time.time()
+    pool = _get_loader_pool()
+    active_ids = []
+    errors = {}
+    for idx, sheet_id in enumerate(sheet_ids):
+        if not sheet_id:
+            print(f'[DEBUG] sheet_id kosong pada iterasi ke-{idx+1}, skip')
+            continue
+        if sheet_id not in active_ids:
+            active_ids.append(sheet_id)
+
+    # Tahap 1: daftar worksheet per spreadsheet
+    title_futures = {sheet_id: pool.submit(get_worksheet_titles, sheet_id) for sheet_id in active_ids}
+    selected = {}
+    for sheet_id in active_ids:
+        try:
+            worksheet_names = title_futures[sheet_id].result()
+        except Exception as e:
+            print(f'[ERROR] Gagal mengambil daftar worksheet dari sheet "{sheet_id}": {e}')
+            errors[sheet_id] = str(e)
+            continue
+        print(f'[DEBUG] Sheet {sheet_id} worksheets: {worksheet_names}')
+        names = []
+        for ws_name in worksheet_names:
+            if not is_worksheet_whitelisted(ws_name, whitelist):
+                print(f'[DEBUG] SKIP worksheet "{ws_name}" - not matching whitelist patterns (case-insensitive): {whitelist}')
+                continue
+            names.append(ws_name)
+        selected[sheet_id] = names
+
+    # Tahap 2: cache HIT langsung dipakai, MISS di-fetch paralel per chunk.
+    # ADDITIVE: Single-flight - worksheet yang sedang di-fetch request lain tidak di-download ulang,
+    # cukup menunggu Future yang sama.
+    cached = {}
+    pending = {}
+    chunk_futures = []
+    owned_total = 0
+    for sheet_id, names in selected.items():
+        owned = []
+        for ws_name in names:
+            data = get_cached_sheet_data(sheet_id, ws_name)
+            if data is not None:
+                print(f'[DEBUG] Loaded worksheet "{ws_name}" from sheet "{sheet_id}" from cache with {len(data)} rows.')
+                cached[(sheet_id, ws_name)] = (ws_name, data)
+                continue
+            future, is_leader = claim_sheet_fetch(sheet_id, ws_name)
+            pending[(sheet_id, ws_name)] = future
+            if is_leader:
+                owned.append(ws_name)
+        owned_total += len(owned)
+        for chunk in _chunk_names(owned):
+            try:
+                chunk_futures.append(pool.submit(_fetch_worksheet_chunk, sheet_id, chunk))
+            except Exception as e:
+                for ws_name in chunk:
+                    complete_sheet_fetch(sheet_id, ws_name, error=e)
+
+    fetched = {}
+    for (sheet_id, ws_name), future in pending.items():
+        try:
+            fetched[(sheet_id, ws_name)] = wait_sheet_fetch(sheet_id, ws_name, future)
+        except Exception as e:
+            print(f'[ERROR] Gagal load worksheet "{ws_name}" dari sheet "{sheet_id}": {e}')
+            errors[f"{sheet_id}:{ws_name}"] = str(e)
+
+    # Urutan deterministik
+    partitions = []
+    rows = 0
+    for sheet_id, names in selected.items():
+        for ws_name in names:
+            entry = cached.get((sheet_id, ws_name)) or fetched.get((sheet_id, ws_name))
+            if entry is None:
+                continue
+            loaded_name, data = entry
+            partitions.append((sheet_id, loaded_name, data))
+            rows += len(data)
+    print(f"[LOADER] {len(active_ids)} spreadsheet, {len(chunk_futures)} batch fetch, {len(pending) - owned_total} coalesced, {rows} rows dalam {time.time() - started:.2f}s")
+    return partitions, errors
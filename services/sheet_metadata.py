@@ -0,0 +1,106 @@
+"""
+services/sheet_metadata.py
+Cache metadata spreadsheet (judul worksheet, gid, jumlah baris/kolom, header row).
+
+Dipakai chat() untuk mengetahui daftar worksheet tanpa memanggil sh.worksheets() di setiap
+request. TTL terpisah dari cache data worksheet (GSHEET_META_TTL).
+"""
+import os
+import threading
+import time
+
+from gspread.utils import absolute_range_name
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+_GSHEET_META_TTL = int(os.environ.get('GSHEET_META_TTL', 10 * 60))
+
+_meta_cache = {}  # sheet_id -> (metadata dict, fetched_at)
+_meta_lock = threading.Lock()
+
+
+def _fetch_spreadsheet_metadata(sheet_id):
+    """Ambil metadata dari Sheets API: 1 call properties + 1 call batchGet header row."""
+    from routes.sheet_routes import get_gsheet_by_id
+    sh = get_gsheet_by_id(sheet_id)
+    raw = sh.fetch_sheet_metadata()
+    worksheets = []
+    for sheet in raw.get('sheets', []):
+        props = sheet.get('properties', {})
+        grid = props.get('gridProperties', {})
+        worksheets.append({
+            'title': props.get('title'),
+            'sheet_id': props.get('sheetId'),
+            'index': props.get('index'),
+            'row_count': grid.get('rowCount', 0),
+            'col_count': grid.get('columnCount', 0),
+            'header': []
+        })
+    if worksheets:
+        ranges = [absolute_range_name(ws['title'], '1:1') for ws in worksheets]
+        response = sh.values_batch_get(ranges)
+        for ws, value_range in zip(worksheets, response.get('valueRanges', [])):
+            values = value_range.get('values', [])
+            ws['header'] = values[0] if values else []
+    return {
+        'sheet_id': sheet_id,
+        'title': raw.get('properties', {}).get('title'),
+        'worksheets': worksheets
+    }
+
+
+def get_spreadsheet_metadata(sheet_id, force_refresh=False):
+    """Metadata spreadsheet dari cache; fetch ulang jika belum ada, expired, atau force_refresh."""
+    now = time.time()
+    if not force_refresh:
+        with _meta_lock:
+            entry = _meta_cache.get(sheet_id)
+            if entry and now - entry[1] < _GSHEET_META_TTL:
+                if VERBOSE_LOG:
+                    print(f"[META] HIT for {sheet_id} (TTL: {_GSHEET_META_TTL}s)")
+                return entry[0]
+    if VERBOSE_LOG:
+        print(f"[META] MISS for {sheet_id} (TTL: {_GSHEET_META_TTL}s)")
+    metadata = _fetch_spreadsheet_metadata(sheet_id)
+    with _meta_lock:
+        _meta_cache[sheet_id] = (metadata, time.time())
+    print(f"[META] Loaded metadata for {sheet_id}: {len(metadata['worksheets'])} worksheets")
+    return metadata
+
+
+def get_worksheet_titles(sheet_id):
+    """Daftar judul worksheet (urut sesuai tab di spreadsheet)."""
+    metadata = get_spreadsheet_metadata(sheet_id)
+    return [ws['title'] for ws in sorted(metadata['worksheets'], key=lambda w: w.get('index') or 0)]
+
+
+def get_worksheet_metadata(sheet_id, worksheet_name):
+    """Metadata satu worksheet, atau None jika tidak ada di cache metadata."""
+    metadata = get_spreadsheet_metadata(sheet_id)
+    for ws in metadata['worksheets']:
+        if ws['title'] == worksheet_name:
+            return ws
+    return None
+
+
+def invalidate_spreadsheet_metadata(sheet_id=None):
+    """Hapus metadata satu spreadsheet (atau semua jika sheet_id None)."""
+    with _meta_lock:
+        if sheet_id is None:
+            _meta_cache.clear()
+        else:
+            _meta_cache.pop(sheet_id, None)
+    if VERBOSE_LOG:
+        print(f"[META] INVALIDATED {sheet_id or 'ALL'}")
+
+
+def get_metadata_cache_status():
+    now = time.time()
+    with _meta_lock:
+        return [{
+            "sheet_id": sheet_id,
+            "title": metadata.get('title'),
+            "worksheets": len(metadata.get('worksheets', [])),
+            "age_seconds": now - ts,
+            "ttl_seconds": _GSHEET_META_TTL,
+            "expired": now - ts > _GSHEET_META_TTL
+        } for sheet_id, (metadata, ts) in _meta_cache.items()]
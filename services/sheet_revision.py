@@ -0,0 +1,182 @@
+"""
+services/sheet_revision.py
+Deteksi perubahan worksheet sebelum download ulang (conditional refresh).
+
+Revision sebuah worksheet adalah dict:
+    {"drive": modifiedTime spreadsheet dari Drive API (atau None),
+     "fingerprint": "<jumlah baris>:<crc32 kolom A>:<crc32 baris terakhir>",
+     "downloaded_at": waktu download penuh terakhir,
+     "watermark": {"rows": jumlah baris mentah ter-ingest (termasuk header), "header": [...]} atau None}
+
+Urutan pengecekan saat TTL habis:
+1. Drive modifiedTime spreadsheet sama dengan saat download -> semua tab tidak berubah (1 call/spreadsheet).
+2. Jika berbeda (atau Drive API tidak tersedia): fingerprint per tab dari kolom A + baris terakhir
+   (2 call values:batchGet untuk semua tab) -> hanya tab yang fingerprint-nya berubah di-download.
+Fingerprint tidak melihat edit di tengah sheet di luar kolom A, jadi download penuh tetap dipaksa
+setelah GSHEET_REVISION_MAX_SKIP detik sejak download penuh terakhir.
+"""
+import os
+import time
+import zlib
+
+from gspread.utils import absolute_range_name
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+REVISION_CHECK_ENABLED = os.environ.get('GSHEET_REVISION_CHECK', '1') in ['1', 'true', 'True']
+DRIVE_REVISION_ENABLED = os.environ.get('GSHEET_REVISION_DRIVE', '1') in ['1', 'true', 'True']
+_REVISION_MAX_SKIP = int(os.environ.get('GSHEET_REVISION_MAX_SKIP', 24 * 60 * 60))
+
+_drive_unavailable = False
+_revision_stats = {"checks": 0, "unchanged": 0, "changed": 0, "drive_hits": 0, "fingerprint_checks": 0, "errors": 0}
+
+
+def crc_values(values):
+    return zlib.crc32(repr(values).encode('utf-8'))
+
+
+def _normalize_column(values):
+    column = [row[0] if row else '' for row in values]
+    while column and column[-1] == '':
+        column.pop()
+    return column
+
+
+def fingerprint_from_values(values):
+    """Fingerprint dari value range penuh (hasil download); harus identik dengan fetch_fingerprints()."""
+    column = _normalize_column(values or [])
+    last_row = list(values[len(column) - 1]) if column else []
+    return f"{len(column)}:{crc_values(column)}:{crc_values(last_row)}"
+
+
+def fingerprint_from_parts(column, last_row):
+    return f"{len(column)}:{crc_values(column)}:{crc_values(list(last_row))}"
+
+
+def watermark_from_values(values):
+    """
+    Watermark append-only: jumlah baris mentah + header. None jika baris terakhir tidak punya
+    kolom A (posisi watermark tidak bisa diverifikasi lewat kolom A).
+    """
+    if not values:
+        return None
+    column = _normalize_column(values)
+    if len(column) != len(values):
+        return None
+    # Baris lebih lebar dari header membuat get_all_records menambah key '' - tidak aman di-append
+    if any(len(row) > len(values[0]) for row in values):
+        return None
+    return {"rows": len(values), "header": list(values[0])}
+
+
+def describe_values(values):
+    """Info revision dari value range penuh: fingerprint + watermark."""
+    return {"fingerprint": fingerprint_from_values(values), "watermark": watermark_from_values(values)}
+
+
+def get_drive_modified_time(sh):
+    """modifiedTime spreadsheet dari Drive API; None jika Drive API tidak bisa dipakai."""
+    global _drive_unavailable
+    if not DRIVE_REVISION_ENABLED or _drive_unavailable:
+        return None
+    try:
+        return sh.get_lastUpdateTime()
+    except Exception as e:
+        # Biasanya Drive API belum di-enable di project: jangan coba lagi sampai proses restart
+        _drive_unavailable = True
+        print(f"[REVISION] Drive modifiedTime tidak tersedia, pakai fingerprint per worksheet. Error: {e}")
+        return None
+
+
+def fetch_columns(sh, worksheet_names):
+    """Kolom A (ter-normalisasi) semua worksheet dalam satu call batchGet."""
+    column_response = sh.values_batch_get([absolute_range_name(ws_name, 'A:A') for ws_name in worksheet_names])
+    columns = {}
+    for ws_name, value_range in zip(worksheet_names, column_response.get('valueRanges', [])):
+        columns[ws_name] = _normalize_column(value_range.get('values', []))
+    return columns
+
+
+def fetch_fingerprints(sh, worksheet_names, columns=None):
+    """Fingerprint semua worksheet dengan 2 call batchGet (kolom A, lalu baris terakhir)."""
+    if columns is None:
+        columns = {}
+    columns.update(fetch_columns(sh, worksheet_names))
+    with_rows = [ws_name for ws_name in worksheet_names if columns.get(ws_name)]
+    last_rows = {}
+    if with_rows:
+        row_ranges = [absolute_range_name(ws_name, f"{len(columns[ws_name])}:{len(columns[ws_name])}") for ws_name in with_rows]
+        row_response = sh.values_batch_get(row_ranges)
+        for ws_name, value_range in zip(with_rows, row_response.get('valueRanges', [])):
+            values = value_range.get('values', [])
+            last_rows[ws_name] = list(values[0]) if values else []
+    _revision_stats["fingerprint_checks"] += 1
+    return {
+        ws_name: f"{len(columns.get(ws_name, []))}:{crc_values(columns.get(ws_name, []))}:{crc_values(last_rows.get(ws_name, []))}"
+        for ws_name in worksheet_names
+    }
+
+
+def build_revision(drive_time, fingerprint, downloaded_at=None, watermark=None):
+    return {
+        "drive": drive_time,
+        "fingerprint": fingerprint,
+        "downloaded_at": downloaded_at if downloaded_at is not None else time.time(),
+        "watermark": watermark
+    }
+
+
+def find_unchanged_worksheets(sh, previous_revisions):
+    """
+    Bandingkan revision tersimpan dengan kondisi spreadsheet sekarang.
+
+    previous_revisions: {ws_name: revision dict}
+    Returns: (unchanged, drive_time, columns) dengan unchanged = {ws_name: revision baru} untuk worksheet
+    yang tidak perlu di-download ulang, drive_time untuk dipakai saat download penuh, dan columns =
+    kolom A yang sudah diambil saat cek fingerprint (dipakai ulang oleh ingestion incremental).
+    """
+    columns = {}
+    if not REVISION_CHECK_ENABLED:
+        return {}, None, columns
+    now = time.time()
+    candidates = {
+        ws_name: rev for ws_name, rev in previous_revisions.items()
+        if rev and now - rev.get('downloaded_at', 0) < _REVISION_MAX_SKIP
+    }
+    drive_time = get_drive_modified_time(sh)
+    if not candidates:
+        return {}, drive_time, columns
+    _revision_stats["checks"] += len(candidates)
+
+    unchanged = {}
+    if drive_time is not None:
+        for ws_name, rev in candidates.items():
+            if rev.get('drive') == drive_time:
+                unchanged[ws_name] = build_revision(drive_time, rev.get('fingerprint'), rev.get('downloaded_at'), rev.get('watermark'))
+        _revision_stats["drive_hits"] += len(unchanged)
+
+    remaining = [ws_name for ws_name, rev in candidates.items() if ws_name not in unchanged and rev.get('fingerprint')]
+    if remaining:
+        try:
+            current = fetch_fingerprints(sh, remaining, columns)
+        except Exception as e:
+            _revision_stats["errors"] += 1
+            print(f"[REVISION] Gagal menghitung fingerprint untuk '{sh.title}': {e}")
+            current = {}
+        for ws_name in remaining:
+            if current.get(ws_name) == candidates[ws_name].get('fingerprint'):
+                unchanged[ws_name] = build_revision(drive_time, current[ws_name], candidates[ws_name].get('downloaded_at'),
+                                                    candidates[ws_name].get('watermark'))
+
+    _revision_stats["unchanged"] += len(unchanged)
+    _revision_stats["changed"] += len(candidates) - len(unchanged)
+    if unchanged:
+        print(f"[REVISION] {len(unchanged)}/{len(previous_revisions)} worksheet di '{sh.title}' tidak berubah, skip download: {list(unchanged)}")
+    return unchanged, drive_time, columns
+
+
+def get_revision_stats():
+    stats = dict(_revision_stats)
+    stats["enabled"] = REVISION_CHECK_ENABLED
+    stats["drive_available"] = DRIVE_REVISION_ENABLED and not _drive_unavailable
+    stats["max_skip_seconds"] = _REVISION_MAX_SKIP
+    return stats
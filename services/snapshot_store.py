@@ -0,0 +1,162 @@
+"""
+services/snapshot_store.py
+Snapshot worksheet persisten di disk lokal (bertahan lintas restart/deploy).
+
+Satu file per worksheet (<GSHEET_SNAPSHOT_DIR>/<sha1 key>.snap) berformat kolumnar:
+header + satu list nilai per kolom, di-pickle lalu dikompres zlib. Metadata yang ikut disimpan:
+sheet_id, worksheet, fetched_at (waktu download dari Google Sheets) dan revision sumber.
+File ditulis atomik (tmp + os.replace) sehingga worker lain tidak pernah membaca file setengah jadi.
+Default GSHEET_SNAPSHOT_DIR = <CACHE_HOME shared_cache>/snapshots (mode 0700), bukan working directory.
+PENTING: snapshot dibaca dengan pickle.loads, jadi direktori ini tidak boleh bisa ditulis oleh pihak yang
+tidak dipercaya.
+"""
+import hashlib
+import os
+import pickle
+import time
+import zlib
+
+from services.shared_cache import CACHE_HOME, make_private_dir
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+SNAPSHOT_DIR = os.environ.get('GSHEET_SNAPSHOT_DIR', os.path.join(CACHE_HOME, 'snapshots'))
+SNAPSHOT_ENABLED = os.environ.get('GSHEET_SNAPSHOT', '1') in ['1', 'true', 'True'] and bool(SNAPSHOT_DIR)
+# Snapshot lebih tua dari ini tidak dimuat saat startup (detik)
+SNAPSHOT_MAX_AGE = int(os.environ.get('GSHEET_SNAPSHOT_MAX_AGE', 7 * 24 * 60 * 60))
+_FORMAT_VERSION = 1
+
+
+def _snapshot_path(sheet_id, worksheet_name):
+    digest = hashlib.sha1(f"{sheet_id}:{worksheet_name}".encode('utf-8')).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.snap")
+
+
+def rows_to_columns(data):
+    """List of dict -> (columns, {col: [values]}). None jika key antar baris tidak seragam."""
+    if not data:
+        return [], {}
+    columns = list(data[0].keys())
+    column_set = set(columns)
+    if any(len(row) != len(columns) or row.keys() != column_set for row in data):
+        return None
+    return columns, {col: [row[col] for row in data] for col in columns}
+
+
+def columns_to_rows(columns, values, row_count):
+    if not columns:
+        return []
+    column_values = [values[col] for col in columns]
+    return [dict(zip(columns, row_values)) for row_values in zip(*column_values)] if row_count else []
+
+
+def save_snapshot(sheet_id, worksheet_name, data, fetched_at, revision=None):
+    if not SNAPSHOT_ENABLED:
+        return
+    make_private_dir(SNAPSHOT_DIR)
+    columnar = rows_to_columns(data)
+    payload = {
+        'version': _FORMAT_VERSION,
+        'sheet_id': sheet_id,
+        'worksheet': worksheet_name,
+        'fetched_at': fetched_at,
+        'revision': revision,
+        'row_count': len(data),
+    }
+    if columnar is None:
+        # Baris tidak seragam (jarang): simpan apa adanya
+        payload['rows'] = data
+    else:
+        payload['columns'], payload['values'] = columnar
+    blob = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    path = _snapshot_path(sheet_id, worksheet_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+    if VERBOSE_LOG:
+        print(f"[SNAPSHOT] SAVED {sheet_id}:{worksheet_name} ({len(data)} rows, {len(blob)} bytes)")
+
+
+def _read_payload(path):
+    with open(path, 'rb') as f:
+        payload = pickle.loads(zlib.decompress(f.read()))
+    if payload.get('version') != _FORMAT_VERSION:
+        raise Exception(f"Format snapshot tidak dikenal: {payload.get('version')}")
+    return payload
+
+
+def _payload_rows(payload):
+    if 'rows' in payload:
+        return payload['rows']
+    return columns_to_rows(payload['columns'], payload['values'], payload['row_count'])
+
+
+def load_snapshot(sheet_id, worksheet_name):
+    """Returns: dict {sheet_id, worksheet, fetched_at, revision, data} atau None."""
+    if not SNAPSHOT_ENABLED:
+        return None
+    path = _snapshot_path(sheet_id, worksheet_name)
+    if not os.path.exists(path):
+        return None
+    payload = _read_payload(path)
+    payload['data'] = _payload_rows(payload)
+    return payload
+
+
+def load_all_snapshots():
+    """Muat semua snapshot yang belum melewati GSHEET_SNAPSHOT_MAX_AGE. File rusak dilewati."""
+    if not SNAPSHOT_ENABLED or not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    now = time.time()
+    snapshots = []
+    for filename in sorted(os.listdir(SNAPSHOT_DIR)):
+        if not filename.endswith('.snap'):
+            continue
+        path = os.path.join(SNAPSHOT_DIR, filename)
+        try:
+            payload = _read_payload(path)
+            if now - payload['fetched_at'] > SNAPSHOT_MAX_AGE:
+                continue
+            payload['data'] = _payload_rows(payload)
+            snapshots.append(payload)
+        except Exception as e:
+            print(f"[SNAPSHOT] Gagal membaca {path}, dilewati: {e}")
+    return snapshots
+
+
+def delete_snapshot(sheet_id, worksheet_name):
+    if not SNAPSHOT_ENABLED:
+        return
+    try:
+        os.remove(_snapshot_path(sheet_id, worksheet_name))
+    except FileNotFoundError:
+        pass
+
+
+def clear_snapshots():
+    if not SNAPSHOT_ENABLED or not os.path.isdir(SNAPSHOT_DIR):
+        return 0
+    removed = 0
+    for filename in os.listdir(SNAPSHOT_DIR):
+        if filename.endswith('.snap'):
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, filename))
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def get_snapshot_status():
+    if not SNAPSHOT_ENABLED:
+        return {"enabled": False}
+    files = []
+    if os.path.isdir(SNAPSHOT_DIR):
+        files = [f for f in os.listdir(SNAPSHOT_DIR) if f.endswith('.snap')]
+    return {
+        "enabled": True,
+        "dir": SNAPSHOT_DIR,
+        "files": len(files),
+        "bytes": sum(os.path.getsize(os.path.join(SNAPSHOT_DIR, f)) for f in files),
+        "max_age_seconds": SNAPSHOT_MAX_AGE
+    }
@@ -0,0 +1,153 @@
+"""
+services/temporal_index.py
+Indeks temporal terurut per WorksheetTable untuk filter tahun/bulan/minggu ke-N tanpa scan baris.
+
+filter_sheet_data_by_temporal dulu mem-parse tanggal setiap baris untuk setiap pertanyaan
+("minggu ke-3 Oktober"). TemporalIndex dibangun sekali per tabel (partisi snapshot, read-only) dari
+tanggal kanonik table.dates['day'] (services/calendar_table.py):
+- order: posisi baris bertanggal, terurut per tanggal (stabil: posisi naik untuk tanggal sama),
+- ordinals: date.toordinal() sejajar dengan order.
+Filter (tahun, bulan, minggu ke-N dalam bulan) diterjemahkan ke interval tanggal; setiap interval
+= satu range di order (bisect, O(log n)). Posisi hasil diurutkan kembali agar urutan baris sama
+dengan sheet_data, dan di-memo per filter (pertanyaan serupa tidak menghitung ulang).
+
+select_temporal(sheet_data, year, month, week) menerima RowSelection / WorksheetTable / list TableRow /
+list of dict biasa dan mengembalikan RowSelection; baris tanpa tabel bertipe dicek lewat row_calendar.
+TEMPORAL_INDEX=0 mematikan indeks (cek per baris dari tanggal kanonik).
+"""
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from calendar import monthrange
+from datetime import date
+
+from services.calendar_table import matches, row_calendar
+from services.row_selection import RowSelection
+from services.worksheet_table import WorksheetTable
+
+INDEX_ENABLED = os.environ.get('TEMPORAL_INDEX', '1') in ['1', 'true', 'True']
+
+# Batas memo seleksi per indeks (kombinasi tahun/bulan/minggu yang ditanyakan)
+_MAX_SELECTIONS = 64
+
+_index_lock = threading.Lock()
+_index_stats = {"built": 0, "selections": 0, "memo_hits": 0, "rows_selected": 0, "row_checks": 0}
+
+
+class TemporalIndex:
+    """Posisi baris terurut per tanggal + memo seleksi (lihat docstring modul)."""
+
+    def __init__(self, days):
+        ordinals = [tgl.toordinal() if tgl else None for tgl in days]
+        positions = [i for i, ordinal in enumerate(ordinals) if ordinal is not None]
+        positions.sort(key=ordinals.__getitem__)
+        self.order = array('I', positions)
+        self.ordinals = array('l', [ordinals[i] for i in positions])
+        self.undated = len(days) - len(positions)
+        self._selections = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.order)
+
+    def intervals(self, year=None, month=None, week=None):
+        """Interval ordinal [awal, akhir) untuk filter; week = minggu ke-N dalam bulan (hari 1-7 = minggu 1)."""
+        if not self.order:
+            return []
+        first_year = date.fromordinal(self.ordinals[0]).year
+        last_year = date.fromordinal(self.ordinals[-1]).year
+        years = [year] if year else range(first_year, last_year + 1)
+        intervals = []
+        for y in years:
+            if not (date.min.year < y < date.max.year):
+                continue
+            if not month and not week:
+                intervals.append((date(y, 1, 1).toordinal(), date(y + 1, 1, 1).toordinal()))
+                continue
+            for m in ([month] if month else range(1, 13)):
+                if not 1 <= m <= 12:
+                    continue
+                last_day = monthrange(y, m)[1]
+                start, end = ((week - 1) * 7 + 1, min(week * 7, last_day)) if week else (1, last_day)
+                if start < 1 or start > end:
+                    continue
+                intervals.append((date(y, m, start).toordinal(), date(y, m, end).toordinal() + 1))
+        return intervals
+
+    def select(self, year=None, month=None, week=None):
+        """Posisi baris (urut naik) yang lolos filter. Hasil di-memo: jangan modifikasi."""
+        key = (year or None, month or None, week or None)
+        with self._lock:
+            cached = self._selections.get(key)
+        if cached is not None:
+            with _index_lock:
+                _index_stats["memo_hits"] += 1
+            return cached
+        picked = []
+        for start, end in self.intervals(*key):
+            lo = bisect_left(self.ordinals, start)
+            hi = bisect_left(self.ordinals, end, lo)
+            picked.extend(self.order[lo:hi])
+        picked.sort()
+        selection = array('I', picked)
+        with self._lock:
+            if len(self._selections) >= _MAX_SELECTIONS:
+                self._selections.clear()
+            self._selections[key] = selection
+        return selection
+
+
+def temporal_index(table):
+    """TemporalIndex untuk WorksheetTable (dibangun sekali per tabel), atau None jika tanggal tidak ter-parse."""
+    index = table.temporal
+    if index is not None:
+        return index
+    days = table.dates.get('day')
+    if days is None:
+        return None
+    with _index_lock:
+        if table.temporal is None:
+            table.temporal = TemporalIndex(days)
+            _index_stats["built"] += 1
+        return table.temporal
+
+
+def select_temporal(sheet_data, year=None, month=None, week=None):
+    """
+    Baris sheet_data yang tanggal kanoniknya lolos filter tahun/bulan/minggu, urutan baris tetap.
+    Hasil berupa RowSelection (services/row_selection.py): view posisi di atas tabel asal, tanpa salin baris.
+    """
+    if not any([year, month, week]):
+        return sheet_data
+    source = RowSelection.of(sheet_data)
+    selections = []
+    row_checks = 0
+    for part in source.parts:
+        data = part.data
+        index = temporal_index(data) if INDEX_ENABLED and isinstance(data, WorksheetTable) else None
+        if index is None:
+            indices = range(len(data)) if part.positions is None else part.positions
+            row_checks += len(indices)
+            selections.append([i for i in indices if matches(row_calendar(data[i]), year, month, week)])
+            continue
+        selection = index.select(year, month, week)
+        if part.positions is None:
+            selections.append(selection)
+        else:
+            # Sebagian tabel (mis. hasil filter lain): irisan dengan seleksi indeks, urutan part tetap
+            wanted = set(selection)
+            selections.append([i for i in part.positions if i in wanted])
+    filtered = source.narrow(selections)
+    with _index_lock:
+        _index_stats["selections"] += 1
+        _index_stats["rows_selected"] += len(filtered)
+        _index_stats["row_checks"] += row_checks
+    return filtered
+
+
+def get_temporal_index_stats():
+    with _index_lock:
+        stats = dict(_index_stats)
+    stats["enabled"] = INDEX_ENABLED
+    return stats
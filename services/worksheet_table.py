@@ -0,0 +1,309 @@
+"""
+services/worksheet_table.py
+Snapshot kolumnar bertipe per worksheet, dibangun SEKALI saat data masuk cache (ingest).
+
+Data mentah get_all_records() masih berupa string/campuran tipe sehingga setiap agregasi
+mengulang safe_float + regex tanggal di setiap cell. WorksheetTable menyimpan hasil konversi itu:
+- kolom metrik -> array('d') hasil safe_float (cost, impressions, clicks, ...),
+- kolom tanggal -> tanggal kanonik ter-parse per baris (row_date/row_month, services/calendar_table.py),
+- SEMUA kolom (termasuk 'worksheet' yang di-inject loader) -> dictionary encoding: array kode
+  (typecode minimal 'B'/'H'/'I') + daftar nilai unik; string dimensi & nama header di-intern.
+
+Penyimpanan baris kompak: tidak ada dict per baris. Header disimpan sekali per tabel dan
+TableRow hanya berisi (tabel, posisi) via __slots__; nilai cell dibaca dari kolom ter-encode.
+Export Facebook Ads sangat repetitif (nama ad set/ad, age, gender, region, worksheet) jadi
+memori cache turun beberapa kali lipat dibanding list of dict dengan key berulang.
+
+WorksheetTable tetap sebuah list berisi TableRow (Mapping read-only), jadi semua caller lama
+(row.get('worksheet'), row['Ad set'], keys()/items(), filter list comprehension, extend,
+json.dumps(dict(row))) tetap jalan. Karena TableRow tahu tabel + posisinya,
+services/aggregation.py bisa membaca kolom bertipe langsung, termasuk setelah sheet_data
+di-filter. Saat di-pickle (tier bersama, snapshot) keduanya kembali menjadi list/dict biasa
+dan dibangun ulang saat di-ingest worker lain.
+
+Kolom metrik yang tidak dikenal saat ingest dikonversi lazy saat pertama kali diminta (hasilnya ikut di-cache).
+Data dianggap read-only setelah masuk cache.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+
+from services.calendar_table import (
+    calendar_day, looks_like_date, month_columns, parse_row_date, parse_row_month
+)
+from services.column_resolver import resolve_column
+
+VERBOSE_LOG = os.environ.get('VERBOSE_LOG', '0') in ['1', 'true', 'True']
+TYPED_TABLE_ENABLED = os.environ.get('GSHEET_TYPED_TABLE', '1') in ['1', 'true', 'True']
+
+# Nama kolom (lowercase) yang dipakai col_fallback di services/aggregation.py
+METRIC_COLUMNS = frozenset([
+    'cost', 'biaya', 'impressions', 'imp', 'reach', 'frequency',
+    'all clicks', 'clicks all', 'clicks', 'link clicks', 'link',
+    'whatsapp', 'whatsapp leads', 'whatsapp clicks',
+    'messaging conversations started', 'messaging conversations', 'messaging clicks',
+    'leads (offsite/pixels)', 'offsite leads', 'on-facebook leads', 'facebook leads',
+    'lead form', 'leadform', 'lead form (on-facebook)', 'form clicks', 'website clicks',
+    'outbound clicks - whatsapp', 'outbound clicks - website', 'outbound clicks - messaging', 'outbound clicks - form'
+])
+DIMENSION_COLUMNS = frozenset([
+    'ad set', 'adset', 'ad_set', 'ad', 'age', 'usia', 'gender', 'jenis kelamin', 'region',
+    'worksheet', 'sheet_id', 'sheet id'
+])
+
+# Jumlah baris sampel untuk memperkirakan ukuran list of dict biasa (estimate_bytes)
+_SIZE_SAMPLE_ROWS = 200
+
+_table_stats = {"built": 0, "skipped": 0, "rows": 0, "build_seconds": 0.0, "lazy_columns": 0}
+_stats_lock = threading.Lock()
+
+
+class TableRow(Mapping):
+    """Baris worksheet read-only (API dict) yang membaca nilainya dari kolom WorksheetTable asalnya."""
+    __slots__ = ('_table', '_idx')
+
+    def __init__(self, table, idx):
+        self._table = table
+        self._idx = idx
+
+    def __getitem__(self, key):
+        codes, dictionary = self._table._columns[key]
+        return dictionary[codes[self._idx]]
+
+    def get(self, key, default=None):
+        column = self._table._columns.get(key)
+        if column is None:
+            return default
+        return column[1][column[0][self._idx]]
+
+    def __contains__(self, key):
+        return key in self._table._columns
+
+    def __iter__(self):
+        return iter(self._table.header)
+
+    def __len__(self):
+        return len(self._table.header)
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        # Pickle sebagai dict biasa: tabel tidak ikut diserialisasi
+        return (dict, (dict(self),))
+
+
+class WorksheetTable(list):
+    """List TableRow + kolom ter-encode/bertipe untuk satu worksheet (lihat docstring modul)."""
+
+    def __init__(self, sheet_id, worksheet_name, header, columns, length):
+        self.sheet_id = sheet_id
+        self.worksheet = worksheet_name
+        self.header = header
+        self.header_set = frozenset(header)
+        # {key: (codes, dictionary)} untuk setiap kolom header
+        self._columns = columns
+        self.built_at = time.time()
+        self._floats = {}
+        # {key: profil numerik kolom metrik} (locale, prefix, cell gagal/kosong), lihat services/numeric_parser.py
+        self.numeric = {}
+        self._zeros = None
+        self._nbytes = None
+        # Tanggal kanonik per baris (services/calendar_table.py): 'day' (row_date), 'month' (row_month).
+        # Tidak ada = hitung per baris seperti biasa.
+        self.dates = {}
+        # TemporalIndex (services/temporal_index.py), dibangun saat filter temporal pertama
+        self.temporal = None
+        # {dimensi: {nilai ter-normalisasi: bitmap baris}} (services/dimension_index.py), dibangun per dimensi saat filter
+        self.bitmaps = {}
+        super().__init__([TableRow(self, idx) for idx in range(length)])
+
+    def __reduce__(self):
+        return (list, ([dict(row) for row in self],))
+
+    # -- kolom metrik -------------------------------------------------------
+    def resolve(self, names):
+        """Key kolom pertama yang cocok dengan names, urutan & normalisasi sama persis dengan col_fallback."""
+        return resolve_column(self.header, names)
+
+    def floats(self, names):
+        """array('d') = safe_float(col_fallback(row, names)) untuk setiap baris."""
+        key = self.resolve(names)
+        if key is None:
+            # col_fallback -> default 0 -> safe_float(0) = 0.0
+            if self._zeros is None:
+                self._zeros = array('d', bytes(8 * len(self)))
+            return self._zeros
+        column = self._floats.get(key)
+        if column is None:
+            column = _float_column(self, key)
+            self._floats[key] = column
+            with _stats_lock:
+                _table_stats["lazy_columns"] += 1
+        return column
+
+    # -- kolom dimensi ------------------------------------------------------
+    def dimension(self, key):
+        """(codes, dictionary) untuk kolom key, atau None jika kolom tidak ada di worksheet ini."""
+        return self._columns.get(key)
+
+    def memory_info(self):
+        code_bytes = sum(codes.itemsize * len(codes) for codes, dictionary in self._columns.values())
+        distinct = sum(len(dictionary) for codes, dictionary in self._columns.values())
+        return {
+            "rows": len(self),
+            "columns": len(self._columns),
+            "distinct_values": distinct,
+            "float_columns": len(self._floats),
+            "unparsed_cells": sum(info["failed"] for info in self.numeric.values()),
+            "date_modes": sorted(mode for mode, values in self.dates.items() if values is not None),
+            "code_bytes": code_bytes,
+            "typed_bytes": sum(column.itemsize * len(column) for column in self._floats.values()),
+            # Perkiraan kasar: slot TableRow + pointer list; nilai unik dihitung sekali
+            "row_bytes": len(self) * (_ROW_SIZE + 8)
+        }
+
+
+_ROW_SIZE = sys.getsizeof(TableRow(None, 0))
+
+
+def _float_column(table, key):
+    from services.numeric_parser import parse_column, sniff_column
+    codes, dictionary = table._columns[key]
+    # Format kolom di-sniff & setiap nilai unik di-parse sekali
+    occurrences = Counter(codes)
+    profile = sniff_column(dictionary)
+    parsed, info = parse_column(dictionary, profile=profile, counts=[occurrences[code] for code in range(len(dictionary))])
+    table.numeric[key] = {"locale": profile["locale"], "prefix": profile["prefix"],
+                          "failed": info["failed"], "empty": info["empty"]}
+    return array('d', [parsed[code] for code in codes])
+
+
+def _typecode(size):
+    if size <= 1 << 8:
+        return 'B'
+    if size <= 1 << 16:
+        return 'H'
+    return 'I'
+
+
+def _encode_column(data, key, intern_strings):
+    index = {}
+    dictionary = []
+    codes = []
+    for source in data:
+        value = source[key]
+        if value.__class__ is str:
+            marker = value
+        elif value != value:
+            # NaN: tidak pernah sama dengan dirinya, jangan digabung dengan NaN lain
+            marker = (float, id(value), len(dictionary))
+        else:
+            # Tipe + repr ikut jadi key: 1, 1.0, True dan -0.0/0.0 tidak boleh digabung
+            marker = (value.__class__, repr(value))
+        code = index.get(marker)
+        if code is None:
+            code = len(dictionary)
+            index[marker] = code
+            if intern_strings and value.__class__ is str:
+                value = sys.intern(value)
+            dictionary.append(value)
+        codes.append(code)
+    return array(_typecode(len(dictionary)), codes), dictionary
+
+
+def build_worksheet_table(sheet_id, worksheet_name, data):
+    """
+    Bangun WorksheetTable dari list of dict. Returns: WorksheetTable, atau data apa adanya jika
+    fitur dimatikan / data kosong / key antar baris tidak seragam.
+    """
+    if not TYPED_TABLE_ENABLED or not data or isinstance(data, WorksheetTable):
+        return data
+    started = time.time()
+    header = tuple(sys.intern(key) if key.__class__ is str else key for key in data[0].keys())
+    width = len(header)
+    for idx, source in enumerate(data):
+        if len(source) != width or tuple(source) != header:
+            with _stats_lock:
+                _table_stats["skipped"] += 1
+            print(f"[TABLE] {sheet_id}:{worksheet_name} kolom tidak seragam di baris {idx}, pakai list of dict biasa")
+            return data
+
+    columns = {}
+    for key in header:
+        columns[key] = _encode_column(data, key, str(key).strip().lower() in DIMENSION_COLUMNS)
+    table = WorksheetTable(sheet_id, worksheet_name, header, columns, len(data))
+
+    for key in header:
+        if str(key).strip().lower() in METRIC_COLUMNS:
+            table._floats[key] = _float_column(table, key)
+
+    date_keys = month_columns(header)
+    if not date_keys:
+        # Tanpa header tanggal parse_row_date memakai kolom yang isinya mirip tanggal (cek per nilai unik)
+        date_keys = [key for key in header if any(looks_like_date(value) for value in columns[key][1])]
+    if date_keys:
+        # Hasil parse hanya bergantung pada nilai kolom tanggal/bulan: parse sekali per kombinasi kode
+        combos = list(zip(*[columns[key][0] for key in date_keys]))
+        try:
+            parsed = {}
+            for row, combo in zip(table, combos):
+                if combo not in parsed:
+                    tgl = parse_row_date(row)
+                    parsed[combo] = (tgl, parse_row_month(row, tgl))
+                    calendar_day(tgl)
+            table.dates['day'] = [parsed[combo][0] for combo in combos]
+            table.dates['month'] = [parsed[combo][1] for combo in combos]
+        except Exception as e:
+            # Biarkan agregasi menghitung per baris (dan gagal dengan cara yang sama seperti sebelumnya)
+            table.dates.clear()
+            print(f"[TABLE] Tanggal gagal di-parse untuk {sheet_id}:{worksheet_name}: {e}")
+
+    elapsed = time.time() - started
+    with _stats_lock:
+        _table_stats["built"] += 1
+        _table_stats["rows"] += len(table)
+        _table_stats["build_seconds"] += elapsed
+    if VERBOSE_LOG:
+        print(f"[TABLE] BUILT {sheet_id}:{worksheet_name} ({len(table)} rows, {len(table._floats)} metrik, "
+              f"{sum(len(dictionary) for codes, dictionary in columns.values())} nilai unik) dalam {elapsed:.3f}s")
+    return table
+
+
+def estimate_bytes(data):
+    """
+    Perkiraan memori (byte) data worksheet untuk budget cache. WorksheetTable dihitung dari kolomnya
+    (hasilnya di-cache di tabel, data read-only); list of dict biasa diperkirakan dari sampel baris.
+    """
+    if isinstance(data, WorksheetTable):
+        if data._nbytes is None:
+            info = data.memory_info()
+            values = sum(sys.getsizeof(value) for codes, dictionary in data._columns.values() for value in dictionary)
+            dates = sum(8 * len(values) for values in data.dates.values() if values is not None)
+            data._nbytes = (sys.getsizeof(data) + info["row_bytes"] + info["code_bytes"] + info["typed_bytes"]
+                            + values + dates)
+        return data._nbytes
+    if not data:
+        return sys.getsizeof(data)
+    sample = data[:_SIZE_SAMPLE_ROWS]
+    per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values()) for row in sample) / len(sample)
+    return sys.getsizeof(data) + int(per_row * len(data))
+
+
+def table_of(row):
+    """WorksheetTable asal sebuah baris (None untuk dict biasa)."""
+    return getattr(row, '_table', None)
+
+
+def get_table_stats():
+    with _stats_lock:
+        stats = dict(_table_stats)
+    stats["enabled"] = TYPED_TABLE_ENABLED
+    return stats
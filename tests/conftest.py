@@ -0,0 +1,150 @@
+"""
+Fixture bersama untuk test services/*: worksheet sintetis bergaya export Facebook Ads.
+
+Data sengaja "kotor" seperti export asli: cell dimensi kosong, varian header (Ad set / Ad Set / Adset,
+Date / tanggal), format angka campuran (Rp 1.500.000, 1.234,56, 1,234.5, teks) dan tanggal campuran
+(YYYY-MM-DD, DD/MM/YYYY, nama bulan, kosong, tidak valid).
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADERS = {
+    'Age Gender': ['Date', 'Ad set', 'Ad', 'Age', 'Gender', 'Cost', 'Impressions', 'Reach', 'Frequency', 'All Clicks',
+                   'Link Clicks', 'WhatsApp', 'On-Facebook Leads', 'Lead Form', 'Messaging Conversations Started',
+                   'Outbound Clicks - WhatsApp'],
+    'Region': ['tanggal', 'Ad Set', 'Region', 'biaya', 'impressions', 'clicks', 'link', 'frequency', 'tgl'],
+    'Adset': ['Adset', 'Ad', 'COST ', 'Impressions', 'Leads (Offsite/Pixels)', 'Date'],
+    # Header age/gender bukan 'Age'/'Gender' persis: filter baris me-resolve varian METRIC_COLUMNS
+    'Demografi': ['Date', 'Ad set', 'usia', 'jenis kelamin', 'Cost', 'Impressions', 'Reach', 'WhatsApp'],
+    'Usia Lower': ['date', 'Ad Set', 'age', 'GENDER', 'cost', 'impressions', 'Frequency'],
+}
+DIMENSION_VALUES = {
+    'Ad set': ['Adset A', 'adset a', 'Adset B', '', 'Retarget'],
+    'Ad Set': ['Adset A', 'Adset C', ''],
+    'Adset': ['Adset A', '', 'Adset D'],
+    'Ad': ['Ad 1', 'Ad 2', '', 'ad 1'],
+    'Age': ['18-24', '25-34', ' 35-44', '45-54', ''],
+    'Gender': ['male', 'female', 'Female', 'pria', 'wanita', 'unknown', ''],
+    'usia': ['18-24', ' 25-34', '45-54', ''],
+    'age': ['25-34', '45-54 ', '18-24'],
+    'jenis kelamin': ['Laki-laki', 'Perempuan', 'male', 'FEMALE', ''],
+    'GENDER': ['male', 'pria', 'wanita', 'female'],
+    'Region': ['Jakarta', 'jawa barat', ' Bali', ''],
+}
+
+
+def _number(rng):
+    return rng.choice([
+        rng.randint(0, 5000), round(rng.random() * 1000, 2), f"Rp {rng.randint(1, 9)}.{rng.randint(100, 999)}.000",
+        f"{rng.randint(1, 999)},{rng.randint(10, 99)}", '', 'abc', '1,234.5', -3, '0',
+    ])
+
+
+def _date(rng):
+    month, day = rng.randint(1, 12), rng.randint(1, 28)
+    return rng.choice([
+        f"2025-{month:02d}-{day:02d}", f"{day}/{month}/2025", f"2024-{month}-{day}", f"{day:02d}-{month:02d}-2025",
+        f"2025-{month:02d}-{day:02d}", '', 'Mei 2025', '2025-13-45', 'bad',
+    ])
+
+
+def make_rows(name, count, seed):
+    """count baris worksheet name (header HEADERS[name]) + kolom 'worksheet' seperti yang di-inject loader."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = {}
+        for header in HEADERS[name]:
+            if header.lower() in ('date', 'tanggal', 'tgl'):
+                row[header] = _date(rng)
+            elif header in DIMENSION_VALUES:
+                row[header] = rng.choice(DIMENSION_VALUES[header])
+            else:
+                row[header] = _number(rng)
+        row['worksheet'] = name
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture
+def partitions():
+    """[(sheet_id, worksheet, list of dict)] untuk lima worksheet dengan schema berbeda."""
+    return [
+        ('sheet-1', 'Age Gender', make_rows('Age Gender', 600, 1)),
+        ('sheet-1', 'Region', make_rows('Region', 400, 2)),
+        ('sheet-2', 'Adset', make_rows('Adset', 150, 3)),
+        ('sheet-2', 'Demografi', make_rows('Demografi', 200, 4)),
+        ('sheet-2', 'Usia Lower', make_rows('Usia Lower', 120, 5)),
+    ]
+
+
+def mismatches(expected, got, path='result'):
+    """Daftar perbedaan expected vs got (dict rekursif; float dibandingkan relatif 1e-9, urutan key diabaikan)."""
+    if isinstance(expected, dict) and isinstance(got, dict):
+        if set(expected) != set(got):
+            return [f"{path}: keys {sorted(map(repr, set(expected) ^ set(got)))[:6]}"]
+        found = []
+        for key in expected:
+            found += mismatches(expected[key], got[key], f"{path}[{key!r}]")
+        return found
+    if isinstance(expected, (list, tuple)) and isinstance(got, (list, tuple)):
+        if len(expected) != len(got):
+            return [f"{path}: len {len(expected)} vs {len(got)}"]
+        found = []
+        for i, (a, b) in enumerate(zip(expected, got)):
+            found += mismatches(a, b, f"{path}[{i}]")
+        return found
+    if isinstance(expected, float) or isinstance(got, float):
+        if isinstance(expected, (int, float)) and isinstance(got, (int, float)) \
+                and math.isclose(expected, got, rel_tol=1e-9, abs_tol=1e-9):
+            return []
+    elif expected == got:
+        return []
+    return [f"{path}: {expected!r} vs {got!r}"]
+
+
+class FakeSpreadsheet:
+    """
+    Spreadsheet gspread palsu untuk cek revision/incremental: values_batch_get menjawab range
+    "'Tab'", "'Tab'!A:A" dan "'Tab'!N:M" seperti Sheets API (cell/baris kosong di ujung dibuang).
+    get_lastUpdateTime me-raise jika modified None (Drive API tidak tersedia).
+    """
+
+    def __init__(self, worksheets, modified=None, title='Fake Ads'):
+        self.worksheets = worksheets
+        self.modified = modified
+        self.title = title
+        self.calls = []
+
+    def get_lastUpdateTime(self):
+        if self.modified is None:
+            raise Exception("Drive API has not been used in project")
+        return self.modified
+
+    def values_batch_get(self, ranges):
+        self.calls.append(list(ranges))
+        return {'valueRanges': [{'range': name, 'values': self._values(name)} for name in ranges]}
+
+    def _values(self, range_name):
+        title, _, cells = range_name.partition('!')
+        values = self.worksheets[title[1:-1].replace("''", "'")]
+        if cells == 'A:A':
+            values = [row[:1] for row in values]
+        elif cells:
+            start, end = (int(part) for part in cells.split(':'))
+            values = values[start - 1:end]
+        trimmed = []
+        for row in values:
+            row = list(row)
+            while row and row[-1] == '':
+                row.pop()
+            trimmed.append(row)
+        while trimmed and not trimmed[-1]:
+            trimmed.pop()
+        return trimmed
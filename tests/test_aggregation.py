@@ -0,0 +1,46 @@
+"""aggregate_workflow (kernel gabungan satu pass) harus identik dengan fungsi aggregate_* satu per satu."""
+import pytest
+
+from services.aggregation import WORKFLOW_AGGREGATES, aggregate_workflow
+from services.row_selection import RowSelection
+from services.worksheet_table import build_worksheet_table
+
+
+def _inputs(partitions, kind):
+    dicts = [row for _, _, rows in partitions for row in rows]
+    tables = [build_worksheet_table(sheet_id, name, [dict(row) for row in rows]) for sheet_id, name, rows in partitions]
+    if kind == 'dict':
+        return dicts
+    if kind == 'table':
+        return [row for table in tables for row in table]
+    if kind == 'mixed':
+        return list(tables[0]) + partitions[1][2] + list(tables[2])[::2]
+    selection = RowSelection.from_partitions({(t.sheet_id, t.worksheet): t for t in tables})
+    return selection.narrow([range(0, len(part.data), 3) for part in selection.parts])
+
+
+def _ordered(value):
+    # Urutan key ikut dibandingkan: laporan menampilkan grup sesuai urutan kemunculan
+    if isinstance(value, dict):
+        return [(key, _ordered(item)) for key, item in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [_ordered(item) for item in value]
+    return value
+
+
+@pytest.mark.parametrize('kind', ['dict', 'table', 'mixed', 'selection'])
+def test_fused_workflow_matches_individual_aggregates(partitions, kind):
+    sheet_data = _inputs(partitions, kind)
+    fused = aggregate_workflow(sheet_data, backend='python')
+    assert list(fused) == list(WORKFLOW_AGGREGATES)
+    for name, aggregate in WORKFLOW_AGGREGATES.items():
+        assert _ordered(fused[name]) == _ordered(aggregate(sheet_data, 'python')), name
+
+
+def test_fused_workflow_requested_subset(partitions):
+    sheet_data = _inputs(partitions, 'table')
+    requested = {'region_breakdown', 'period_stats_weekly', 'outbound_clicks'}
+    fused = aggregate_workflow(sheet_data, requested=requested, backend='python')
+    assert set(fused) == requested
+    for name in requested:
+        assert _ordered(fused[name]) == _ordered(WORKFLOW_AGGREGATES[name](sheet_data, 'python')), name
@@ -0,0 +1,48 @@
+"""Backend numpy (services/aggregation_numpy.py) harus sama dengan backend python untuk setiap aggregate_*."""
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+
+from conftest import mismatches  # noqa: E402
+from services import aggregation  # noqa: E402
+from services.row_selection import RowSelection  # noqa: E402
+from services.worksheet_table import build_worksheet_table  # noqa: E402
+
+AGGREGATES = dict(aggregation.WORKFLOW_AGGREGATES, **{
+    'metrics_by_worksheet': lambda data, backend: aggregation.aggregate_metrics_by_worksheet(data, backend=backend),
+    'age_gender_enhanced_adset': lambda data, backend: aggregation.aggregate_age_gender_enhanced(
+        data, adset_name='adset a', backend=backend),
+    'adset_by_age_gender': lambda data, backend: aggregation.aggregate_adset_by_age_gender(
+        data, age_range='25-34', gender='female', backend=backend),
+})
+
+
+def _inputs(partitions):
+    dicts = [row for _, _, rows in partitions for row in rows]
+    tables = [build_worksheet_table(s, w, [dict(r) for r in rows]) for s, w, rows in partitions]
+    table_rows = [row for table in tables for row in table]
+    selection = RowSelection.from_partitions({(t.sheet_id, t.worksheet): t for t in tables})
+    return {
+        'dict': dicts,
+        'table': table_rows,
+        'mixed': table_rows[:300] + dicts[600:900] + table_rows[1000:],
+        'selection': selection.narrow([range(1, len(part.data), 2) for part in selection.parts]),
+        'empty': [],
+    }
+
+
+@pytest.mark.parametrize('name', list(AGGREGATES))
+def test_numpy_backend_matches_python(partitions, name):
+    for kind, sheet_data in _inputs(partitions).items():
+        expected = AGGREGATES[name](sheet_data, 'python')
+        got = AGGREGATES[name](sheet_data, 'numpy')
+        assert mismatches(expected, got, f"{name}/{kind}") == []
+
+
+def test_workflow_numpy_matches_python(partitions):
+    for kind, sheet_data in _inputs(partitions).items():
+        expected = aggregation.aggregate_workflow(sheet_data, backend='python')
+        got = aggregation.aggregate_workflow(sheet_data, backend='numpy')
+        assert list(got) == list(expected)
+        assert mismatches(expected, got, kind) == []
@@ -0,0 +1,162 @@
+"""CachePolicy (services/cache_policy.py): urutan eviction LRU/LFU, pinning, budget byte dan statistik."""
+import pytest
+
+from services.cache_policy import CachePolicy
+
+
+def _policy(policy='lru', max_entries=100, max_bytes=0, pinned=()):
+    return CachePolicy(max_entries, max_bytes=max_bytes, policy=policy, pinned=list(pinned))
+
+
+def _evict(policy, keep_key=None):
+    # Loop sheet_cache._evict_locked: korban sesuai policy sampai kembali dalam budget
+    evicted = []
+    while True:
+        reason = policy.over_budget()
+        if reason is None:
+            return evicted
+        victim = policy.victim(exclude=keep_key)
+        if victim is None:
+            return evicted
+        policy.remove(victim, reason)
+        evicted.append(victim)
+
+
+def test_lru_evicts_least_recently_used():
+    policy = _policy('lru', max_entries=3)
+    for key in ('s:a', 's:b', 's:c'):
+        policy.admit(key, 10)
+    policy.touch('s:a')
+    policy.admit('s:d', 10)
+    assert _evict(policy, keep_key='s:d') == ['s:b']
+    policy.touch('s:c')
+    policy.admit('s:e', 10)
+    assert _evict(policy, keep_key='s:e') == ['s:a']
+    assert list(policy.entries) == ['s:c', 's:d', 's:e']
+    assert policy.evictions == {'max_entries': 2}
+
+
+def test_lfu_evicts_least_frequently_used_with_lru_tie_break():
+    policy = _policy('lfu', max_entries=3)
+    for key in ('s:a', 's:b', 's:c'):
+        policy.admit(key, 10)
+    for _ in range(3):
+        policy.touch('s:a')
+    policy.touch('s:b')
+    policy.touch('s:c')
+    # b dan c freq 2: b lebih lama tidak diakses
+    policy.admit('s:d', 10)
+    assert _evict(policy, keep_key='s:d') == ['s:b']
+    # d (freq 1) korban berikutnya meski paling baru, kecuali sedang di-exclude
+    assert policy.victim() == 's:d'
+    assert policy.victim(exclude='s:d') == 's:c'
+
+
+def test_replace_keeps_frequency_and_hits():
+    policy = _policy('lfu')
+    policy.admit('s:a', 10)
+    policy.touch('s:a')
+    policy.admit('s:b', 10)
+    policy.admit('s:a', 30)
+    assert policy.entries['s:a']['hits'] == 1 and policy.entries['s:a']['freq'] == 2
+    assert policy.victim() == 's:b'
+
+
+@pytest.mark.parametrize('name', ['lru', 'lfu'])
+def test_pinned_entries_survive_max_bytes(name):
+    policy = _policy(name, max_bytes=100, pinned=['Daily'])
+    policy.admit('sheet-1:Daily', 80)
+    for i in range(5):
+        policy.admit(f'sheet-1:W{i}', 10)
+    policy.touch('sheet-1:W0')
+    assert policy.over_budget() == 'max_bytes'
+    evicted = _evict(policy)
+    assert 'sheet-1:Daily' not in evicted
+    assert policy.total_bytes <= 100
+    assert policy.evictions == {'max_bytes': len(evicted)}
+
+    # Hanya entry pinned yang tersisa: budget boleh terlampaui, tidak ada korban
+    policy.admit('sheet-1:Daily', 500)
+    _evict(policy)
+    assert list(policy.entries) == ['sheet-1:Daily']
+    assert policy.over_budget() == 'max_bytes'
+    assert policy.victim() is None
+
+
+def test_set_pinned_moves_entry_out_of_eviction_order():
+    policy = _policy('lru', max_entries=2)
+    policy.admit('s:a', 10)
+    policy.admit('s:b', 10)
+    policy.set_pinned('s:a', True)
+    policy.admit('s:c', 10)
+    assert _evict(policy, keep_key='s:c') == ['s:b']
+    policy.set_pinned('s:a', False)
+    assert policy.victim(exclude='s:c') == 's:a'
+
+
+def test_total_bytes_after_replace_remove_and_remove_all():
+    policy = _policy('lru')
+    policy.admit('s:a', 10)
+    policy.admit('s:b', 20)
+    assert policy.total_bytes == 30
+    policy.admit('s:a', 5)
+    assert policy.total_bytes == 25
+    assert policy.remove('s:b', 'expired')['bytes'] == 20
+    assert policy.total_bytes == 5
+    assert policy.remove('s:b', 'expired') is None
+    assert policy.total_bytes == 5
+    policy.admit('s:c', 7)
+    policy.remove_all('cleared')
+    assert policy.total_bytes == 0 and not policy.entries and policy.victim() is None
+    policy.remove_all('cleared')
+
+
+def test_eviction_reason_counts():
+    policy = _policy('lru', max_entries=2, max_bytes=25)
+    policy.admit('s:a', 10)
+    policy.admit('s:b', 10)
+    policy.admit('s:c', 10)
+    assert _evict(policy, keep_key='s:c') == ['s:a']
+    policy.admit('s:d', 20)
+    assert _evict(policy, keep_key='s:d') == ['s:b', 's:c']
+    policy.admit('s:e', 1)
+    policy.remove('s:e', 'invalidated')
+    policy.admit('s:f', 1)
+    policy.remove_all('generation')
+    assert policy.evictions == {'max_entries': 2, 'max_bytes': 1, 'invalidated': 1, 'generation': 2}
+    assert [item['reason'] for item in policy.recent] == ['max_entries', 'max_entries', 'max_bytes', 'invalidated']
+    assert policy.status()['evictions'] == policy.evictions
+
+
+@pytest.mark.parametrize('name', ['lru', 'lfu'])
+def test_exclude_is_never_returned(name):
+    policy = _policy(name)
+    assert policy.victim() is None
+    policy.admit('s:a', 10)
+    assert policy.victim(exclude='s:a') is None
+    policy.admit('s:b', 10)
+    policy.touch('s:b')
+    assert policy.victim(exclude='s:a') == 's:b'
+    assert policy.victim(exclude='s:b') == 's:a'
+
+
+def test_lfu_min_freq_repaired_after_removal_outside_eviction():
+    policy = _policy('lfu')
+    policy.admit('s:a', 10)
+    policy.admit('s:b', 10)
+    policy.touch('s:b')
+    policy.touch('s:b')
+    policy.admit('s:c', 10)
+    policy.touch('s:c')
+    # Bucket freq 1 hilang lewat remove (expired): _min_freq basi, victim() memperbaikinya
+    policy.remove('s:a', 'expired')
+    assert policy._min_freq == 1
+    assert policy.victim() == 's:c'
+    assert policy._min_freq == 2
+    # touch() memperbaiki _min_freq saat bucket minimum kosong
+    policy.touch('s:c')
+    assert policy._min_freq == 3
+    assert policy.victim() == 's:b'
+    # Entry baru (freq 1) menurunkan _min_freq lagi
+    policy.admit('s:d', 10)
+    assert policy._min_freq == 1 and policy.victim() == 's:d'
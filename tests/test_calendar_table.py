@@ -0,0 +1,65 @@
+"""Aturan kolom tanggal services/calendar_table.py vs aturan lama terluas (filter temporal + bulanan)."""
+import pytest
+
+from services.calendar_table import date_columns, month_columns, row_date, row_month
+from services.temporal_index import select_temporal
+from services.worksheet_table import build_worksheet_table
+
+ROWS = {
+    'Day': [
+        {'Day': '2025-09-03', 'Ad set': 'A', 'Cost': 100},
+        {'Day': '2025-10-01', 'Ad set': 'B', 'Cost': 200},
+    ],
+    'Date Start': [
+        {'Campaign': 'X', 'Date Start': '03/09/2025', 'Date Stop': '04/09/2025', 'Cost': 100},
+        {'Campaign': 'Y', 'Date Start': '01/10/2025', 'Date Stop': '02/10/2025', 'Cost': 200},
+    ],
+    'sniff': [
+        {'Periode': '2025-09-03', 'Ad set': 'A', 'Cost': 100},
+        {'Periode': '2025-10-01', 'Ad set': 'B', 'Cost': 200},
+    ],
+}
+
+
+def _both(rows):
+    return [[dict(row) for row in rows], build_worksheet_table('s', 'ws', [dict(row) for row in rows])]
+
+
+@pytest.mark.parametrize('name', sorted(ROWS))
+def test_month_filter_finds_broad_date_columns(name):
+    # Baseline: worksheet dengan kolom "Day" dan month=9 -> 1/2 baris (bukan "No date column found")
+    for data in _both(ROWS[name]):
+        assert date_columns(data[0].keys(), data[0])
+        got = list(select_temporal(data, month=9))
+        assert [row['Cost'] for row in got] == [100]
+        assert [row_month(row) for row in data] == [(2025, 9), (2025, 10)]
+
+
+def test_exact_names_win_over_substring_matches():
+    row = {'Day': '2025-01-05', 'Tanggal': '2025-02-10', 'Cost': 1}
+    assert date_columns(row.keys()) == ['Tanggal', 'Day']
+    for data in _both([row]):
+        assert row_date(data[0]).month == 2
+
+
+def test_header_rule_skips_content_sniff():
+    # Kolom tanggal di header ada tapi kosong: kolom lain yang mirip tanggal tidak dipakai (aturan lama)
+    row = {'Tgl Laporan': '', 'Catatan': '2025-09-03', 'Cost': 1}
+    assert date_columns(row.keys(), row) == ['Tgl Laporan']
+    for data in _both([row]):
+        assert row_date(data[0]) is None
+
+
+def test_month_only_columns():
+    rows = [{'Bulan Laporan': 'September 2025', 'Cost': 1}, {'Bulan Laporan': 'Okt', 'Cost': 2}]
+    assert month_columns(rows[0].keys()) == ['Bulan Laporan']
+    for data in _both(rows):
+        assert [row_date(row) for row in data] == [None, None]
+        assert [row_month(row) for row in data] == [(2025, 9), (None, 10)]
+
+
+def test_no_date_column():
+    rows = [{'Ad set': 'A', 'Cost': 1}, {'Ad set': 'B', 'Cost': 2}]
+    assert date_columns(rows[0].keys(), rows[0]) == []
+    for data in _both(rows):
+        assert [row_month(row) for row in data] == [None, None]
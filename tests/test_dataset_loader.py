@@ -0,0 +1,21 @@
+"""DatasetSnapshot (services/dataset_loader.py): rows adalah view atas partitions, bukan salinan."""
+from itertools import chain
+
+import pytest
+
+from services.dataset_loader import DatasetSnapshot
+from services.worksheet_table import build_worksheet_table
+
+
+@pytest.mark.parametrize('typed', [False, True], ids=['dict', 'table'])
+def test_rows_view_follows_partitions(partitions, typed):
+    sources = [(sheet_id, name, build_worksheet_table(sheet_id, name, [dict(r) for r in rows]) if typed else rows)
+               for sheet_id, name, rows in partitions]
+    snapshot = DatasetSnapshot('key', sources)
+    expected = list(chain.from_iterable(data for _, _, data in sources))
+    assert len(snapshot) == len(snapshot.rows) == len(expected)
+    assert list(snapshot.rows) == expected
+    assert snapshot.rows[-1] == expected[-1]
+    assert snapshot.records() == [{k: v for k, v in row.items() if k != 'worksheet'} for row in expected]
+    with pytest.raises(AttributeError):
+        snapshot.rows = ()
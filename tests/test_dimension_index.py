@@ -0,0 +1,86 @@
+"""Bitmap dimensi (services/dimension_index.py) vs filter list adset/age/gender lama di services/aggregation.py."""
+import pytest
+
+from conftest import make_rows
+from services import dimension_index
+from services.aggregation import _normalize_gender
+from services.calendar_table import matches, row_calendar
+from services.column_resolver import METRIC_COLUMNS, column_value
+from services.dimension_index import bitmap_from_positions, positions_from_bitmap, select_rows
+from services.row_selection import RowSelection
+from services.worksheet_table import build_worksheet_table
+
+
+def _old_adset_filter(rows, adset_name):
+    # aggregate_age_gender_enhanced(adset_name=...) sebelum indeks dimensi
+    return [r for r in rows if str(r.get('Ad set', r.get('Ad Set', r.get('Adset', '')))).lower() == adset_name.lower()]
+
+
+def _old_age_gender_filter(rows, age_range, gender):
+    # aggregate_adset_by_age_gender sebelum indeks dimensi
+    filtered = []
+    for row in rows:
+        row_age = str(column_value(row, METRIC_COLUMNS['age'], '')).strip()
+        row_gender = str(column_value(row, METRIC_COLUMNS['gender'], '')).strip().lower()
+        gender_normalized = _normalize_gender(row_gender) if row_gender else None
+        age_match = row_age == age_range if age_range else True
+        gender_match = gender_normalized == _normalize_gender(gender.lower()) if gender else True
+        if age_match and gender_match:
+            filtered.append(row)
+    return filtered
+
+
+def _same(got, expected):
+    got = list(got)
+    return len(got) == len(expected) and all(a is b for a, b in zip(got, expected))
+
+
+def _sources(partitions):
+    tables = {(s, w): build_worksheet_table(s, w, [dict(r) for r in rows]) for s, w, rows in partitions}
+    table_rows = [row for table in tables.values() for row in table]
+    dict_rows = [row for _, _, rows in partitions for row in rows]
+    return {
+        'tables': RowSelection.from_partitions(tables),
+        'table_rows': table_rows,
+        'subset': table_rows[::3],
+        'dicts': dict_rows,
+        'mixed': table_rows[:400] + dict_rows[600:],
+    }
+
+
+@pytest.mark.parametrize('adset', ['Adset A', 'ADSET A', 'adset b', 'Retarget', 'Adset D', 'missing'])
+def test_adset_bitmap_matches_list_filter(partitions, adset):
+    for kind, sheet_data in _sources(partitions).items():
+        assert _same(select_rows(sheet_data, adset=adset), _old_adset_filter(list(sheet_data), adset)), kind
+
+
+@pytest.mark.parametrize('age, gender', [
+    ('18-24', None), ('35-44', None), (None, 'female'), (None, 'Wanita'), (None, 'male'), (None, 'unknown'),
+    ('25-34', 'pria'), ('45-54', 'Female'), ('99', 'male'),
+])
+def test_age_gender_bitmap_matches_list_filter(partitions, age, gender):
+    for kind, sheet_data in _sources(partitions).items():
+        expected = _old_age_gender_filter(list(sheet_data), age, gender)
+        assert _same(select_rows(sheet_data, age=age, gender=gender), expected), kind
+
+
+@pytest.mark.parametrize('enabled', [True, False], ids=['index', 'row-checks'])
+def test_combined_with_temporal_filter(partitions, monkeypatch, enabled):
+    monkeypatch.setattr(dimension_index, 'INDEX_ENABLED', enabled)
+    for kind, sheet_data in _sources(partitions).items():
+        rows = list(sheet_data)
+        for year, month, week in [(2025, None, None), (None, 3, None), (None, 6, 2)]:
+            expected = [r for r in _old_age_gender_filter(_old_adset_filter(rows, 'adset a'), None, 'female')
+                        if (entry := row_calendar(r)) is not None and matches(entry, year, month, week)]
+            got = select_rows(sheet_data, year, month, week, adset='adset a', gender='female')
+            assert _same(got, expected), (kind, year, month, week)
+            # Filter berantai = filter gabungan
+            assert _same(select_rows(select_rows(sheet_data, adset='adset a'), year, month, week, gender='female'), expected)
+
+
+def test_bitmap_round_trip_and_unknown_dimension():
+    positions = [0, 1, 7, 8, 63, 64, 200]
+    assert positions_from_bitmap(bitmap_from_positions(positions, 201)) == positions
+    assert positions_from_bitmap(0) == []
+    with pytest.raises(ValueError):
+        select_rows(make_rows('Adset', 3, 1), campaign='x')
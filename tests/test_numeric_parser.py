@@ -0,0 +1,100 @@
+"""parse_number / parse_column (services/numeric_parser.py) vs safe_float baseline (services/aggregation.py lama)."""
+import re
+
+import pytest
+
+from services import numeric_parser
+from services.numeric_parser import parse_column, parse_number
+
+
+def safe_float(val):
+    # Salinan safe_float sebelum services/numeric_parser.py (referensi perilaku, jangan diubah)
+    try:
+        s = str(val)
+        m = re.search(r"[-+]?\d[\d.,]*", s)
+        if not m:
+            m2 = re.search(r"(\d{1,3}(?:[.,]\d{3})+)", s)
+            if m2:
+                num = m2.group(1)
+                if ('.' in num and ',' not in num) or (',' in num and '.' not in num):
+                    num = num.replace('.', '').replace(',', '')
+                    return float(num)
+            return 0.0
+        num = m.group(0)
+        if ',' in num and '.' in num:
+            if num.rfind(',') > num.rfind('.'):
+                num = num.replace('.', '').replace(',', '.')
+            else:
+                num = num.replace(',', '')
+        elif ',' in num:
+            if num.count(',') > 1:
+                num = num.replace(',', '')
+            else:
+                parts = num.split(',')
+                if len(parts[-1]) == 3 and len(parts) > 1:
+                    num = num.replace(',', '')
+                else:
+                    num = num.replace(',', '.')
+        elif '.' in num:
+            parts = num.split('.')
+            if all(len(p) == 3 for p in parts[1:]) and len(parts[0]) <= 3:
+                num = num.replace('.', '')
+        return float(num)
+    except:  # noqa: E722
+        return 0.0
+
+
+CELLS = [
+    # prefix mata uang
+    'Rp 1.500.000', 'Rp1.234,56', 'IDR 2,500,000', 'IDR 750', 'Rp -1.500', '$1,234.56', 'Rp', 'IDR -',
+    # locale / separator
+    '1.234,56', '1,234.56', '1,234', '1.500', '1.2.3', '1,2,3', '4,56', '1.000.000', '1,000,000', '0,5', '12.5',
+    # negatif
+    '-1.234,56', '-1,234.56', '-1,234', '-1.500', -42, -3.25, '+7',
+    # bool, float, int
+    True, False, 0.1, 1e20, float('nan'), 10 ** 400, 0, 1500,
+    # kosong / teks
+    '', '   ', None, 'abc', '-', 'n/a', ' 12 leads',
+]
+AMBIGUOUS = {'1,234', '1.500', '-1,234', '-1.500'}
+
+
+def _same(expected, got):
+    return (expected != expected and got != got) or (expected == got and type(got) is float)
+
+
+@pytest.mark.parametrize('cell', CELLS, ids=repr)
+def test_parse_number_matches_safe_float(cell):
+    assert _same(safe_float(cell), parse_number(cell))
+
+
+@pytest.mark.parametrize('mode', ['compat', 'auto'])
+def test_parse_column_modes(monkeypatch, mode):
+    # mode dibaca dari GSHEET_NUMERIC_LOCALE saat import -> NUMERIC_LOCALE_MODE modul
+    monkeypatch.setattr(numeric_parser, 'NUMERIC_LOCALE_MODE', mode)
+    parsed, info = parse_column(CELLS)
+    assert info["cells"] == len(CELLS)
+    assert info["empty"] == 3
+    for cell, got in zip(CELLS, parsed):
+        if mode == 'compat' or not isinstance(cell, str) or cell not in AMBIGUOUS:
+            # compat: identik safe_float; auto: hanya cell ambigu yang boleh berbeda
+            assert _same(safe_float(cell), got), cell
+    # kolom campuran (id + us) -> locale 'mixed': cell ambigu tetap aturan safe_float
+    assert info["locale"] == ('mixed' if mode == 'auto' else None)
+    assert parsed[CELLS.index('1,234')] == 1234.0
+    assert parsed[CELLS.index('1.500')] == 1500.0
+
+
+@pytest.mark.parametrize('mode, column, expected', [
+    ('compat', ['1.234,56', 'Rp 2.000,5', '1,500', '1.500'], [1234.56, 2000.5, 1500.0, 1500.0]),
+    ('auto', ['1.234,56', 'Rp 2.000,5', '1,500', '1.500'], [1234.56, 2000.5, 1.5, 1500.0]),
+    ('compat', ['1,234.56', '$2,000.5', '1,500', '1.500'], [1234.56, 2000.5, 1500.0, 1500.0]),
+    ('auto', ['1,234.56', '$2,000.5', '1,500', '1.500'], [1234.56, 2000.5, 1500.0, 1.5]),
+    ('auto', ['1,500', '1.500', '', 'abc'], [1500.0, 1500.0, 0.0, 0.0]),
+])
+def test_parse_column_ambiguous_cells_follow_column_locale(monkeypatch, mode, column, expected):
+    monkeypatch.setattr(numeric_parser, 'NUMERIC_LOCALE_MODE', mode)
+    parsed, info = parse_column(column)
+    assert parsed == expected
+    if mode == 'compat':
+        assert parsed == [safe_float(cell) for cell in column]
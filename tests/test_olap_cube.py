@@ -0,0 +1,169 @@
+"""OlapCube (services/olap_cube.py): view cube harus sama dengan aggregate_* yang dihitung dari baris."""
+import pytest
+
+from conftest import mismatches
+from services.aggregation import aggregate_adset_by_age_gender, aggregate_breakdown, aggregate_workflow
+from services.olap_cube import CUBE_VIEWS, adset_by_age_gender, build_cube, cube_aggregates
+from services.worksheet_table import build_worksheet_table
+
+
+def _tables(partitions):
+    return {(sheet_id, name): build_worksheet_table(sheet_id, name, [dict(row) for row in rows])
+            for sheet_id, name, rows in partitions}
+
+
+def _rows(data_by_key):
+    return [row for data in data_by_key.values() for row in data]
+
+
+@pytest.mark.parametrize('typed', [False, True], ids=['dict', 'table'])
+def test_cube_views_match_row_aggregates(partitions, typed):
+    data = _tables(partitions) if typed else {(sheet_id, name): rows for sheet_id, name, rows in partitions}
+    cube = build_cube(data)
+    expected = aggregate_workflow(_rows(data), requested=set(CUBE_VIEWS), backend='python')
+    got = cube_aggregates(cube)
+    assert cube.row_count == len(_rows(data))
+    for name in CUBE_VIEWS:
+        assert mismatches(expected[name], got[name], name) == []
+
+
+@pytest.mark.parametrize('age, gender', [('18-24', 'male'), ('25-34', 'wanita'), (None, 'female'), ('45-54', None)])
+def test_adset_by_age_gender_matches_rows(partitions, age, gender):
+    data = _tables(partitions)
+    cube = build_cube(data)
+    expected = aggregate_adset_by_age_gender(_rows(data), age, gender, backend='python')
+    assert mismatches(expected, adset_by_age_gender(cube, age, gender)) == []
+
+
+def test_breakdown_keys_follow_aggregate_breakdown():
+    # aggregate_breakdown: r.get('Ad set', r.get('Ad Set', 'Unknown')) -> cell kosong tetap '' (bukan 'Unknown')
+    rows = [
+        {'Ad set': '', 'Ad': '', 'Cost': 10, 'worksheet': 'w'},
+        {'Adset': 'B', 'Cost': 5, 'worksheet': 'w'},
+    ]
+    cube = build_cube([rows])
+    for view, by in (('breakdown_adset', 'Ad set'), ('breakdown_ad', 'Ad')):
+        expected = aggregate_breakdown(rows, by=by, backend='python')
+        assert list(cube.view(view)) == list(expected)
+        assert mismatches(expected, cube.view(view)) == []
+
+
+def test_covers_requires_same_rows_not_same_count(partitions):
+    from services.dataset_loader import DatasetSnapshot
+    from services.olap_cube import cell_filter
+    from services.row_selection import RowSelection
+    from services.temporal_index import select_temporal
+
+    snapshot = DatasetSnapshot(('test',), [(s, w, t) for (s, w), t in _tables(partitions).items()])
+    cube = build_cube(snapshot.partitions)
+    rows = snapshot.selection()
+    assert cube.covers(rows)
+
+    by_worksheet = cube.slice(cell_filter(worksheet=lambda name: name == 'Region'))
+    assert by_worksheet.covers(rows.where_worksheet(['Region']))
+    assert not by_worksheet.covers(rows)
+
+    march = cube.slice(cell_filter(month=3))
+    march_rows = select_temporal(rows, month=3)
+    assert march.covers(march_rows)
+    assert not cube.covers(march_rows)
+    # Jumlah baris sama, baris berbeda: geser satu posisi di part pertama
+    first = march_rows.parts[0]
+    data = first.data
+    taken = set(first.positions)
+    swap = next(i for i in range(len(data)) if i not in taken)
+    shifted = march_rows.narrow([sorted(taken - {first.positions[0]} | {swap})] + [None] * (len(march_rows.parts) - 1))
+    assert len(shifted) == march.row_count
+    assert not march.covers(shifted)
+
+    # Filter dimensi lain (tanpa padanan filter baris) dan list biasa tidak pernah dianggap mencakup
+    assert cube.slice(cell_filter(adset='Adset A')).scope is None
+    assert not cube.covers(list(rows))
+    assert not cube.covers(RowSelection.of(list(rows)[:10]))
+
+
+def _assert_same_cube(got, expected):
+    assert got.row_count == expected.row_count
+    assert set(got.keys) == set(expected.keys)
+    got_views, expected_views = cube_aggregates(got), cube_aggregates(expected)
+    for name in CUBE_VIEWS:
+        assert mismatches(expected_views[name], got_views[name], name) == []
+    for by in (('age',), ('worksheet', 'region'), ()):
+        assert mismatches(expected.rollup(by), got.rollup(by), repr(by)) == []
+
+
+def test_extended_matches_full_rebuild(partitions):
+    head = {(s, w): build_worksheet_table(s, w, [dict(r) for r in rows[:len(rows) // 2]]) for s, w, rows in partitions}
+    full = _tables(partitions)
+    cube = build_cube(head)
+    # Rollup di luar CUBE_VIEWS yang sudah di-memo juga harus ikut delta
+    memo_before = cube.rollup(('age',))
+    before = cube_aggregates(cube)
+    tails = [full[key][len(head[key]):] for key in full]
+    extended = cube.extended(tails)
+    _assert_same_cube(extended, build_cube(full))
+    # Copy-on-write: cube lama tidak berubah
+    assert cube.rollup(('age',)) == memo_before
+    assert all(mismatches(before[name], cube_aggregates(cube)[name]) == [] for name in CUBE_VIEWS)
+
+
+def test_get_cube_delta_matches_rebuild(partitions, monkeypatch):
+    from services import olap_cube
+    from services.dataset_loader import DatasetSnapshot
+
+    monkeypatch.setattr(olap_cube, 'CUBE_ENABLED', True)
+    monkeypatch.setattr(olap_cube, 'INCREMENTAL_ENABLED', True)
+    key = ('test-delta',)
+
+    def snapshot(cut, extra=None, drop=None, edit=False):
+        sources = []
+        for s, w, rows in partitions:
+            if w == drop:
+                continue
+            rows = [dict(r) for r in rows[:cut(len(rows))]]
+            if edit and 'Cost' in rows[3]:
+                rows[3]['Cost'] = 123456
+            sources.append((s, w, build_worksheet_table(s, w, rows)))
+        if extra:
+            sources.append(('sheet-3', 'Extra', build_worksheet_table('sheet-3', 'Extra', [dict(r) for r in extra])))
+        return DatasetSnapshot(key, sources)
+
+    def stats():
+        return {k: olap_cube.get_cube_stats()[k] for k in ('builds', 'delta_updates', 'invalidated')}
+
+    first = snapshot(lambda n: n * 2 // 3)
+    cube = olap_cube.get_cube(first)
+    start = stats()
+    steps = [
+        (snapshot(lambda n: n * 2 // 3 + 5), 'delta_updates'),                 # append di semua partisi
+        (snapshot(lambda n: n, extra=partitions[0][2][:50]), 'delta_updates'),  # append + partisi baru
+        (snapshot(lambda n: n, extra=partitions[0][2][:50], edit=True), 'invalidated'),  # baris lama berubah
+        (snapshot(lambda n: n, drop='Adset'), 'invalidated'),                   # partisi hilang
+    ]
+    for i, (snap, counter) in enumerate(steps):
+        before = stats()
+        previous = cube
+        cube = olap_cube.get_cube(snap)
+        assert cube is not previous and cube.version == snap.version
+        assert stats()[counter] == before[counter] + 1, (i, counter)
+        _assert_same_cube(cube, build_cube(snap.partitions))
+        assert cube.covers(snap.selection())
+    assert stats()['builds'] == start['builds'] + 2
+
+
+@pytest.mark.parametrize('header_age, header_gender', [('age', 'gender'), ('usia', 'jenis kelamin'), ('AGE', 'GENDER')])
+def test_adset_by_age_gender_resolves_header_variants(header_age, header_gender):
+    rows = [
+        {'Ad set': 'A', header_age: '45-54', header_gender: 'Laki-laki', 'Cost': 100, 'Clicks': 3, 'worksheet': 'w'},
+        {'Ad set': 'B', header_age: '45-54 ', header_gender: 'female', 'Cost': 50, 'Clicks': 1, 'worksheet': 'w'},
+        {'Ad set': 'A', header_age: '18-24', header_gender: 'pria', 'Cost': 10, 'Clicks': 1, 'worksheet': 'w'},
+    ]
+    table = build_worksheet_table('sheet-1', 'w', rows)
+    cube = build_cube({('sheet-1', 'w'): table})
+    for age, gender in (('45-54', 'male'), ('45-54', None), (None, 'laki-laki'), ('18-24', 'female')):
+        expected = aggregate_adset_by_age_gender(list(table), age, gender, backend='python')
+        assert mismatches(expected, adset_by_age_gender(cube, age, gender)) == [], (age, gender)
+    assert list(adset_by_age_gender(cube, '45-54', 'male')) == ['A']
+    # View age_gender tetap mengikuti r.get('Age') seperti aggregate_age_gender
+    assert mismatches(aggregate_workflow(list(table), requested={'age_gender'}, backend='python')['age_gender'],
+                      cube.view('age_gender')) == []
@@ -0,0 +1,77 @@
+"""RowSelection (services/row_selection.py): view zero-copy harus sama dengan filter list lama."""
+import pytest
+
+from services.row_selection import RowSelection
+from services.worksheet_table import build_worksheet_table
+
+
+@pytest.fixture
+def snapshot_parts(partitions):
+    # Dua worksheet bertipe + satu list dict biasa + satu worksheet kosong (seperti DatasetSnapshot.partitions)
+    (s1, w1, r1), (s2, w2, r2), (s3, w3, r3) = partitions[:3]
+    return {
+        (s1, w1): build_worksheet_table(s1, w1, [dict(r) for r in r1]),
+        (s2, w2): build_worksheet_table(s2, w2, [dict(r) for r in r2]),
+        (s3, w3): r3,
+        (s3, 'Empty'): [],
+    }
+
+
+def _same(got, expected):
+    got = list(got)
+    return len(got) == len(expected) and all(a is b for a, b in zip(got, expected))
+
+
+def test_sequence_matches_concatenated_rows(snapshot_parts):
+    selection = RowSelection.from_partitions(snapshot_parts)
+    rows = [row for data in snapshot_parts.values() for row in data]
+    assert len(selection) == len(rows) and _same(selection, rows)
+    boundary = len(snapshot_parts[('sheet-1', 'Age Gender')])
+    for i in (0, boundary - 1, boundary, len(rows) - 1, -1, -len(rows)):
+        assert selection[i] is rows[i]
+    for sl in (slice(None, 3), slice(5, 40, 7), slice(-5, None), slice(boundary - 2, boundary + 2)):
+        assert _same(selection[sl], rows[sl])
+    with pytest.raises(IndexError):
+        selection[len(rows)]
+
+
+@pytest.mark.parametrize('names', [['Age Gender'], ['Region', 'Adset'], ['Empty'], ['nope']])
+def test_where_worksheet_matches_list_filter(snapshot_parts, names):
+    rows = [row for data in snapshot_parts.values() for row in data]
+    selection = RowSelection.from_partitions(snapshot_parts)
+    expected = [row for row in rows if row.get('worksheet') in names]
+    got = selection.where_worksheet(names)
+    assert isinstance(got, RowSelection) and _same(got, expected)
+    assert set(got.worksheets()) == {row.get('worksheet') for row in expected}
+    # Sumber list tanpa key partisi: filter per baris
+    mixed = [row for i, row in enumerate(rows) if i % 3]
+    assert _same(RowSelection.of(mixed).where_worksheet(names), [row for row in mixed if row.get('worksheet') in names])
+
+
+def test_narrow_composes_without_copying(snapshot_parts):
+    selection = RowSelection.from_partitions(snapshot_parts)
+    # Part kosong dibuang oleh from_partitions atau narrow; posisi per part relatif terhadap data part
+    selections = [range(0, len(part.data), 2) for part in selection.parts]
+    even = selection.narrow(selections)
+    expected = [row for part in selection.parts for i, row in enumerate(part.data) if i % 2 == 0]
+    assert _same(even, expected)
+    assert all(part.data is snapshot_parts[part.key] for part in even.parts)
+    narrower = even.narrow([None if i == 0 else [] for i in range(len(even.parts))])
+    first = even.parts[0]
+    assert len(narrower.parts) == 1 and _same(narrower, [first.data[i] for i in first.positions])
+    assert len(selection.narrow([[] for _ in selection.parts])) == 0
+
+
+def test_of_and_columns(snapshot_parts):
+    table = snapshot_parts[('sheet-1', 'Age Gender')]
+    dicts = snapshot_parts[('sheet-2', 'Adset')]
+    subset = [table[i] for i in range(0, len(table), 5)]
+    for rows in (table, dicts, subset, subset + dicts):
+        assert _same(RowSelection.of(rows), list(rows))
+    selection = RowSelection.of(subset)
+    assert RowSelection.of(selection) is selection
+    assert selection.parts[0].data is table and selection.parts[0].key == ('sheet-1', 'Age Gender')
+    full = RowSelection.from_partitions(snapshot_parts)
+    assert full.columns(('sheet-1', 'Age Gender')) == list(table.header)
+    assert full.columns(('sheet-2', 'Adset')) == list(dicts[0].keys())
+    assert full.columns(('sheet-2', 'Empty')) == []
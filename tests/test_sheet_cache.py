@@ -0,0 +1,262 @@
+"""
+sheet_cache: writer background (tier bersama & snapshot ditulis di luar thread request),
+single-flight fetch worksheet dan stale-while-revalidate L1.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import shared_cache, sheet_cache, snapshot_store
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, 'SHARED_CACHE_ENABLED', True)
+    monkeypatch.setattr(shared_cache, 'SHARED_CACHE_PATH', str(tmp_path / 'cache' / 'gsheet_cache.db'))
+    monkeypatch.setattr(shared_cache, '_initialized', False)
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_ENABLED', True)
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_DIR', str(tmp_path / 'cache' / 'snapshots'))
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_ASYNC_PERSIST', True)
+    yield
+    assert sheet_cache.flush_persistence(10)
+    sheet_cache.clear_gsheet_cache()
+
+
+ROWS = [{'Date': '2025-01-01', 'Cost': '1.500', 'worksheet': 'Daily'}, {'Date': '2025-01-02', 'Cost': '20', 'worksheet': 'Daily'}]
+
+
+def test_set_returns_before_persisting(stores):
+    with sheet_cache._persist_io_lock:
+        # Writer tertahan: request tetap selesai dan data sudah ada di L1
+        data = sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS], revision='r1')
+        assert len(data) == 2
+        assert sheet_cache.get_cached_sheet_data('sheet-1', 'Daily') is data
+        assert shared_cache.shared_get_fetched_at('sheet-1', 'Daily') is None
+    assert sheet_cache.flush_persistence(10)
+    shared = shared_cache.shared_get('sheet-1', 'Daily')
+    assert shared is not None and shared[2] == 'r1' and len(shared[0]) == 2
+    assert snapshot_store.load_snapshot('sheet-1', 'Daily')['revision'] == 'r1'
+
+
+def test_pending_writes_coalesce_and_invalidate_drops_them(stores):
+    with sheet_cache._persist_io_lock:
+        sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS], revision='r1')
+        data = sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS[:1]], revision='r2')
+        # Renew di atas set yang belum ditulis tetap menulis data penuh
+        sheet_cache.renew_cached_sheet_data('sheet-1', 'Daily', data, 'r3')
+        assert sheet_cache.get_persist_stats()["pending"] == 1
+    assert sheet_cache.flush_persistence(10)
+    shared = shared_cache.shared_get('sheet-1', 'Daily')
+    assert shared[2] == 'r3' and len(shared[0]) == 1
+
+    with sheet_cache._persist_io_lock:
+        sheet_cache.set_cached_sheet_data('sheet-1', 'Weekly', [dict(r) for r in ROWS], revision='w1')
+    sheet_cache.invalidate_cached_sheet_data('sheet-1', 'Weekly')
+    assert sheet_cache.flush_persistence(10)
+    assert shared_cache.shared_get('sheet-1', 'Weekly') is None
+    assert snapshot_store.load_snapshot('sheet-1', 'Weekly') is None
+
+
+def test_lease_released_after_write(stores):
+    assert shared_cache.try_acquire_lease('sheet-1', 'Daily')
+    with sheet_cache._persist_io_lock:
+        sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS])
+        sheet_cache.release_lease_after_persist('sheet-1', 'Daily')
+        # Lease masih dipegang selama hasil belum ada di tier bersama
+        assert shared_cache.shared_get_fetched_at('sheet-1', 'Daily') is None
+        with ThreadPoolExecutor(1) as pool:
+            assert not pool.submit(shared_cache.try_acquire_lease, 'sheet-1', 'Daily').result()
+    assert sheet_cache.flush_persistence(10)
+    assert shared_cache.shared_get_fetched_at('sheet-1', 'Daily') is not None
+    # Lease milik thread request dilepas oleh writer (thread lain boleh mengambilnya)
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(shared_cache.try_acquire_lease, 'sheet-1', 'Daily').result()
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    # Hanya L1: tanpa tier bersama/snapshot, antrian refresh diperiksa test (thread refresher tidak jalan)
+    monkeypatch.setattr(shared_cache, 'SHARED_CACHE_ENABLED', False)
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_ENABLED', False)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_ASYNC_PERSIST', False)
+    monkeypatch.setattr(sheet_cache, '_inflight', {})
+    monkeypatch.setattr(sheet_cache, '_singleflight_stats', {"fetches": 0, "coalesced": 0, "failed": 0, "timeouts": 0})
+    monkeypatch.setattr(sheet_cache, '_refresh_queue', queue.Queue())
+    monkeypatch.setattr(sheet_cache, '_refresh_pending', set())
+    monkeypatch.setattr(sheet_cache, '_swr_stats', {"stale_served": 0, "refresh_scheduled": 0, "refreshed": 0, "refresh_failed": 0})
+    monkeypatch.setattr(sheet_cache, '_ensure_refresher_started', lambda: None)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_SWR', True)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_TTL', 100)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_MAX_STALENESS', 50)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_REFRESH_AHEAD', 10)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_SINGLEFLIGHT_TIMEOUT', 10)
+    sheet_cache.clear_gsheet_cache()
+    yield
+    sheet_cache.clear_gsheet_cache()
+
+
+def _load(sheet_id, worksheet_name, loader):
+    # Pola load_worksheet (services/sheet_loader.py): MISS -> claim -> leader fetch + complete -> wait
+    data = sheet_cache.get_cached_sheet_data(sheet_id, worksheet_name)
+    if data is not None:
+        return worksheet_name, data
+    future, is_leader = sheet_cache.claim_sheet_fetch(sheet_id, worksheet_name)
+    if is_leader:
+        try:
+            data = sheet_cache.set_cached_sheet_data(sheet_id, worksheet_name, loader())
+            sheet_cache.complete_sheet_fetch(sheet_id, worksheet_name, result=(worksheet_name, data))
+        except Exception as e:
+            sheet_cache.complete_sheet_fetch(sheet_id, worksheet_name, error=e)
+    return sheet_cache.wait_sheet_fetch(sheet_id, worksheet_name, future)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "kondisi tidak terpenuhi sebelum timeout"
+        time.sleep(0.005)
+
+
+def _age_entry(cache_key, age):
+    data, fetched_at = sheet_cache._gsheet_cache[cache_key]
+    sheet_cache._gsheet_cache[cache_key] = (data, time.time() - age)
+
+
+CONCURRENT = 8
+
+
+def test_concurrent_misses_call_loader_once(local_cache):
+    calls = []
+
+    def loader():
+        calls.append(threading.get_ident())
+        # Leader menahan fetch sampai semua thread lain sudah menunggu future yang sama
+        _wait_for(lambda: sheet_cache.get_singleflight_stats()["coalesced"] == CONCURRENT - 1)
+        return [dict(r) for r in ROWS]
+
+    barrier = threading.Barrier(CONCURRENT)
+
+    def request():
+        barrier.wait()
+        return _load('sheet-1', 'Daily', loader)
+
+    with ThreadPoolExecutor(CONCURRENT) as pool:
+        results = [future.result() for future in [pool.submit(request) for _ in range(CONCURRENT)]]
+    assert len(calls) == 1
+    assert all(name == 'Daily' and data is results[0][1] for name, data in results)
+    assert len(results[0][1]) == 2
+    stats = sheet_cache.get_singleflight_stats()
+    assert stats["fetches"] == 1 and stats["coalesced"] == CONCURRENT - 1 and stats["inflight"] == []
+    # Sesudahnya cache HIT, loader tidak dipanggil lagi
+    assert _load('sheet-1', 'Daily', loader)[1] is results[0][1]
+    assert len(calls) == 1
+
+
+def test_leader_error_propagates_and_frees_key(local_cache):
+    def failing():
+        _wait_for(lambda: sheet_cache.get_singleflight_stats()["coalesced"] == CONCURRENT - 1)
+        raise RuntimeError("quota exceeded")
+
+    barrier = threading.Barrier(CONCURRENT)
+
+    def request():
+        barrier.wait()
+        try:
+            _load('sheet-1', 'Daily', failing)
+        except RuntimeError as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(CONCURRENT) as pool:
+        errors = [future.result() for future in [pool.submit(request) for _ in range(CONCURRENT)]]
+    assert errors == ["quota exceeded"] * CONCURRENT
+    stats = sheet_cache.get_singleflight_stats()
+    assert stats["failed"] == 1 and stats["inflight"] == []
+    # Key sudah bebas: request berikutnya jadi leader baru dan berhasil
+    assert _load('sheet-1', 'Daily', lambda: [dict(r) for r in ROWS])[1] is not None
+    assert sheet_cache.get_singleflight_stats()["fetches"] == 2
+
+
+def test_waiter_times_out(local_cache, monkeypatch):
+    monkeypatch.setattr(sheet_cache, '_GSHEET_SINGLEFLIGHT_TIMEOUT', 0.05)
+    future, is_leader = sheet_cache.claim_sheet_fetch('sheet-1', 'Daily')
+    assert is_leader
+    waiter, is_leader = sheet_cache.claim_sheet_fetch('sheet-1', 'Daily')
+    assert not is_leader and waiter is future
+    with pytest.raises(Exception, match='Timeout'):
+        sheet_cache.wait_sheet_fetch('sheet-1', 'Daily', waiter)
+    assert sheet_cache.get_singleflight_stats()["timeouts"] == 1
+    sheet_cache.complete_sheet_fetch('sheet-1', 'Daily', result=('Daily', []))
+
+
+def test_stale_entry_served_and_refreshed_once(local_cache, monkeypatch):
+    from services import sheet_loader
+
+    old = sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS])
+    sheet_cache.set_cached_sheet_data('sheet-1', 'Weekly', [dict(r) for r in ROWS])
+    _age_entry('sheet-1:Daily', 120)
+    _age_entry('sheet-1:Weekly', 149)
+
+    # Stale dalam TTL + MAX_STALENESS: data lama dilayani, refresh hanya diantri sekali per key
+    for _ in range(3):
+        assert sheet_cache._get_local_sheet_data('sheet-1:Daily') is old
+    assert sheet_cache._get_local_sheet_data('sheet-1:Weekly') is not None
+    stats = sheet_cache.get_swr_stats()
+    assert stats["stale_served"] == 4 and stats["refresh_scheduled"] == 2
+    assert sheet_cache._refresh_queue.qsize() == 2
+
+    # Refresher mengumpulkan semua key yang antri jadi satu batch (satu batchGet per spreadsheet)
+    class Stop(Exception):
+        pass
+
+    batches = []
+
+    def record(keys):
+        batches.append(keys)
+        raise Stop()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(sheet_cache, '_refresh_keys', record)
+        with pytest.raises(Stop):
+            sheet_cache._refresher_loop()
+    assert batches == [['sheet-1:Daily', 'sheet-1:Weekly']]
+
+    refreshed = []
+
+    def refresh_worksheets(sheet_id, names):
+        refreshed.append((sheet_id, list(names)))
+        sheet_cache.set_cached_sheet_data(sheet_id, 'Daily', [dict(r) for r in ROWS[:1]])
+        return 1
+
+    monkeypatch.setattr(sheet_loader, 'refresh_worksheets', refresh_worksheets)
+    sheet_cache._refresh_keys(batches[0])
+    assert refreshed == [('sheet-1', ['Daily', 'Weekly'])]
+    assert sheet_cache._refresh_pending == set()
+    stats = sheet_cache.get_swr_stats()
+    assert stats["refreshed"] == 1 and stats["refresh_failed"] == 1
+    fresh = sheet_cache._get_local_sheet_data('sheet-1:Daily')
+    assert fresh is not old and len(fresh) == 1
+    assert sheet_cache.get_swr_stats()["stale_served"] == 4
+
+    # Weekly masih stale dan tidak ter-refresh: diantri lagi pada akses berikutnya
+    assert sheet_cache._get_local_sheet_data('sheet-1:Weekly') is not None
+    assert sheet_cache.get_swr_stats()["refresh_scheduled"] == 3
+
+
+def test_stale_entry_expires_after_max_staleness(local_cache, monkeypatch):
+    sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS])
+    _age_entry('sheet-1:Daily', 151)
+    assert sheet_cache._get_local_sheet_data('sheet-1:Daily') is None
+    assert 'sheet-1:Daily' not in sheet_cache._gsheet_cache
+    assert sheet_cache.get_cache_policy_status()["evictions"].get("expired", 0) >= 1
+    assert sheet_cache._refresh_queue.qsize() == 0
+
+    # Tanpa SWR entry expired tepat di TTL
+    sheet_cache.set_cached_sheet_data('sheet-1', 'Daily', [dict(r) for r in ROWS])
+    _age_entry('sheet-1:Daily', 101)
+    monkeypatch.setattr(sheet_cache, '_GSHEET_CACHE_SWR', False)
+    assert sheet_cache._get_local_sheet_data('sheet-1:Daily') is None
+    assert sheet_cache._refresh_queue.qsize() == 0
@@ -0,0 +1,109 @@
+"""Ingestion incremental (services/sheet_incremental.py): append baris baru vs download penuh."""
+import pytest
+
+from conftest import FakeSpreadsheet
+from services import sheet_incremental, sheet_revision
+from services.sheet_incremental import try_incremental_append
+from services.sheet_loader import batch_get_worksheet_records, records_from_values
+from services.sheet_revision import build_revision, describe_values, find_unchanged_worksheets
+
+NEW_ROWS = [
+    ['2025-09-03', 'Adset B', '1,234', '10'],
+    ['2025-09-03', 'Adset C', '', '0.5'],
+    ['2025-09-04', 'Adset A'],
+]
+
+
+def ads_values():
+    return [
+        ['Date', 'Ad set', 'Cost', 'Impressions'],
+        ['2025-09-01', 'Adset A', '1,500', '100'],
+        ['2025-09-01', 'Adset B', '', '50'],
+        ['2025-09-02', 'Adset A', '2.5', '70'],
+    ]
+
+
+@pytest.fixture(autouse=True)
+def incremental_enabled(monkeypatch):
+    monkeypatch.setattr(sheet_incremental, 'INCREMENTAL_ENABLED', True)
+    monkeypatch.setattr(sheet_revision, 'REVISION_CHECK_ENABLED', True)
+    monkeypatch.setattr(sheet_revision, 'DRIVE_REVISION_ENABLED', False)
+
+
+def download(sh, ws_name):
+    info = {}
+    records = batch_get_worksheet_records(sh, [ws_name], info)[ws_name]
+    sh.calls.clear()
+    data = [dict(row, worksheet=ws_name) for row in records]
+    return data, build_revision(None, info[ws_name]['fingerprint'], watermark=info[ws_name]['watermark'])
+
+
+def check_and_append(sh, ws_name, source):
+    # Urutan sheet_loader: cek fingerprint dulu, kolom A hasilnya dipakai ulang untuk append
+    unchanged, drive_time, columns = find_unchanged_worksheets(sh, {ws_name: source[1]})
+    assert ws_name not in unchanged
+    return try_incremental_append(sh, {ws_name: source}, columns)
+
+
+def test_pure_append_matches_full_download():
+    sh = FakeSpreadsheet({'Daily': ads_values()})
+    data, rev = download(sh, 'Daily')
+    sh.worksheets['Daily'] += [list(row) for row in NEW_ROWS]
+    appended = check_and_append(sh, 'Daily', (data, rev))
+
+    full = [dict(row, worksheet='Daily') for row in records_from_values(sh.worksheets['Daily'])]
+    new_data, fingerprint, watermark = appended['Daily']
+    assert new_data == full
+    assert [row['Cost'] for row in new_data[-3:]] == [1234, '', '']
+    assert [row['Impressions'] for row in new_data[-3:]] == [10, 0.5, '']
+    assert {'fingerprint': fingerprint, 'watermark': watermark} == describe_values(sh.worksheets['Daily'])
+    # Data lama tidak diubah in-place; hanya 1 batchGet (header, baris watermark, tail) setelah cek fingerprint
+    assert len(data) == 3 and new_data[:3] == data
+    assert sh.calls[-1] == ["'Daily'!1:1", "'Daily'!4:4", "'Daily'!5:7"]
+
+
+def test_append_fetches_column_a_when_not_given():
+    sh = FakeSpreadsheet({'Daily': ads_values()})
+    data, rev = download(sh, 'Daily')
+    sh.worksheets['Daily'] += [list(row) for row in NEW_ROWS[:1]]
+    new_data, fingerprint, watermark = try_incremental_append(sh, {'Daily': (data, rev)})['Daily']
+    assert sh.calls[0] == ["'Daily'!A:A"]
+    assert new_data[-1] == {'Date': '2025-09-03', 'Ad set': 'Adset B', 'Cost': 1234, 'Impressions': 10,
+                            'worksheet': 'Daily'}
+    assert watermark == {'rows': 5, 'header': ads_values()[0]}
+
+
+@pytest.mark.parametrize('edit', ['column_a', 'delete', 'header', 'watermark_row', 'wide_tail', 'no_new_rows'])
+def test_non_append_changes_fall_back_to_full_reload(edit):
+    sh = FakeSpreadsheet({'Daily': ads_values()})
+    data, rev = download(sh, 'Daily')
+    values = sh.worksheets['Daily']
+    values += [list(row) for row in NEW_ROWS]
+    if edit == 'column_a':
+        values[1][0] = '2025-08-31'
+    elif edit == 'delete':
+        del values[2]
+    elif edit == 'header':
+        values[0][2] = 'Amount Spent'
+    elif edit == 'watermark_row':
+        values[3][2] = '3.5'
+    elif edit == 'wide_tail':
+        values[-1] = ['2025-09-04', 'Adset A', '1', '2', 'catatan']
+    else:
+        del values[4:]
+        values[3][3] = '71'
+    before = sheet_incremental.get_incremental_stats()["fallback_full_reload"]
+    assert check_and_append(sh, 'Daily', (data, rev)) == {}
+    assert sheet_incremental.get_incremental_stats()["fallback_full_reload"] == before + 1
+
+
+def test_worksheet_without_watermark_is_not_eligible():
+    # Baris lebih lebar dari header saat download penuh: watermark None, selalu download penuh
+    values = ads_values()
+    values[2] = values[2] + ['x']
+    sh = FakeSpreadsheet({'Daily': values})
+    data, rev = download(sh, 'Daily')
+    assert rev['watermark'] is None
+    sh.worksheets['Daily'] += [list(row) for row in NEW_ROWS]
+    assert try_incremental_append(sh, {'Daily': (data, rev)}) == {}
+    assert sh.calls == []
@@ -0,0 +1,119 @@
+"""records_from_values (services/sheet_loader.py) vs gspread Worksheet.get_all_records(head=1) asli."""
+import pytest
+from gspread.exceptions import GSpreadException
+from gspread.http_client import HTTPClient
+from gspread.worksheet import Worksheet
+
+from conftest import FakeSpreadsheet
+from services.sheet_loader import batch_get_worksheet_records, records_from_values
+
+VALUES = {
+    'numericise': [
+        ['Date', 'Cost', 'Impressions', 'Frequency', 'Note'],
+        ['2025-09-01', '', '1,234', '1.5', 'Rp 1.500'],
+        ['01/09/2025', '1_000', '-3', '1e3', ' 7 '],
+        ['2025-09-02', '0', '1.234,56', '2,5', 'abc'],
+    ],
+    'short_rows': [
+        ['Date', 'Ad set', 'Cost', 'Reach'],
+        ['2025-09-01', 'Adset A'],
+        [],
+        ['2025-09-02', '', '', '5'],
+        ['2025-09-03'],
+    ],
+    'long_rows': [
+        ['Date', 'Ad set', 'Cost'],
+        ['2025-09-01', 'Adset A', '10', '3'],
+        ['2025-09-02', 'Adset B', '20'],
+    ],
+    # Dua kolom tanpa header -> header hasil fill_gaps punya '' dobel -> GSpreadException
+    'long_rows_two_extra': [
+        ['Date', 'Ad set', 'Cost'],
+        ['2025-09-01', 'Adset A', '10', 'extra', '3'],
+    ],
+    'header_gap': [
+        ['Date', '', 'Cost'],
+        ['2025-09-01', 'x', '10'],
+    ],
+    'header_only': [['Date', 'Cost']],
+    'blank': [[]],
+    'empty': [],
+    'duplicate_header': [
+        ['Date', 'Cost', 'Date'],
+        ['2025-09-01', '1', '2025-09-02'],
+    ],
+    'duplicate_blank_header': [
+        ['Date', '', 'Cost', ''],
+        ['2025-09-01', 'x', '1', 'y'],
+    ],
+}
+
+
+class _ValuesClient(HTTPClient):
+    # Hanya values_get yang dipakai get_all_records; respons mengikuti Sheets API (tanpa 'values' jika kosong)
+    def __init__(self, values):
+        self.values = values
+
+    def values_get(self, spreadsheet_id, range_name, params=None):
+        response = {'range': range_name, 'majorDimension': 'ROWS'}
+        if self.values:
+            response['values'] = self.values
+        return response
+
+
+def get_all_records(values):
+    client = _ValuesClient(values)
+    worksheet = Worksheet(None, {'title': 'Daily', 'sheetId': 0, 'index': 0}, spreadsheet_id='sheet-1', client=client)
+    return worksheet.get_all_records()
+
+
+def _outcome(func, values):
+    try:
+        return func([list(row) for row in values])
+    except GSpreadException as e:
+        return ('GSpreadException', str(e).split(']')[0] + ']')
+
+
+@pytest.mark.parametrize('name', sorted(VALUES))
+def test_records_match_get_all_records(name):
+    expected = _outcome(get_all_records, VALUES[name])
+    assert _outcome(records_from_values, VALUES[name]) == expected
+    if isinstance(expected, list):
+        # Tipe ikut dibandingkan: 1 vs 1.0 vs '1'
+        got = records_from_values([list(row) for row in VALUES[name]])
+        assert [[type(v) for v in row.values()] for row in got] == [[type(v) for v in row.values()] for row in expected]
+
+
+def test_numericise_values():
+    rows = records_from_values(VALUES['numericise'])
+    assert rows[0]['Cost'] == '' and rows[0]['Impressions'] == 1234 and rows[0]['Frequency'] == 1.5
+    assert rows[0]['Note'] == 'Rp 1.500'
+    assert rows[1]['Cost'] == '1_000' and rows[1]['Frequency'] == 1000.0
+
+
+def test_gap_filling_and_wide_rows():
+    rows = records_from_values(VALUES['short_rows'])
+    assert rows[1] == {'Date': '', 'Ad set': '', 'Cost': '', 'Reach': ''}
+    assert rows[2]['Reach'] == 5 and rows[3]['Ad set'] == ''
+    # Kolom tanpa header jadi key ''
+    assert records_from_values(VALUES['long_rows'])[0][''] == 3
+    assert set(records_from_values(VALUES['long_rows'])[1]) == {'Date', 'Ad set', 'Cost', ''}
+
+
+@pytest.mark.parametrize('name', ['duplicate_header', 'duplicate_blank_header', 'long_rows_two_extra'])
+def test_duplicate_header_raises(name):
+    with pytest.raises(GSpreadException, match='duplicates'):
+        records_from_values(VALUES[name])
+
+
+def test_batch_get_isolates_bad_worksheet():
+    sh = FakeSpreadsheet({name: [list(row) for row in values] for name, values in VALUES.items()})
+    names = sorted(VALUES)
+    results = batch_get_worksheet_records(sh, names)
+    assert len(sh.calls) == 1
+    for name in names:
+        expected = _outcome(get_all_records, VALUES[name])
+        if isinstance(expected, tuple):
+            assert isinstance(results[name], GSpreadException)
+        else:
+            assert results[name] == expected
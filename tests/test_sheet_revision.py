@@ -0,0 +1,97 @@
+"""Conditional refresh (services/sheet_revision.py): worksheet tidak berubah tidak di-download ulang."""
+import time
+
+import pytest
+
+from conftest import FakeSpreadsheet
+from services import sheet_revision
+from services.sheet_loader import batch_get_worksheet_records
+from services.sheet_revision import build_revision, find_unchanged_worksheets
+
+
+def ads_values():
+    return [
+        ['Date', 'Ad set', 'Cost', 'Impressions'],
+        ['2025-09-01', 'Adset A', '1,500', '100'],
+        ['2025-09-01', 'Adset B', '', '50'],
+        ['2025-09-02', 'Adset A', '2.5', '70'],
+    ]
+
+
+@pytest.fixture(autouse=True)
+def revision_enabled(monkeypatch):
+    monkeypatch.setattr(sheet_revision, 'REVISION_CHECK_ENABLED', True)
+    monkeypatch.setattr(sheet_revision, 'DRIVE_REVISION_ENABLED', True)
+    monkeypatch.setattr(sheet_revision, '_drive_unavailable', False)
+
+
+def download(sh, names):
+    """Download penuh seperti sheet_loader: records + revision (fingerprint + watermark) per worksheet."""
+    info = {}
+    records = batch_get_worksheet_records(sh, names, info)
+    drive_time = sheet_revision.get_drive_modified_time(sh)
+    sh.calls.clear()
+    return {
+        ws_name: ([dict(row, worksheet=ws_name) for row in records[ws_name]],
+                  build_revision(drive_time, info[ws_name]['fingerprint'], watermark=info[ws_name]['watermark']))
+        for ws_name in names
+    }
+
+
+def revisions(downloaded):
+    return {ws_name: rev for ws_name, (data, rev) in downloaded.items()}
+
+
+def test_same_drive_time_skips_without_reading_values():
+    sh = FakeSpreadsheet({'Daily': ads_values(), 'Region': ads_values()}, modified='2025-09-02T10:00:00Z')
+    previous = revisions(download(sh, ['Daily', 'Region']))
+    unchanged, drive_time, columns = find_unchanged_worksheets(sh, previous)
+    assert set(unchanged) == {'Daily', 'Region'}
+    assert drive_time == '2025-09-02T10:00:00Z' and columns == {}
+    assert sh.calls == []
+    assert unchanged['Daily']['fingerprint'] == previous['Daily']['fingerprint']
+
+
+@pytest.mark.parametrize('modified', [None, '2025-09-03T08:00:00Z'])
+def test_unchanged_fingerprint_skips_download(modified):
+    sh = FakeSpreadsheet({'Daily': ads_values(), 'Region': ads_values()}, modified='2025-09-02T10:00:00Z')
+    previous = revisions(download(sh, ['Daily', 'Region']))
+    # Drive bilang spreadsheet berubah (atau Drive API tidak tersedia): fingerprint per tab yang menentukan
+    sh.modified = modified
+    # Edit di tengah sheet di luar kolom A tidak terlihat fingerprint (ditangkap GSHEET_REVISION_MAX_SKIP)
+    sh.worksheets['Region'][2][2] = '99'
+    unchanged, drive_time, columns = find_unchanged_worksheets(sh, previous)
+    assert set(unchanged) == {'Daily', 'Region'}
+    assert drive_time == modified and unchanged['Daily']['drive'] == modified
+    assert unchanged['Daily']['watermark'] == previous['Daily']['watermark']
+    # Dua batchGet untuk semua tab (kolom A, lalu baris terakhir), tidak ada download penuh
+    assert len(sh.calls) == 2
+    assert columns['Daily'] == ['Date', '2025-09-01', '2025-09-01', '2025-09-02']
+
+
+@pytest.mark.parametrize('edit', ['column_a', 'last_row', 'append', 'delete'])
+def test_changed_worksheet_is_downloaded(edit):
+    sh = FakeSpreadsheet({'Daily': ads_values(), 'Region': ads_values()})
+    previous = revisions(download(sh, ['Daily', 'Region']))
+    values = sh.worksheets['Daily']
+    if edit == 'column_a':
+        values[1][0] = '2025-08-31'
+    elif edit == 'last_row':
+        values[3][3] = '71'
+    elif edit == 'append':
+        values.append(['2025-09-03', 'Adset B', '3', '10'])
+    else:
+        del values[2]
+    unchanged, drive_time, columns = find_unchanged_worksheets(sh, previous)
+    assert set(unchanged) == {'Region'}
+
+
+def test_revision_older_than_max_skip_is_not_checked(monkeypatch):
+    sh = FakeSpreadsheet({'Daily': ads_values()}, modified='2025-09-02T10:00:00Z')
+    previous = revisions(download(sh, ['Daily']))
+    previous['Daily']['downloaded_at'] = time.time() - sheet_revision._REVISION_MAX_SKIP - 1
+    assert find_unchanged_worksheets(sh, previous)[0] == {}
+    assert sh.calls == []
+    monkeypatch.setattr(sheet_revision, 'REVISION_CHECK_ENABLED', False)
+    previous = revisions(download(sh, ['Daily']))
+    assert find_unchanged_worksheets(sh, previous) == ({}, None, {})
@@ -0,0 +1,75 @@
+"""TemporalIndex (services/temporal_index.py) vs filter per baris filter_sheet_data_by_temporal lama."""
+import pytest
+
+from conftest import make_rows
+from services import temporal_index
+from services.calendar_table import matches, row_calendar
+from services.row_selection import RowSelection
+from services.temporal_index import TemporalIndex, select_temporal
+from services.worksheet_table import build_worksheet_table
+
+# Tanggal tepi: minggu ke-5, kabisat, pergantian tahun/bulan
+EDGE_DATES = ['2024-02-29', '29/02/2024', '2024-12-31', '2025-01-01', '2025-03-31', '2025-03-29', '2025-03-28',
+              '2025-03-22', '2025-03-08', '2025-03-07', '2025-04-30', '2023-10-15', '', 'bukan tanggal']
+FILTERS = [
+    (2025, None, None), (2024, None, None), (2023, None, None), (2030, None, None),
+    (None, 3, None), (None, 2, None), (2024, 2, None), (2025, 12, None),
+    (None, None, 1), (None, None, 5), (None, 3, 5), (2025, 3, 4), (2025, 3, 5), (2024, 2, 5), (2025, 3, 1), (None, 13, None),
+]
+
+
+def _old_filter(rows, year, month, week):
+    # Loop filter_sheet_data_by_temporal sebelum indeks temporal
+    filtered = []
+    for row in rows:
+        entry = row_calendar(row)
+        if entry is not None and matches(entry, year, month, week):
+            filtered.append(row)
+    return filtered
+
+
+@pytest.fixture
+def dated_rows():
+    rows = make_rows('Age Gender', 500, 11)
+    for i, value in enumerate(EDGE_DATES):
+        rows[i * 7]['Date'] = value
+    return rows
+
+
+def _same(got, expected):
+    got = list(got)
+    return len(got) == len(expected) and all(a is b for a, b in zip(got, expected))
+
+
+@pytest.mark.parametrize('year, month, week', FILTERS)
+def test_select_temporal_matches_row_filter(dated_rows, year, month, week):
+    table = build_worksheet_table('sheet-1', 'Age Gender', [dict(r) for r in dated_rows])
+    rows = list(table)
+    subset = rows[::3]
+    for sheet_data in (table, rows, subset, dated_rows, subset + dated_rows[:50]):
+        expected = _old_filter(list(sheet_data), year, month, week)
+        got = select_temporal(sheet_data, year, month, week)
+        assert isinstance(got, RowSelection) and _same(got, expected), type(sheet_data)
+    # Komposisi: hasil filter worksheet / filter temporal lain tetap bisa difilter lagi
+    selection = RowSelection.from_partitions({('sheet-1', 'Age Gender'): table, ('sheet-2', 'Adset'): dated_rows})
+    narrowed = select_temporal(selection, year, None, None)
+    assert _same(select_temporal(narrowed, None, month, week), _old_filter(list(narrowed), None, month, week))
+
+
+def test_intervals_cover_exactly_matching_days():
+    days = [row_calendar({'Date': f"2024-{m:02d}-{d:02d}"}) for m in range(1, 13) for d in range(1, 32)
+            if row_calendar({'Date': f"2024-{m:02d}-{d:02d}"}) is not None]
+    index = TemporalIndex([entry.date for entry in days])
+    for year, month, week in FILTERS:
+        selected = set(index.select(year, month, week))
+        expected = {i for i, entry in enumerate(days) if matches(entry, year, month, week)}
+        assert selected == expected, (year, month, week)
+        # Memo: filter yang sama mengembalikan seleksi yang sama
+        assert index.select(year, month, week) is index.select(year, month, week)
+
+
+def test_index_disabled_falls_back_to_row_checks(dated_rows, monkeypatch):
+    monkeypatch.setattr(temporal_index, 'INDEX_ENABLED', False)
+    table = build_worksheet_table('sheet-1', 'Age Gender', [dict(r) for r in dated_rows])
+    for year, month, week in FILTERS[:6]:
+        assert _same(select_temporal(table, year, month, week), _old_filter(list(table), year, month, week))
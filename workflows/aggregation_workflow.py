@@ -20,93 +20,37 @@ from services.aggregation import (
     aggregate_age_gender_enhanced,
     aggregate_by_period_enhanced,
     aggregate_outbound_clicks,
-    aggregate_adset_by_age_gender  # ADDITIVE: Aggregate by adset filtered by age/gender
+    aggregate_adset_by_age_gender,  # ADDITIVE: Aggregate by adset filtered by age/gender
+    aggregate_workflow,  # ADDITIVE: Kernel gabungan untuk semua agregat workflow
+    WORKFLOW_AGGREGATES
 )
+# ADDITIVE: OLAP cube per snapshot (agregat dari rollup, tanpa scan baris)
+from services.olap_cube import CUBE_VIEWS, adset_by_age_gender, cell_filter, cube_aggregates
+# ADDITIVE: Tanggal kanonik + tabel kalender (satu aturan parse untuk semua kode temporal)
+from services.calendar_table import calendar_day, parse_date, row_calendar, row_month
+# ADDITIVE: Filter bulan/minggu lewat indeks temporal terurut per tabel
+from services.temporal_index import select_temporal
 
-# ADDITIVE: Helper function to extract month from date string
+# ADDITIVE: Helper function to extract month from date string (format kanonik services/calendar_table.py)
 def extract_month_from_date(date_str):
     """Extract month number (1-12) from date string in various formats"""
-    if not date_str:
-        return None
-    import re
-    from datetime import datetime
-    
-    date_str = str(date_str).strip()
-    
-    # Try ISO format YYYY-MM-DD
-    m = re.match(r'(\d{4})-(\d{2})-(\d{2})', date_str)
-    if m:
-        return int(m.group(2))
-    
-    # Try DD/MM/YYYY
-    m = re.match(r'(\d{1,2})/(\d{1,2})/(\d{4})', date_str)
-    if m:
-        return int(m.group(2))
-    
-    # Try datetime parsing as fallback
-    try:
-        dt = datetime.strptime(date_str, '%Y-%m-%d')
-        return dt.month
-    except:
-        pass
-    
-    try:
-        dt = datetime.strptime(date_str, '%d/%m/%Y')
-        return dt.month
-    except:
-        pass
-    
-    return None
+    entry = calendar_day(parse_date(date_str))
+    return entry.month if entry else None
 
 # ADDITIVE: Helper function to extract week number from date string
 def extract_week_from_date(date_str, month_num=None):
     """
     Extract week number (1-5) within a month from date string.
-    If month_num provided, calculate week relative to that month's start.
+    Week 1 = days 1-7, Week 2 = days 8-14, etc. (week_of_month tabel kalender).
     """
-    if not date_str:
-        return None
-    import re
-    from datetime import datetime
-    
-    date_str = str(date_str).strip()
-    dt = None
-    
-    # Try ISO format YYYY-MM-DD
-    m = re.match(r'(\d{4})-(\d{2})-(\d{2})', date_str)
-    if m:
-        dt = datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-    
-    # Try DD/MM/YYYY
-    if not dt:
-        m = re.match(r'(\d{1,2})/(\d{1,2})/(\d{4})', date_str)
-        if m:
-            dt = datetime(int(m.group(3)), int(m.group(2)), int(m.group(1)))
-    
-    # Try datetime parsing as fallback
-    if not dt:
-        try:
-            dt = datetime.strptime(date_str, '%Y-%m-%d')
-        except:
-            try:
-                dt = datetime.strptime(date_str, '%d/%m/%Y')
-            except:
-                return None
-    
-    if not dt:
-        return None
-    
-    # Calculate week number within the month (1-based)
-    # Week 1 = days 1-7, Week 2 = days 8-14, etc.
-    day_of_month = dt.day
-    week_of_month = ((day_of_month - 1) // 7) + 1
-    
-    return week_of_month
+    entry = calendar_day(parse_date(date_str))
+    return entry.week_of_month if entry else None
 
 # Move AggregationState class definition to the top so all functions can reference it
+from typing import Any
 from pydantic import BaseModel
 class AggregationState(BaseModel):
-    sheet_data: list
+    sheet_data: Any  # ADDITIVE: list / RowSelection (services/row_selection.py); Any agar view tidak disalin pydantic jadi list
     question: str = None  # Tambah field question agar selalu ada di state
     main_metrics: dict = None
     daily_weekly: tuple = None
@@ -130,6 +74,8 @@ class AggregationState(BaseModel):
     sorted_months: list = None  # Urutan bulan hasil agregasi
     adsets_by_sheet: dict = None  # New: hasil ekstraksi ad set per sheet
     chat_history: list = None  # ADDITIVE: Chat history for LLM context memory
+    fused_aggregates: dict = None  # ADDITIVE: Hasil aggregate_workflow (satu scan), dibaca node agregasi
+    cube: Any = None  # ADDITIVE: OlapCube (services/olap_cube.py) yang mencakup tepat sheet_data ini, None = dari baris
 
 
 # Node: Tren/agregasi bulanan segmented age|gender (additive)
@@ -146,7 +92,7 @@ def node_aggregate_age_gender_monthly(state: AggregationState):
     gender = gender_match.group(1)
     gender_norm = 'female' if gender in ['wanita','perempuan','female'] else 'male' if gender in ['pria','laki','male'] else gender
     key = f"{age}|{gender_norm}"
-    monthly_stats = aggregate_age_gender_monthly(state.sheet_data)
+    monthly_stats = _fused_result(state, 'age_gender_monthly', lambda: aggregate_age_gender_monthly(state.sheet_data))
     filtered = {k: v for k, v in monthly_stats.items() if k[0].lower() == key.lower()}
     sorted_months = sorted([k[1] for k in filtered.keys()])
     print(f"[DEBUG] AGG_SEG key={key}")
@@ -159,14 +105,75 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 # Node: Jawab pertanyaan umum/non-analitik langsung ke LLM (tidak dipakai lagi, intent di route)
 graph = StateGraph(AggregationState)
+
+# ADDITIVE: Helper deteksi yang dipakai node agregasi & node_fused_aggregates
+def _needs_daily(question):
+    question_lower = (question or "").lower()
+    return any(kw in question_lower for kw in ["tanggal", "date", "hari", "harian", "daily"])
+
+def _detect_adset_name(question_lower):
+    """Nama adset dari pertanyaan ("pada adset X", "adset X"), atau None."""
+    import re
+    adset_patterns = [
+        r'(?:pada|di|untuk|dari)\s+(?:ad\s*set|adset)\s+([a-zA-Z0-9_\-&]+)',  # pada adset vgardh2_oil&gas
+        r'(?:ad\s*set|adset)\s+([a-zA-Z0-9_\-&]+)',  # adset vgardh2_oil&gas
+    ]
+    for pattern in adset_patterns:
+        match = re.search(pattern, question_lower, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+def _has_temporal_filter(question):
+    from services.llm_summary import detect_temporal_filter
+    temporal_filter = detect_temporal_filter(question)
+    return any([temporal_filter.get('week_num'), temporal_filter.get('month_num'), temporal_filter.get('year')])
+
+def _fused_result(state, name, compute):
+    """Hasil agregat dari node_fused_aggregates jika tersedia, selain itu compute() seperti biasa."""
+    fused = state.fused_aggregates
+    if fused and name in fused:
+        return fused[name]
+    return compute()
+
+# ADDITIVE: Node kernel gabungan - semua agregat yang akan dipakai node berikutnya dihitung dari satu scan
+def node_fused_aggregates(state: AggregationState):
+    sheet_data = state.sheet_data
+    requested = set(WORKFLOW_AGGREGATES)
+    # Aturan skip sama dengan node masing-masing (agregat yang tidak akan dipakai tidak dihitung)
+    if len(sheet_data) > 5000:
+        requested -= {'breakdown_ad', 'breakdown_ad_enhanced'}
+        if not _needs_daily(state.question):
+            requested.discard('period_stats_daily')
+    if state.intent != 'tanya_tren':
+        requested.discard('age_gender_monthly')
+    if state.question and _detect_adset_name(state.question.lower()):
+        # node_age_gender_enhanced memfilter per adset, dihitung di node tersebut
+        requested.discard('age_gender_enhanced')
+    if state.question and _has_temporal_filter(state.question):
+        # node_outbound_clicks menerapkan filter temporal sendiri
+        requested.discard('outbound_clicks')
+    fused = {}
+    if state.cube is not None:
+        # ADDITIVE: Agregat yang tersedia sebagai view cube dijawab dari rollup, sisanya dari baris
+        from_cube = [name for name in CUBE_VIEWS if name in requested]
+        fused.update(cube_aggregates(state.cube, requested=from_cube))
+        requested -= set(from_cube)
+    if requested:
+        fused.update(aggregate_workflow(sheet_data, requested=requested))
+    return state.copy(update={"fused_aggregates": fused, "question": state.question})
+
 def node_main_metrics(state: AggregationState):
-    return state.copy(update={"main_metrics": aggregate_main_metrics(state.sheet_data), "question": state.question})
+    main_metrics = _fused_result(state, 'main_metrics', lambda: aggregate_main_metrics(state.sheet_data))
+    return state.copy(update={"main_metrics": main_metrics, "question": state.question})
 
 def node_daily_weekly(state: AggregationState):
-    return state.copy(update={"daily_weekly": aggregate_daily_weekly_cost(state.sheet_data), "question": state.question})
+    daily_weekly = _fused_result(state, 'daily_weekly', lambda: aggregate_daily_weekly_cost(state.sheet_data))
+    return state.copy(update={"daily_weekly": daily_weekly, "question": state.question})
 
 def node_breakdown_adset(state: AggregationState):
-    return state.copy(update={"breakdown_adset": aggregate_breakdown(state.sheet_data, by="Ad set"), "question": state.question})
+    breakdown = _fused_result(state, 'breakdown_adset', lambda: aggregate_breakdown(state.sheet_data, by="Ad set"))
+    return state.copy(update={"breakdown_adset": breakdown, "question": state.question})
 
 def node_breakdown_ad(state: AggregationState):
     # ADDITIVE: Skip old ad breakdown for large datasets (performance optimization)
@@ -174,15 +181,17 @@ def node_breakdown_ad(state: AggregationState):
     if len(state.sheet_data) > 5000:
         print(f"[DEBUG] node_breakdown_ad: SKIPPED - dataset too large ({len(state.sheet_data)} rows)")
         return state.copy(update={"breakdown_ad": {}, "question": state.question})
-    return state.copy(update={"breakdown_ad": aggregate_breakdown(state.sheet_data, by="Ad"), "question": state.question})
+    breakdown = _fused_result(state, 'breakdown_ad', lambda: aggregate_breakdown(state.sheet_data, by="Ad"))
+    return state.copy(update={"breakdown_ad": breakdown, "question": state.question})
 
 def node_age_gender(state: AggregationState):
-    return state.copy(update={"age_gender": aggregate_age_gender(state.sheet_data), "question": state.question})
+    age_gender = _fused_result(state, 'age_gender', lambda: aggregate_age_gender(state.sheet_data))
+    return state.copy(update={"age_gender": age_gender, "question": state.question})
 
 # ADDITIVE: Node untuk region breakdown
 def node_region(state: AggregationState):
     print("[DEBUG] node_region: executing aggregate_region")
-    region_data = aggregate_region(state.sheet_data)
+    region_data = _fused_result(state, 'region_breakdown', lambda: aggregate_region(state.sheet_data))
     print(f"[DEBUG] node_region: aggregated {len(region_data)} regions")
     return state.copy(update={"region_breakdown": region_data, "question": state.question})
 
@@ -190,7 +199,7 @@ def node_region(state: AggregationState):
 def node_breakdown_adset_enhanced(state: AggregationState):
     """Enhanced adset breakdown dengan metrik lengkap (CPM, CPC, CPLC, Frequency, dll)"""
     print("[DEBUG] node_breakdown_adset_enhanced: executing")
-    data = aggregate_breakdown_enhanced(state.sheet_data, by="Ad set")
+    data = _fused_result(state, 'breakdown_adset_enhanced', lambda: aggregate_breakdown_enhanced(state.sheet_data, by="Ad set"))
     print(f"[DEBUG] node_breakdown_adset_enhanced: aggregated {len(data)} adsets")
     return state.copy(update={"breakdown_adset_enhanced": data, "question": state.question})
 
@@ -204,7 +213,7 @@ def node_breakdown_ad_enhanced(state: AggregationState):
         print(f"[DEBUG] node_breakdown_ad_enhanced: SKIPPED - dataset too large ({len(state.sheet_data)} rows), ad-level aggregation disabled for performance")
         return state.copy(update={"breakdown_ad_enhanced": {}, "question": state.question})
     
-    data = aggregate_breakdown_enhanced(state.sheet_data, by="Ad")
+    data = _fused_result(state, 'breakdown_ad_enhanced', lambda: aggregate_breakdown_enhanced(state.sheet_data, by="Ad"))
     print(f"[DEBUG] node_breakdown_ad_enhanced: aggregated {len(data)} ads")
     return state.copy(update={"breakdown_ad_enhanced": data, "question": state.question})
 
@@ -214,30 +223,20 @@ def node_age_gender_enhanced(state: AggregationState):
     
     # ADDITIVE: Detect adset name in question for cross-filter (age/gender + adset)
     # If not found, function call remains unchanged (backward compatible)
-    adset_name = None
     question_lower = state.question.lower()
     
     # Check for adset keywords followed by potential adset name
     # Patterns: "adset X", "pada adset X", "di adset X", etc.
-    import re
-    adset_patterns = [
-        r'(?:pada|di|untuk|dari)\s+(?:ad\s*set|adset)\s+([a-zA-Z0-9_\-&]+)',  # pada adset vgardh2_oil&gas
-        r'(?:ad\s*set|adset)\s+([a-zA-Z0-9_\-&]+)',  # adset vgardh2_oil&gas
-    ]
-    
-    for pattern in adset_patterns:
-        match = re.search(pattern, question_lower, re.IGNORECASE)
-        if match:
-            adset_name = match.group(1)
-            print(f"[DEBUG] node_age_gender_enhanced: detected adset_name='{adset_name}' from question")
-            break
+    adset_name = _detect_adset_name(question_lower)
+    if adset_name:
+        print(f"[DEBUG] node_age_gender_enhanced: detected adset_name='{adset_name}' from question")
     
     # Call aggregate function with or without adset filter (ADDITIVE)
     if adset_name:
         data = aggregate_age_gender_enhanced(state.sheet_data, adset_name=adset_name)
         print(f"[DEBUG] node_age_gender_enhanced: aggregated {len(data)} age|gender segments (filtered by adset '{adset_name}')")
     else:
-        data = aggregate_age_gender_enhanced(state.sheet_data)
+        data = _fused_result(state, 'age_gender_enhanced', lambda: aggregate_age_gender_enhanced(state.sheet_data))
         print(f"[DEBUG] node_age_gender_enhanced: aggregated {len(data)} age|gender segments")
     
     return state.copy(update={"age_gender_enhanced": data, "question": state.question})
@@ -248,7 +247,7 @@ def node_period_daily(state: AggregationState):
     
     # ADDITIVE: Check if user query needs daily data
     question_lower = (state.question or "").lower()
-    needs_daily = any(kw in question_lower for kw in ["tanggal", "date", "hari", "harian", "daily"])
+    needs_daily = _needs_daily(question_lower)
     
     # DEBUG: Print state.question to verify it's passed correctly
     print(f"[DEBUG] node_period_daily: state.question = '{state.question}'")
@@ -266,21 +265,21 @@ def node_period_daily(state: AggregationState):
     if needs_daily and len(state.sheet_data) > 5000:
         print(f"[DEBUG] node_period_daily: ENABLED for date query despite large dataset ({len(state.sheet_data)} rows)")
     
-    data = aggregate_by_period_enhanced(state.sheet_data, period='daily')
+    data = _fused_result(state, 'period_stats_daily', lambda: aggregate_by_period_enhanced(state.sheet_data, period='daily'))
     print(f"[DEBUG] node_period_daily: aggregated {len(data)} days")
     return state.copy(update={"period_stats_daily": data, "question": state.question})
 
 def node_period_weekly(state: AggregationState):
     """Weekly aggregation dengan metrik lengkap"""
     print("[DEBUG] node_period_weekly: executing")
-    data = aggregate_by_period_enhanced(state.sheet_data, period='weekly')
+    data = _fused_result(state, 'period_stats_weekly', lambda: aggregate_by_period_enhanced(state.sheet_data, period='weekly'))
     print(f"[DEBUG] node_period_weekly: aggregated {len(data)} weeks")
     return state.copy(update={"period_stats_weekly": data, "question": state.question})
 
 def node_period_monthly(state: AggregationState):
     """Monthly aggregation dengan metrik lengkap"""
     print("[DEBUG] node_period_monthly: executing")
-    data = aggregate_by_period_enhanced(state.sheet_data, period='monthly')
+    data = _fused_result(state, 'period_stats_monthly', lambda: aggregate_by_period_enhanced(state.sheet_data, period='monthly'))
     print(f"[DEBUG] node_period_monthly: aggregated {len(data)} months")
     return state.copy(update={"period_stats_monthly": data, "question": state.question})
 
@@ -301,7 +300,10 @@ def node_outbound_clicks(state: AggregationState):
         sheet_data = filter_sheet_data_by_temporal(sheet_data, temporal_filter)
         print(f"[DEBUG] node_outbound_clicks: Data filtered from {len(state.sheet_data)} to {len(sheet_data)} rows")
     
-    data = aggregate_outbound_clicks(sheet_data)
+    if sheet_data is state.sheet_data:
+        data = _fused_result(state, 'outbound_clicks', lambda: aggregate_outbound_clicks(sheet_data))
+    else:
+        data = aggregate_outbound_clicks(sheet_data)
     print(f"[DEBUG] node_outbound_clicks: total={data.get('total', 0)}")
     return state.copy(update={"outbound_clicks": data, "question": state.question})
 
@@ -422,33 +424,10 @@ graph.add_node("detect_intent", node_detect_intent)
 def node_aggregate_monthly(state: AggregationState):
     debug_monthly = {}
     debug_failed_rows = []
-    # Robust parsing: coba beberapa nama kolom dan format tanggal
-    import re
     from collections import defaultdict
-    import calendar
     from datetime import datetime
 
     monthly_stats = defaultdict(lambda: {'cost': 0, 'leads': 0, 'clicks': 0})
-    # Deteksi kolom tanggal/bulan secara lebih robust, prioritaskan 'Date' (case-insensitive)
-    date_keys = set()
-    if state.sheet_data:
-        # Prioritas: kolom persis 'Date' (case-insensitive)
-        for k in state.sheet_data[0].keys():
-            if k.strip().lower() == 'date':
-                date_keys = {k}
-                break
-        if not date_keys:
-            for k in state.sheet_data[0].keys():
-                kl = str(k).lower()
-                if any(x in kl for x in ["tanggal", "date", "tgl", "day", "dt", "bulan", "month"]):
-                    date_keys.add(k)
-    if not date_keys and state.sheet_data:
-        # Fallback: cari kolom yang isinya mirip tanggal
-        for k in state.sheet_data[0].keys():
-            sample_val = str(state.sheet_data[0][k])
-            if re.match(r"\d{4}-\d{2}-\d{2}", sample_val) or re.match(r"\d{2}/\d{2}/\d{4}", sample_val):
-                date_keys.add(k)
-
 
     def clean_number(val):
         if val is None:
@@ -467,52 +446,15 @@ def node_aggregate_monthly(state: AggregationState):
             except Exception:
                 return 0
 
+    current_year = datetime.now().year
     for idx, row in enumerate(state.sheet_data):
-        tgl = None
-        # Prioritaskan kolom yang nampak seperti tanggal
-        for k in date_keys or row.keys():
-            v = row.get(k)
-            if not v:
-                continue
-            val = str(v).strip()
-            try:
-                # Format: YYYY-MM-DD
-                if re.match(r"^\d{4}-\d{2}-\d{2}$", val):
-                    tgl = datetime.strptime(val, "%Y-%m-%d")
-                    break
-                # Format: DD/MM/YYYY
-                if re.match(r"^\d{2}/\d{2}/\d{4}$", val):
-                    tgl = datetime.strptime(val, "%d/%m/%Y")
-                    break
-                # Format: YYYY-MM (bulan saja)
-                if re.match(r"^\d{4}-\d{2}$", val):
-                    tgl = datetime.strptime(val + "-01", "%Y-%m-%d")
-                    break
-                # Format: YYYY-MM or YYYY/MM
-                m = re.match(r"^(\d{4})[-/](\d{1,2})$", val)
-                if m:
-                    y = int(m.group(1)); mo = int(m.group(2))
-                    tgl = datetime(y, mo, 1)
-                    break
-                # Try to parse month names like 'May' or 'Mei' optionally with year
-                m = re.match(r"^(?:(\d{4})\s*)?([A-Za-z]+)$", val)
-                if m:
-                    year = int(m.group(1)) if m.group(1) else None
-                    mon_name = m.group(2)
-                    try:
-                        mo = list(calendar.month_name).index(mon_name.capitalize())
-                        if mo:
-                            tgl = datetime(year or datetime.now().year, mo, 1)
-                            break
-                    except Exception:
-                        pass
-            except Exception as parse_err:
-                print(f"[DEBUG] Failed to parse date from row {idx}, key {k}, val {val}: {parse_err}")
-                continue
-
+        # ADDITIVE: Bulan kanonik (tanggal, YYYY-MM atau nama bulan) dari services/calendar_table.py;
+        # bulan tanpa tahun dianggap tahun berjalan
+        month = row_month(row)
+        tgl = (month[0] or current_year, month[1]) if month else None
         if tgl:
             try:
-                key = (tgl.year, tgl.month)
+                key = tgl
                 monthly_stats[key]['cost'] += clean_number(row.get('Cost', 0))
                 # Coba beberapa kemungkinan kolom leads dengan safe get
                 leads_val = 0
@@ -554,26 +496,17 @@ def node_tren_bulanan(state: AggregationState):
 def node_extract_bulan(state: AggregationState):
     if state.intent != 'tanya_bulan':
         return state.copy(update={"question": state.question})
+    import calendar
     bulan_set = set()
     for row in state.sheet_data:
         for k, v in row.items():
             k_lower = k.lower()
             if k_lower in ["bulan", "month"] and v:
                 bulan_set.add(str(v).strip())
-            elif k_lower in ["tanggal", "date", "tgl"] and v:
-                import re
-                import calendar
-                val = str(v)
-                # Format: YYYY-MM-DD
-                m = re.match(r"(\d{4})-(\d{2})-(\d{2})", val)
-                if m:
-                    bulan_num = int(m.group(2))
-                    bulan_set.add(calendar.month_name[bulan_num])
-                # Format: DD/MM/YYYY
-                m = re.match(r"(\d{2})/(\d{2})/(\d{4})", val)
-                if m:
-                    bulan_num = int(m.group(2))
-                    bulan_set.add(calendar.month_name[bulan_num])
+        # ADDITIVE: Bulan dari tanggal kanonik (services/calendar_table.py)
+        entry = row_calendar(row)
+        if entry:
+            bulan_set.add(calendar.month_name[entry.month])
     bulan_list = sorted(list(bulan_set))
     print(f"[DEBUG] node_extract_bulan hasil bulan_list: {bulan_list}")
     return state.copy(update={"bulan_list": bulan_list, "question": state.question})
@@ -582,6 +515,7 @@ graph = StateGraph(AggregationState)
 
 # Node registration (all after graph is defined)
 graph.add_node("detect_intent", node_detect_intent)
+graph.add_node("fused_aggregates", node_fused_aggregates)  # ADDITIVE: Satu scan untuk semua agregat
 graph.add_node("extract_bulan", node_extract_bulan)
 graph.add_node("aggregate_monthly", node_aggregate_monthly)
 graph.add_node("aggregate_age_gender_monthly", node_aggregate_age_gender_monthly)
@@ -712,27 +646,35 @@ def node_llm_summary(state: AggregationState):
         age_gender = getattr(state, 'age_gender', None)
         if not age_gender or len(age_gender) == 0:
             # Aggregate if not yet done
-            age_gender = aggregate_age_gender(state.sheet_data)
+            age_gender = state.cube.view('age_gender') if state.cube is not None else aggregate_age_gender(state.sheet_data)
         
         if age_gender and len(age_gender) > 0:
             # ADDITIVE: Filter by month AND week if specified
             if month_filter or week_filter:
-                filtered_data = state.sheet_data
-                
-                # Apply month filter
-                if month_filter:
-                    print(f"[DEBUG] Filtering data by month: {month_filter} ({month_name})")
-                    filtered_data = [row for row in filtered_data if row.get('Date') and extract_month_from_date(row.get('Date')) == month_filter]
-                
-                # Apply week filter (only if month also specified, week is relative to month)
-                if week_filter and month_filter:
-                    print(f"[DEBUG] Filtering data by week: {week_filter} within month {month_name}")
-                    filtered_data = [row for row in filtered_data if row.get('Date') and extract_week_from_date(row.get('Date'), month_filter) == week_filter]
+                if state.cube is not None:
+                    # ADDITIVE: Slice cube per bulan/minggu (sel per tanggal), tanpa scan baris
+                    sliced = state.cube.slice(cell_filter(month=month_filter, week=week_filter if month_filter else None))
+                    filtered_count = sliced.row_count
+                    filtered_age_gender = lambda: sliced.view('age_gender')
+                else:
+                    filtered_data = state.sheet_data
+                    
+                    # Apply month filter
+                    if month_filter:
+                        print(f"[DEBUG] Filtering data by month: {month_filter} ({month_name})")
+                        filtered_data = select_temporal(filtered_data, month=month_filter)
+                    
+                    # Apply week filter (only if month also specified, week is relative to month)
+                    if week_filter and month_filter:
+                        print(f"[DEBUG] Filtering data by week: {week_filter} within month {month_name}")
+                        filtered_data = select_temporal(filtered_data, month=month_filter, week=week_filter)
+                    filtered_count = len(filtered_data)
+                    filtered_age_gender = lambda: aggregate_age_gender(filtered_data)
                 
-                if len(filtered_data) > 0:
-                    age_gender = aggregate_age_gender(filtered_data)
+                if filtered_count > 0:
+                    age_gender = filtered_age_gender()
                     period_text = f"minggu ke-{week_filter} bulan {month_name}" if week_filter else f"bulan {month_name}"
-                    print(f"[DEBUG] Filtered {len(state.sheet_data)} rows -> {len(filtered_data)} rows for {period_text}")
+                    print(f"[DEBUG] Filtered {len(state.sheet_data)} rows -> {filtered_count} rows for {period_text}")
                 else:
                     period_text = f"minggu ke-{week_filter} di bulan {month_name}" if week_filter else f"bulan {month_name}"
                     llm_answer = f"Tidak ditemukan data untuk {period_text}. Silakan cek periode yang tersedia."
@@ -912,9 +854,14 @@ def node_llm_summary(state: AggregationState):
             print(f"[DEBUG] ADSET HANDLER: Starting with {len(filtered_data)} total rows")
             print(f"[DEBUG] ADSET HANDLER: month_filter={month_filter}, month_name={month_name}")
             
-            if month_filter:
+            if state.cube is not None:
+                # ADDITIVE: Slice cube per bulan/minggu, breakdown adset dari rollup (tanpa scan baris)
+                period_text = (f"minggu ke-{week_filter} bulan {month_name}" if week_filter else f"bulan {month_name}") if month_filter else ""
+                sliced = state.cube.slice(cell_filter(month=month_filter, week=week_filter if month_filter else None)) if month_filter else state.cube
+                print(f"[DEBUG] ADSET HANDLER: Cube slice {state.cube.row_count} → {sliced.row_count} rows")
+            elif month_filter:
                 before_filter = len(filtered_data)
-                filtered_data = [row for row in filtered_data if row.get('Date') and extract_month_from_date(row.get('Date')) == month_filter]
+                filtered_data = select_temporal(filtered_data, month=month_filter)
                 after_filter = len(filtered_data)
                 print(f"[DEBUG] ADSET HANDLER: After month filter {month_name}: {before_filter} → {after_filter} rows")
                 period_text = f"minggu ke-{week_filter} bulan {month_name}" if week_filter else f"bulan {month_name}"
@@ -922,18 +869,21 @@ def node_llm_summary(state: AggregationState):
                 period_text = ""
                 print(f"[DEBUG] ADSET HANDLER: No month filter, using all {len(filtered_data)} rows")
             
-            if week_filter and month_filter:
+            if week_filter and month_filter and state.cube is None:
                 before_week = len(filtered_data)
-                filtered_data = [row for row in filtered_data if row.get('Date') and extract_week_from_date(row.get('Date'), month_filter) == week_filter]
+                filtered_data = select_temporal(filtered_data, month=month_filter, week=week_filter)
                 after_week = len(filtered_data)
                 print(f"[DEBUG] ADSET HANDLER: After week filter week {week_filter}: {before_week} → {after_week} rows")
             
             # Aggregate by adset
-            print(f"[DEBUG] ADSET HANDLER: Aggregating {len(filtered_data)} filtered rows by Ad set")
-            if filtered_data and len(filtered_data) > 0:
-                print(f"[DEBUG] ADSET HANDLER: Sample row Ad set value: {filtered_data[0].get('Ad set', 'MISSING')}")
-            
-            adset_breakdown = aggregate_breakdown_enhanced(filtered_data, by="Ad set")
+            if state.cube is not None:
+                adset_breakdown = sliced.view('breakdown_adset_enhanced')
+            else:
+                print(f"[DEBUG] ADSET HANDLER: Aggregating {len(filtered_data)} filtered rows by Ad set")
+                if filtered_data and len(filtered_data) > 0:
+                    print(f"[DEBUG] ADSET HANDLER: Sample row Ad set value: {filtered_data[0].get('Ad set', 'MISSING')}")
+                
+                adset_breakdown = aggregate_breakdown_enhanced(filtered_data, by="Ad set")
             
             if adset_breakdown and len(adset_breakdown) > 0:
                 print(f"[DEBUG] Adset breakdown: {len(adset_breakdown)} adsets found")
@@ -1057,7 +1007,10 @@ def node_llm_summary(state: AggregationState):
         print(f"[DEBUG] Extracted: age_range={age_range}, gender={gender}, metric={detected_metric}")
         
         # Aggregate by adset filtered by age/gender
-        adset_data = aggregate_adset_by_age_gender(state.sheet_data, age_range=age_range, gender=gender)
+        if state.cube is not None:
+            adset_data = adset_by_age_gender(state.cube, age_range=age_range, gender=gender)
+        else:
+            adset_data = aggregate_adset_by_age_gender(state.sheet_data, age_range=age_range, gender=gender)
         
         if adset_data:
             # Sort by metric descending
@@ -1530,7 +1483,8 @@ graph.add_node("llm_summary", node_llm_summary)
 
 
 
-graph.add_edge("detect_intent", "extract_bulan")
+graph.add_edge("detect_intent", "fused_aggregates")
+graph.add_edge("fused_aggregates", "extract_bulan")
 graph.add_edge("extract_bulan", "aggregate_monthly")
 graph.add_edge("aggregate_monthly", "aggregate_age_gender_monthly")
 graph.add_edge("aggregate_age_gender_monthly", "extract_adsets")
@@ -1557,7 +1511,7 @@ workflow = graph.compile()
 
 # Example usage
 
-def run_aggregation_workflow(sheet_data, question=None, chat_history=None):
+def run_aggregation_workflow(sheet_data, question=None, chat_history=None, cube=None):
     """
     Run aggregation workflow with optional chat history for context.
     
@@ -1567,6 +1521,7 @@ def run_aggregation_workflow(sheet_data, question=None, chat_history=None):
         sheet_data: List of data rows from Google Sheets
         question: User query string
         chat_history: Optional list of previous chat messages for LLM context
+        cube: Optional OlapCube untuk sheet_data (services/olap_cube.get_cube); agregat dijawab dari cube
     
     Returns:
         Workflow result dict with llm_answer and other aggregation data
@@ -1594,14 +1549,24 @@ def run_aggregation_workflow(sheet_data, question=None, chat_history=None):
             print(f"[DEBUG] Temporal filter detected: {temporal_filter}")
             sheet_data = filter_sheet_data_by_temporal(sheet_data, temporal_filter)
             print(f"[DEBUG] Data filtered by temporal constraint: {original_data_count} rows -> {len(sheet_data)} rows")
+            if cube is not None:
+                cube = cube.slice(cell_filter(year=temporal_filter.get("year"), month=temporal_filter.get("month_num"),
+                                              week=temporal_filter.get("week_num")))
         else:
             print("[DEBUG] No temporal filter detected, using all data")
     
+    # ADDITIVE: Cube hanya dipakai jika mencakup tepat baris sheet_data (partisi & posisi baris sama, bukan sekadar
+    # jumlah baris sama), mis. filter temporal dilewati karena baris pertama tidak punya kolom tanggal
+    if cube is not None and not cube.covers(sheet_data):
+        print(f"[CUBE] Cube ({cube.row_count} rows) tidak mencakup baris sheet_data ({len(sheet_data)} rows), agregasi dari baris")
+        cube = None
+    
     # Pastikan question dikirim ke state agar intent detection bekerja
     state = AggregationState(
         sheet_data=sheet_data, 
         question=question,
-        chat_history=chat_history if chat_history else []
+        chat_history=chat_history if chat_history else [],
+        cube=cube
     )
     result = workflow.invoke(state)
     return result